@@ -1,8 +1,15 @@
 import streamlit as st
 import os
-from verifier.citation_verifier_system import CitationVerificationSystem
-from verifier.citation_verify_langchain_ver import CitationVerificationLangchainVer
-from config.settings import CheckType
+from config.settings import PDF_STORE_DIR
+from utils.pdf_store import get_pdf_store
+from verifier.session import get_session
+
+
+@st.cache_resource(show_spinner="正在初始化验证会话...")
+def load_session(download_dir):
+    """进程内共享的验证会话，页面重新运行与多次验证之间复用客户端、模型与缓存"""
+    return get_session(pdf_store_dir=download_dir)
+
 
 def main():
     st.title("论文引用验证系统")
@@ -15,11 +22,13 @@ def main():
     # 侧边栏用于输入参数
     with st.sidebar:
         st.header("设置")
-        system_type = st.selectbox("选择验证系统", ["CitationVerificationSystem", "CitationVerificationLangchainVer"],
-                                  help="选择使用的验证系统")
         verify_type = st.selectbox("验证模式", ["simple", "chain"], help="选择验证模式：simple（基于精确位置）或 chain（基于向量检索）")
         doc_file = st.file_uploader("上传 PDF 文档", type=["pdf"], help="上传需要验证引用的 PDF 文档")
-        download_dir = st.text_input("文档下载路径", value="./downloads", help="指定下载参考文献的目录")
+        download_dir = st.text_input("文献存储路径", value=PDF_STORE_DIR,
+                                     help="参考文献PDF共享存储目录（按内容寻址，多个任务共用，同一文献只下载一次）")
+        if download_dir:
+            store_stats = get_pdf_store(download_dir).stats()
+            st.caption(f"已存储 {store_stats['ids']} 篇文献，共 {store_stats['bytes'] / 2 ** 20:.1f}MB")
         output_dir = st.text_input("输出路径", value="./output", help="指定验证结果的输出目录")
 
     # 验证按钮
@@ -37,28 +46,16 @@ def main():
         with open(temp_doc_path, "wb") as f:
             f.write(doc_file.getbuffer())
 
-        # 确保下载和输出目录存在
-        os.makedirs(download_dir, exist_ok=True)
+        # 确保输出目录存在（文献存储目录由 PdfStore 创建）
         os.makedirs(output_dir, exist_ok=True)
 
         try:
-            # 初始化验证系统
-            if system_type == "CitationVerificationSystem":
-                system = CitationVerificationSystem(
-                    download_dir=download_dir,
-                    doc_path=temp_doc_path,
-                    output_dir=output_dir
-                )
-            else:  # CitationVerificationLangchainVer
-                system = CitationVerificationLangchainVer(
-                    download_dir=download_dir,
-                    doc_path=temp_doc_path,
-                    output_dir=output_dir
-                )
+            # 打开文档（simple 对应 CitationVerificationSystem，chain 对应 CitationVerificationLangchainVer）
+            system = load_session(download_dir).open(temp_doc_path, output_dir, verify_type)
 
             # 提取参考文献
             with st.spinner("正在提取参考文献..."):
-                references = system.parser.extract_references(system.doc_path)
+                references = system.extract_references()
                 st.success(f"提取到 {len(references)} 条参考文献")
 
             # 创建动态输出区域
@@ -81,14 +78,29 @@ def main():
 
             if verify_type == "simple":
                 st.info("✅ 使用精确位置（Grobid）模型进行验证")
-                for i, ref in enumerate(references, 1):
-                    with st.spinner(f"正在验证参考文献 {i}/{len(references)}: {ref.get('title', '未知标题')}..."):
-                        system.verify_citation([ref], callback=callback)
+                # 整篇论文作为一次运行：逐条验证共用一个判定仓库缓冲与运行日志，结束时统一提交
+                system.begin_run()
+                try:
+                    for i, ref in enumerate(references, 1):
+                        with st.spinner(f"正在验证参考文献 {i}/{len(references)}: {ref.get('title', '未知标题')}..."):
+                            system.verify_citation([ref], callback=callback)
+                finally:
+                    system.finish_run()
+                system.report_context_savings(callback=callback)
             else:
                 st.info("✅ 使用向量检索（FAISS）模型进行验证")
-                for i, ref in enumerate(references, 1):
-                    with st.spinner(f"正在验证参考文献 {i}/{len(references)}: {ref.get('title', '未知标题')}..."):
-                        system.verify_citation_by_chain([ref], callback=callback)
+                # 整篇论文作为一次运行：逐条验证共用一个判定仓库缓冲与运行日志，结束时统一提交
+                system.begin_run()
+                try:
+                    for i, ref in enumerate(references, 1):
+                        with st.spinner(f"正在验证参考文献 {i}/{len(references)}: {ref.get('title', '未知标题')}..."):
+                            system.verify_citation_by_chain([ref], callback=callback)
+                finally:
+                    system.finish_run()
+                system.report_early_stop(callback=callback)
+            system.report_prompt_cache(callback=callback)
+            if system.session.cascade is not None:
+                st.caption(system.session.cascade.summary().replace("\n", "  \n"))
 
             # 提供下载结果的选项
             output_file = os.path.join(output_dir, f"output_{system.doc_id}.txt") if hasattr(system, 'output_path') else \
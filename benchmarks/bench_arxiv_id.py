@@ -0,0 +1,115 @@
+"""
+标识规范化微基准：合成多种写法的引用文本（arXiv:编号/带版本号/链接/10.48550 DOI/旧式编号/CoRR/普通 DOI），
+对比预编译的合并正则（utils/arxiv_id）与逐个模式匹配的吞吐量，以及与旧做法 split(":")[-1] 的识别率和去重效果；
+并检查只在原始引用文本（GROBID includeRawCitations）中出现 arXiv 编号的条目能得到规范键
+
+运行：
+    python -m benchmarks.bench_arxiv_id
+    python -m benchmarks.bench_arxiv_id --n 200000
+"""
+import argparse
+import random
+import re
+import time
+
+from lxml import etree
+
+from parsers.grobid_parser import GROBID_PROFILES, GrobidParser
+from utils.arxiv_id import _canonical, canonical_arxiv_id, extract_identifiers
+
+_FORMS = [
+    "arXiv:{id}", "arXiv:{id}v{v}", "arXiv preprint arXiv:{id}", "https://arxiv.org/abs/{id}v{v}",
+    "https://arxiv.org/pdf/{id}.pdf", "doi:10.48550/arXiv.{id}", "CoRR, abs/{id}", "arXiv e-prints, arXiv:{id}v{v}",
+]
+_OLD_FORMS = ["arXiv:{id}", "{id}v{v}", "https://arxiv.org/abs/{id}"]
+
+# 逐个模式匹配（合并前的写法，re.I），用于吞吐量对比
+_SEPARATE = [re.compile(p, re.I) for p in (
+    r'arxiv\.org/(?:abs|pdf)/(\d{4}\.\d{4,5}(?:v\d+)?|[a-z\-]+(?:\.[A-Z]{2})?/\d{7}(?:v\d+)?)',
+    r'10\.48550/arxiv\.(\d{4}\.\d{4,5})',
+    r'arXiv\s*(?:preprint\s*)?(?:e-prints?,?\s*)?(?:abs/)?:?\s*(\d{4}\.\d{4,5}(?:v\d+)?|[a-z\-]+/\d{7}(?:v\d+)?)',
+    r'CoRR,?\s*abs/(\d{4}\.\d{4,5})',
+    r'\b(10\.\d{4,9}/[^\s"<>]+)',
+    r'(https?://[^\s"<>]+)',
+)]
+
+
+def synthetic_citations(n, seed=0):
+    """返回 [(引用文本, 规范 arXiv 编号或 None)]"""
+    rng = random.Random(seed)
+    items = []
+    for _ in range(n):
+        kind = rng.random()
+        prefix = f"A. Author and B. Author. Some title about learning. In Venue, {rng.randint(1995, 2024)}. "
+        if kind < 0.6:
+            arxiv = f"{rng.randint(7, 24):02d}{rng.randint(1, 12):02d}.{rng.randint(0, 99999):05d}"
+            form = rng.choice(_FORMS)
+        elif kind < 0.75:
+            arxiv = f"{rng.choice(['hep-th', 'cs', 'math', 'cond-mat'])}/{rng.randint(9101001, 9912999):07d}"
+            form = rng.choice(_OLD_FORMS)
+        else:
+            arxiv = None
+            form = f"doi:10.{rng.randint(1000, 9999)}/{rng.randint(1000000, 9999999)}"
+        items.append((prefix + form.format(id=arxiv, v=rng.randint(1, 4)), arxiv))
+    return items
+
+
+# GROBID 未识别出 idno、arXiv 编号只出现在原始引用文本中的条目
+RAW_NOTE_BIBL = """<biblStruct xmlns="http://www.tei-c.org/ns/1.0" xml:id="b0">
+  <analytic><title level="a" type="main">Some title about learning</title></analytic>
+  <monogr><title level="j">CoRR</title><imprint><date type="published" when="2021" /></imprint></monogr>
+  <note type="raw_reference">A. Author. Some title about learning. arXiv preprint arXiv:2104.01234v2, 2021.</note>
+</biblStruct>"""
+
+
+def check_raw_note():
+    """processReferences 档位须保留原始引用文本，且只带原始文本编号的条目能得到规范键"""
+    assert GROBID_PROFILES["references"][1].get("include_raw_citations"), "references 档位未开启 includeRawCitations"
+    ref = GrobidParser.parse_bibl(etree.fromstring(RAW_NOTE_BIBL))
+    assert ref["doi"] == "arXiv:2104.01234" and ref["journal"] == "arXiv", ref
+    print(f"  原始引用文本回退: {ref['doi']}（journal={ref['journal']}）")
+
+
+def _separate(text):
+    """与 extract_identifiers 相同的规范化与去重，只是每个模式各扫描一遍"""
+    found = {"arxiv": [], "doi": [], "url": []}
+    for kind, pattern in zip(("arxiv", "arxiv", "arxiv", "arxiv", "doi", "url"), _SEPARATE):
+        for match in pattern.finditer(text):
+            value = _canonical(match.group(1)) if kind == "arxiv" else match.group(1)
+            if value not in found[kind]:
+                found[kind].append(value)
+    return found
+
+
+def _timed(func, texts):
+    start = time.perf_counter()
+    for text in texts:
+        func(text)
+    return len(texts) / (time.perf_counter() - start)
+
+
+def run(n):
+    items = synthetic_citations(n)
+    texts = [t for t, _ in items]
+    print(f"{n} 条合成引用，其中 {sum(a is not None for _, a in items)} 条含 arXiv 编号")
+    print(f"  合并正则 extract_identifiers   {_timed(extract_identifiers, texts):>10,.0f} 条/s")
+    print(f"  合并正则 canonical_arxiv_id    {_timed(canonical_arxiv_id, texts):>10,.0f} 条/s")
+    print(f"  逐个模式匹配                   {_timed(_separate, texts):>10,.0f} 条/s")
+
+    ids = [(t.split("arXiv", 1)[-1], a) for t, a in items if a is not None]
+    legacy = sum(v.split(":")[-1] == a for v, a in ids)
+    engine = sum(canonical_arxiv_id(t) == a for t, a in items if a is not None)
+    false_pos = sum(canonical_arxiv_id(t) is not None for t, a in items if a is None)
+    print(f"  识别率: 合并正则 {engine / len(ids):.1%}（误报 {false_pos}），旧做法 split(':')[-1] {legacy / len(ids):.1%}")
+    distinct = len({a for _, a in ids})
+    legacy_keys = len({v.split(":")[-1] for v, _ in ids})
+    engine_keys = len({canonical_arxiv_id(t) for t, a in items if a is not None})
+    print(f"  去重: 实际 {distinct} 篇，规范键 {engine_keys} 个，旧做法 {legacy_keys} 个（版本号/写法不同被视为不同文献）")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='标识规范化微基准')
+    parser.add_argument('--n', type=int, default=50000)
+    args = parser.parse_args()
+    check_raw_note()
+    run(args.n)
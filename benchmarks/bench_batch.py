@@ -0,0 +1,122 @@
+"""
+批量调度基准：--papers 篇论文各引用 --refs 篇 arXiv 文献，被引文献按 Zipf 分布取自 --pool 篇的文献池（热门文献被反复引用），
+对比逐篇独立验证（每篇按参考文献顺序处理，开启推测式预取）与批量调度（按引用关系图分波准备被引文献，依赖的验证随后执行）的
+端到端耗时、GROBID 请求数、arXiv 下载次数与证据索引的新建/加载次数
+使用本地替身后端：--grobid_delay 模拟 GROBID 处理耗时，--download_delay 模拟 arXiv 检索与下载耗时；两种方式各用独立的工作目录（冷启动）。
+
+运行：
+    python -m benchmarks.bench_batch
+    python -m benchmarks.bench_batch --papers 40 --refs 30 --pool 300 --verify_type chain
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+from benchmarks.bench_prefetch import BIBL, TEI_HEAD, SlowArxivClient
+from service.fake_backends import FakeGrobidServer
+from verifier.batch import BatchScheduler
+from verifier.session import VerifierSession
+
+
+class CountingArxivClient(SlowArxivClient):
+    def __init__(self, delay):
+        super().__init__(delay)
+        self.downloads = 0
+        self._lock = threading.Lock()
+
+    def download_pdf(self, pdf_url, save_path):
+        with self._lock:
+            self.downloads += 1
+        return super().download_pdf(pdf_url, save_path)
+
+
+def build_tei(cited):
+    """施引论文的TEI：第 i 条参考文献为 arXiv:2301.<cited[i]>"""
+    body = "".join(f'        <p>Method {i} extends prior work <ref type="bibr" target="#b{i}">[{i + 1}]</ref> '
+                   f'with a new objective.</p>\n' for i in range(len(cited)))
+    bibls = "".join(BIBL.format(i=i).replace(f"2301.{i:05d}", f"2301.{paper:05d}")
+                    .replace(f"Referenced Paper {i}<", f"Referenced Paper {paper}<") for i, paper in enumerate(cited))
+    return (TEI_HEAD + body + "      </div>\n    </body>\n    <back>\n      <div type=\"references\">\n"
+            "        <listBibl>\n" + bibls + "        </listBibl>\n      </div>\n    </back>\n  </text>\n</TEI>\n")
+
+
+def make_corpus(fixture_dir, args):
+    rng = random.Random(0)
+    weights = [1 / (rank + 1) ** args.zipf for rank in range(args.pool)]
+    doc_paths = []
+    for p in range(args.papers):
+        cited = set()
+        while len(cited) < args.refs:
+            cited.add(rng.choices(range(args.pool), weights)[0])
+        path = os.path.join(fixture_dir, f"batch_paper_{p:03d}.pdf")
+        with open(path, "wb") as f:
+            f.write(f"%PDF-1.4\n% batch benchmark paper {p}\n%%EOF\n".encode())
+        with open(os.path.join(fixture_dir, f"batch_paper_{p:03d}.tei.xml"), "w", encoding="utf-8") as f:
+            f.write(build_tei(sorted(cited, key=lambda _: rng.random())))
+        doc_paths.append(path)
+    return doc_paths
+
+
+def run_mode(name, doc_paths, args, grobid, work_dir, batch):
+    os.makedirs(work_dir)
+    # TEI 缓存、证据索引等相对路径的缓存目录落在各自的工作目录中
+    os.chdir(work_dir)
+    client = CountingArxivClient(args.download_delay)
+    session = VerifierSession(grobid_url=grobid.url, llm_platform="fake",
+                              pdf_store_dir=os.path.join(work_dir, "pdf_store"), arxiv_client=client,
+                              prefetch_workers=args.workers, warehouse_dir="")
+    output_dir = os.path.join(work_dir, "output")
+    served = grobid.served
+    start = time.perf_counter()
+    try:
+        if batch:
+            scheduler = BatchScheduler(session, doc_paths, output_dir, args.verify_type, wave_size=args.wave_size)
+            results = scheduler.run()
+        else:
+            results = []
+            for path in doc_paths:
+                system = session.open(path, output_dir, args.verify_type)
+                references = system.extract_references()
+                if args.verify_type == "simple":
+                    results.append(system.verify_citation(references))
+                else:
+                    results.append(system.verify_citation_by_chain(references))
+        elapsed = time.perf_counter() - start
+        r = session.evidence_retriever.stats if session.evidence_retriever is not None else None
+        evidence = f"，证据索引新建 {r['indexed']} / 加载 {r['loaded']} / 命中 {r['cache_hits']}" if r else ""
+        print(f"  {name}: {elapsed:.2f}s，结果 {sum(len(x) for x in results)} 条，GROBID 请求 {grobid.served - served} 次，"
+              f"arXiv 下载 {client.downloads} 次{evidence}")
+        if batch:
+            print("  " + scheduler.summary().replace("\n", "\n  "))
+    finally:
+        session.executor.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='批量调度基准')
+    parser.add_argument('--papers', type=int, default=20, help='施引论文数')
+    parser.add_argument('--refs', type=int, default=20, help='每篇论文引用的 arXiv 文献数')
+    parser.add_argument('--pool', type=int, default=150, help='被引文献池大小')
+    parser.add_argument('--zipf', type=float, default=1.1, help='被引文献热度的 Zipf 指数')
+    parser.add_argument('--workers', type=int, default=4, help='会话线程数（预取 / 批量准备）')
+    parser.add_argument('--wave_size', type=int, default=0, help='批量调度每波的被引文献数，0 为自动')
+    parser.add_argument('--verify_type', type=str, default='simple', choices=['simple', 'chain'])
+    parser.add_argument('--grobid_delay', type=float, default=0.02, help='替身 GROBID 每次请求的处理耗时（秒）')
+    parser.add_argument('--download_delay', type=float, default=0.05, help='模拟每篇文献检索与下载的耗时（秒）')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fixture_dir = os.path.join(tmp, "fixtures")
+        os.makedirs(fixture_dir)
+        paths = make_corpus(fixture_dir, args)
+        grobid = FakeGrobidServer(fixture_dir=fixture_dir, delay=args.grobid_delay).start()
+        print(f"{args.papers} 篇论文 × {args.refs} 篇被引文献（文献池 {args.pool} 篇，Zipf {args.zipf}），"
+              f"{args.verify_type} 模式，GROBID {args.grobid_delay * 1000:.0f}ms/请求，检索下载 {args.download_delay * 1000:.0f}ms/篇")
+        try:
+            run_mode("逐篇独立", paths, args, grobid, os.path.join(tmp, "independent"), batch=False)
+            run_mode("批量调度", paths, args, grobid, os.path.join(tmp, "batch"), batch=True)
+        finally:
+            grobid.stop()
@@ -0,0 +1,95 @@
+"""
+模型级联基准：模拟快速模型（低延迟、低单价，难例上易错且置信度偏低）与推理模型（高延迟、高单价、更准确），
+对比全部交给推理模型与级联（快速模型先判，不确定或低置信度时升级）的耗时、成本与准确率，
+并用影子复核产生的判定日志输出不同阈值下的升级比例与两级一致率（python -m verifier.cascade 的离线报告）
+
+运行：
+    python -m benchmarks.bench_cascade
+    python -m benchmarks.bench_cascade --citations 500 --threshold 0.7 --shadow_rate 0.2
+"""
+import argparse
+import hashlib
+import os
+import tempfile
+import time
+
+from langchain_core.language_models.llms import LLM
+
+from verifier.cascade import CascadeVerifier, agreement_report
+from verifier.prompts import parse_verdict, verify_citation_with_llm
+
+
+def _case(prompt, seed=0):
+    """由提示词中的引用片段确定模拟样本的真实标签、难度（多数样本较容易）与各模型的随机扰动"""
+    context = prompt.split('"""')[1]
+    digest = hashlib.sha256(context.encode()).digest()
+    noise = hashlib.sha256(f"{seed}:{context}".encode()).digest()[0] / 255
+    return ("相关" if digest[0] % 3 else "不相关"), (digest[1] / 255) ** 3, noise
+
+
+class SimulatedLLM(LLM):
+    """模拟模型：难度超过 skill 的样本以一定概率判错，置信度随难度下降"""
+    delay: float
+    skill: float
+    with_confidence: bool
+    seed: int = 0
+
+    @property
+    def _llm_type(self):
+        return "simulated"
+
+    def _call(self, prompt, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.delay)
+        label, difficulty, noise = _case(prompt, self.seed)
+        wrong = noise < 0.03 or (difficulty > self.skill and noise < 0.6)
+        verdict = ({"相关": "不相关", "不相关": "相关"}[label] if wrong else label)
+        if difficulty > 0.95:
+            verdict = "不确定"
+        confidence = max(0.0, min(1.0, 1.0 - difficulty + (noise - 0.5) / 5))
+        lines = [verdict]
+        if self.with_confidence:
+            lines.append(f"置信度：{confidence:.2f}")
+        lines.append("理由：模拟输出。")
+        return "\n".join(lines)
+
+
+def _accuracy(outputs, cases):
+    return sum(parse_verdict(o) == label for o, (label, _, _) in zip(outputs, cases)) / len(cases)
+
+
+def run(args):
+    contexts = [f"Method {i} builds on the referenced work and extends its objective." for i in range(args.citations)]
+    cases = [_case(f'"""{c}"""') for c in contexts]
+    heavy = SimulatedLLM(delay=args.heavy_delay, skill=0.9, with_confidence=False, seed=1)
+    fast = SimulatedLLM(delay=args.fast_delay, skill=0.4, with_confidence=True, seed=2)
+    print(f"{args.citations} 条引用，快速模型 {args.fast_delay * 1000:.0f}ms/次（单价 {args.fast_price}），"
+          f"推理模型 {args.heavy_delay * 1000:.0f}ms/次（单价 {args.heavy_price}），阈值 {args.threshold}")
+
+    start = time.perf_counter()
+    outputs = [verify_citation_with_llm(heavy, c, "Referenced Paper", "Ada", "Abstract.") for c in contexts]
+    elapsed = time.perf_counter() - start
+    print(f"  全部推理模型: 耗时 {elapsed:.2f}s，准确率 {_accuracy(outputs, cases):.1%}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = os.path.join(tmp, "cascade_log.jsonl")
+        cascade = CascadeVerifier(fast, heavy, threshold=args.threshold, fast_price=args.fast_price,
+                                  heavy_price=args.heavy_price, log_path=log_path, shadow_rate=args.shadow_rate)
+        start = time.perf_counter()
+        outputs = [cascade.verify(c, "Referenced Paper", "Ada", "Abstract.") for c in contexts]
+        elapsed = time.perf_counter() - start
+        print(f"  级联: 耗时 {elapsed:.2f}s（含影子复核），准确率 {_accuracy(outputs, cases):.1%}")
+        print("  " + cascade.summary().replace("\n", "\n  "))
+        print()
+        agreement_report(log_path, [0.5, 0.6, 0.7, 0.8, 0.9])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='模型级联基准')
+    parser.add_argument('--citations', type=int, default=200, help='待验证的引用数')
+    parser.add_argument('--threshold', type=float, default=0.8, help='快速模型直接采纳的最低置信度')
+    parser.add_argument('--shadow_rate', type=float, default=0.1, help='影子复核抽样比例')
+    parser.add_argument('--fast_delay', type=float, default=0.002, help='快速模型单次耗时（秒）')
+    parser.add_argument('--heavy_delay', type=float, default=0.02, help='推理模型单次耗时（秒）')
+    parser.add_argument('--fast_price', type=float, default=0.0003, help='快速模型每千 token 单价')
+    parser.add_argument('--heavy_price', type=float, default=0.004, help='推理模型每千 token 单价')
+    run(parser.parse_args())
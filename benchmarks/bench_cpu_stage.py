@@ -0,0 +1,84 @@
+"""
+CPU 阶段扩展性基准：合成 --docs 份带句子切分的长篇 TEI（每份 --pages 页），分别以 1..N 个进程执行
+参考文献解析、句子级引用索引与论文切分（utils/cpu_stage），调用方与批量调度相同，由会话线程并发提交；
+同时给出只用线程（不启用进程池）时的耗时，以及进程间传递的数据量（TEI 路径 vs TEI 内容、紧凑记录 vs Document 列表）。
+进程数超过本机核心数时不会再有加速。
+
+运行：
+    python -m benchmarks.bench_cpu_stage
+    python -m benchmarks.bench_cpu_stage --docs 64 --pages 40 --workers 1,2,4,8
+"""
+import argparse
+import os
+import pickle
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.bench_tei_stream import write_synthetic_tei
+from utils.academic_paper_splitter import AcademicPaperSplitter, split_sentences
+from utils.cpu_stage import TASK_NAMES, TASKS, CpuStage
+
+
+def run_all(stage, paths, threads):
+    """由 threads 个线程并发提交全部文档的三类任务，返回各任务的墙钟耗时"""
+    elapsed = {}
+    with ThreadPoolExecutor(threads) as pool:
+        for task in TASKS:
+            fn = getattr(stage, task)
+            start = time.perf_counter()
+            list(pool.map(fn, paths))
+            elapsed[task] = time.perf_counter() - start
+    return elapsed
+
+
+def report_sizes(path):
+    with open(path, "rb") as f:
+        tei_bytes = len(f.read())
+    records = AcademicPaperSplitter.from_file(path).split_records()
+    docs = AcademicPaperSplitter.documents_from_records(records)
+    print(f"单份 TEI 交接: 路径 {len(pickle.dumps(path))} B（TEI 内容 {tei_bytes / 1024:.0f} KB 不经过管道）；"
+          f"切分结果: 紧凑记录 {len(pickle.dumps(records)) / 1024:.0f} KB vs Document 列表 "
+          f"{len(pickle.dumps(docs)) / 1024:.0f} KB（{len(docs)} 块）")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='CPU 阶段扩展性基准')
+    parser.add_argument('--docs', type=int, default=32, help='TEI 文档数')
+    parser.add_argument('--pages', type=int, default=20, help='每份 TEI 的页数')
+    parser.add_argument('--workers', type=str, default="", help='进程数，逗号分隔，默认 1,2,4.. 至 CPU 核数')
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    counts = [int(w) for w in args.workers.split(",")] if args.workers else \
+        sorted({1, cores} | {2 ** i for i in range(cores.bit_length()) if 2 ** i <= cores})
+    split_sentences("Warm up.")  # 句子切分器只加载一次，不计入耗时
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(args.docs):
+            path = os.path.join(tmp, f"doc_{i:03d}.tei.xml")
+            write_synthetic_tei(path, args.pages, seed=i)
+            paths.append(path)
+        print(f"{args.docs} 份 TEI × {args.pages} 页，本机 {cores} 个 CPU 核心")
+        report_sizes(paths[0])
+
+        baseline = None
+        for workers in counts:
+            stage = CpuStage(workers)
+            try:
+                # 预热：进程启动与模块导入不计入耗时
+                run_all(stage, paths[:workers], workers)
+                elapsed = run_all(stage, paths, max(2, workers * 2))
+            finally:
+                stage.close()
+            total = sum(elapsed.values())
+            baseline = baseline or total
+            detail = "，".join(f"{TASK_NAMES[task]} {args.docs / seconds:6.1f} 篇/s"
+                              for task, seconds in elapsed.items())
+            mode = "线程内执行" if workers == 1 else f"{workers} 个进程"
+            print(f"  {mode:<8}: 合计 {total:6.2f}s（加速 {baseline / total:4.2f}x）  {detail}")
+
+        # 只用线程：受 GIL 限制，线程数增加不会缩短 CPU 计算时间
+        stage = CpuStage(1)
+        elapsed = run_all(stage, paths, max(counts) * 2)
+        print(f"  {'仅线程':<8}: 合计 {sum(elapsed.values()):6.2f}s（{max(counts) * 2} 个线程，不启用进程池）")
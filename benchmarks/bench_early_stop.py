@@ -0,0 +1,133 @@
+"""
+自适应检索与逐段提前终止基准：单篇论文引用 --refs 篇 arXiv 文献，每篇在正文中被 1..--max_mentions 个段落引用，
+其中 --miscited 比例的文献被错误引用；模拟模型按段落内容给出判定（以 --noise 概率判错或输出“不确定”）。
+对比固定逐段验证（CONTEXT_SCORE_RATIO=0，不提前终止）与自适应检索 + 提前终止的大模型调用次数、耗时，
+以及文献级结论（任一段“相关”即相关，否则有“不相关”即不相关）的准确率与两种方式的一致率
+
+运行：
+    python -m benchmarks.bench_early_stop
+    python -m benchmarks.bench_early_stop --refs 60 --max_mentions 10 --retrieval vector
+"""
+import argparse
+import hashlib
+import os
+import random
+import tempfile
+import time
+
+from langchain_core.language_models.llms import LLM
+
+from benchmarks.bench_prefetch import BIBL, TEI_HEAD
+from service.fake_backends import FakeArxivClient, FakeGrobidServer
+from verifier.llm_platform import create_llm_platform
+from verifier.prompts import parse_verdict
+from verifier.session import VerifierSession
+
+CITED = "builds directly on the method of"
+MISCITED = "is listed among surveys such as"
+
+
+class SimulatedLLM(LLM):
+    """按引用片段判定：片段中为正确引用的措辞时判“相关”，否则判“不相关”；以 noise 概率判错或输出“不确定”"""
+    delay: float
+    noise: float
+    calls: int = 0
+
+    @property
+    def _llm_type(self):
+        return "simulated"
+
+    def _call(self, prompt, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.delay)
+        self.calls += 1
+        context = prompt.split('"""')[-2]
+        label = "相关" if CITED in context else "不相关"
+        roll = hashlib.sha256(context.encode()).digest()[0] / 255
+        if roll < self.noise / 2:
+            label = "不确定"
+        elif roll < self.noise:
+            label = {"相关": "不相关", "不相关": "相关"}[label]
+        return f"{label}\n理由：模拟输出。"
+
+
+def build_tei(args):
+    """每篇文献被随机 1..max_mentions 个段落引用；错误引用的文献在所有段落中都使用无关措辞"""
+    rng = random.Random(0)
+    truth, paragraphs = {}, []
+    for i in range(args.refs):
+        cited = rng.random() >= args.miscited
+        truth[f"arXiv:2301.{i:05d}"] = "相关" if cited else "不相关"
+        for j in range(rng.randint(1, args.max_mentions)):
+            phrase = CITED if cited else MISCITED
+            paragraphs.append(f'        <p>Variant {j} of our pipeline {phrase} prior work '
+                              f'<ref type="bibr" target="#b{i}">[{i + 1}]</ref> on task {i}.</p>\n')
+    rng.shuffle(paragraphs)
+    bibls = "".join(BIBL.format(i=i) for i in range(args.refs))
+    tei = (TEI_HEAD + "".join(paragraphs) + "      </div>\n    </body>\n    <back>\n      <div type=\"references\">\n"
+           "        <listBibl>\n" + bibls + "        </listBibl>\n      </div>\n    </back>\n  </text>\n</TEI>\n")
+    return tei, truth
+
+
+def reference_verdict(entries):
+    verdicts = [parse_verdict(e["verification_result"]) for e in entries]
+    if "相关" in verdicts:
+        return "相关"
+    return "不相关" if "不相关" in verdicts else "不确定"
+
+
+def run_mode(name, doc_path, args, grobid_url, work_dir, adaptive):
+    os.makedirs(work_dir)
+    os.chdir(work_dir)
+    _, embeddings = create_llm_platform("fake")
+    llm = SimulatedLLM(delay=args.llm_delay, noise=args.noise)
+    session = VerifierSession(grobid_url=grobid_url, pdf_store_dir=os.path.join(work_dir, "pdf_store"),
+                              arxiv_client=FakeArxivClient(), llm=llm, embeddings=embeddings, prefetch_workers=0,
+                              warehouse_dir="")
+    system = session.open(doc_path, os.path.join(work_dir, "output"), "chain", retrieval_mode=args.retrieval)
+    if not adaptive:
+        system.score_ratio = 0
+        system.early_stop_related = system.early_stop_unrelated = 0
+    references = system.extract_references()
+    start = time.perf_counter()
+    system.verify_citation_by_chain(references)
+    elapsed = time.perf_counter() - start
+    verdicts = {key: reference_verdict(entries) for key, entries in system.processed_refs.items()}
+    print(f"  {name}: {elapsed:.2f}s，大模型调用 {llm.calls} 次")
+    print(f"    {system.early_stop.summary()}")
+    return verdicts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='自适应检索与提前终止基准')
+    parser.add_argument('--refs', type=int, default=40, help='被引文献数')
+    parser.add_argument('--max_mentions', type=int, default=8, help='每篇文献最多被引用的段落数')
+    parser.add_argument('--miscited', type=float, default=0.3, help='错误引用的文献比例')
+    parser.add_argument('--noise', type=float, default=0.1, help='模拟模型逐段判错或输出“不确定”的概率')
+    parser.add_argument('--llm_delay', type=float, default=0.05, help='模拟模型每次调用的耗时（秒）')
+    parser.add_argument('--retrieval', type=str, default='hybrid', choices=['hybrid', 'vector'])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fixture_dir = os.path.join(tmp, "fixtures")
+        os.makedirs(fixture_dir)
+        tei, truth = build_tei(args)
+        doc_path = os.path.join(fixture_dir, "early_stop_paper.pdf")
+        with open(doc_path, "wb") as f:
+            f.write(b"%PDF-1.4\n% early stop benchmark paper\n%%EOF\n")
+        with open(os.path.join(fixture_dir, "early_stop_paper.tei.xml"), "w", encoding="utf-8") as f:
+            f.write(tei)
+        grobid = FakeGrobidServer(fixture_dir=fixture_dir).start()
+        print(f"{args.refs} 篇被引文献（每篇 1-{args.max_mentions} 段引用，错误引用 {args.miscited:.0%}），"
+              f"{args.retrieval} 检索，模拟模型 {args.llm_delay * 1000:.0f}ms/次、逐段噪声 {args.noise:.0%}")
+        try:
+            results = {}
+            for name, adaptive in (("固定逐段验证", False), ("自适应 + 提前终止", True)):
+                verdicts = run_mode(name, doc_path, args, grobid.url, os.path.join(tmp, f"adaptive_{adaptive}"),
+                                    adaptive)
+                correct = sum(verdicts.get(key) == label for key, label in truth.items())
+                print(f"    文献级结论准确率 {correct / len(truth):.1%}")
+                results[adaptive] = verdicts
+            agree = sum(results[True].get(key) == results[False].get(key) for key in truth)
+            print(f"  两种方式文献级结论一致 {agree}/{len(truth)}")
+        finally:
+            grobid.stop()
@@ -0,0 +1,92 @@
+"""
+GROBID 客户端池基准：启动多个本地替身 GROBID（模拟处理耗时与并发上限），
+对比单节点与多节点下并发提交的吞吐量，并统计各节点分到的请求数、峰值并发、503 次数。
+默认其中一个节点并发上限较小（容易返回 503），另加一个无法连接的地址验证健康检查摘除。
+
+运行：
+    python -m benchmarks.bench_grobid_pool
+    python -m benchmarks.bench_grobid_pool --nodes 4 --requests 200 --threads 16 --delay 0.05
+    python -m benchmarks.bench_grobid_pool --pdf a.pdf --grobid_url http://h1:8070,http://h2:8070   # 真实服务
+"""
+import argparse
+import os
+import socket
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from clients.grobid_pool import GrobidPool
+from parsers.grobid_parser import GROBID_PROFILES
+from service.fake_backends import FakeGrobidServer
+
+
+def _dead_url():
+    """一个当前无人监听的本地地址"""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{s.getsockname()[1]}"
+
+
+def run(urls, pdfs, n_requests, threads, max_concurrency, profile="fulltext"):
+    service, options = GROBID_PROFILES[profile]
+    pool = GrobidPool(urls, max_concurrency=max_concurrency, sleep_time=0.2)
+    latencies, errors = [], 0
+
+    def one(i):
+        start = time.perf_counter()
+        _, status, _ = pool.process_pdf(service, pdfs[i % len(pdfs)], **options)
+        return status, time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        for status, latency in executor.map(one, range(n_requests)):
+            latencies.append(latency)
+            errors += status != 200
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    print(f"{len(urls)} 个地址: {n_requests / elapsed:.1f} 请求/s  耗时 {elapsed:.2f}s  "
+          f"p95={p95 * 1000:.0f}ms  errors={errors}")
+    for node in pool.stats():
+        print(f"  {node['url']:<28} healthy={node['healthy']!s:<5} 请求={node['requests']:<4} "
+              f"503={node['busy']:<3} 连接失败={node['errors']}")
+    return pool
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='GROBID 客户端池基准')
+    parser.add_argument('--nodes', type=int, default=3, help='替身 GROBID 节点数')
+    parser.add_argument('--requests', type=int, default=120)
+    parser.add_argument('--threads', type=int, default=12, help='并发提交的线程数')
+    parser.add_argument('--delay', type=float, default=0.05, help='替身节点单个请求的处理耗时（秒）')
+    parser.add_argument('--server_concurrency', type=int, default=4, help='替身节点的处理线程数')
+    parser.add_argument('--max_concurrency', type=int, default=4, help='池对每个节点的在途请求上限')
+    parser.add_argument('--pdf', nargs='*', help='PDF文件（默认使用占位PDF）')
+    parser.add_argument('--grobid_url', type=str, help='逗号分隔的真实 GROBID 服务地址（不启动替身）')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdfs = args.pdf
+        if not pdfs:
+            pdfs = [os.path.join(tmp, "bench.pdf")]
+            with open(pdfs[0], "wb") as f:
+                f.write(b"%PDF-1.4\n% bench\n%%EOF\n")
+
+        if args.grobid_url:
+            run(args.grobid_url.split(","), pdfs, args.requests, args.threads, args.max_concurrency)
+        else:
+            # 最后一个节点的处理线程数只有 1，池按上限分配时会收到 503 并改发其他节点
+            servers = [FakeGrobidServer(delay=args.delay, max_concurrency=args.server_concurrency).start()
+                       for _ in range(args.nodes - 1)]
+            servers.append(FakeGrobidServer(delay=args.delay, max_concurrency=1).start())
+            try:
+                run([servers[0].url], pdfs, args.requests, args.threads, args.max_concurrency)
+                run([s.url for s in servers] + [_dead_url()], pdfs, args.requests, args.threads,
+                    args.max_concurrency)
+                print("替身节点统计（累计）:")
+                for s in servers:
+                    print(f"  {s.url:<28} 已处理={s.served:<4} 峰值并发={s.peak_active}"
+                          f"（上限 {s.max_concurrency}） 503={s.rejected}")
+            finally:
+                for s in servers:
+                    s.stop()
@@ -0,0 +1,110 @@
+"""
+语料索引基准：对比 Flat / HNSW / IVF-PQ 的建库耗时、召回率（recall@k，以精确 Flat 结果为真值）、查询延迟与内存
+内存包括索引文件大小，以及在子进程中常规加载 / 内存映射加载后的匿名内存（进程私有堆）与 RSS 增量；
+内存映射加载的索引位于页缓存中，由多个 worker 进程共享，不计入匿名内存
+
+运行：
+    python -m benchmarks.bench_index --n 200000 --dim 1024
+    python -m benchmarks.bench_index --n 20000 --dim 256 --types flat hnsw
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+
+import faiss
+import numpy as np
+
+from utils.index_factory import build_index, load_index
+
+
+def _memory_mb():
+    """当前进程的 (RSS, 匿名内存) MB，读取 /proc/self/smaps_rollup（仅 Linux）"""
+    values = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                values[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return values.get("Rss", 0.0), values.get("Anonymous", 0.0)
+
+
+def _measure(path, mmap, queries, k, conn):
+    """子进程：加载索引并检索，回传召回所需结果、延迟与内存增量"""
+    rss0, anon0 = _memory_mb()
+    index, mmapped = load_index(path, mmap=mmap)
+    _, found = index.search(queries, k)
+    mean, p95 = _latency(index, queries)
+    rss1, anon1 = _memory_mb()
+    conn.send((found, mean, p95, mmapped, rss1 - rss0, anon1 - anon0))
+    conn.close()
+
+
+def synthetic_corpus(n, dim, n_queries, seed=0):
+    """聚类分布的合成向量（接近真实文本嵌入的分布），查询为语料点加噪声"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(1, n // 500), dim)).astype(np.float32)
+    labels = rng.integers(0, len(centers), n)
+    data = centers[labels] + 0.3 * rng.standard_normal((n, dim)).astype(np.float32)
+    picks = rng.integers(0, n, n_queries)
+    queries = data[picks] + 0.1 * rng.standard_normal((n_queries, dim)).astype(np.float32)
+    faiss.normalize_L2(data)
+    faiss.normalize_L2(queries)
+    return data, queries
+
+
+def _latency(index, queries):
+    latencies = []
+    for q in queries:
+        start = time.perf_counter()
+        index.search(q[None, :], 10)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return statistics.mean(latencies), latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+
+
+def run(n, dim, n_queries=200, k=10, types=("flat", "hnsw", "ivfpq")):
+    data, queries = synthetic_corpus(n, dim, n_queries)
+    exact = faiss.IndexFlatL2(dim)
+    exact.add(data)
+    _, truth = exact.search(queries, k)
+    del exact
+    print(f"{n} 个向量，维度 {dim}，原始向量 {data.nbytes / 2 ** 20:.1f}MB，{n_queries} 次查询")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for index_type in types:
+            start = time.perf_counter()
+            index, _ = build_index(data, index_type)
+            build_s = time.perf_counter() - start
+            path = os.path.join(tmp, f"{index_type}.faiss")
+            faiss.write_index(index, path)
+            del index
+
+            line = f"{index_type:<6} build={build_s:.2f}s file={os.path.getsize(path) / 2 ** 20:.1f}MB"
+            for mmap in (False, True):
+                # spawn 启动的子进程不继承本进程的堆，内存增量只反映索引加载本身
+                ctx = multiprocessing.get_context("spawn")
+                recv, send = ctx.Pipe(duplex=False)
+                proc = ctx.Process(target=_measure, args=(path, mmap, queries, k, send))
+                proc.start()
+                found, mean, p95, mmapped, rss, anon = recv.recv()
+                proc.join()
+                recall = np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)])
+                mode = "mmap" if mmapped else "ram"
+                line += (f"\n  [{mode}] recall@{k}={recall:.3f} latency mean={mean * 1000:.2f}ms "
+                         f"p95={p95 * 1000:.2f}ms rss+={rss:.1f}MB anon+={anon:.1f}MB")
+            print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='语料索引基准')
+    parser.add_argument('--n', type=int, default=100000, help='向量数量')
+    parser.add_argument('--dim', type=int, default=1024, help='向量维度（text-embedding-v4 默认 1024）')
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--types', nargs='+', default=['flat', 'hnsw', 'ivfpq'],
+                        choices=['flat', 'hnsw', 'ivfpq'])
+    args = parser.parse_args()
+    run(args.n, args.dim, args.queries, args.k, args.types)
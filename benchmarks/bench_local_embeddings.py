@@ -0,0 +1,76 @@
+"""
+本地嵌入模型基准：对比远程嵌入服务（--platform）与本地 ONNX 模型（fp32 / int8，不同线程数）的建库吞吐量与检索召回率
+召回率的标注与 bench_retrieval 一致：TEI中 <ref type="bibr" target="#bN"> 所在段落为该文献的引用段落，
+以 build_faiss_query 构造查询做纯向量检索（k 段），召回率 = 命中的引用段落数 / 引用段落总数
+
+运行：
+    python -m benchmarks.bench_local_embeddings --tei paper.tei.xml
+    python -m benchmarks.bench_local_embeddings --tei paper.tei.xml --model_dir ./models/bge-small-zh-onnx --threads 1,4,0
+"""
+import argparse
+import statistics
+import time
+
+from langchain_community.vectorstores import FAISS
+
+from config.settings import GROBID_URL, LLM_PLATFORM, LOCAL_EMBEDDING_MODEL
+from parsers.grobid_parser import GrobidParser as gp
+from utils.hybrid_retriever import chunks_from_tei
+from verifier.citation_verify_langchain_ver import CitationVerificationLangchainVer
+from verifier.llm_platform import create_embeddings
+
+
+def evaluate(name, embeddings, chunks, references, truth, k):
+    texts = [d.page_content for d in chunks]
+    start = time.perf_counter()
+    vectors = embeddings.embed_documents(texts)
+    elapsed = time.perf_counter() - start
+    vector_db = FAISS.from_embeddings(list(zip(texts, vectors)), embeddings, metadatas=[d.metadata for d in chunks])
+    recalls = []
+    for ref in references:
+        docs = vector_db.similarity_search(CitationVerificationLangchainVer.build_faiss_query(ref), k=k)
+        hits = {d.metadata["chunk_id"] for d in docs} & truth[ref["ref_id"]]
+        recalls.append(len(hits) / len(truth[ref["ref_id"]]))
+    print(f"  {name:<24} {len(texts) / elapsed:8.1f} 段/s（{elapsed:.2f}s，维度 {len(vectors[0])}）  "
+          f"recall@{k}={statistics.mean(recalls):.3f}")
+
+
+def run(tei_path, args):
+    chunks = chunks_from_tei(tei_path)
+    truth = {}
+    for doc in chunks:
+        for target in doc.metadata["ref_targets"]:
+            truth.setdefault(target, set()).add(doc.metadata["chunk_id"])
+    references = [r for r in list(gp.iter_references(tei_path)) if r["ref_id"] in truth]
+    if not references:
+        print("TEI中没有带引用目标的参考文献，无法评测")
+        return
+    print(f"{len(chunks)} 个检索块，{len(references)} 条被引用的参考文献")
+
+    try:
+        evaluate(f"{args.platform}（远程）", create_embeddings(args.platform, backend=""), chunks, references, truth,
+                 args.k)
+    except Exception as e:
+        print(f"[警告] 远程嵌入服务不可用，跳过: {e}")
+
+    from utils.local_embeddings import LocalOnnxEmbeddings
+    for int8 in (False, True):
+        for threads in (int(t) for t in args.threads.split(",")):
+            embeddings = LocalOnnxEmbeddings(args.model_dir, int8=int8, threads=threads, batch_size=args.batch_size)
+            name = f"本地 {'int8' if int8 else 'fp32'} {threads or '全部'} 线程"
+            evaluate(name, embeddings, chunks, references, truth, args.k)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='本地嵌入模型吞吐量/召回率基准')
+    parser.add_argument('--tei', type=str, help='GROBID processFulltextDocument 输出的TEI文件')
+    parser.add_argument('--doc_path', type=str, help='PDF文件路径（未提供 --tei 时通过GROBID解析）')
+    parser.add_argument('--platform', type=str, default=LLM_PLATFORM, help='对比的远程嵌入模型平台')
+    parser.add_argument('--model_dir', type=str, default=LOCAL_EMBEDDING_MODEL, help='本地 ONNX 模型目录')
+    parser.add_argument('--threads', type=str, default="1,0", help='本地推理线程数，逗号分隔，0 为全部核心')
+    parser.add_argument('--batch_size', type=int, default=32)
+    parser.add_argument('--k', type=int, default=5)
+    args = parser.parse_args()
+
+    tei_path = args.tei or gp(grobid_url=GROBID_URL).grobid_extract_tei_file(doc_path=args.doc_path)
+    run(tei_path, args)
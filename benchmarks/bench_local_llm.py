@@ -0,0 +1,73 @@
+"""
+本地量化大模型基准：按不同并发数提交引用验证请求（与多个任务/验证器并发调用 verify_single_citation 相同），
+统计 llama-server 连续批处理下的吞吐量与延迟
+- 默认使用替身 llama-server（固定槽位数、每请求固定解码耗时），用于离线/CI 验证调度行为
+- --url 指向运行中的 llama-server，或 --model 指定 GGUF 模型由 LlamaServer 启动，测量真实吞吐
+
+运行：
+    python -m benchmarks.bench_local_llm
+    python -m benchmarks.bench_local_llm --model ./models/qwen2.5-1.5b-instruct-q4_k_m.gguf --parallel 4 --threads 8
+"""
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from clients.llama_server import LlamaServer, LlamaServerLLM
+from service.fake_backends import FakeLlamaServer
+from verifier.prompts import CitationChains, citation_inputs
+
+ABSTRACT = ("We introduce a retrieval-augmented method for verifying citations in scientific papers. "
+            "The method aligns citing sentences with passages of the cited work and reports a relatedness judgement.")
+
+
+def run(url, parallel, requests_count, concurrencies):
+    chains = CitationChains(LlamaServerLLM(url=url, parallel=parallel))
+    inputs = [citation_inputs(f"Prior work [{i % 8 + 1}] proposed a citation verification method that we extend.",
+                              f"Referenced Paper {i % 8}", ["Ada Lovelace"], ABSTRACT) for i in range(requests_count)]
+
+    def one(item):
+        start = time.perf_counter()
+        chains.invoke(item)
+        return time.perf_counter() - start
+
+    for concurrency in concurrencies:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            latencies = sorted(pool.map(one, inputs))
+        elapsed = time.perf_counter() - start
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print(f"  并发 {concurrency:>2}: {requests_count / elapsed:6.2f} 次/s，延迟 p50 {statistics.median(latencies):.2f}s "
+              f"p95 {p95:.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='本地量化大模型吞吐量基准')
+    parser.add_argument('--url', type=str, default=None, help='运行中的 llama-server 地址')
+    parser.add_argument('--model', type=str, default=None, help='GGUF 模型路径（由 LlamaServer 启动）')
+    parser.add_argument('--port', type=int, default=8081, help='启动 llama-server 时使用的端口')
+    parser.add_argument('--parallel', type=int, default=4, help='并行槽位数')
+    parser.add_argument('--threads', type=int, default=0, help='推理线程数，0 为全部核心')
+    parser.add_argument('--requests', type=int, default=32, help='请求总数')
+    parser.add_argument('--concurrency', type=str, default="1,2,4,8", help='并发数，逗号分隔')
+    parser.add_argument('--delay', type=float, default=0.2, help='替身服务每请求的解码耗时（秒）')
+    args = parser.parse_args()
+
+    server, fake = None, None
+    if args.url:
+        url = args.url
+    elif args.model:
+        server = LlamaServer(args.model, f"http://127.0.0.1:{args.port}", threads=args.threads,
+                             parallel=args.parallel).start()
+        url = server.url
+    else:
+        fake = FakeLlamaServer(delay=args.delay, parallel=args.parallel).start()
+        url = fake.url
+    print(f"{args.requests} 次引用验证，{args.parallel} 个槽位，服务 {url}{'（替身）' if fake else ''}")
+    try:
+        run(url, args.parallel, args.requests, [int(c) for c in args.concurrency.split(",")])
+    finally:
+        if server is not None:
+            server.stop()
+        if fake is not None:
+            fake.stop()
@@ -0,0 +1,205 @@
+"""
+本地参考文献提取基准：对比 PDF 文本层本地解析（parsers/pdf_references）与 GROBID processReferences 的准确率与速度
+- 合成语料（默认）：生成 IEEE / ACM / 作者-年份 三种格式的文本层PDF，带标准答案，可离线运行
+- 真实语料（--pdf / --dir）：以 GROBID 结果为参照，统计本地解析与 GROBID 的一致率与回退率
+准确率指标：条目数一致、标题（规范化后相似度 ≥0.9）、年份、arXiv 编号（精确率/召回率）
+
+运行：
+    python -m benchmarks.bench_pdf_references                        # 合成语料，仅本地解析
+    python -m benchmarks.bench_pdf_references --grobid                # 合成语料，同时调用 GROBID
+    python -m benchmarks.bench_pdf_references --dir ./papers --grobid_url http://127.0.0.1:8070
+"""
+import argparse
+import difflib
+import glob
+import os
+import random
+import re
+import statistics
+import tempfile
+import time
+
+from config.settings import GROBID_URL
+from parsers import pdf_references
+
+WORDS = ("learning neural graph retrieval citation language models attention transformer efficient "
+         "robust scalable benchmark evaluation representation knowledge generation sparse dense").split()
+SURNAMES = "Smith Chen Wang Garcia Müller Kumar Ivanov Tanaka Rossi Brown Lee Novak Silva Kim Dubois".split()
+FORENAMES = "Alice Bo Carlos Dana Erik Fatima Gita Hiro Ivan Julia Kenji Lena Marco Nadia Omar".split()
+VENUES = ["Advances in Neural Information Processing Systems", "Proceedings of ACL",
+          "International Conference on Learning Representations", "Journal of Machine Learning Research"]
+
+
+def _escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path, pages):
+    """写出最简单的文本层PDF（Helvetica，每页若干行）"""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"]
+    kids = []
+    for lines in pages:
+        ops = ["BT /F1 9 Tf 11 TL 50 780 Td"] + [f"({_escape(line)}) Tj T*" for line in lines] + ["ET"]
+        stream = "\n".join(ops).encode("latin-1", "replace")
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n".encode("latin-1") + stream + b"\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    out, offsets = bytearray(b"%PDF-1.4\n"), []
+    for i, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        body = obj if isinstance(obj, bytes) else obj.encode("latin-1")
+        out += f"{i} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{o:010d} 00000 n \n" for o in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def _wrap(text, width=95):
+    lines, line = [], ""
+    for word in text.split():
+        if line and len(line) + 1 + len(word) > width:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}" if line else word
+    return lines + [line]
+
+
+def synthetic_paper(path, style, n_refs, rng):
+    """生成一篇合成论文PDF，返回参考文献标准答案"""
+    truth, entries = [], []
+    for i in range(n_refs):
+        authors = [(rng.choice(FORENAMES), rng.choice(SURNAMES)) for _ in range(rng.randint(1, 4))]
+        title = " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 10))).capitalize()
+        year = str(rng.randint(1995, 2024))
+        arxiv = f"{rng.randint(15, 24)}{rng.randint(1, 12):02d}.{rng.randint(0, 99999):05d}" if rng.random() < 0.5 else ""
+        venue = "arXiv preprint" if arxiv else rng.choice(VENUES)
+        tail = f" arXiv:{arxiv}." if arxiv else ""
+        truth.append({"title": title, "year": year, "doi": f"arXiv:{arxiv}" if arxiv else ""})
+        if style == "ieee":
+            names = ", ".join(f"{f[0]}. {s}" for f, s in authors)
+            entries.append(f"[{i + 1}] {names}, \"{title},\" in {venue}, {year}.{tail}")
+        elif style == "acm":
+            names = ", ".join(f"{f} {s}" for f, s in authors[:-1])
+            names = f"{names}, and {authors[-1][0]} {authors[-1][1]}" if names else f"{authors[0][0]} {authors[0][1]}"
+            entries.append(f"[{i + 1}] {names}. {year}. {title}. In {venue}.{tail}")
+        else:
+            names = ", ".join(f"{s}, {f[0]}." for f, s in authors)
+            entries.append(f"{names} ({year}). {title}. {venue}.{tail}")
+    if style == "author_year":
+        order = sorted(range(n_refs), key=lambda i: entries[i])
+        entries, truth = [entries[i] for i in order], [truth[i] for i in order]
+
+    body = [[" ".join(rng.choice(WORDS) for _ in range(14)) for _ in range(60)] for _ in range(rng.randint(6, 12))]
+    ref_lines = ["References"] + [line for entry in entries for line in _wrap(entry)]
+    pages = body + [ref_lines[i:i + 60] for i in range(0, len(ref_lines), 60)]
+    write_pdf(path, pages)
+    return truth
+
+
+def _norm(text):
+    return re.sub(r"[^a-z0-9]+", " ", (text or "").lower()).strip()
+
+
+def _arxiv(doi):
+    return re.sub(r"v\d+$", "", (doi or "").split(":")[-1]) if doi else ""
+
+
+def score(refs, truth):
+    """按顺序对齐比较；返回 条目数是否一致、标题/年份准确率、arXiv 精确率/召回率"""
+    refs = refs or []
+    pairs = list(zip(refs, truth))
+    title = sum(difflib.SequenceMatcher(None, _norm(r["title"]), _norm(t["title"])).ratio() >= 0.9
+                for r, t in pairs)
+    year = sum(r["year"] == t["year"] for r, t in pairs)
+    got = {_arxiv(r["doi"]) for r in refs if r.get("doi")}
+    want = {_arxiv(t["doi"]) for t in truth if t.get("doi")}
+    return {"count_ok": len(refs) == len(truth), "title": title / max(1, len(truth)),
+            "year": year / max(1, len(truth)),
+            "arxiv_p": len(got & want) / len(got) if got else 1.0,
+            "arxiv_r": len(got & want) / len(want) if want else 1.0}
+
+
+def _summary(name, scores, times, fallbacks=None):
+    line = (f"  {name:<8} 条目数一致 {statistics.mean(s['count_ok'] for s in scores):.0%}  "
+            f"标题 {statistics.mean(s['title'] for s in scores):.1%}  年份 {statistics.mean(s['year'] for s in scores):.1%}  "
+            f"arXiv P/R {statistics.mean(s['arxiv_p'] for s in scores):.1%}/{statistics.mean(s['arxiv_r'] for s in scores):.1%}  "
+            f"平均 {statistics.mean(times) * 1000:.0f}ms/篇")
+    if fallbacks is not None:
+        line += f"  回退率 {fallbacks:.0%}"
+    print(line)
+
+
+def run(corpus, grobid=None):
+    """
+    :param corpus: [(PDF路径, 标准答案或 None)]；无标准答案时以 GROBID 结果为参照
+    :param grobid: GrobidParser，None 时不调用 GROBID
+    """
+    local_scores, local_times, grobid_scores, grobid_times, fallbacks = [], [], [], [], 0
+    for pdf, truth in corpus:
+        start = time.perf_counter()
+        refs, info = pdf_references.extract_references(pdf)
+        local_times.append(time.perf_counter() - start)
+        fallbacks += refs is None
+
+        grobid_refs = None
+        if grobid is not None:
+            start = time.perf_counter()
+            grobid_refs = grobid.extract_references(pdf)
+            grobid_times.append(time.perf_counter() - start)
+        reference = truth if truth is not None else grobid_refs
+        if reference is None:
+            print(f"  {os.path.basename(pdf)}: {info}")
+            continue
+        # 回退的文档按 GROBID 结果计（无 GROBID 时记为空）
+        local_scores.append(score(refs if refs is not None else grobid_refs, reference))
+        if truth is not None and grobid_refs is not None:
+            grobid_scores.append(score(grobid_refs, truth))
+        if refs is None:
+            print(f"  回退 GROBID: {os.path.basename(pdf)}（{info['reason']}）")
+    if local_scores:
+        _summary("local", local_scores, local_times, fallbacks / len(corpus))
+    if grobid_scores:
+        _summary("grobid", grobid_scores, grobid_times)
+    elif grobid_times:
+        print(f"  grobid   平均 {statistics.mean(grobid_times) * 1000:.0f}ms/篇（作为参照）")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='本地参考文献提取基准')
+    parser.add_argument('--pdf', nargs='*', help='真实PDF文件（以 GROBID 结果为参照）')
+    parser.add_argument('--dir', type=str, help='真实PDF目录')
+    parser.add_argument('--papers', type=int, default=20, help='每种格式的合成论文数')
+    parser.add_argument('--refs', type=int, default=40, help='每篇合成论文的参考文献数')
+    parser.add_argument('--grobid', action='store_true', help='同时调用 GROBID（默认地址取配置 GROBID_URL）')
+    parser.add_argument('--grobid_url', type=str, default=None)
+    args = parser.parse_args()
+
+    grobid = None
+    if args.grobid or args.grobid_url:
+        from parsers.grobid_parser import GrobidParser
+        grobid = GrobidParser(args.grobid_url or GROBID_URL, reference_extractor="grobid")
+
+    pdfs = list(args.pdf or []) + (sorted(glob.glob(os.path.join(args.dir, "*.pdf"))) if args.dir else [])
+    if pdfs:
+        if grobid is None:
+            parser.error("真实语料需要 GROBID 结果作为参照：请指定 --grobid 或 --grobid_url")
+        print(f"真实语料 {len(pdfs)} 篇（参照 GROBID）")
+        run([(pdf, None) for pdf in pdfs], grobid)
+    else:
+        rng = random.Random(0)
+        with tempfile.TemporaryDirectory() as tmp:
+            for style in ("ieee", "acm", "author_year"):
+                corpus = []
+                for i in range(args.papers):
+                    path = os.path.join(tmp, f"{style}_{i}.pdf")
+                    corpus.append((path, synthetic_paper(path, style, args.refs, rng)))
+                print(f"合成语料 {style}: {args.papers} 篇 × {args.refs} 条参考文献")
+                run(corpus, grobid)
@@ -0,0 +1,122 @@
+"""
+PDF 共享存储基准：多个进程（模拟多个验证任务）按重叠的文献列表并发取 PDF，
+对比各任务独立下载目录（旧做法）与共享存储（utils/pdf_store）的下载次数、磁盘占用与耗时，并演示按配额回收
+- 下载为模拟：休眠 --latency 秒后写出 --size_kb 大小的内容；部分不同标识指向相同内容（如同一文献的 DOI 与 arXiv 编号）
+- 统计：实际下载次数、重复下载次数（同一标识被下载多次）、blob 数、磁盘占用
+
+运行：
+    python -m benchmarks.bench_pdf_store
+    python -m benchmarks.bench_pdf_store --jobs 8 --papers 40 --overlap 0.7 --quota_mb 2
+"""
+import argparse
+import hashlib
+import os
+import random
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from filelock import FileLock
+
+from utils.pdf_store import PdfStore
+
+
+def _content(key, size, aliases):
+    """模拟文献内容：别名标识返回与原标识相同的字节"""
+    seed = hashlib.sha256(aliases.get(key, key).encode()).digest()
+    return (seed * (size // len(seed) + 1))[:size]
+
+
+def _download(key, save_path, args, log_path, aliases):
+    time.sleep(args.latency)
+    with open(save_path, "wb") as f:
+        f.write(_content(key, args.size_kb * 1024, aliases))
+    with FileLock(f"{log_path}.lock"):
+        with open(log_path, "a", encoding="utf-8") as f:
+            f.write(key + "\n")
+    return True
+
+
+def _job_private(job_dir, keys, args, log_path, aliases):
+    """旧做法：每个任务使用自己的下载目录，按标识命名"""
+    os.makedirs(job_dir, exist_ok=True)
+    for key in keys:
+        path = os.path.join(job_dir, f"{key.replace(':', '_')}.pdf")
+        if not os.path.exists(path):
+            _download(key, path, args, log_path, aliases)
+
+
+def _job_shared(root, keys, args, log_path, aliases):
+    store = PdfStore(root, quota_mb=0)
+    for key in keys:
+        with store.lease(key, lambda dest: _download(key, dest, args, log_path, aliases)) as path:
+            assert os.path.getsize(path) == args.size_kb * 1024
+
+
+def _disk_usage(root):
+    return sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(root)
+               for f in files if f.endswith(".pdf"))
+
+
+def _downloads(log_path):
+    with open(log_path, encoding="utf-8") as f:
+        keys = f.read().split()
+    return len(keys), len(keys) - len(set(keys))
+
+
+def run(args):
+    rng = random.Random(0)
+    universe = [f"arXiv:{2300 + i // 100}.{i:05d}" for i in range(args.papers * 2)]
+    # 约 10% 的标识是其他标识的别名（内容相同）
+    aliases = {universe[i]: universe[i - 1] for i in range(1, len(universe), 10)}
+    common = universe[:int(args.papers * args.overlap)]
+    jobs = [common + rng.sample(universe[len(common):], args.papers - len(common)) for _ in range(args.jobs)]
+    for keys in jobs:
+        rng.shuffle(keys)
+    print(f"{args.jobs} 个任务 × {args.papers} 篇文献（重叠 {args.overlap:.0%}），"
+          f"不同标识 {len({k for keys in jobs for k in keys})} 个，模拟下载 {args.latency * 1000:.0f}ms/篇")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, job in (("独立目录", _job_private), ("共享存储", _job_shared)):
+            root = os.path.join(tmp, name)
+            log_path = os.path.join(tmp, f"{name}.log")
+            open(log_path, "w").close()
+            start = time.perf_counter()
+            with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+                futures = [pool.submit(job, os.path.join(root, f"job{i}") if job is _job_private else root,
+                                       keys, args, log_path, aliases) for i, keys in enumerate(jobs)]
+                for f in futures:
+                    f.result()
+            elapsed = time.perf_counter() - start
+            total, repeated = _downloads(log_path)
+            print(f"  {name}: 下载 {total} 次（同一标识重复下载 {repeated} 次），"
+                  f"磁盘 {_disk_usage(root) / 2 ** 20:.1f}MB，耗时 {elapsed:.2f}s")
+
+        store = PdfStore(os.path.join(tmp, "共享存储"), quota_mb=args.quota_mb)
+        stats = store.stats()
+        print(f"  共享存储: {stats['ids']} 个标识 → {stats['blobs']} 个 blob（内容去重）")
+
+        # 按配额回收：持有租约的文献不会被回收
+        leased = jobs[0][:3]
+        for key in leased:
+            store.lookup(key, lease=True)
+        removed, freed = store.gc()
+        stats = store.stats()
+        kept = all(store.lookup(key) for key in leased)
+        print(f"  回收至配额 {args.quota_mb}MB: 删除 {removed} 个 blob（{freed / 2 ** 20:.1f}MB），"
+              f"剩余 {stats['bytes'] / 2 ** 20:.1f}MB，持有租约的文献{'均保留' if kept else '被误删'}")
+        for key in leased:
+            store.release(key)
+        shutil.rmtree(store.root)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='PDF 共享存储基准')
+    parser.add_argument('--jobs', type=int, default=6, help='并发任务（进程）数')
+    parser.add_argument('--papers', type=int, default=30, help='每个任务引用的文献数')
+    parser.add_argument('--overlap', type=float, default=0.6, help='各任务共同引用的文献比例')
+    parser.add_argument('--latency', type=float, default=0.05, help='模拟下载耗时（秒）')
+    parser.add_argument('--size_kb', type=int, default=256, help='模拟PDF大小（KB）')
+    parser.add_argument('--quota_mb', type=float, default=4, help='回收演示使用的配额（MB）')
+    run(parser.parse_args())
@@ -0,0 +1,114 @@
+"""
+推测式预取基准：单篇论文引用 N 篇 arXiv 文献，对比关闭预取（PREFETCH_WORKERS=0，逐条串行：解析下载链接 → 下载 → GROBID 解析摘要 → 大模型判别）
+与开启预取（参考文献提取与全文解析并行发出，参考文献就绪后在后台并发下载、解析被引文献）的端到端耗时
+使用本地替身后端：--grobid_delay 模拟 GROBID 处理耗时，--download_delay 模拟 arXiv 检索与下载耗时；
+每种模式使用独立的工作目录（PDF 存储、TEI 缓存均为冷启动）。
+
+运行：
+    python -m benchmarks.bench_prefetch
+    python -m benchmarks.bench_prefetch --refs 40 --workers 8 --verify_type chain
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from service.fake_backends import FakeArxivClient, FakeGrobidServer
+from verifier.session import VerifierSession
+
+TEI_HEAD = """<?xml version="1.0" encoding="UTF-8"?>
+<TEI xmlns="http://www.tei-c.org/ns/1.0">
+  <teiHeader>
+    <fileDesc><titleStmt><title level="a" type="main">Prefetch benchmark paper</title></titleStmt></fileDesc>
+    <profileDesc><abstract><div><p>Benchmark abstract.</p></div></abstract></profileDesc>
+  </teiHeader>
+  <text>
+    <body>
+      <div>
+        <head>1. Related Work</head>
+"""
+
+BIBL = """          <biblStruct xml:id="b{i}">
+            <monogr>
+              <title level="m">Referenced Paper {i}</title>
+              <idno type="arXiv">arXiv:2301.{i:05d}</idno>
+              <author><persName><forename>Ada</forename><surname>Author{i}</surname></persName></author>
+              <imprint><date type="published" when="2023"/></imprint>
+            </monogr>
+          </biblStruct>
+"""
+
+
+def build_tei(refs):
+    body = "".join(f'        <p>Method {i} extends prior work <ref type="bibr" target="#b{i}">[{i + 1}]</ref> '
+                   f'with a new objective.</p>\n' for i in range(refs))
+    bibls = "".join(BIBL.format(i=i) for i in range(refs))
+    return (TEI_HEAD + body + "      </div>\n    </body>\n    <back>\n      <div type=\"references\">\n"
+            "        <listBibl>\n" + bibls + "        </listBibl>\n      </div>\n    </back>\n  </text>\n</TEI>\n")
+
+
+class SlowArxivClient(FakeArxivClient):
+    """模拟 arXiv 检索与下载耗时的替身客户端"""
+
+    def __init__(self, delay):
+        super().__init__()
+        self.delay = delay
+
+    def search_papers(self, query, max_results=1):
+        time.sleep(self.delay / 2)
+        return super().search_papers(query, max_results)
+
+    def download_pdf(self, pdf_url, save_path):
+        time.sleep(self.delay / 2)
+        return super().download_pdf(pdf_url, save_path)
+
+
+def run(doc_path, args, grobid_url, work_dir):
+    for name, workers in (("关闭预取", 0), (f"预取 {args.workers} 线程", args.workers)):
+        run_dir = os.path.join(work_dir, f"run_{workers}")
+        os.makedirs(run_dir)
+        # TEI 缓存、证据索引等相对路径的缓存目录落在各自的工作目录中，两种模式都是冷启动
+        os.chdir(run_dir)
+        session = VerifierSession(grobid_url=grobid_url, llm_platform="fake",
+                                  pdf_store_dir=os.path.join(run_dir, "pdf_store"),
+                                  arxiv_client=SlowArxivClient(args.download_delay), prefetch_workers=workers)
+        start = time.perf_counter()
+        system = session.open(doc_path, os.path.join(run_dir, "output"), args.verify_type)
+        references = system.extract_references()
+        if args.verify_type == "simple":
+            results = system.verify_citation(references)
+        else:
+            results = system.verify_citation_by_chain(references)
+        elapsed = time.perf_counter() - start
+        assert len(results) == args.refs, f"应产生 {args.refs} 条验证结果，实际 {len(results)}"
+        extra = ""
+        if system.prefetcher is not None:
+            stats = system.prefetcher.stats
+            extra = f"（预取 {stats['warmed']}/{stats['submitted']} 篇，验证循环等待 {stats['waited']:.2f}s）"
+        print(f"  {name}: {elapsed:.2f}s{extra}")
+        if session.executor is not None:
+            session.executor.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='推测式预取基准')
+    parser.add_argument('--refs', type=int, default=20, help='被引 arXiv 文献数')
+    parser.add_argument('--workers', type=int, default=4, help='预取线程数')
+    parser.add_argument('--verify_type', type=str, default='simple', choices=['simple', 'chain'])
+    parser.add_argument('--grobid_delay', type=float, default=0.05, help='替身 GROBID 每次请求的处理耗时（秒）')
+    parser.add_argument('--download_delay', type=float, default=0.1, help='模拟每篇文献检索与下载的耗时（秒）')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        doc_path = os.path.join(tmp, "prefetch_paper.pdf")
+        with open(doc_path, "wb") as f:
+            f.write(b"%PDF-1.4\n% prefetch benchmark\n%%EOF\n")
+        with open(os.path.join(tmp, "prefetch_paper.tei.xml"), "w", encoding="utf-8") as f:
+            f.write(build_tei(args.refs))
+        grobid = FakeGrobidServer(fixture_dir=tmp, delay=args.grobid_delay).start()
+        print(f"{args.refs} 篇被引文献，{args.verify_type} 模式，GROBID {args.grobid_delay * 1000:.0f}ms/请求，"
+              f"检索下载 {args.download_delay * 1000:.0f}ms/篇")
+        try:
+            run(doc_path, args, grobid.url, tmp)
+        finally:
+            grobid.stop()
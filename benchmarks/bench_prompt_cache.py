@@ -0,0 +1,131 @@
+"""
+提示词构造与前缀缓存基准
+1. 构造开销：每次调用新建 PromptTemplate 与 `prompt | llm`（旧做法）对比会话内预先编译的 CitationChains
+2. 前缀缓存：模拟按前缀缓存的服务商（与此前任一提示词的最长公共前缀按 --block 个 token 向下取整计为缓存命中，
+   通过用量信息返回 cached_tokens），对比旧布局（引用片段在参考文献条目之前）与新布局（指令与参考文献条目在前、引用片段在后）
+   的缓存命中比例，统计由 PromptCacheMeter 从回调中读取
+
+运行：
+    python -m benchmarks.bench_prompt_cache
+    python -m benchmarks.bench_prompt_cache --refs 30 --contexts 6 --block 64
+"""
+import argparse
+import random
+import time
+
+from langchain_community.llms.fake import FakeListLLM
+from langchain_core.language_models.llms import LLM
+from langchain_core.outputs import Generation, LLMResult
+from langchain_core.prompts import PromptTemplate
+
+from utils.tokens import count_tokens
+from verifier.prompt_cache import PromptCacheMeter
+from verifier.prompts import CitationChains, citation_inputs
+
+# 旧布局：引用片段在参考文献条目之前
+LEGACY_TEMPLATE = """请判断下面论文正文中的引用内容，从论文内容、相关性等方面判断是否真正参考了后面给出的文献。
+论文正文引用片段：
+\"\"\"{context}\"\"\"
+
+参考文献条目：
+标题：{title}
+作者：{authors}
+摘要：{abstract}
+
+请输出“相关/不相关/不确定”，并给出简短理由。"""
+
+WORDS = ("citation graph retrieval transformer attention benchmark dataset evaluation model training "
+         "inference latency accuracy embedding corpus reference verification language vision").split()
+
+
+class PrefixCachingLLM(LLM):
+    """模拟服务商前缀缓存：命中部分为与历史提示词的最长公共前缀，按 block 个 token 向下取整"""
+    block: int = 32
+    history: list = []
+
+    @property
+    def _llm_type(self):
+        return "prefix-caching"
+
+    def _call(self, prompt, stop=None, run_manager=None, **kwargs):
+        return "相关\n理由：模拟输出。"
+
+    def _generate(self, prompts, stop=None, run_manager=None, **kwargs):
+        generations = []
+        for prompt in prompts:
+            common = 0
+            for previous in self.history:
+                n = 0
+                limit = min(len(previous), len(prompt))
+                while n < limit and previous[n] == prompt[n]:
+                    n += 1
+                common = max(common, n)
+            self.history.append(prompt)
+            cached = count_tokens(prompt[:common]) // self.block * self.block
+            usage = {"prompt_tokens": count_tokens(prompt), "prompt_tokens_details": {"cached_tokens": cached}}
+            generations.append([Generation(text=self._call(prompt), generation_info={"token_usage": usage})])
+        return LLMResult(generations=generations)
+
+
+def _text(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def _workload(args):
+    rng = random.Random(0)
+    refs = [{"title": f"Referenced Paper {i}: {_text(rng, 6)}", "authors": ["Ada Lovelace", f"Author {i}"],
+             "abstract": _text(rng, args.abstract_words)} for i in range(args.refs)]
+    return [(ref, _text(rng, args.context_words)) for ref in refs for _ in range(args.contexts)]
+
+
+def bench_construction(workload):
+    llm = FakeListLLM(responses=["相关\n理由：模拟输出。"])
+    start = time.perf_counter()
+    for ref, context in workload:
+        prompt = PromptTemplate(input_variables=["context", "title", "authors", "abstract"], template=LEGACY_TEMPLATE)
+        (prompt | llm).invoke(citation_inputs(context, ref["title"], ref["authors"], ref["abstract"]))
+    legacy = time.perf_counter() - start
+    chains = CitationChains(llm)
+    start = time.perf_counter()
+    for ref, context in workload:
+        chains.invoke(citation_inputs(context, ref["title"], ref["authors"], ref["abstract"]))
+    compiled = time.perf_counter() - start
+    n = len(workload)
+    print(f"  构造开销: 每次新建 {legacy / n * 1e6:.0f}us/次，预编译 {compiled / n * 1e6:.0f}us/次")
+
+
+def bench_layout(workload, block):
+    # 旧布局
+    llm = PrefixCachingLLM(block=block, history=[])
+    meter = PromptCacheMeter()
+    prompt = PromptTemplate.from_template(LEGACY_TEMPLATE)
+    for ref, context in workload:
+        (prompt | llm).invoke(citation_inputs(context, ref["title"], ref["authors"], ref["abstract"]),
+                              config={"callbacks": [meter]})
+    s = meter.stats
+    print(f"  旧布局（引用片段在前）: 缓存命中 {s['cached_tokens']}/{s['prompt_tokens']} 输入 tokens"
+          f"（{s['cached_tokens'] / s['prompt_tokens']:.1%}）")
+    # 新布局
+    chains = CitationChains(PrefixCachingLLM(block=block, history=[]))
+    meter = PromptCacheMeter()
+    for ref, context in workload:
+        chains.invoke(citation_inputs(context, ref["title"], ref["authors"], ref["abstract"]), meter=meter)
+    s = meter.stats
+    print(f"  新布局（引用片段在后）: 缓存命中 {s['cached_tokens']}/{s['prompt_tokens']} 输入 tokens"
+          f"（{s['cached_tokens'] / s['prompt_tokens']:.1%}）")
+    print(f"  {meter.summary()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='提示词构造与前缀缓存基准')
+    parser.add_argument('--refs', type=int, default=20, help='参考文献数')
+    parser.add_argument('--contexts', type=int, default=4, help='每篇文献的引用上下文数')
+    parser.add_argument('--abstract_words', type=int, default=180, help='摘要词数')
+    parser.add_argument('--context_words', type=int, default=60, help='引用上下文词数')
+    parser.add_argument('--block', type=int, default=32, help='模拟服务商缓存的粒度（token）')
+    args = parser.parse_args()
+
+    workload = _workload(args)
+    print(f"{args.refs} 篇文献 × {args.contexts} 段上下文，摘要 {args.abstract_words} 词，上下文 {args.context_words} 词")
+    bench_construction(workload)
+    bench_layout(workload, args.block)
@@ -0,0 +1,97 @@
+"""
+链路模式检索基准：对比原向量检索（FAISS k=5）与混合检索（引用标记倒排索引 + BM25/FAISS 兜底）的召回率与延迟
+以TEI中 <ref type="bibr" target="#bN"> 所在段落为标注，召回率 = 命中的引用段落数 / 引用段落总数
+
+运行：
+    python -m benchmarks.bench_retrieval --tei paper.tei.xml
+    python -m benchmarks.bench_retrieval --doc_path paper.pdf          # 通过GROBID解析
+    python -m benchmarks.bench_retrieval --tei paper.tei.xml --platform fake
+"""
+import argparse
+import statistics
+import time
+
+from langchain_community.vectorstores import FAISS
+
+from config.settings import GROBID_URL, LLM_PLATFORM
+from parsers.grobid_parser import GrobidParser as gp
+from utils.hybrid_retriever import HybridCitationRetriever, batch_similarity_search, chunks_from_tei
+from verifier.citation_verify_langchain_ver import CitationVerificationLangchainVer
+from verifier.llm_platform import create_llm_platform
+
+
+def _recall(retrieved_ids, truth):
+    return len(set(retrieved_ids) & truth) / len(truth)
+
+
+def _summary(name, recalls, latencies):
+    latencies = sorted(latencies)
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    return (f"{name:<28} recall={statistics.mean(recalls):.3f}  "
+            f"latency mean={statistics.mean(latencies) * 1000:.1f}ms p95={p95 * 1000:.1f}ms")
+
+
+def run(tei_path, embeddings, k=5):
+    chunks = chunks_from_tei(tei_path)
+    references = list(gp.iter_references(tei_path))
+    truth = {}
+    for doc in chunks:
+        for target in doc.metadata["ref_targets"]:
+            truth.setdefault(target, set()).add(doc.metadata["chunk_id"])
+    references = [r for r in references if r["ref_id"] in truth]
+    if not references:
+        print("TEI中没有带引用目标的参考文献，无法评测")
+        return
+
+    start = time.perf_counter()
+    vector_db = FAISS.from_documents(chunks, embeddings)
+    print(f"{len(chunks)} 个检索块，{len(references)} 条被引用的参考文献，"
+          f"建库 {time.perf_counter() - start:.2f}s")
+
+    # 模拟TEI中没有引用目标、只能依靠正文引用标记的情况
+    text_only_chunks = [type(d)(page_content=d.page_content, metadata={**d.metadata, "ref_targets": []})
+                        for d in chunks]
+    engines = {
+        "vector (k=5)": None,
+        "hybrid": HybridCitationRetriever(chunks, vector_db, k=k),
+        "hybrid (text markers only)": HybridCitationRetriever(text_only_chunks, vector_db, k=k),
+    }
+    for name, engine in engines.items():
+        recalls, latencies = [], []
+        for ref in references:
+            query = CitationVerificationLangchainVer.build_faiss_query(ref)
+            start = time.perf_counter()
+            if engine is None:
+                docs = vector_db.similarity_search(query, k=k)
+            else:
+                docs = engine.retrieve(ref, vector_query=query)
+            latencies.append(time.perf_counter() - start)
+            recalls.append(_recall([d.metadata["chunk_id"] for d in docs], truth[ref["ref_id"]]))
+        line = _summary(name, recalls, latencies)
+        if engine is not None:
+            line += f"  marker_hits={engine.stats['marker_hits']} fallbacks={engine.stats['fallbacks']}"
+        print(line)
+
+    # 逐条检索与批量检索（一次嵌入 + 一次 index.search）的总耗时
+    queries = [CitationVerificationLangchainVer.build_faiss_query(ref) for ref in references]
+    start = time.perf_counter()
+    for query in queries:
+        vector_db.similarity_search(query, k=k)
+    serial = time.perf_counter() - start
+    start = time.perf_counter()
+    batch_similarity_search(vector_db, queries, k=k)
+    batched = time.perf_counter() - start
+    print(f"{'vector serial vs batched':<28} {len(queries)} 次查询 {serial * 1000:.1f}ms → 批量 {batched * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='链路模式检索基准')
+    parser.add_argument('--tei', type=str, help='GROBID processFulltextDocument 输出的TEI文件')
+    parser.add_argument('--doc_path', type=str, help='PDF文件路径（未提供 --tei 时通过GROBID解析）')
+    parser.add_argument('--platform', type=str, default=LLM_PLATFORM, help='嵌入模型平台')
+    parser.add_argument('--k', type=int, default=5)
+    args = parser.parse_args()
+
+    tei_path = args.tei or gp(grobid_url=GROBID_URL).grobid_extract_tei_file(doc_path=args.doc_path)
+    _, embeddings = create_llm_platform(args.platform)
+    run(tei_path, embeddings, k=args.k)
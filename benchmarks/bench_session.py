@@ -0,0 +1,78 @@
+"""
+验证会话基准：连续验证 N 篇论文，对比每篇论文新建全部客户端（旧做法，等同每次构造独立的验证系统）
+与进程内共享一个 VerifierSession、每篇只 open 一个轻量文档句柄，第 2..N 篇的单篇开销
+使用本地替身后端（GROBID / arXiv / 大模型），可用 --grobid_delay 模拟 GROBID 处理耗时；
+各篇论文引用相同的文献，共享会话可复用被引文献的解析缓存与证据索引。
+
+运行：
+    python -m benchmarks.bench_session
+    python -m benchmarks.bench_session --papers 20 --grobid_delay 0.05 --verify_type chain
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from service.fake_backends import FakeArxivClient, FakeGrobidServer
+from verifier.session import VerifierSession
+
+
+def _timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def run(papers, verify_type, grobid_url, work_dir):
+    def new_session():
+        return VerifierSession(grobid_url=grobid_url, llm_platform="fake",
+                               pdf_store_dir=os.path.join(work_dir, "pdf_store"), arxiv_client=FakeArxivClient())
+
+    shared = None
+    for mode in ("每篇新建", "共享会话"):
+        opens, totals = [], []
+        for i, doc_path in enumerate(papers):
+            output_dir = os.path.join(work_dir, mode, f"out{i}")
+            start = time.perf_counter()
+            if mode == "每篇新建":
+                session = new_session()
+            else:
+                shared = shared or new_session()
+                session = shared
+            system = session.open(doc_path, output_dir, verify_type)
+            opens.append(time.perf_counter() - start)
+            references = system.extract_references()
+            if verify_type == "simple":
+                results = system.verify_citation(references)
+            else:
+                results = system.verify_citation_by_chain(references)
+            assert results, "替身后端应产生验证结果"
+            totals.append(time.perf_counter() - start)
+        rest = totals[1:] or totals
+        print(f"  {mode}: 第 1 篇 {totals[0] * 1000:7.1f}ms，第 2..{len(papers)} 篇平均 {statistics.mean(rest) * 1000:7.1f}ms"
+              f"（其中初始化 {statistics.mean(opens[1:] or opens) * 1000:6.1f}ms）")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='验证会话单篇开销基准')
+    parser.add_argument('--papers', type=int, default=10, help='连续验证的论文数')
+    parser.add_argument('--verify_type', type=str, default='simple', choices=['simple', 'chain'])
+    parser.add_argument('--grobid_delay', type=float, default=0.02, help='替身 GROBID 每次请求的处理耗时（秒）')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # 向量库、TEI 与证据索引等相对路径的缓存目录都落在临时目录中
+        os.chdir(tmp)
+        papers = []
+        for i in range(args.papers):
+            path = os.path.join(tmp, f"paper{i}.pdf")
+            with open(path, "wb") as f:
+                f.write(f"%PDF-1.4\n% paper {i}\n%%EOF\n".encode())
+            papers.append(path)
+        grobid = FakeGrobidServer(delay=args.grobid_delay).start()
+        print(f"{args.papers} 篇论文，{args.verify_type} 模式，替身 GROBID 处理耗时 {args.grobid_delay * 1000:.0f}ms/请求")
+        try:
+            run(papers, args.verify_type, grobid.url, tmp)
+        finally:
+            grobid.stop()
@@ -0,0 +1,91 @@
+"""
+论文分割基准：AcademicPaperSplitter 对长篇 TEI（默认合成 100 页）的吞吐量、首块延迟与分块统计
+
+运行：
+    python -m benchmarks.bench_splitter                      # 合成 100 页 TEI
+    python -m benchmarks.bench_splitter --pages 300 --repeat 5
+    python -m benchmarks.bench_splitter --tei a.tei.xml b.tei.xml
+"""
+import argparse
+import random
+import statistics
+import time
+
+from utils.academic_paper_splitter import AcademicPaperSplitter, split_sentences
+
+WORDS = ("model data citation retrieval graph network training evaluation baseline corpus "
+         "attention transformer embedding language paper method result accuracy benchmark task").split()
+
+
+def synthetic_tei(pages=100, paragraphs_per_page=6, seed=0):
+    """生成接近 GROBID 输出结构的 TEI：多级章节、带引用标记的段落、公式、图表"""
+    rng = random.Random(seed)
+
+    def sentence():
+        words = [rng.choice(WORDS) for _ in range(rng.randint(12, 30))]
+        return " ".join(words).capitalize() + "."
+
+    body, b = [], 0
+    for page in range(pages):
+        if page % 5 == 0:
+            body.append(f'<div><head n="{page // 5 + 1}.">{page // 5 + 1}. Section {page // 5 + 1}</head>')
+        for _ in range(paragraphs_per_page):
+            parts = []
+            for _ in range(rng.randint(4, 8)):
+                text = sentence()
+                if rng.random() < 0.3:
+                    text = text[:-1] + f' <ref type="bibr" target="#b{b % 80}">[{b % 80 + 1}]</ref>.'
+                    b += 1
+                parts.append(text)
+            body.append(f"<p>{' '.join(parts)}</p>")
+        body.append(f'<formula xml:id="formula_{page}">E = mc^{page}</formula>')
+        if page % 2 == 0:
+            body.append(f'<figure xml:id="fig_{page}"><head>Figure {page}</head><label>{page}</label>'
+                        f'<figDesc>{sentence()}</figDesc></figure>')
+        if page % 5 == 4:
+            body.append('</div>')
+    if pages % 5:
+        body.append('</div>')
+    return ('<?xml version="1.0" encoding="UTF-8"?>'
+            '<TEI xmlns="http://www.tei-c.org/ns/1.0"><teiHeader><fileDesc><titleStmt>'
+            '<title level="a" type="main">Synthetic Paper</title></titleStmt></fileDesc></teiHeader>'
+            f'<text><body>{"".join(body)}</body></text></TEI>')
+
+
+def run(documents, repeat=3):
+    split_sentences("Warm up.")  # 句子切分器只加载一次，不计入耗时
+    for name, xml_content in documents:
+        size_mb = len(xml_content.encode('utf-8')) / 2 ** 20
+        totals, firsts = [], []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            docs = AcademicPaperSplitter(xml_content).iter_documents()
+            next(docs, None)
+            firsts.append(time.perf_counter() - start)
+            chunks = 1 + sum(1 for _ in docs)
+            totals.append(time.perf_counter() - start)
+        docs = AcademicPaperSplitter(xml_content).split_document()
+        lengths = [len(d.page_content) for d in docs]
+        sections = len({d.metadata["section"] for d in docs})
+        total = statistics.median(totals)
+        print(f"{name}: {size_mb:.2f}MB，{chunks} 块，{sections} 个章节，"
+              f"块长 均值={statistics.mean(lengths):.0f} 最大={max(lengths)}\n"
+              f"  耗时 {total * 1000:.1f}ms（{size_mb / total:.1f}MB/s，{chunks / total:.0f} 块/s），"
+              f"首块 {statistics.median(firsts) * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='论文分割基准')
+    parser.add_argument('--tei', nargs='*', help='GROBID processFulltextDocument 输出的TEI文件')
+    parser.add_argument('--pages', type=int, default=100, help='合成TEI的页数')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    if args.tei:
+        inputs = []
+        for path in args.tei:
+            with open(path, "r", encoding="utf-8") as f:
+                inputs.append((path, f.read()))
+    else:
+        inputs = [(f"synthetic {args.pages} pages", synthetic_tei(args.pages))]
+    run(inputs, args.repeat)
@@ -0,0 +1,133 @@
+"""
+TEI 流式解析内存基准：对比字符串路径（整份TEI读入内存后 fromstring 建树）与流式路径（iterparse 边读边清除）
+在不同文档长度下的峰值内存增量。每个用例在独立的 spawn 子进程中运行，峰值取 ru_maxrss。
+上下文索引的结果本身保留全部句子文本，其内存随正文长度增长；流式路径省去的是整份TEI字符串与整棵树。
+
+运行：
+    python -m benchmarks.bench_tei_stream
+    python -m benchmarks.bench_tei_stream --pages 50 200 800
+    python -m benchmarks.bench_tei_stream --tei thesis.tei.xml
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+WORDS = ("model data citation retrieval graph network training evaluation baseline corpus "
+         "attention transformer embedding language paper method result accuracy benchmark task").split()
+
+
+def write_synthetic_tei(path, pages, refs_per_page=2, seed=0):
+    """写出带句子切分与坐标属性的合成TEI（接近开启 tei_coordinates/segment_sentences 的 GROBID 输出）"""
+    rng = random.Random(seed)
+    n_refs = max(1, pages * refs_per_page)
+
+    def coords():
+        return ";".join(f"{rng.randint(1, pages)},{rng.uniform(50, 500):.2f},{rng.uniform(50, 700):.2f},"
+                        f"{rng.uniform(10, 400):.2f},{rng.uniform(5, 12):.2f}" for _ in range(rng.randint(1, 3)))
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<TEI xmlns="http://www.tei-c.org/ns/1.0"><teiHeader>'
+                '<fileDesc><titleStmt><title level="a" type="main">Synthetic Long Document</title></titleStmt>'
+                '</fileDesc><profileDesc><abstract><div><p>Synthetic abstract.</p></div></abstract></profileDesc>'
+                '</teiHeader><text><body>')
+        for page in range(pages):
+            if page % 5 == 0:
+                f.write(f'<div><head n="{page // 5 + 1}.">{page // 5 + 1}. Section {page // 5 + 1}</head>')
+            for _ in range(6):
+                f.write("<p>")
+                for _ in range(rng.randint(4, 8)):
+                    words = " ".join(rng.choice(WORDS) for _ in range(rng.randint(12, 30)))
+                    ref = ""
+                    if rng.random() < 0.3:
+                        b = rng.randrange(n_refs)
+                        ref = f' <ref type="bibr" target="#b{b}" coords="{coords()}">[{b + 1}]</ref>'
+                    f.write(f'<s coords="{coords()}">{words.capitalize()}{ref}.</s>')
+                f.write("</p>")
+            f.write(f'<formula xml:id="formula_{page}" coords="{coords()}">E = mc^{page}</formula>')
+            if page % 5 == 4 or page == pages - 1:
+                f.write("</div>")
+        f.write('</body><back><div type="references"><listBibl>')
+        for b in range(n_refs):
+            f.write(f'<biblStruct xml:id="b{b}" coords="{coords()}"><analytic><title level="a">Reference {b}</title>'
+                    f'<author><persName><forename>A</forename><surname>Author{b}</surname></persName></author>'
+                    f'</analytic><monogr><title level="j">Journal</title><imprint><date when="20{b % 25:02d}"/>'
+                    f'</imprint></monogr><note type="raw_reference">Author{b} A. Reference {b}. Journal.</note>'
+                    f'</biblStruct>')
+        f.write('</listBibl></div></back></text></TEI>')
+
+
+def _consume(mode, task, tei_path, conn):
+    """
+    子进程：按指定路径完成任务，回传峰值内存增量
+    task=parse 为分块 + 参考文献解析（输出逐条消费），task=contexts 为引用上下文索引（结果保留全部句子文本）
+    """
+    from parsers.context_extractor import CitationContextExtractor
+    from parsers.grobid_parser import GrobidParser
+    from parsers.tei_stream import peak_rss_mb
+    from utils.academic_paper_splitter import AcademicPaperSplitter, split_sentences
+
+    split_sentences("Warm up.")
+    base = peak_rss_mb()
+    start = time.perf_counter()
+    xml_content = None
+    if mode == "string":
+        with open(tei_path, "r", encoding="utf-8") as f:
+            xml_content = f.read()
+    if task == "parse":
+        if xml_content is not None:
+            chunks = sum(1 for _ in AcademicPaperSplitter(xml_content).iter_documents())
+            refs = len(GrobidParser.parse_references(xml_content))
+        else:
+            chunks = sum(1 for _ in AcademicPaperSplitter.from_file(tei_path).iter_documents())
+            refs = sum(1 for _ in GrobidParser.iter_references(tei_path))
+        detail = f"{chunks} 块, {refs} 条参考文献"
+    else:
+        extractor = CitationContextExtractor(None)
+        if xml_content is not None:
+            paragraphs, index = extractor.build_index(xml_content)
+        else:
+            paragraphs, index = extractor.build_index(tei_path=tei_path)
+        detail = f"{len(paragraphs)} 段, {len(index)} 条被引文献"
+    conn.send((peak_rss_mb() - base, time.perf_counter() - start, detail))
+    conn.close()
+
+
+def measure(mode, task, tei_path):
+    ctx = multiprocessing.get_context("spawn")
+    recv, send = ctx.Pipe(duplex=False)
+    proc = ctx.Process(target=_consume, args=(mode, task, tei_path, send))
+    proc.start()
+    result = recv.recv()
+    proc.join()
+    return result
+
+
+def run(inputs):
+    for name, tei_path in inputs:
+        size_mb = os.path.getsize(tei_path) / 2 ** 20
+        print(f"{name}: TEI {size_mb:.1f}MB")
+        for task, label in (("parse", "分块+参考文献"), ("contexts", "上下文索引")):
+            for mode in ("string", "stream"):
+                peak, elapsed, detail = measure(mode, task, tei_path)
+                print(f"  {label:<8} {mode:<7} 峰值内存 +{peak:.1f}MB  耗时 {elapsed:.2f}s  ({detail})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='TEI 流式解析内存基准')
+    parser.add_argument('--tei', nargs='*', help='GROBID processFulltextDocument 输出的TEI文件')
+    parser.add_argument('--pages', nargs='+', type=int, default=[50, 200, 800], help='合成TEI的页数')
+    args = parser.parse_args()
+
+    if args.tei:
+        run([(path, path) for path in args.tei])
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            inputs = []
+            for pages in args.pages:
+                path = os.path.join(tmp, f"synthetic_{pages}.tei.xml")
+                write_synthetic_tei(path, pages)
+                inputs.append((f"synthetic {pages} pages", path))
+            run(inputs)
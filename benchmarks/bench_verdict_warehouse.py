@@ -0,0 +1,135 @@
+"""
+判定仓库查询基准：生成合成判定（--rows 行，分布在 --days 个运行日期、--runs 次运行中，每次运行一个文件），
+统计常用聚合查询在合并小文件前后的耗时（首次查询需读盘，重复查询使用内存中缓存的列），
+并与逐个扫描各运行文本结果文件（result_*.txt）统计相同问题的耗时对比
+
+运行：
+    python -m benchmarks.bench_verdict_warehouse
+    python -m benchmarks.bench_verdict_warehouse --rows 5000000 --runs 5000 --text_baseline
+"""
+import argparse
+import os
+import re
+import shutil
+import tempfile
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from utils.verdict_warehouse import PARTITION, VerdictWarehouse
+
+VERDICTS = ["相关", "不相关", "不确定"]
+MODELS = ["qwen-plus", "qwen-max", "deepseek-r1"]
+
+
+def generate(warehouse, args, text_dir=None):
+    rng = np.random.default_rng(0)
+    per_run = args.rows // args.runs
+    start_day = date(2026, 1, 1)
+    for run in range(args.runs):
+        run_date = (start_day + timedelta(days=run * args.days // args.runs)).isoformat()
+        refs = rng.zipf(1.3, per_run) % args.refs
+        # 每篇被引文献有固定的“不相关”倾向，便于核对排行结果
+        bias = (refs % 7) / 10
+        roll = rng.random(per_run)
+        verdict = np.where(roll < bias, 1, np.where(roll < bias + 0.1, 2, 0))
+        columns = {
+            "run_id": pa.array([f"run{run:06d}"] * per_run),
+            "created_at": pa.array(np.full(per_run, np.datetime64(run_date, "ms"))),
+            "doc_id": pa.array([f"paper{run % 500}"] * per_run),
+            "doc_digest": pa.array([f"{run:064x}"] * per_run),
+            "method": pa.DictionaryArray.from_arrays(pa.array(np.zeros(per_run, dtype=np.int32)),
+                                                     ["grobid_extraction"]),
+            "ref_key": pa.array([f"arxiv:{r:05d}" for r in refs]),
+            "ref_title": pa.array([f"Referenced Paper {r}" for r in refs]),
+            "context_idx": pa.array(rng.integers(1, 6, per_run, dtype=np.int32)),
+            "context": pa.array([f"As shown in prior work [{r}], the method improves results." for r in refs]),
+            "verdict": pa.DictionaryArray.from_arrays(pa.array(verdict.astype(np.int32)), VERDICTS),
+            "model": pa.DictionaryArray.from_arrays(pa.array(np.full(per_run, run % len(MODELS), np.int32)), MODELS),
+            "tier": pa.DictionaryArray.from_arrays(pa.array(np.zeros(per_run, np.int32)), [""]),
+            "llm_ms": pa.array(rng.gamma(4, 300, per_run).astype(np.float32)),
+            "evidence_ms": pa.array(rng.gamma(2, 20, per_run).astype(np.float32)),
+            "evidence_count": pa.array(np.full(per_run, 3, np.int16)),
+        }
+        table = pa.table(columns).cast(warehouse.schema)
+        partition = os.path.join(warehouse.root, f"{PARTITION}={run_date}")
+        os.makedirs(partition, exist_ok=True)
+        pq.write_table(table, os.path.join(partition, f"part-run{run:06d}-0001.parquet"), compression="zstd")
+        if text_dir:
+            with open(os.path.join(text_dir, f"result_run{run:06d}.txt"), "w", encoding="utf-8") as f:
+                for title, context, v in zip(columns["ref_title"].to_pylist(), columns["context"].to_pylist(),
+                                             verdict):
+                    f.write(f"【精确位置】{title}段落1:\n\n{context}\nresult:\n {VERDICTS[v]}\n理由：合成数据。\n\n")
+    return per_run * args.runs
+
+
+def text_baseline(text_dir):
+    """逐文件扫描文本结果，统计各被引文献被判定为“不相关”的次数"""
+    pattern = re.compile(r"【精确位置】(.+?)段落\d+:\n\n.*?\nresult:\n (\S+)", re.S)
+    counts = {}
+    for name in os.listdir(text_dir):
+        with open(os.path.join(text_dir, name), encoding="utf-8") as f:
+            for title, verdict in pattern.findall(f.read()):
+                if verdict == "不相关":
+                    counts[title] = counts.get(title, 0) + 1
+    return sorted(counts.items(), key=lambda kv: -kv[1])[:10]
+
+
+def timed(name, fn, repeat=3):
+    """首次查询（读盘）与重复查询（列已缓存）的耗时"""
+    elapsed = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed.append(time.perf_counter() - start)
+    warm = f"，重复 {min(elapsed[1:]) * 1000:7.1f}ms" if repeat > 1 else ""
+    print(f"  {name:<36} 首次 {elapsed[0] * 1000:7.1f}ms{warm}")
+    return result
+
+
+def run_queries(warehouse, days):
+    since = (date(2026, 1, 1) + timedelta(days=days - max(1, days // 10))).isoformat()
+    timed("总条数", warehouse.count)
+    top = timed("不相关次数最多的被引文献（top 10）", lambda: warehouse.top_references("不相关", 10))
+    timed("按模型统计判定", lambda: warehouse.verdict_counts(("model",)))
+    timed("按模型统计耗时 p50/p95", lambda: warehouse.latency(("model",)))
+    timed(f"最近 10% 日期（since {since}）的排行", lambda: warehouse.top_references("不相关", 10, since=since))
+    timed("单个模型的判定统计", lambda: warehouse.verdict_counts(("verdict",), model="qwen-max"))
+    return top
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='判定仓库查询基准')
+    parser.add_argument('--rows', type=int, default=1000000, help='判定总行数')
+    parser.add_argument('--runs', type=int, default=2000, help='运行次数（每次运行一个文件）')
+    parser.add_argument('--days', type=int, default=60, help='运行日期数（分区数）')
+    parser.add_argument('--refs', type=int, default=20000, help='被引文献数')
+    parser.add_argument('--text_baseline', action='store_true', help='同时生成文本结果文件并统计扫描耗时')
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="verdict_bench_")
+    try:
+        warehouse = VerdictWarehouse(os.path.join(root, "warehouse"))
+        text_dir = None
+        if args.text_baseline:
+            text_dir = os.path.join(root, "text")
+            os.makedirs(text_dir)
+        start = time.perf_counter()
+        rows = generate(warehouse, args, text_dir)
+        print(f"生成 {rows} 条判定，{args.runs} 个文件，{args.days} 个分区（{time.perf_counter() - start:.1f}s）")
+
+        if text_dir:
+            print("逐文件扫描文本结果:")
+            timed("不相关次数最多的被引文献（top 10）", lambda: text_baseline(text_dir), repeat=1)
+        print(f"判定仓库（{args.runs} 个小文件）:")
+        run_queries(warehouse, args.days)
+        start = time.perf_counter()
+        warehouse.compact()
+        print(f"合并小文件后（{time.perf_counter() - start:.1f}s）:")
+        top = run_queries(warehouse, args.days)
+        print("  排行前 3:", [(r["ref_title"], r["hits"], round(r["ratio"], 2)) for r in top[:3]])
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
@@ -1,7 +1,11 @@
+import os
+
 import requests
 # from config.settings import DEFAULT_MAX_RESULTS
 import arxiv
 
+from utils.arxiv_id import arxiv_key, canonical_arxiv_id
+
 DEFAULT_MAX_RESULTS = 10
 
 
@@ -45,17 +49,39 @@ class ArxivClient:
         :param save_path: 保存路径（含文件名）
         :return: 下载成功状态
         """
+        tmp_path = f"{save_path}.{os.getpid()}.part"
         try:
             response = requests.get(pdf_url, stream=True)
             response.raise_for_status()
-            with open(save_path, 'wb') as f:
+            with open(tmp_path, 'wb') as f:
                 for chunk in response.iter_content(chunk_size=8192):
                     f.write(chunk)
+            # 先写临时文件再原子替换，避免并发进程读到不完整的PDF
+            os.replace(tmp_path, save_path)
             return True
         except Exception as e:
             print(f"PDF下载失败: {str(e)}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
             return False
 
+    def fetch_pdf(self, arxiv_doi, pdf_store, lease=False):
+        """
+        按arXiv标识从PDF共享存储取得文献，不存在时下载入库
+        :param arxiv_doi: arXiv标识，例如 arXiv:1705.06950
+        :param pdf_store: utils.pdf_store.PdfStore
+        :param lease: 是否同时取得租约（使用完毕后调用 pdf_store.release(arxiv_key(arxiv_doi))）
+        :return: PDF文件路径
+        """
+        arxiv_id = canonical_arxiv_id(arxiv_doi) or arxiv_doi
+
+        def download(save_path):
+            s_result = self.search_papers(arxiv_id)
+            if not s_result:
+                raise ValueError(f"未找到论文: {arxiv_doi}")
+            return self.download_pdf(s_result[0]["pdf_link"], save_path)
+
+        return pdf_store.fetch(arxiv_key(arxiv_id) or arxiv_id, download, lease=lease)
 
 if __name__ == "__main__":
     # 测试示例
@@ -0,0 +1,250 @@
+"""
+GROBID 客户端池：在多个 GROBID 服务之间分发请求
+- 健康检查：定期在后台线程中并行访问 /api/isalive（不阻塞请求线程），连接失败的节点立即摘除，恢复后重新加入
+- 路由：选择未达并发上限的健康节点中在途请求最少的一个
+- 背压：节点返回 503（GROBID 处理线程已满）时该节点短暂退避，请求改发其他节点
+- 同一组服务地址在进程内共享一个池（get_pool），多个验证器实例的并发上限合并计算
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import requests
+
+# GrobidClient 默认输出坐标的元素
+TEI_COORDINATES = ["persName", "figure", "ref", "biblStruct", "formula", "s", "note", "title"]
+
+# GrobidClient.process_pdf 参数名 → GROBID 表单字段
+_FORM_FIELDS = {
+    "generateIDs": "generateIDs",
+    "consolidate_header": "consolidateHeader",
+    "consolidate_citations": "consolidateCitations",
+    "include_raw_citations": "includeRawCitations",
+    "include_raw_affiliations": "includeRawAffiliations",
+    "segment_sentences": "segmentSentences",
+}
+
+
+def parse_urls(grobid_url):
+    """GROBID 服务地址：逗号分隔的字符串或列表"""
+    if isinstance(grobid_url, str):
+        grobid_url = grobid_url.split(",")
+    urls = [u.strip().rstrip("/") for u in grobid_url if u and u.strip()]
+    if not urls:
+        raise ValueError("未配置 GROBID 服务地址")
+    return urls
+
+
+def form_data(options, coordinates=TEI_COORDINATES):
+    """与 GrobidClient.process_pdf 一致的表单参数"""
+    data = {field: "1" for name, field in _FORM_FIELDS.items() if options.get(name)}
+    if options.get("tei_coordinates"):
+        data["teiCoordinates"] = coordinates
+    return data
+
+
+class GrobidNode:
+    """单个 GROBID 服务节点的状态（由池加锁维护）"""
+
+    def __init__(self, url, max_concurrency):
+        self.url = url
+        self.max_concurrency = max_concurrency
+        self.outstanding = 0
+        self.healthy = True
+        # 返回 503 后在此时间之前不再分配请求
+        self.busy_until = 0.0
+        self.requests = 0
+        self.busy = 0
+        self.errors = 0
+
+    def available(self, now):
+        return self.healthy and self.busy_until <= now and self.outstanding < self.max_concurrency
+
+
+class GrobidPool:
+    def __init__(self, urls, max_concurrency=4, health_interval=30, timeout=60, sleep_time=5,
+                 max_retries=5, coordinates=TEI_COORDINATES, probe_timeout=2, recheck_backoff=5):
+        """
+        :param urls: GROBID 服务地址列表（或逗号分隔的字符串）
+        :param max_concurrency: 每个节点的在途请求上限，建议不超过该节点 GROBID 的处理线程数
+        :param health_interval: 健康检查间隔（秒），不健康的节点在下次检查通过后恢复
+        :param timeout: 单次请求超时（秒）
+        :param sleep_time: 节点返回 503 后的退避时间（秒）
+        :param max_retries: 单个请求最多尝试的次数（503 或连接失败时换节点重试）
+        :param probe_timeout: 单个节点健康检查的超时（秒）
+        :param recheck_backoff: 全部节点不可用时，距上次检查不足该秒数则直接失败，不再同步检查
+        """
+        self.nodes = [GrobidNode(url, max_concurrency) for url in parse_urls(urls)]
+        self.health_interval = health_interval
+        self.timeout = timeout
+        self.sleep_time = sleep_time
+        self.max_retries = max_retries
+        self.coordinates = coordinates
+        self.probe_timeout = probe_timeout
+        self.recheck_backoff = recheck_backoff
+        self._cond = threading.Condition()
+        self._checking = False
+        self._last_check = 0.0
+        # 首次检查同样在后台进行，检查完成前节点视为可用（连接失败时由 post 摘除）
+        self._maybe_check_health()
+
+    @property
+    def url(self):
+        """首个节点地址（兼容只接受单个地址的调用方）"""
+        return self.nodes[0].url
+
+    def _probe(self, node):
+        try:
+            res = requests.get(f"{node.url}/api/isalive", timeout=self.probe_timeout)
+            return res.status_code == 200 and res.text.strip() == "true"
+        except requests.RequestException:
+            return False
+
+    def check_health(self):
+        """并行检查全部节点的存活状态（耗时不超过 probe_timeout），返回可用节点数"""
+        with ThreadPoolExecutor(len(self.nodes), thread_name_prefix="grobid-probe") as probes:
+            results = list(zip(self.nodes, probes.map(self._probe, self.nodes)))
+        with self._cond:
+            for node, alive in results:
+                if alive and not node.healthy:
+                    print(f"[信息] GROBID 节点恢复: {node.url}")
+                elif not alive and node.healthy:
+                    print(f"[警告] GROBID 节点不可用: {node.url}")
+                node.healthy = alive
+            self._last_check = time.monotonic()
+            self._checking = False
+            self._cond.notify_all()
+        return sum(alive for _, alive in results)
+
+    def _maybe_check_health(self):
+        """距上次检查超过间隔时在后台线程中执行一次检查，请求线程不等待"""
+        with self._cond:
+            if self._checking or time.monotonic() - self._last_check < self.health_interval:
+                return
+            self._checking = True
+        threading.Thread(target=self._background_check, name="grobid-health", daemon=True).start()
+
+    def _background_check(self):
+        try:
+            self.check_health()
+        except Exception as e:
+            print(f"[警告] GROBID 健康检查失败: {e}")
+            with self._cond:
+                self._checking = False
+
+    def acquire(self, exclude=()):
+        """
+        选择一个节点并占用其一个并发名额，全部节点繁忙时等待
+        :param exclude: 本次请求已失败过的节点，仍有其他可用节点时不再选择
+        """
+        self._maybe_check_health()
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                candidates = [n for n in self.nodes if n.available(now)]
+                preferred = [n for n in candidates if n.url not in exclude] or candidates
+                if preferred:
+                    # 在途请求最少者优先，相同时选累计请求较少的，使空闲节点轮流分担
+                    node = min(preferred, key=lambda n: (n.outstanding / n.max_concurrency, n.requests))
+                    node.outstanding += 1
+                    node.requests += 1
+                    return node
+                if not any(n.healthy for n in self.nodes):
+                    # 全部节点不可用：刚检查过时直接放弃，否则立即并行重新检查一次，仍无可用节点则放弃
+                    if now - self._last_check < self.recheck_backoff:
+                        raise RuntimeError("没有可用的 GROBID 节点")
+                    self._cond.release()
+                    try:
+                        alive = self.check_health()
+                    finally:
+                        self._cond.acquire()
+                    if not alive:
+                        raise RuntimeError("没有可用的 GROBID 节点")
+                    continue
+                if now >= deadline:
+                    raise RuntimeError(f"等待 GROBID 节点超时（{self.timeout}s）")
+                # 等待名额释放或退避结束
+                wake = min([n.busy_until for n in self.nodes if n.healthy and n.busy_until > now] + [deadline])
+                self._cond.wait(max(0.01, wake - now))
+
+    def release(self, node):
+        with self._cond:
+            node.outstanding -= 1
+            self._cond.notify_all()
+
+    def _mark(self, node, busy=False, error=False):
+        with self._cond:
+            if busy:
+                node.busy += 1
+                node.busy_until = time.monotonic() + self.sleep_time
+            if error:
+                node.errors += 1
+                node.healthy = False
+
+    @contextmanager
+    def post(self, service, pdf_file, options, stream=False):
+        """
+        向一个节点提交PDF，503 或连接失败时换节点重试；响应在上下文内有效，退出时释放节点名额
+        :param service: GROBID 服务名，例如 processFulltextDocument
+        :param options: GrobidClient.process_pdf 同名参数
+        :param stream: 是否流式读取响应（读取完之前节点名额一直占用）
+        """
+        data = form_data(options, self.coordinates)
+        tried = set()
+        for _ in range(self.max_retries):
+            node = self.acquire(exclude=tried)
+            tried.add(node.url)
+            try:
+                with open(pdf_file, "rb") as pdf:
+                    res = requests.post(f"{node.url}/api/{service}",
+                                        files={"input": (os.path.basename(pdf_file), pdf, "application/pdf")},
+                                        data=data, headers={"Accept": "text/plain"},
+                                        timeout=self.timeout, stream=stream)
+            except requests.ConnectionError as e:
+                # 连接失败（含连接超时）：摘除节点，改发其他节点；读取超时说明节点在处理，不重试
+                print(f"[警告] GROBID 节点 {node.url} 连接失败，改用其他节点: {e}")
+                self._mark(node, error=True)
+                self.release(node)
+                continue
+            except BaseException:
+                self.release(node)
+                raise
+            if res.status_code == 503:
+                # 节点处理线程已满：退避该节点，改发其他节点
+                res.close()
+                self._mark(node, busy=True)
+                self.release(node)
+                continue
+            try:
+                with res:
+                    yield res
+            finally:
+                self.release(node)
+            return
+        raise RuntimeError(f"GROBID {service} 重试 {self.max_retries} 次仍失败（节点繁忙或不可用）")
+
+    def process_pdf(self, service, pdf_file, **options):
+        """与 GrobidClient.process_pdf 返回值一致：(文件, 状态码, TEI文本)"""
+        with self.post(service, pdf_file, options) as res:
+            return pdf_file, res.status_code, res.text
+
+    def stats(self):
+        with self._cond:
+            return [{"url": n.url, "healthy": n.healthy, "outstanding": n.outstanding,
+                     "requests": n.requests, "busy": n.busy, "errors": n.errors} for n in self.nodes]
+
+
+_POOLS = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_pool(grobid_url, **kwargs):
+    """按服务地址组共享 GrobidPool，同一进程内的多个解析器共用节点状态与并发上限"""
+    key = tuple(parse_urls(grobid_url))
+    with _POOLS_LOCK:
+        if key not in _POOLS:
+            _POOLS[key] = GrobidPool(list(key), **kwargs)
+        return _POOLS[key]
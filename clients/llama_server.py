@@ -0,0 +1,139 @@
+"""
+本地量化大模型（llama.cpp llama-server）
+- LlamaServer: 启动并管理本机 llama-server 进程（GGUF 模型，-np 个并行槽位 + 连续批处理，-t 个推理线程）
+- LlamaServerLLM: 与 langchain LLM 接口一致，经 llama-server 的 OpenAI 兼容接口 /v1/chat/completions 调用（由服务端套用模型的对话模板）；
+  并发请求由服务端连续批处理，客户端按槽位数限制在途请求，返回的用量信息（含复用的 KV 前缀 token）供提示词缓存统计
+
+    LLM_PLATFORM=local LOCAL_LLM_MODEL=./models/qwen2.5-1.5b-instruct-q4_k_m.gguf python main.py ...
+
+已有运行中的 llama-server 时只需配置 LOCAL_LLM_URL，不会再启动新进程。
+"""
+import atexit
+import os
+import subprocess
+import threading
+import time
+from typing import Any, Optional
+
+import requests
+from langchain_core.language_models.llms import LLM
+from langchain_core.outputs import Generation, LLMResult
+
+from config.settings import (LOCAL_LLM_CTX, LOCAL_LLM_MAX_TOKENS, LOCAL_LLM_MODEL, LOCAL_LLM_PARALLEL,
+                             LOCAL_LLM_SERVER_BIN, LOCAL_LLM_THREADS, LOCAL_LLM_URL)
+
+
+def _healthy(url, timeout=2):
+    try:
+        return requests.get(f"{url}/health", timeout=timeout).status_code == 200
+    except requests.RequestException:
+        return False
+
+
+class LlamaServer:
+    def __init__(self, model_path=LOCAL_LLM_MODEL, url=LOCAL_LLM_URL, threads=LOCAL_LLM_THREADS,
+                 parallel=LOCAL_LLM_PARALLEL, ctx=LOCAL_LLM_CTX, server_bin=LOCAL_LLM_SERVER_BIN):
+        """
+        :param model_path: GGUF 模型路径（建议 Q4_K_M 等量化版本）
+        :param threads: 推理线程数，0 为全部核心
+        :param parallel: 并行槽位数（同时解码的请求数），服务端对各槽位连续批处理
+        :param ctx: 每个槽位的上下文长度（总上下文为 ctx * parallel）
+        """
+        self.model_path = model_path
+        self.url = url.rstrip("/")
+        self.threads = threads or os.cpu_count()
+        self.parallel = parallel
+        self.ctx = ctx
+        self.server_bin = server_bin
+        self.process = None
+
+    def start(self, timeout=300):
+        """启动 llama-server 并等待模型加载完成；地址上已有健康的服务时直接复用"""
+        if _healthy(self.url):
+            return self
+        if not self.model_path or not os.path.isfile(self.model_path):
+            raise FileNotFoundError(f"找不到本地模型: {self.model_path}（LOCAL_LLM_MODEL）且 {self.url} 上没有运行中的 llama-server")
+        host, port = self.url.split("://", 1)[-1].rsplit(":", 1)
+        cmd = [self.server_bin, "-m", self.model_path, "--host", host, "--port", port,
+               "-t", str(self.threads), "-np", str(self.parallel), "-c", str(self.ctx * self.parallel),
+               "--cont-batching"]
+        self.process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        atexit.register(self.stop)
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"llama-server 启动失败（退出码 {self.process.returncode}）: {' '.join(cmd)}")
+            if _healthy(self.url):
+                print(f"[成功] 本地模型已加载: {self.model_path} → {self.url}（{self.threads} 线程，{self.parallel} 个槽位）")
+                return self
+            time.sleep(0.5)
+        self.stop()
+        raise TimeoutError(f"llama-server 在 {timeout}s 内未就绪: {self.url}")
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.process = None
+
+
+class LlamaServerLLM(LLM):
+    """llama-server 客户端（线程安全，可被多个验证器/任务并发调用）"""
+    url: str = LOCAL_LLM_URL
+    max_tokens: int = LOCAL_LLM_MAX_TOKENS
+    temperature: float = 0.0
+    parallel: int = LOCAL_LLM_PARALLEL
+    timeout: float = 600.0
+    semaphore: Optional[Any] = None
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        # 在途请求不超过服务端槽位数，多出的请求在客户端排队，避免在服务端排队时超时
+        self.semaphore = threading.BoundedSemaphore(self.parallel)
+
+    @property
+    def _llm_type(self):
+        return "llama-server"
+
+    def _complete(self, prompt, stop=None):
+        payload = {
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": self.max_tokens,
+            "temperature": self.temperature,
+            # 复用槽位中相同前缀的 KV 缓存（提示词的指令与参考文献条目在前）
+            "cache_prompt": True,
+        }
+        if stop:
+            payload["stop"] = stop
+        with self.semaphore:
+            response = requests.post(f"{self.url.rstrip('/')}/v1/chat/completions", json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        data = response.json()
+        return data["choices"][0]["message"]["content"], data.get("usage")
+
+    def _call(self, prompt, stop=None, run_manager=None, **kwargs):
+        return self._complete(prompt, stop)[0]
+
+    def _generate(self, prompts, stop=None, run_manager=None, **kwargs):
+        generations = []
+        for prompt in prompts:
+            text, usage = self._complete(prompt, stop)
+            generations.append([Generation(text=text, generation_info={"token_usage": usage} if usage else None)])
+        return LLMResult(generations=generations)
+
+
+_SERVERS = {}
+_SERVERS_LOCK = threading.Lock()
+
+
+def create_local_llm(model_path=LOCAL_LLM_MODEL, url=LOCAL_LLM_URL):
+    """按地址共享本地 llama-server（未运行时按配置启动），返回其客户端"""
+    url = url.rstrip("/")
+    with _SERVERS_LOCK:
+        if url not in _SERVERS:
+            _SERVERS[url] = LlamaServer(model_path, url).start()
+        server = _SERVERS[url]
+    return LlamaServerLLM(url=url, parallel=server.parallel)
@@ -16,10 +16,30 @@ ARXIV_API_URL = "http://export.arxiv.org/api/query"
 DEFAULT_MAX_RESULTS = 10
 CHECK_TYPE = os.getenv("CHECK_TYPE", CheckType.CHECK_TYPE_SIMPLE)
 
+# 多个 GROBID 服务用逗号分隔，单文件请求在节点间负载均衡
 GROBID_URL = os.getenv("GROBID_URL", "http://localhost:8070")
+# 每个 GROBID 节点的在途请求上限（不超过该节点的处理线程数，超出时 GROBID 返回 503）
+GROBID_MAX_CONCURRENCY = int(os.getenv("GROBID_MAX_CONCURRENCY", "4"))
+# GROBID 节点健康检查间隔（秒）
+GROBID_HEALTH_INTERVAL = float(os.getenv("GROBID_HEALTH_INTERVAL", "30"))
 
 LLM_PLATFORM = os.getenv("LLM_PLATFORM", "dashscope")
 
+# 模型级联：设置快速模型后，先由快速模型给出判定与置信度，“不确定”或置信度低于阈值时再交给 LLM_MODEL 复核；为空时不启用
+LLM_FAST_MODEL = os.getenv("LLM_FAST_MODEL", "")
+# 快速模型判定直接采纳的最低置信度
+CASCADE_THRESHOLD = float(os.getenv("CASCADE_THRESHOLD", "0.8"))
+# 每千 token 单价（输入输出合计，用于级联成本统计）
+LLM_PRICE_PER_1K = float(os.getenv("LLM_PRICE_PER_1K", "0"))
+LLM_FAST_PRICE_PER_1K = float(os.getenv("LLM_FAST_PRICE_PER_1K", "0"))
+# 级联判定日志（JSONL，供 python -m verifier.cascade 离线统计两级模型一致率），为空时不记录
+CASCADE_LOG = os.getenv("CASCADE_LOG", "")
+# 快速模型直接采纳的判定中，按该比例抽样同时交给复核模型（影子评估），用于估计不同阈值下的一致率
+CASCADE_SHADOW_RATE = float(os.getenv("CASCADE_SHADOW_RATE", "0"))
+# 对话模型的提示词前缀（指令与参考文献条目）标注 cache_control，供支持显式缓存的服务商缓存前缀
+# 仅对对话模型（BaseChatModel）生效；目前 LLM_PLATFORM 可选的平台均为文本补全模型，开启后不起作用
+PROMPT_CACHE_HINTS = os.getenv("PROMPT_CACHE_HINTS", "0") == "1"
+
 # 大模型配置
 MODEL_CONFIGS = {
     "openai": {
@@ -39,3 +59,96 @@ MODEL_CONFIGS = {
         "model": os.getenv("LLM_MODEL", "claude-2")
     }
 }
+
+# 本地量化大模型（LLM_PLATFORM=local）：llama.cpp llama-server 的地址，未运行时用 LOCAL_LLM_MODEL（GGUF）启动
+LOCAL_LLM_URL = os.getenv("LOCAL_LLM_URL", "http://127.0.0.1:8081")
+LOCAL_LLM_MODEL = os.getenv("LOCAL_LLM_MODEL", "./models/qwen2.5-1.5b-instruct-q4_k_m.gguf")
+LOCAL_LLM_SERVER_BIN = os.getenv("LOCAL_LLM_SERVER_BIN", "llama-server")
+# 推理线程数（0 为全部核心）、并行槽位数（连续批处理同时解码的请求数）、每个槽位的上下文长度与最大生成 token 数
+LOCAL_LLM_THREADS = int(os.getenv("LOCAL_LLM_THREADS", "0"))
+LOCAL_LLM_PARALLEL = int(os.getenv("LOCAL_LLM_PARALLEL", "4"))
+LOCAL_LLM_CTX = int(os.getenv("LOCAL_LLM_CTX", "4096"))
+LOCAL_LLM_MAX_TOKENS = int(os.getenv("LOCAL_LLM_MAX_TOKENS", "256"))
+
+# 嵌入模型后端：为空时使用 LLM_PLATFORM 对应的远程嵌入服务，local 为本机 CPU 运行的 ONNX 句向量模型（无需联网）
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "")
+# 本地嵌入模型目录（model.onnx + tokenizer.json）
+LOCAL_EMBEDDING_MODEL = os.getenv("LOCAL_EMBEDDING_MODEL", "./models/all-MiniLM-L6-v2-onnx")
+# 是否使用 int8 量化模型（首次加载时自动量化并缓存）
+LOCAL_EMBEDDING_INT8 = os.getenv("LOCAL_EMBEDDING_INT8", "1") == "1"
+# ONNX Runtime 推理线程数，0 为使用全部核心
+LOCAL_EMBEDDING_THREADS = int(os.getenv("LOCAL_EMBEDDING_THREADS", "0"))
+# 每批推理的文本数与单段文本的最大 token 数
+LOCAL_EMBEDDING_BATCH = int(os.getenv("LOCAL_EMBEDDING_BATCH", "32"))
+LOCAL_EMBEDDING_MAX_LENGTH = int(os.getenv("LOCAL_EMBEDDING_MAX_LENGTH", "256"))
+
+# 引用上下文提取：sentence 为句子窗口（GROBID 句子切分），paragraph 为整段
+CONTEXT_MODE = os.getenv("CONTEXT_MODE", "sentence")
+# 引用句前后各保留的句子数
+CONTEXT_WINDOW = int(os.getenv("CONTEXT_WINDOW", "1"))
+# 单段上下文的 token 上限
+CONTEXT_MAX_TOKENS = int(os.getenv("CONTEXT_MAX_TOKENS", "256"))
+
+# 链路模式的引用上下文检索：hybrid 为引用标记倒排索引 + BM25/FAISS 兜底，vector 为仅向量检索
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")
+# 链路模式每条参考文献最多检索并验证的引用上下文数
+CONTEXT_TOP_K = int(os.getenv("CONTEXT_TOP_K", "5"))
+# 自适应检索：向量距离超过最近片段距离 × 该倍数的片段不再验证（BM25 兜底时为得分低于最高分 / 该倍数），0 为固定取 CONTEXT_TOP_K 段
+CONTEXT_SCORE_RATIO = float(os.getenv("CONTEXT_SCORE_RATIO", "1.5"))
+# 逐段提前终止：同一参考文献出现 EARLY_STOP_RELATED 次“相关”或连续 EARLY_STOP_UNRELATED 次“不相关”后，
+# 剩余段落不再调用大模型，0 为不按对应判定终止
+EARLY_STOP_RELATED = int(os.getenv("EARLY_STOP_RELATED", "1"))
+EARLY_STOP_UNRELATED = int(os.getenv("EARLY_STOP_UNRELATED", "2"))
+
+# 参考文献提取：grobid 为调用 GROBID processReferences，local 为先读取 PDF 文本层本地解析，置信度低时回退 GROBID
+REFERENCE_EXTRACTOR = os.getenv("REFERENCE_EXTRACTOR", "grobid")
+
+# GROBID 全文TEI落盘目录（流式解析用，按 服务/文件内容/参数 缓存）
+TEI_CACHE_DIR = os.getenv("TEI_CACHE_DIR", "./tei_cache")
+# TEI 落盘缓存的磁盘配额（MB），超出时按最近使用时间回收；0 为不限
+TEI_CACHE_QUOTA_MB = float(os.getenv("TEI_CACHE_QUOTA_MB", "1024"))
+# TEI 落盘缓存的保留天数，超过后回收；0 为不限
+TEI_CACHE_MAX_AGE_DAYS = float(os.getenv("TEI_CACHE_MAX_AGE_DAYS", "30"))
+
+# 被引文献PDF共享存储（按内容寻址，多个任务/进程共用，同一文献只下载一次）
+PDF_STORE_DIR = os.getenv("PDF_STORE_DIR", "./pdf_store")
+# PDF 存储的磁盘配额（MB），超出时按最近访问时间回收未在使用的文件；0 为不限
+PDF_STORE_QUOTA_MB = float(os.getenv("PDF_STORE_QUOTA_MB", "2048"))
+# PDF 存储租约的有效期（小时），超过后视为持有进程已退出（其他主机上的进程无法检查存活）；0 为不过期
+PDF_STORE_LEASE_TTL_HOURS = float(os.getenv("PDF_STORE_LEASE_TTL_HOURS", "24"))
+
+# 推测式预取的线程数：参考文献提取与全文解析并行，参考文献就绪后在后台下载并解析被引文献；0 为关闭
+PREFETCH_WORKERS = int(os.getenv("PREFETCH_WORKERS", "4"))
+
+# 被引文献证据：fulltext 为检索被引文献全文中与引用上下文最相关的段落作为证据，abstract 为仅使用摘要
+EVIDENCE_MODE = os.getenv("EVIDENCE_MODE", "fulltext")
+# 每段引用上下文检索的证据段落数
+EVIDENCE_TOP_K = int(os.getenv("EVIDENCE_TOP_K", "3"))
+# 证据的 token 预算
+EVIDENCE_MAX_TOKENS = int(os.getenv("EVIDENCE_MAX_TOKENS", "768"))
+# 被引文献索引的持久化目录，按 arXiv ID 存放，不同施引论文共享
+EVIDENCE_INDEX_DIR = os.getenv("EVIDENCE_INDEX_DIR", "./evidence_index")
+
+# 语料索引：向量数不超过 INDEX_FLAT_MAX 用精确 Flat，不超过 INDEX_HNSW_MAX 用 HNSW，更大时用 IVF-PQ
+INDEX_FLAT_MAX = int(os.getenv("INDEX_FLAT_MAX", "50000"))
+INDEX_HNSW_MAX = int(os.getenv("INDEX_HNSW_MAX", "1000000"))
+
+# 验证服务配置
+SERVICE_HOST = os.getenv("SERVICE_HOST", "127.0.0.1")
+SERVICE_PORT = int(os.getenv("SERVICE_PORT", "8000"))
+# 服务工作目录（任务队列数据库、上传文件、下载文献、输出结果）
+SERVICE_WORK_DIR = os.getenv("SERVICE_WORK_DIR", "./service_data")
+# 并发执行验证任务的 worker 数量
+SERVICE_WORKERS = int(os.getenv("SERVICE_WORKERS", "2"))
+# 排队任务上限，超过后提交接口返回 429 进行背压
+SERVICE_MAX_PENDING = int(os.getenv("SERVICE_MAX_PENDING", "32"))
+# 允许以 JSON {"doc_path": ...} 提交的服务端本地目录（只接受该目录下的文件）；为空时只接受上传
+SERVICE_DOC_ROOT = os.getenv("SERVICE_DOC_ROOT", "")
+
+# 判定仓库目录（Parquet 列式存储，跨运行统计判定结果）；为空时不记录
+VERDICT_WAREHOUSE_DIR = os.getenv("VERDICT_WAREHOUSE_DIR", "./verdict_warehouse")
+
+# 批量调度每一波准备的被引文献数（verifier/batch），0 为按解析器与证据索引的缓存容量自动确定
+BATCH_WAVE_SIZE = int(os.getenv("BATCH_WAVE_SIZE", "0"))
+# 批量调度中 CPU 密集步骤（TEI 解析、论文切分、句子切分）的进程数（utils/cpu_stage），0 为 CPU 核数，1 为在会话线程中执行
+CPU_WORKERS = int(os.getenv("CPU_WORKERS", "0"))
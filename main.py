@@ -1,6 +1,7 @@
 import argparse
-from verifier.citation_verifier_system import CitationVerificationSystem
-from verifier.citation_verify_langchain_ver import CitationVerificationLangchainVer
+import os
+from config.settings import PDF_STORE_DIR
+from verifier.session import get_session
 
 if __name__ == "__main__":
     # 添加参数解析器
@@ -8,25 +9,56 @@ if __name__ == "__main__":
     # 添加 --doc_path 参数，用于指定文档路径
     parser.add_argument('--verify_type', type=str, required=True,
                         help='验证模式，例如：chain/simple')
-    parser.add_argument('--doc_path', type=str, required=True,
-                        help='文档路径，例如：path/to/your/document.pdf')
-    parser.add_argument('--download_dir', type=str, required=True,
-                        help='文档保存路径，例如：path/to/your/download_dir')
+    parser.add_argument('--doc_path', type=str, nargs='+', required=True,
+                        help='文档路径，例如：path/to/your/document.pdf；给出多篇时按跨论文引用关系批量调度')
+    parser.add_argument('--download_dir', type=str, default=PDF_STORE_DIR,
+                        help='参考文献PDF共享存储目录，默认读取配置 PDF_STORE_DIR')
     parser.add_argument('--output_dir', type=str, required=True,
                         help='文档保存路径，例如：path/to/your/download_dir')
+    parser.add_argument('--processes', type=int, default=1,
+                        help='分片执行的本机 worker 进程数，大于 1 时启用分片模式')
+    parser.add_argument('--spool_dir', type=str, default=None,
+                        help='分片队列目录，默认 output_dir/spool_<文档ID>')
+    parser.add_argument('--fresh', action='store_true',
+                        help='忽略运行日志，从头开始验证（默认从上次中断处续跑）')
+    parser.add_argument('--retrieval', type=str, default=None, choices=['hybrid', 'vector'],
+                        help='链路模式的检索方式，默认读取配置 RETRIEVAL_MODE')
     args = parser.parse_args()
 
-    # 解析出所有的参考文献
-    if args.verify_type == "simple":
-        system = CitationVerificationSystem(
-            download_dir=args.download_dir, doc_path=args.doc_path, output_dir=args.output_dir)
-        references = system.parser.extract_references(system.doc_path)
-        print("✅ 使用普通模型进行验证")
-        system.verify_citation(references)
+    # 进程内共享的验证会话（GROBID / arXiv / 大模型客户端），文档句柄在首次使用时才解析
+    session = get_session(pdf_store_dir=args.download_dir)
+    if len(args.doc_path) > 1:
+        from verifier.batch import BatchScheduler
+        print(f"✅ 使用批量调度验证 {len(args.doc_path)} 篇论文")
+        scheduler = BatchScheduler(session, args.doc_path, args.output_dir, args.verify_type,
+                                   resume=not args.fresh, retrieval_mode=args.retrieval)
+        scheduler.run()
+        print(scheduler.summary())
     else:
-        sys = CitationVerificationLangchainVer(
-            download_dir=args.download_dir, doc_path=args.doc_path, output_dir=args.output_dir)
-        references = sys.parser.extract_references(
-            sys.doc_path)
-        print("✅ 使用链路模型进行验证")
-        sys.verify_citation_by_chain(references)
+        # 分片模式由 worker 进程下载并验证被引文献，不在本进程预取
+        system = session.open(args.doc_path[0], args.output_dir, args.verify_type,
+                              resume=not args.fresh, retrieval_mode=args.retrieval,
+                              prefetch=args.processes <= 1)
+        # 解析出所有的参考文献
+        references = system.extract_references()
+        if args.processes > 1:
+            from verifier.sharding import run_sharded
+            spool_dir = args.spool_dir or os.path.join(
+                args.output_dir, f"spool_{system.doc_id}")
+            print(f"✅ 使用分片模式进行验证（{args.processes} 个进程）")
+            run_sharded(system, references, args.verify_type, spool_dir, args.download_dir,
+                        processes=args.processes,
+                        output_path=os.path.join(args.output_dir, f"sharded_{system.doc_id}.txt"))
+        elif args.verify_type == "simple":
+            print("✅ 使用普通模型进行验证")
+            system.verify_citation(references)
+            system.report_context_savings()
+            system.report_prompt_cache()
+        else:
+            print("✅ 使用链路模型进行验证")
+            system.verify_citation_by_chain(references)
+            system.report_early_stop()
+            system.report_prompt_cache()
+    if session.cascade is not None:
+        print(session.cascade.summary())
+    session.close()
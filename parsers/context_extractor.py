@@ -0,0 +1,165 @@
+import threading
+from collections import OrderedDict
+
+from lxml import etree
+
+from parsers.tei_stream import iter_paragraphs
+from utils.tokens import count_tokens, truncate_tokens
+
+TEI_NS = {'tei': 'http://www.tei-c.org/ns/1.0'}
+
+
+class CitationContextExtractor:
+    """
+    句子级引用上下文提取
+    使用GROBID的句子切分（segment_sentences），对每处引用返回“引用句 + 前后 window 句”，
+    同一参考文献在同一段落中的窗口重叠或相邻时合并，每段上下文不超过 max_tokens 个 token。
+    同时统计与整段提取（extract_refer_text）相比节省的 token 数。
+    """
+
+    def __init__(self, parser, window=1, max_tokens=256, cache_size=8):
+        """
+        :param parser: GrobidParser 实例
+        :param window: 引用句前后各保留的句子数
+        :param max_tokens: 单段上下文的 token 上限
+        """
+        self.parser = parser
+        self.window = window
+        self.max_tokens = max_tokens
+        self.cache_size = cache_size
+        self._index_cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.stats = {"references": 0, "contexts": 0,
+                      "paragraph_tokens": 0, "context_tokens": 0}
+
+    @property
+    def tokens_saved(self):
+        return self.stats["paragraph_tokens"] - self.stats["context_tokens"]
+
+    def summary(self):
+        """本次运行的 token 节省情况"""
+        paragraph_tokens = self.stats["paragraph_tokens"]
+        ratio = self.tokens_saved / paragraph_tokens if paragraph_tokens else 0.0
+        return (f"引用上下文：{self.stats['references']} 条文献，{self.stats['contexts']} 段上下文，"
+                f"整段 {paragraph_tokens} tokens → 句子窗口 {self.stats['context_tokens']} tokens，"
+                f"节省 {self.tokens_saved} tokens（{ratio:.1%}）")
+
+    @staticmethod
+    def build_index(xml_content=None, tei_path=None):
+        """
+        解析带句子切分的TEI，建立 参考文献ID → 引用位置 的索引
+        :param xml_content: TEI XML 字符串
+        :param tei_path: TEI 文件路径，传入时流式解析正文段落，只保留句子文本
+        :return: (段落列表, 索引)，段落为句子文本列表，索引为 ref_id → [(段落序号, 句子序号)]
+        """
+        if tei_path is not None:
+            elements = iter_paragraphs(tei_path)
+        else:
+            elements = etree.fromstring(xml_content.encode('utf-8')).iterfind('.//tei:p', TEI_NS)
+        paragraphs, index = [], {}
+        for p in elements:
+            sentences = p.findall('tei:s', TEI_NS)
+            # 未切分句子时整段视为一句
+            units = sentences if sentences else [p]
+            para_idx = len(paragraphs)
+            texts = []
+            for sent_idx, s in enumerate(units):
+                texts.append(''.join(s.itertext()).strip())
+                for ref in s.iterfind('.//tei:ref[@type="bibr"]', TEI_NS):
+                    for ref_id in (ref.get('target') or '').split():
+                        positions = index.setdefault(ref_id.lstrip('#'), [])
+                        if (para_idx, sent_idx) not in positions:
+                            positions.append((para_idx, sent_idx))
+            paragraphs.append(texts)
+        return paragraphs, index
+
+    def _get_index(self, doc_path):
+        key = self.parser.file_digest(doc_path)
+        with self._lock:
+            if key in self._index_cache:
+                self._index_cache.move_to_end(key)
+                return self._index_cache[key]
+        tei_path = self.parser.grobid_extract_tei_file(
+            doc_path=doc_path, segment_sentences=True)
+        built = self.build_index(tei_path=tei_path) if tei_path else ([], {})
+        with self._lock:
+            self._index_cache[key] = built
+            while len(self._index_cache) > self.cache_size:
+                self._index_cache.popitem(last=False)
+        return built
+
+    def _merge_windows(self, positions, paragraphs):
+        """按段落合并重叠或相邻的句子窗口，返回 [(段落序号, 起始句, 结束句, 引用句集合)]"""
+        windows = []
+        for para_idx, sent_idx in sorted(positions):
+            start = max(0, sent_idx - self.window)
+            end = min(len(paragraphs[para_idx]) - 1, sent_idx + self.window)
+            if windows and windows[-1][0] == para_idx and start <= windows[-1][2] + 1:
+                last = windows[-1]
+                windows[-1] = (para_idx, last[1], max(last[2], end), last[3] | {sent_idx})
+            else:
+                windows.append((para_idx, start, end, {sent_idx}))
+        return windows
+
+    def _fit_window(self, sentences, start, end, anchors):
+        """在 token 上限内保留窗口：优先保留引用句，再由近及远加入相邻句"""
+        keep = set(anchors)
+        used = sum(count_tokens(sentences[i]) for i in keep)
+        if used > self.max_tokens:
+            # 引用句本身超限时，截断为仅含引用句的文本
+            text = " ".join(sentences[i] for i in sorted(keep))
+            return truncate_tokens(text, self.max_tokens)
+        candidates = sorted(
+            (i for i in range(start, end + 1) if i not in keep),
+            key=lambda i: (min(abs(i - a) for a in anchors), i))
+        for i in candidates:
+            cost = count_tokens(sentences[i])
+            # 遇到放不下的句子即停止，保证上下文由近及远连续
+            if used + cost > self.max_tokens:
+                break
+            keep.add(i)
+            used += cost
+        return " ".join(sentences[i] for i in sorted(keep))
+
+    def install(self, doc_path, built):
+        """放入已在别处（如 utils/cpu_stage 的工作进程）建好的引用索引，之后的 extract 直接命中缓存"""
+        key = self.parser.file_digest(doc_path)
+        with self._lock:
+            self._index_cache[key] = built
+            while len(self._index_cache) > self.cache_size:
+                self._index_cache.popitem(last=False)
+
+    def prepare(self, doc_path):
+        """预先解析文档并建立引用索引（供后台预取调用，之后的 extract 直接命中缓存）"""
+        self._get_index(doc_path)
+
+    def extract(self, doc_path, ref_id):
+        """
+        提取指定参考文献的句子级引用上下文
+        :param doc_path: PDF文件路径
+        :param ref_id: 引用ID，例如 b4
+        :return: 上下文文本列表
+        """
+        paragraphs, index = self._get_index(doc_path)
+        positions = index.get(ref_id, [])
+        if not positions:
+            return []
+
+        contexts = []
+        for para_idx, start, end, anchors in self._merge_windows(positions, paragraphs):
+            contexts.append(self._fit_window(
+                paragraphs[para_idx], start, end, anchors))
+
+        # 统计：与整段提取相比节省的 token
+        cited_paragraphs = {para_idx for para_idx, _ in positions}
+        with self._lock:
+            self.stats["references"] += 1
+            self.stats["contexts"] += len(contexts)
+            self.stats["paragraph_tokens"] += sum(
+                count_tokens(" ".join(paragraphs[i])) for i in cited_paragraphs)
+            self.stats["context_tokens"] += sum(count_tokens(c)
+                                                for c in contexts)
+        return contexts
@@ -1,10 +1,192 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
 from lxml import etree
 from grobid_client.grobid_client import GrobidClient
 
+from clients.grobid_pool import get_pool, parse_urls
+from config.settings import (GROBID_HEALTH_INTERVAL, GROBID_MAX_CONCURRENCY, REFERENCE_EXTRACTOR, TEI_CACHE_DIR,
+                             TEI_CACHE_MAX_AGE_DAYS, TEI_CACHE_QUOTA_MB)
+from parsers import pdf_references
+from parsers.tei_stream import iter_bibl_structs, iter_paragraphs, read_header
+from utils.arxiv_id import arxiv_key, extract_identifiers
+
+_NO_OPTIONS = dict(generateIDs=False, consolidate_header=False, consolidate_citations=False,
+                   include_raw_citations=False, include_raw_affiliations=False,
+                   tei_coordinates=False, segment_sentences=False)
+
+# GROBID 参数档位：按调用方实际读取的内容选择服务与参数。
+# 合并（consolidate_*，需调用 CrossRef/biblio-glutton）是 GROBID 最慢的环节，坐标与句子切分也会增加处理时间和TEI体积，
+# 只在读取方确实需要时开启。
+GROBID_PROFILES = {
+    # 仅读取标题、摘要
+    "header": ("processHeaderDocument", _NO_OPTIONS),
+    # 仅读取参考文献列表；保留原始引用文本（<note type="raw_reference">），
+    # GROBID 未识别出 arXiv idno 时由 bibl_arxiv_key 从原始文本中提取编号
+    "references": ("processReferences", {**_NO_OPTIONS, "include_raw_citations": True}),
+    # 正文段落、引用标记与参考文献列表
+    "fulltext": ("processFulltextDocument", _NO_OPTIONS),
+    # 同上，并切分句子（<s>），用于句子级引用上下文
+    "citation_contexts": ("processFulltextDocument", {**_NO_OPTIONS, "segment_sentences": True}),
+    # 句子切分并带坐标，供 langchain GrobidParser.process_xml 按句子坐标组块（链路模式 vector 检索）
+    "vector_chunks": ("processFulltextDocument", {**_NO_OPTIONS, "segment_sentences": True,
+                                                  "tei_coordinates": True}),
+}
+
+# TEI 落盘缓存回收的最小间隔（秒），以及回收时保留的最近使用窗口（秒，调用方可能正在读取）
+TEI_GC_INTERVAL = 60
+TEI_GC_GRACE = 600
+
 
 class GrobidParser:
-    def __init__(self, grobid_url="http://localhost:8070"):
-        self.grobid_client = GrobidClient(grobid_server=grobid_url)
+    def __init__(self, grobid_url="http://localhost:8070", cache_size=64, tei_dir=TEI_CACHE_DIR,
+                 reference_extractor=REFERENCE_EXTRACTOR, tei_quota_mb=TEI_CACHE_QUOTA_MB,
+                 tei_max_age_days=TEI_CACHE_MAX_AGE_DAYS):
+        """
+        :param grobid_url: GROBID 服务地址，多个地址用逗号分隔（或传入列表）时在节点间负载均衡
+        :param cache_size: 内存中缓存的TEI文件路径数量（命中时不再计算PDF哈希）
+        :param tei_dir: TEI文件的落盘目录（按 服务地址/档位参数/文件内容 缓存）
+        :param reference_extractor: grobid 或 local（先从PDF文本层本地解析参考文献，置信度低时回退 GROBID）
+        :param tei_quota_mb: TEI 落盘缓存的磁盘配额（MB），0 为不限
+        :param tei_max_age_days: TEI 落盘缓存的保留天数，0 为不限
+        """
+        urls = parse_urls(grobid_url)
+        self.grobid_url = urls[0]
+        self.grobid_urls = urls
+        # 单文件请求经由进程内共享的客户端池分发；批量处理（目录）仍使用首个节点的 GrobidClient
+        self.pool = get_pool(urls, max_concurrency=GROBID_MAX_CONCURRENCY,
+                             health_interval=GROBID_HEALTH_INTERVAL)
+        self.grobid_client = GrobidClient(grobid_server=self.grobid_url, check_server=False)
+        # GROBID 解析结果落盘缓存，同一文件同一档位只解析一次；内存中只保留 （档位, PDF路径, 修改时间, 大小）→ TEI 路径 的 LRU 索引
+        self.cache_size = cache_size
+        self._tei_cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.tei_dir = tei_dir
+        self.reference_extractor = reference_extractor
+        self.tei_quota_bytes = int(tei_quota_mb * 2 ** 20)
+        self.tei_max_age = tei_max_age_days * 86400
+        self._gc_lock = threading.Lock()
+        self._last_gc = 0.0
+
+    @staticmethod
+    def file_digest(doc_path):
+        """计算文件内容哈希，作为缓存键的一部分"""
+        h = hashlib.sha1()
+        with open(doc_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        return h.hexdigest()
+
+    def profile_tag(self, profile):
+        """TEI 落盘缓存键中的档位标识：GROBID 服务地址、服务名与参数的哈希，任一变化时不再复用旧的TEI"""
+        service, options = GROBID_PROFILES[profile]
+        payload = json.dumps([self.grobid_urls, service, options], sort_keys=True)
+        return f"{profile}_{hashlib.sha1(payload.encode()).hexdigest()[:10]}"
+
+    def process_pdf_cached(self, profile, doc_path):
+        """
+        按参数档位调用GROBID处理PDF，返回TEI字符串（结果落盘缓存，见 process_pdf_to_file）
+        :param profile: GROBID_PROFILES 中的档位名，例如 header / fulltext
+        :param doc_path: PDF文件路径
+        :return: TEI XML字符串
+        """
+        tei_path = self.process_pdf_to_file(profile, doc_path)
+        with open(tei_path, "r", encoding="utf-8") as f:
+            xml_content = f.read()
+        if not xml_content:
+            raise RuntimeError(f"GROBID {GROBID_PROFILES[profile][0]} 返回空结果")
+        return xml_content
+
+    def process_pdf_to_file(self, profile, doc_path):
+        """
+        按参数档位调用GROBID处理PDF，响应按块写入磁盘而不在内存中保留完整TEI字符串，供 iterparse 流式解析
+        结果按（服务地址, 档位参数, 文件内容）缓存在 tei_dir 中，超出配额或保留期的文件由 gc_tei_cache 回收
+        :return: TEI 文件路径
+        """
+        stat = os.stat(doc_path)
+        key = (profile, os.path.abspath(doc_path), stat.st_mtime_ns, stat.st_size)
+        with self._cache_lock:
+            tei_path = self._tei_cache.get(key)
+            if tei_path is not None:
+                self._tei_cache.move_to_end(key)
+        if tei_path is None or not os.path.exists(tei_path):
+            tei_path = os.path.join(self.tei_dir, f"{self.file_digest(doc_path)}_{self.profile_tag(profile)}.tei.xml")
+            if not os.path.exists(tei_path):
+                self._fetch_tei(profile, doc_path, tei_path)
+                self.gc_tei_cache(force=False)
+            with self._cache_lock:
+                self._tei_cache[key] = tei_path
+                while len(self._tei_cache) > self.cache_size:
+                    self._tei_cache.popitem(last=False)
+        # 记录最近使用时间，回收时优先删除最久未使用的文件
+        try:
+            os.utime(tei_path)
+        except FileNotFoundError:
+            pass
+        return tei_path
+
+    def _fetch_tei(self, profile, doc_path, tei_path):
+        """请求 GROBID 并将响应流式写入 tei_path（先写临时文件再替换）"""
+        service, options = GROBID_PROFILES[profile]
+        os.makedirs(self.tei_dir, exist_ok=True)
+        tmp_path = f"{tei_path}.{os.getpid()}.{threading.get_ident()}.part"
+        try:
+            # 503 与连接失败由客户端池换节点重试
+            with self.pool.post(service, doc_path, options, stream=True) as res:
+                if res.status_code != 200:
+                    raise RuntimeError(f"GROBID {service} 返回状态 {res.status_code}")
+                with open(tmp_path, "wb") as f:
+                    for block in res.iter_content(chunk_size=1 << 16):
+                        f.write(block)
+            os.replace(tmp_path, tei_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def gc_tei_cache(self, force=True):
+        """
+        回收 TEI 落盘缓存：删除超过保留期的TEI与中断遗留的临时文件，总大小超出配额时按最近使用时间从旧到新删除；
+        最近 TEI_GC_GRACE 秒内使用过的文件不删除（调用方可能正在读取）
+        :param force: 为 False 时距上次回收不足 TEI_GC_INTERVAL 秒则跳过
+        :return: 删除的文件数
+        """
+        now = time.time()
+        if not force and now - self._last_gc < TEI_GC_INTERVAL:
+            return 0
+        if not self._gc_lock.acquire(blocking=False):
+            return 0
+        try:
+            self._last_gc = now
+            files = []
+            for entry in os.scandir(self.tei_dir) if os.path.isdir(self.tei_dir) else []:
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+            files.sort()
+            total = sum(size for _, size, _ in files)
+            removed = 0
+            for mtime, size, path in files:
+                age = now - mtime
+                if age < TEI_GC_GRACE:
+                    break
+                expired = path.endswith(".part") or (self.tei_max_age and age > self.tei_max_age)
+                if not expired and not (self.tei_quota_bytes and total > self.tei_quota_bytes):
+                    continue
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                removed += 1
+            return removed
+        finally:
+            self._gc_lock.release()
 
     def extract_metadata(self, doc_path):
         """
@@ -13,12 +195,12 @@ class GrobidParser:
         :return: 元数据字典
         """
         try:
-            _, _, xml_content = self.grobid_client.process_pdf(service="processHeaderDocument", pdf_file=doc_path, generateIDs=False, consolidate_header=True,
-                                                               consolidate_citations=True, include_raw_citations=True, include_raw_affiliations=True, tei_coordinates=True, segment_sentences=True)
+            # 落盘TEI中只读取 teiHeader
+            root = read_header(self.process_pdf_to_file("header", doc_path))
             # grobid解析文件成功
             print(f"[成功] grobid解析{doc_path}成功")
-            # 解析出 XML Abstract 内容
-            root = etree.fromstring(xml_content.encode('utf-8'))
+            if root is None:
+                return {}
             ns = {'tei': 'http://www.tei-c.org/ns/1.0'}
 
             # 提取 biblStruct/analytic/title
@@ -33,21 +215,37 @@ class GrobidParser:
             print(f"[错误] 提取元数据失败: {e}")
             return {}
 
-    def grobid_extract_tei(self, doc_path):
+    def grobid_extract_tei(self, doc_path, segment_sentences=False):
         """
         使用GROBID提取PDF中的TEI XML
         :param pdf_path: PDF文件路径
+        :param segment_sentences: 是否让GROBID将段落切分为句子（<s>元素）
         :return: TEI XML字符串
         """
         try:
-            _, _, xml_content = self.grobid_client.process_pdf(
-                service="processFulltextDocument", pdf_file=doc_path, generateIDs=False, consolidate_header=True, consolidate_citations=False, include_raw_citations=True,
-                include_raw_affiliations=True, tei_coordinates=True, segment_sentences=False)
+            xml_content = self.process_pdf_cached(
+                self._fulltext_profile(segment_sentences), doc_path)
         except Exception as e:
             print(f"[ERROR] Grobid 解析全文错误: {e}")
             return None
         return xml_content
 
+    def grobid_extract_tei_file(self, doc_path, segment_sentences=False):
+        """
+        使用GROBID提取PDF中的TEI XML并写入磁盘（流式解析用，适合长篇论文）
+        :return: TEI 文件路径，失败时返回 None
+        """
+        try:
+            return self.process_pdf_to_file(
+                self._fulltext_profile(segment_sentences), doc_path)
+        except Exception as e:
+            print(f"[ERROR] Grobid 解析全文错误: {e}")
+            return None
+
+    @staticmethod
+    def _fulltext_profile(segment_sentences):
+        return "citation_contexts" if segment_sentences else "fulltext"
+
     def grobid_extract_tei_batch(self,
                                  input_path="./resources/test_pdf",
                                  output_dir="./resources/test_output",
@@ -117,72 +315,111 @@ class GrobidParser:
         :param pdf_path: PDF文件路径
         :return: 参考文献列表
         """
+        if self.reference_extractor == "local":
+            references, info = pdf_references.extract_references(doc_path)
+            if references is not None:
+                print(f"[成功] 本地解析参考文献 {len(references)} 条（{info['style']}）")
+                return references
+            print(f"[警告] 本地解析参考文献不可靠（{info['reason']}），回退 GROBID")
         try:
-            _, _, xml_content = self.grobid_client.process_pdf(
-                service="processReferences", pdf_file=doc_path, generateIDs=False, consolidate_header=False, consolidate_citations=False, include_raw_citations=True, include_raw_affiliations=True, tei_coordinates=False, segment_sentences=False)
+            xml_content = self.process_pdf_cached("references", doc_path)
+            return self.parse_references(xml_content)
+        except Exception as e:
+            print(f"[错误] 提取参考文献失败: {e}")
+            return []
 
-            # 解析出 XML References 内容
-            root = etree.fromstring(xml_content.encode('utf-8'))
-            ns = {'tei': 'http://www.tei-c.org/ns/1.0'}
+    @staticmethod
+    def parse_references(xml_content):
+        """
+        从TEI XML中解析参考文献列表
+        :param xml_content: TEI XML字符串（processReferences 或 processFulltextDocument 的结果）
+        :return: 参考文献列表
+        """
+        # 解析出 XML References 内容
+        root = etree.fromstring(xml_content.encode('utf-8'))
+        ns = {'tei': 'http://www.tei-c.org/ns/1.0'}
+        return [GrobidParser.parse_bibl(bib) for bib in root.xpath('//tei:biblStruct', namespaces=ns)
+                if bib.get('{http://www.w3.org/XML/1998/namespace}id')]
 
-            bibl_list = []
+    @staticmethod
+    def iter_references(tei_path):
+        """
+        流式解析TEI文件中的参考文献列表，逐条产出，内存占用与文献数量无关
+        :param tei_path: TEI 文件路径
+        """
+        for bib in iter_bibl_structs(tei_path):
+            yield GrobidParser.parse_bibl(bib)
 
-            for bib in root.xpath('//tei:biblStruct', namespaces=ns):
-                xml_id = bib.get('{http://www.w3.org/XML/1998/namespace}id')
-                if not xml_id:
-                    continue
+    @staticmethod
+    def parse_bibl(bib):
+        """解析单条 biblStruct"""
+        ns = {'tei': 'http://www.tei-c.org/ns/1.0'}
+        xml_id = bib.get('{http://www.w3.org/XML/1998/namespace}id')
 
-                # 提取常见元数据
-                # 作者
-                authors = []
-                for author in bib.xpath('.//tei:author', namespaces=ns):
-                    name = []
-                    for fn in author.findall('.//tei:forename', namespaces=ns):
-                        name.append(fn.text)
-                    surname = author.find('.//tei:surname', namespaces=ns)
-                    if surname is not None:
-                        name.append(surname.text)
-                    authors.append(' '.join(name))
-
-                # 期刊
-                journal_el = bib.find(
-                    './/tei:monogr//tei:title', namespaces=ns)
-                journal = journal_el.text if journal_el is not None else ""
-
-                # DOI
-                doi = ""
-
-                # 标题
-                title_el = bib.find(
-                    './/tei:analytic//tei:title', namespaces=ns)
-                if title_el is None:
-                    title_el = bib.find(
-                        './/tei:monogr//tei:title', namespaces=ns)
-                    d = bib.find(
-                        './/tei:monogr//tei:idno[@type="arXiv"]', namespaces=ns)
-                    if d is not None:
-                        doi = d.text
-                        journal = "arXiv"
-
-                title = title_el.text
-
-                # 出版年份
-                year_el = bib.find('.//tei:date', namespaces=ns)
-                year = year_el.get('when') if (year_el is not None and year_el.get(
-                    'when')) else (year_el.text if year_el is not None else "")
-
-                bibl_list.append({
-                    "ref_id": xml_id,
-                    "authors": authors,
-                    "title": title,
-                    "journal": journal,
-                    "year": year,
-                    "doi": doi
-                })
-            return bibl_list
-        except Exception as e:
-            print(f"[错误] 提取参考文献失败: {e}")
-            return []
+        # 提取常见元数据
+        # 作者
+        authors = []
+        for author in bib.xpath('.//tei:author', namespaces=ns):
+            name = []
+            for fn in author.findall('.//tei:forename', namespaces=ns):
+                name.append(fn.text)
+            surname = author.find('.//tei:surname', namespaces=ns)
+            if surname is not None:
+                name.append(surname.text)
+            authors.append(' '.join(name))
+
+        # 期刊
+        journal_el = bib.find(
+            './/tei:monogr//tei:title', namespaces=ns)
+        journal = journal_el.text if journal_el is not None else ""
+
+        # DOI（arXiv 规范键），有 analytic 标题的期刊/会议版本同样可能带 arXiv 编号
+        doi = GrobidParser.bibl_arxiv_key(bib)
+        if doi:
+            journal = "arXiv"
+
+        # 标题
+        title_el = bib.find(
+            './/tei:analytic//tei:title', namespaces=ns)
+        if title_el is None:
+            title_el = bib.find(
+                './/tei:monogr//tei:title', namespaces=ns)
+
+        title = title_el.text
+
+        # 出版年份
+        year_el = bib.find('.//tei:date', namespaces=ns)
+        year = year_el.get('when') if (year_el is not None and year_el.get(
+            'when')) else (year_el.text if year_el is not None else "")
+
+        return {
+            "ref_id": xml_id,
+            "authors": authors,
+            "title": title,
+            "journal": journal,
+            "year": year,
+            "doi": doi
+        }
+
+    @staticmethod
+    def bibl_arxiv_key(bib):
+        """
+        biblStruct 中的 arXiv 规范键（arXiv:编号），依次查找 arXiv idno、其他 idno（如 10.48550/arXiv.* DOI）、
+        链接与原始引用文本；没有时返回空字符串
+        """
+        ns = {'tei': 'http://www.tei-c.org/ns/1.0'}
+        for idno in bib.iterfind('.//tei:idno[@type="arXiv"]', ns):
+            key = arxiv_key(''.join(idno.itertext()))
+            if key:
+                return key
+        texts = [''.join(idno.itertext()) for idno in bib.iterfind('.//tei:idno', ns)]
+        texts += [ptr.get('target', '') for ptr in bib.iterfind('.//tei:ptr', ns)]
+        texts += [''.join(note.itertext()) for note in bib.iterfind('.//tei:note', ns)]
+        for text in texts:
+            ids = extract_identifiers(text)["arxiv"]
+            if ids:
+                return arxiv_key(ids[0])
+        return ""
 
     def extract_abstract_batch(self, input_dir, output_dir):
         """
@@ -229,16 +466,14 @@ class GrobidParser:
         :return: 提取到的摘要文本，若提取失败则返回空字符串
         """
         try:
-            _, _, xml_content = self.grobid_client.process_pdf(service="processHeaderDocument", pdf_file=pdf_path, generateIDs=False, consolidate_header=True,
-                                                               consolidate_citations=True, include_raw_citations=True, include_raw_affiliations=True, tei_coordinates=True, segment_sentences=True)
+            # 落盘TEI中只读取 teiHeader（摘要位于 profileDesc）
+            root = read_header(self.process_pdf_to_file("header", pdf_path))
             # grobid解析文件成功
             print(f"[成功] grobid解析{pdf_path}成功")
-            # 解析出 XML Abstract 内容
-            root = etree.fromstring(xml_content.encode('utf-8'))
             ns = {'tei': 'http://www.tei-c.org/ns/1.0'}
 
             # 提取abstract部分
-            abstracts = root.xpath('//tei:abstract', namespaces=ns)
+            abstracts = root.xpath('.//tei:abstract', namespaces=ns) if root is not None else []
             if abstracts:
                 abstract_text = ''.join(abstracts[0].itertext()).strip()
                 return abstract_text
@@ -256,19 +491,15 @@ class GrobidParser:
         :return: 提取到的引用文本，若提取失败则返回空字符串
         """
         res = []
-        # 调用GROBID客户端的process方法，使用processReferences服务处理输入文件
-        xml_content = self.grobid_extract_tei(doc_path=doc_path)
-        if not xml_content:
+        # 全文TEI落盘后流式解析，逐段判断是否引用了该文献
+        tei_path = self.grobid_extract_tei_file(doc_path=doc_path)
+        if not tei_path:
             return res
-        # 解析出 XML References 内容
-        root = etree.fromstring(xml_content.encode('utf-8'))
         ns = {'tei': 'http://www.tei-c.org/ns/1.0'}
-        xpath_str = '//tei:p[.//tei:ref[@type="bibr" and @target="#{}"]]'.format(
-            ref_id)
-        paras = root.xpath(xpath_str, namespaces=ns)
-        for p in paras:
-            text = ''.join(p.itertext())
-            res.append(text)
+        xpath_str = './/tei:ref[@type="bibr" and @target="#{}"]'.format(ref_id)
+        for p in iter_paragraphs(tei_path):
+            if p.xpath(xpath_str, namespaces=ns):
+                res.append(''.join(p.itertext()))
         return res
 
 
@@ -0,0 +1,206 @@
+"""
+本地参考文献提取（快速路径）
+用纯 Python 的 pypdf 读取 PDF 文本层，定位参考文献章节，解析 IEEE / ACM（编号）与作者-年份格式的条目，
+输出与 GrobidParser.parse_references 相同的字典结构（ref_id 按列表顺序编号为 b0、b1…，与 GROBID 的 xml:id 一致）。
+解析置信度低（无文本层、找不到参考文献章节、编号不连续、多数条目缺标题或年份）时返回 None，由调用方回退 GROBID。
+"""
+import re
+import unicodedata
+
+from utils.arxiv_id import arxiv_key, extract_identifiers
+
+# 参考文献章节标题（单独成行，可带章节编号）
+_HEADING_RE = re.compile(
+    r'^[ \t]*(?:\d+\.?|[IVX]+\.)?[ \t]*(References|REFERENCES|Bibliography|BIBLIOGRAPHY|'
+    r'Literature Cited|R\s?EFERENCES|参考文献)[ \t]*$', re.M)
+# 参考文献之后的附录标题
+_END_RE = re.compile(r'^[ \t]*(?:[A-Z]\.?[ \t]+)?(Appendix|APPENDIX|Appendices|APPENDICES|'
+                     r'Supplementary Material|SUPPLEMENTARY MATERIAL)\b.*$', re.M)
+# 编号条目：[12] Author… / 12. Author…
+_BRACKET_RE = re.compile(r'^[ \t]*\[(\d{1,3})\][ \t]*', re.M)
+_DOTTED_RE = re.compile(r'^[ \t]*(\d{1,3})\.[ \t]+(?=[A-Z])', re.M)
+# 作者-年份条目的起始行：Surname, A. / Surname, First / First Surname, …
+_AUTHOR_START_RE = re.compile(r"^[^\W\d_][^\W\d_'’.\-]*(?: [^\W\d_][^\W\d_'’.\-]*){0,2}, [A-Z]")
+
+_YEAR_RE = re.compile(r'\b((?:19|20)\d{2})[a-z]?\b')
+_PAREN_YEAR_RE = re.compile(r'\(((?:19|20)\d{2})[a-z]?\)')
+_QUOTED_TITLE_RE = re.compile(r'["“”](.+?)["“”]')
+# 句子边界：不在单个大写首字母（作者缩写）或常见缩写之后
+_SEGMENT_RE = re.compile(r'(?<!\b[A-Z])(?<!\bet al)(?<!\bpp)(?<!\bvol)(?<!\bno)(?<!\bVol)(?<!\bNo)(?<!\bEd)(?<!\bEds)'
+                         r'(?<!\bed)(?<!\beds)[.?!][ \t]+(?=[A-Z0-9"“(\[]|arXiv|https?:)')
+_INITIALS_RE = re.compile(r'^(?:[A-Z]\.?[ \-]?)+$')
+
+
+def pdf_text(doc_path):
+    """
+    读取 PDF 文本层，从最后一页向前读到参考文献章节标题为止
+    :return: (参考文献标题之后的文本, 读取的页数)；没有文本层或找不到标题时文本为 None
+    """
+    from pypdf import PdfReader
+
+    reader = PdfReader(doc_path)
+    pages = []
+    for index in range(len(reader.pages) - 1, -1, -1):
+        pages.insert(0, reader.pages[index].extract_text() or "")
+        text = "\n".join(pages)
+        headings = list(_HEADING_RE.finditer(text))
+        if headings:
+            return text[headings[-1].end():], len(pages)
+    return None, len(pages)
+
+
+def _normalize(text):
+    # NFKC 展开连字（ﬁ ﬀ），去掉行尾连字符并合并断行
+    text = unicodedata.normalize("NFKC", text)
+    # 旧版 TeX 字体中的短横线在文本层中常被映射为 {
+    text = re.sub(r'(\d)\{(\d)', r'\1-\2', text)
+    text = re.sub(r'(\w)-\n(?=[a-z])', r'\1', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def split_entries(section):
+    """
+    将参考文献章节切分为条目
+    :return: (条目列表, 编号列表或 None, 格式 numbered / author_year)
+    """
+    end = _END_RE.search(section)
+    if end:
+        section = section[:end.start()]
+    for pattern in (_BRACKET_RE, _DOTTED_RE):
+        marks = list(pattern.finditer(section))
+        numbers = [int(m.group(1)) for m in marks]
+        # 编号格式要求从 1 开始且大体连续，避免把页码、年份误判为编号
+        if len(marks) >= 2 and numbers[0] == 1 and sum(
+                b == a + 1 for a, b in zip(numbers, numbers[1:])) >= 0.8 * (len(numbers) - 1):
+            entries = [section[m.end():(marks[i + 1].start() if i + 1 < len(marks) else len(section))]
+                       for i, m in enumerate(marks)]
+            return [_normalize(e) for e in entries], numbers, "numbered"
+
+    # 作者-年份：上一行以句号结束且本行以“姓, 名”开头时视为新条目
+    entries, current = [], []
+    for line in section.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if current and current[-1].endswith(".") and _AUTHOR_START_RE.match(line):
+            entries.append(" ".join(current))
+            current = []
+        current.append(line)
+    if current:
+        entries.append(" ".join(current))
+    return [_normalize(e) for e in entries], None, "author_year"
+
+
+def _segments(text):
+    return [s.strip() for s in _SEGMENT_RE.split(text) if s.strip()]
+
+
+def _split_authors(text):
+    text = re.sub(r'\bet al\.?', '', text)
+    text = re.sub(r'\s*(?:,\s*)?(?:\band\b|&)\s*', ', ', text)
+    parts = [p.strip(" ,") for p in text.split(",") if p.strip(" .,")]
+    authors, i = [], 0
+    while i < len(parts):
+        # “Surname, A. B.” 形式：姓与缩写被逗号分开，合并为一人
+        if i + 1 < len(parts) and _INITIALS_RE.match(parts[i + 1]) and not _INITIALS_RE.match(parts[i]):
+            authors.append(f"{parts[i + 1]} {parts[i].rstrip('.')}")
+            i += 2
+        else:
+            # 保留缩写末尾的句点，去掉条目分隔的句点
+            authors.append(parts[i] if re.search(r'\b[A-Z]\.$', parts[i]) else parts[i].rstrip("."))
+            i += 1
+    return [a for a in authors if len(a) > 1]
+
+
+def arxiv_id(text):
+    """条目中的 arXiv 规范键（与 GrobidParser 一致为 arXiv:编号），无则返回空字符串"""
+    ids = extract_identifiers(text)["arxiv"]
+    return arxiv_key(ids[0]) if ids else ""
+
+
+def parse_entry(text):
+    """解析单条参考文献文本为 {authors, title, journal, year, doi}"""
+    doi = arxiv_id(text)
+    paren_year = _PAREN_YEAR_RE.search(text)
+    # arXiv 编号、DOI 与链接中的数字（如 1912.01234）不作为年份
+    years = _YEAR_RE.findall(re.sub(r'\S*\d{4}\.\d{4,5}\S*|https?://\S+|\b10\.\d{4,9}/\S+', ' ', text))
+    year = paren_year.group(1) if paren_year else (years[-1] if years else "")
+
+    authors_text, title, venue = "", "", ""
+    quoted = _QUOTED_TITLE_RE.search(text)
+    if quoted:
+        # IEEE：作者, “标题,” 期刊, 年份
+        authors_text = text[:quoted.start()]
+        title = quoted.group(1)
+        venue = text[quoted.end():]
+    elif paren_year and paren_year.start() < len(text) // 2:
+        # APA：作者 (年份). 标题. 期刊
+        authors_text = text[:paren_year.start()]
+        rest = _segments(text[paren_year.end():].lstrip(". "))
+        title = rest[0] if rest else ""
+        venue = rest[1] if len(rest) > 1 else ""
+    else:
+        segments = _segments(text)
+        if segments:
+            authors_text = segments[0]
+        rest = segments[1:]
+        # ACL/natbib：作者. 年份. 标题. 期刊
+        if rest and _YEAR_RE.fullmatch(rest[0].rstrip(".")):
+            rest = rest[1:]
+        title = rest[0] if rest else ""
+        venue = rest[1] if len(rest) > 1 else ""
+
+    venue = re.sub(r'^In:?\s+', '', venue).split(",")[0].strip(" .")
+    return {
+        "authors": _split_authors(authors_text),
+        "title": title.strip(' .,"“”'),
+        "journal": "arXiv" if doi else venue,
+        "year": year,
+        "doi": doi,
+    }
+
+
+# 解析出的“标题”实为出处，说明作者与标题的分界判断错误
+_VENUE_TITLE_RE = re.compile(r'^(?:In\b|Proc\.|Proceedings\b|pp\.|Vol\.|arXiv\b|https?:)')
+
+
+def _confident(ref, text):
+    title = ref["title"]
+    # 过长或含多个 (年份) 的条目多为切分失败、把相邻条目合并在了一起
+    merged = len(text) > 600 or len(_PAREN_YEAR_RE.findall(text)) > 1
+    return (not merged and len(title.split()) >= 2 and not _VENUE_TITLE_RE.match(title)
+            and bool(ref["year"]) and bool(ref["authors"]))
+
+
+def extract_references(doc_path, min_confidence=0.8):
+    """
+    从 PDF 文本层提取参考文献
+    :param min_confidence: 标题、年份、作者齐全的条目比例下限，低于此值视为解析不可靠
+    :return: (参考文献列表或 None, 诊断信息)；None 表示应回退 GROBID
+    """
+    info = {"pages": 0, "style": None, "entries": 0, "confidence": 0.0, "reason": ""}
+    try:
+        section, info["pages"] = pdf_text(doc_path)
+    except Exception as e:
+        info["reason"] = f"读取PDF文本层失败: {e}"
+        return None, info
+    if section is None:
+        info["reason"] = "未找到参考文献章节（或无文本层）"
+        return None, info
+
+    entries, numbers, info["style"] = split_entries(section)
+    entries = [e for e in entries if e]
+    info["entries"] = len(entries)
+    if not entries:
+        info["reason"] = "参考文献章节为空"
+        return None, info
+    if numbers is not None and numbers != list(range(1, len(numbers) + 1)):
+        info["reason"] = "条目编号不连续"
+        return None, info
+
+    refs = [{"ref_id": f"b{i}", **parse_entry(text)} for i, text in enumerate(entries)]
+    info["confidence"] = sum(_confident(r, text) for r, text in zip(refs, entries)) / len(refs)
+    if info["confidence"] < min_confidence:
+        info["reason"] = f"解析置信度 {info['confidence']:.2f} 低于 {min_confidence}"
+        return None, info
+    return refs, info
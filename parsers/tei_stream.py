@@ -0,0 +1,150 @@
+"""
+TEI 流式解析
+以 lxml.iterparse 逐元素读取 GROBID 输出的TEI文件（或字节流），处理完即清除，
+内存占用只与单个段落/参考文献条目相关，与文档长度无关。
+"""
+import sys
+
+from lxml import etree
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+TEI = '{http://www.tei-c.org/ns/1.0}'
+XML_ID = '{http://www.w3.org/XML/1998/namespace}id'
+TEI_NS = {'tei': 'http://www.tei-c.org/ns/1.0'}
+
+
+def _release(elem):
+    """清除已处理的元素及其之前的兄弟节点，释放内存"""
+    elem.clear(keep_tail=True)
+    parent = elem.getparent()
+    if parent is not None:
+        while elem.getprevious() is not None:
+            del parent[0]
+
+
+def _text(elem):
+    return ''.join(elem.itertext()).strip()
+
+
+def bibr_targets(elem):
+    """元素中的参考文献引用目标（去掉 #），按出现顺序去重"""
+    targets = []
+    for ref in elem.iterfind('.//tei:ref[@type="bibr"]', TEI_NS):
+        for target in (ref.get('target') or '').split():
+            if target.lstrip('#') not in targets:
+                targets.append(target.lstrip('#'))
+    return targets
+
+
+def iter_body_units(source, header=None):
+    """
+    按文档顺序流式产出正文与附录（<back> 中的附录、致谢等）单元：
+        ("head", 标题文本)
+        ("p", 段落元素)               —— 元素仅在本次迭代内有效，产出后即被清除
+        ("formula", 公式ID, 公式文本)
+        ("figure", 图表元素)          —— 同上
+    图表内部的标题与段落不单独产出；参考文献列表（listBibl）跳过，<back> 结束后停止读取。
+    :param source: TEI 文件路径或二进制文件对象
+    :param header: 可选，传入字典时写入 {"header": teiHeader 元素的副本}
+    """
+    in_body = False
+    figure_depth = 0
+    p_depth = 0
+    bibl_depth = 0
+    for event, elem in etree.iterparse(source, events=("start", "end"), huge_tree=True):
+        tag = elem.tag
+        if event == "start":
+            if tag in (TEI + "body", TEI + "back"):
+                in_body = True
+            elif not in_body:
+                pass
+            elif tag == TEI + "listBibl":
+                bibl_depth += 1
+            elif bibl_depth:
+                pass
+            elif tag == TEI + "figure":
+                figure_depth += 1
+            elif tag == TEI + "p":
+                p_depth += 1
+            continue
+
+        if tag == TEI + "teiHeader":
+            if header is not None:
+                header["header"] = etree.fromstring(etree.tostring(elem))
+            _release(elem)
+            continue
+        if not in_body:
+            continue
+        if tag == TEI + "back":
+            return
+        if tag == TEI + "listBibl":
+            bibl_depth -= 1
+        if bibl_depth or tag == TEI + "listBibl":
+            # 参考文献条目不产出，读完即清除
+            _release(elem)
+            continue
+
+        if tag == TEI + "figure":
+            figure_depth -= 1
+            if figure_depth or p_depth:
+                continue
+            yield "figure", elem
+        elif tag == TEI + "p":
+            p_depth -= 1
+            if p_depth or figure_depth:
+                continue
+            yield "p", elem
+        elif figure_depth or p_depth:
+            # 段落或图表内部的元素，随外层元素一并处理
+            continue
+        elif tag == TEI + "head":
+            yield "head", _text(elem)
+        elif tag == TEI + "formula":
+            yield "formula", elem.get(XML_ID, ''), _text(elem)
+        # 处理完的元素（包括 div 等容器）即清除
+        _release(elem)
+
+
+def read_header(source):
+    """只读取 teiHeader（读到即停止），返回其副本，不存在时返回 None"""
+    for _, elem in etree.iterparse(source, events=("end",), tag=TEI + "teiHeader", huge_tree=True):
+        return etree.fromstring(etree.tostring(elem))
+    return None
+
+
+def iter_paragraphs(source):
+    """流式产出正文与附录段落元素（产出后即被清除）"""
+    for unit in iter_body_units(source):
+        if unit[0] == "p":
+            yield unit[1]
+
+
+def iter_bibl_structs(source):
+    """流式产出带 xml:id 的参考文献条目元素（产出后即被清除）"""
+    depth = 0
+    for event, elem in etree.iterparse(source, events=("start", "end"), huge_tree=True):
+        if elem.tag == TEI + "biblStruct":
+            if event == "start":
+                depth += 1
+                continue
+            depth -= 1
+            if depth == 0 and elem.get(XML_ID):
+                yield elem
+        elif event == "start" or depth:
+            continue
+        if depth == 0:
+            _release(elem)
+
+
+def peak_rss_mb():
+    """进程峰值常驻内存（MB）"""
+    if resource is None:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / 2 ** 20
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 单位为字节，Linux 为 KB
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 1024
@@ -0,0 +1,284 @@
+"""
+本地替身后端：用于在没有 GROBID / arXiv / 大模型服务时完整运行验证流程
+- FakeGrobidServer: 实现 GROBID 的 /api/isalive 与 /api/process* 接口，返回固定或预置的 TEI；
+  可模拟处理耗时与并发上限（超出时返回 503），用于测试多节点 GROBID 客户端池
+- FakeArxivClient: 与 ArxivClient 接口一致，从本地目录“下载”文献
+- FakeLlamaServer: 实现 llama-server 的 /health 与 /v1/chat/completions 接口，模拟固定槽位数的连续批处理
+大模型与嵌入模型的替身见 LLM_PLATFORM=fake
+"""
+import json
+import os
+import shutil
+import threading
+import time
+from email import policy
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from xml.sax.saxutils import escape
+
+from clients.arxiv_client import ArxivClient
+
+STUB_TEI = """<?xml version="1.0" encoding="UTF-8"?>
+<TEI xmlns="http://www.tei-c.org/ns/1.0">
+  <teiHeader>
+    <fileDesc>
+      <titleStmt><title level="a" type="main">{title}</title></titleStmt>
+      <sourceDesc>
+        <biblStruct>
+          <analytic><title level="a" type="main">{title}</title></analytic>
+          <monogr><imprint/></monogr>
+        </biblStruct>
+      </sourceDesc>
+    </fileDesc>
+    <profileDesc>
+      <abstract><div><p>Stand-in abstract for {title}.</p></div></abstract>
+    </profileDesc>
+  </teiHeader>
+  <text>
+    <body>
+      <div>
+        <head>1. Introduction</head>
+        <p>We build on prior work <ref type="bibr" target="#b0">[1]</ref> for citation verification.</p>
+      </div>
+    </body>
+    <back>
+      <div type="references">
+        <listBibl>
+          <biblStruct xml:id="b0">
+            <monogr>
+              <title level="m">Stand-in Referenced Paper</title>
+              <idno type="arXiv">arXiv:1705.06950</idno>
+              <author><persName><forename>Ada</forename><surname>Lovelace</surname></persName></author>
+              <imprint><date type="published" when="2017"/></imprint>
+            </monogr>
+          </biblStruct>
+        </listBibl>
+      </div>
+    </back>
+  </text>
+</TEI>
+"""
+
+
+def _upload_filename(headers, body):
+    """从 multipart/form-data 请求体中取出上传文件名"""
+    content_type = headers.get("Content-Type", "")
+    msg = BytesParser(policy=policy.default).parsebytes(
+        b"Content-Type: " + content_type.encode() + b"\r\n\r\n" + body)
+    if not msg.is_multipart():
+        return None
+    for part in msg.iter_parts():
+        if part.get_param("name", header="content-disposition") == "input":
+            return part.get_filename()
+    return None
+
+
+class _FakeGrobidHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, code, text, content_type="text/plain"):
+        data = text.encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/api/isalive":
+            self._send(200, "true")
+        else:
+            self._send(404, "not found")
+
+    def do_POST(self):
+        if not self.path.startswith("/api/process"):
+            self._send(404, "not found")
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        filename = _upload_filename(self.headers, body) or "document.pdf"
+        if not self.server.enter():
+            # 与 GROBID 一致：处理线程已满时返回 503
+            self._send(503, "busy")
+            return
+        try:
+            if self.server.delay:
+                time.sleep(self.server.delay)
+            tei = self.server.tei_for(filename)
+        finally:
+            self.server.leave()
+        self._send(200, tei, "application/xml")
+
+
+class FakeGrobidServer(ThreadingHTTPServer):
+    """
+    替身 GROBID 服务
+    若 fixture_dir 中存在与上传文件同名的 `<文件名>.tei.xml`，则返回该 TEI，否则返回内置的最小 TEI
+    :param delay: 每个请求的模拟处理耗时（秒）
+    :param max_concurrency: 同时处理的请求上限，超出时返回 503；None 为不限
+    """
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, fixture_dir=None, delay=0.0, max_concurrency=None):
+        super().__init__((host, port), _FakeGrobidHandler)
+        self.fixture_dir = fixture_dir
+        self.delay = delay
+        self.max_concurrency = max_concurrency
+        self._thread = None
+        # 请求统计：处理中/峰值并发/已处理/返回 503 的请求数
+        self._lock = threading.Lock()
+        self.active = 0
+        self.peak_active = 0
+        self.served = 0
+        self.rejected = 0
+
+    def enter(self):
+        with self._lock:
+            if self.max_concurrency is not None and self.active >= self.max_concurrency:
+                self.rejected += 1
+                return False
+            self.active += 1
+            self.peak_active = max(self.peak_active, self.active)
+            return True
+
+    def leave(self):
+        with self._lock:
+            self.active -= 1
+            self.served += 1
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def tei_for(self, filename):
+        stem = os.path.splitext(os.path.basename(filename))[0]
+        if self.fixture_dir:
+            tei_path = os.path.join(self.fixture_dir, f"{stem}.tei.xml")
+            if os.path.exists(tei_path):
+                with open(tei_path, "r", encoding="utf-8") as f:
+                    return f.read()
+        return STUB_TEI.format(title=escape(stem))
+
+    def start(self):
+        """在后台线程中启动服务"""
+        self._thread = threading.Thread(
+            target=self.serve_forever, name="fake-grobid", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class FakeArxivClient(ArxivClient):
+    """替身 arXiv 客户端：检索总能命中，下载时从 fixture_dir 复制同名 PDF，缺失时写入占位 PDF"""
+
+    def __init__(self, fixture_dir=None):
+        super().__init__()
+        self.fixture_dir = fixture_dir
+
+    def search_papers(self, query, max_results=1):
+        return [{
+            "title": f"Stand-in paper {query}",
+            "authors": [],
+            "summary": "",
+            "pdf_link": f"stub://{query}"
+        }]
+
+    def download_pdf(self, pdf_url, save_path):
+        arxiv_id = pdf_url.split("://", 1)[-1]
+        src = os.path.join(self.fixture_dir, f"{arxiv_id}.pdf") if self.fixture_dir else None
+        if src and os.path.exists(src):
+            shutil.copyfile(src, save_path)
+        else:
+            with open(save_path, "wb") as f:
+                f.write(f"%PDF-1.4\n% stand-in {arxiv_id}\n%%EOF\n".encode())
+        return True
+
+
+class _FakeLlamaHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, code, data):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/health":
+            self._send_json(200, {"status": "ok"})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/v1/chat/completions":
+            self._send_json(404, {"error": "not found"})
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        prompt = "".join(m.get("content", "") for m in payload.get("messages", []))
+        # 槽位已满的请求排队；占用槽位的请求同步解码（连续批处理），各自耗时与并发数无关
+        with self.server.slots:
+            time.sleep(self.server.delay)
+        self.server.count()
+        self._send_json(200, {
+            "choices": [{"message": {"role": "assistant", "content": self.server.response}}],
+            "usage": {"prompt_tokens": len(prompt), "completion_tokens": len(self.server.response),
+                      "prompt_tokens_details": {"cached_tokens": 0}},
+        })
+
+
+class FakeLlamaServer(ThreadingHTTPServer):
+    """
+    替身 llama-server
+    :param delay: 每个请求的模拟解码耗时（秒）
+    :param parallel: 并行槽位数，同时解码的请求不超过该数
+    """
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, delay=0.0, parallel=4,
+                 response="不确定\n理由：本地替身模型，未进行真实判断。"):
+        super().__init__((host, port), _FakeLlamaHandler)
+        self.delay = delay
+        self.parallel = parallel
+        self.response = response
+        self.slots = threading.BoundedSemaphore(parallel)
+        self._lock = threading.Lock()
+        self.served = 0
+        self._thread = None
+
+    def count(self):
+        with self._lock:
+            self.served += 1
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """在后台线程中启动服务"""
+        self._thread = threading.Thread(
+            target=self.serve_forever, name="fake-llama", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == "__main__":
+    server = FakeGrobidServer(port=8070).start()
+    print(f"替身 GROBID 服务已启动: {server.url}")
+    try:
+        server._thread.join()
+    except KeyboardInterrupt:
+        server.stop()
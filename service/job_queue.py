@@ -0,0 +1,137 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+
+
+class QueueFullError(Exception):
+    """排队任务数达到上限（背压）"""
+
+
+class JobQueue:
+    """
+    基于 SQLite 的持久化任务队列
+    任务状态流转：queued → running → done / failed
+    服务重启后，未完成的 running 任务会重新回到 queued
+    """
+
+    def __init__(self, db_path, max_pending=32):
+        self.db_path = db_path
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                verify_type TEXT NOT NULL,
+                doc_path TEXT NOT NULL,
+                filename TEXT,
+                submitted_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                result TEXT,
+                error TEXT
+            )""")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, submitted_at)")
+        self.recover()
+
+    def recover(self):
+        """将上次异常退出时处于 running 的任务重新排队"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status='queued', started_at=NULL WHERE status='running'")
+
+    def submit(self, doc_path, verify_type, filename=None, job_id=None):
+        """
+        提交任务
+        :return: 任务ID
+        :raises QueueFullError: 排队任务数已达上限
+        """
+        job_id = job_id or uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                pending = self._conn.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')").fetchone()[0]
+                if pending >= self.max_pending:
+                    raise QueueFullError(f"排队任务已达上限 {self.max_pending}")
+                self._conn.execute(
+                    "INSERT INTO jobs (id, status, verify_type, doc_path, filename, submitted_at) "
+                    "VALUES (?, 'queued', ?, ?, ?, ?)",
+                    (job_id, verify_type, doc_path, filename, time.time()))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return job_id
+
+    def claim(self):
+        """
+        领取最早提交的排队任务
+        :return: 任务字典，没有可执行任务时返回 None
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT * FROM jobs WHERE status='queued' ORDER BY submitted_at LIMIT 1").fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                self._conn.execute(
+                    "UPDATE jobs SET status='running', started_at=?, attempts=attempts+1 WHERE id=?",
+                    (time.time(), row["id"]))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        job = dict(row)
+        job["status"] = "running"
+        return job
+
+    def complete(self, job_id, result):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status='done', finished_at=?, result=? WHERE id=?",
+                (time.time(), json.dumps(result, ensure_ascii=False), job_id))
+
+    def fail(self, job_id, error):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status='failed', finished_at=?, error=? WHERE id=?",
+                (time.time(), str(error), job_id))
+
+    def get(self, job_id, with_result=False):
+        """
+        查询任务
+        :param with_result: 是否同时返回验证结果
+        :return: 任务字典，不存在时返回 None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM jobs WHERE id=?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        result = job.pop("result")
+        if with_result:
+            job["result"] = json.loads(result) if result else None
+        return job
+
+    def stats(self):
+        """各状态任务数量"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
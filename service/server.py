@@ -0,0 +1,277 @@
+"""
+常驻验证服务
+- 进程内常驻 GROBID / arXiv / 嵌入模型 / 大模型客户端及其缓存，所有任务共享
+- SQLite 持久化任务队列，可配置 worker 并发数，排队数超过上限时拒绝提交（HTTP 429）
+
+接口：
+    POST /jobs?verify_type=simple&filename=paper.pdf   请求体为 PDF 二进制（Content-Type: application/pdf）
+    POST /jobs                                         请求体为 JSON {"doc_path": "...", "verify_type": "chain"}，
+                                                       doc_path 须位于 --doc_root 目录下，未配置时不接受
+    GET  /jobs/<job_id>                                查询任务状态
+    GET  /jobs/<job_id>/result                         获取验证结果
+    GET  /health                                       服务与队列状态
+
+运行：
+    python -m service.server --workers 2
+    python -m service.server --fake        # 使用本地替身后端，无需 GROBID / arXiv / 大模型服务
+"""
+import argparse
+import json
+import os
+import shutil
+import threading
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from config.settings import (CheckType, GROBID_URL, LLM_PLATFORM, SERVICE_DOC_ROOT, SERVICE_HOST,
+                             SERVICE_MAX_PENDING, PDF_STORE_DIR, SERVICE_PORT, SERVICE_WORK_DIR, SERVICE_WORKERS)
+from service.job_queue import JobQueue, QueueFullError
+from verifier.citation_verify_langchain_ver import VECTOR_DB_DIRS
+from verifier.session import VerifierSession
+
+VERIFY_TYPES = {t.value for t in CheckType}
+
+
+class VerificationService:
+    def __init__(self, work_dir=SERVICE_WORK_DIR, workers=SERVICE_WORKERS, max_pending=SERVICE_MAX_PENDING,
+                 grobid_url=GROBID_URL, llm_platform=LLM_PLATFORM, arxiv_client=None, pdf_store_dir=PDF_STORE_DIR,
+                 doc_root=SERVICE_DOC_ROOT):
+        self.work_dir = work_dir
+        # 按路径提交时只接受该目录下的文件，为空时只接受上传
+        self.doc_root = os.path.realpath(doc_root) if doc_root else None
+        self.upload_dir = os.path.join(work_dir, "uploads")
+        self.output_dir = os.path.join(work_dir, "outputs")
+        for d in (self.upload_dir, self.output_dir):
+            os.makedirs(d, exist_ok=True)
+
+        self.queue = JobQueue(os.path.join(
+            work_dir, "jobs.db"), max_pending=max_pending)
+        self.workers = workers
+
+        # 常驻验证会话，所有任务共享客户端与缓存（GROBID 解析缓存、被引文献证据索引）；
+        # 被引文献PDF使用共享存储（utils/pdf_store），与命令行及其他服务实例共用
+        self.session = VerifierSession(grobid_url=grobid_url, llm_platform=llm_platform,
+                                       pdf_store_dir=pdf_store_dir, arxiv_client=arxiv_client)
+
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self._threads = []
+
+    def start(self):
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker_loop,
+                                 name=f"verify-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+        for t in self._threads:
+            t.join()
+        self.queue.close()
+        self.session.close()
+
+    def submit_file(self, data, filename, verify_type):
+        """保存上传的PDF并提交任务"""
+        job_id = os.urandom(16).hex()
+        doc_path = os.path.join(self.upload_dir, f"{job_id}.pdf")
+        with open(doc_path, "wb") as f:
+            f.write(data)
+        try:
+            self.queue.submit(doc_path, verify_type,
+                              filename=filename, job_id=job_id)
+        except QueueFullError:
+            os.remove(doc_path)
+            raise
+        self._wakeup.set()
+        return job_id
+
+    def submit_path(self, doc_path, verify_type):
+        """提交服务端本地已有的PDF，路径解析（含符号链接）后须位于 doc_root 目录下"""
+        if self.doc_root is None:
+            raise PermissionError("服务未配置 doc_root，不接受按路径提交，请上传 PDF 文档")
+        real_path = os.path.realpath(os.path.join(self.doc_root, doc_path))
+        if os.path.commonpath([self.doc_root, real_path]) != self.doc_root:
+            raise PermissionError(f"路径不在允许的目录下: {doc_path}")
+        if not os.path.isfile(real_path):
+            raise FileNotFoundError(f"找不到文件: {doc_path}")
+        job_id = self.queue.submit(
+            real_path, verify_type, filename=os.path.basename(real_path))
+        self._wakeup.set()
+        return job_id
+
+    def run_job(self, job):
+        """执行单个验证任务，返回验证结果列表"""
+        output_dir = os.path.join(self.output_dir, job["id"])
+        system = self.session.open(job["doc_path"], output_dir, job["verify_type"])
+        references = system.extract_references()
+        if job["verify_type"] == CheckType.CHECK_TYPE_SIMPLE.value:
+            results = system.verify_citation(references)
+        else:
+            results = system.verify_citation_by_chain(references)
+            system.report_early_stop(callback=lambda msg: print(f"[任务 {job['id']}] {msg}", end=""))
+        system.report_prompt_cache(callback=lambda msg: print(f"[任务 {job['id']}] {msg}", end=""))
+        return results
+
+    def cleanup_job(self, job):
+        """任务结束（完成或失败）后删除上传的PDF与本任务的向量库，结果已保存在任务队列中"""
+        doc_id = os.path.splitext(os.path.basename(job["doc_path"]))[0]
+        for name in VECTOR_DB_DIRS.values():
+            shutil.rmtree(os.path.join(self.output_dir, job["id"], doc_id, name), ignore_errors=True)
+        # 按路径提交的文件属于调用方，只删除上传目录中的文件
+        if os.path.dirname(os.path.abspath(job["doc_path"])) == os.path.abspath(self.upload_dir):
+            try:
+                os.remove(job["doc_path"])
+            except FileNotFoundError:
+                pass
+
+    def _worker_loop(self):
+        while not self._stop.is_set():
+            job = self.queue.claim()
+            if job is None:
+                self._wakeup.wait(timeout=1.0)
+                self._wakeup.clear()
+                continue
+            try:
+                results = self.run_job(job)
+                self.queue.complete(job["id"], results)
+                print(f"[成功] 任务 {job['id']} 完成，共 {len(results)} 条结果")
+            except Exception as e:
+                traceback.print_exc()
+                self.queue.fail(job["id"], e)
+                print(f"[错误] 任务 {job['id']} 失败: {e}")
+            finally:
+                self.cleanup_job(job)
+
+
+class _ServiceHandler(BaseHTTPRequestHandler):
+    service = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, code, payload):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        parts = [p for p in urlparse(self.path).path.split("/") if p]
+        if parts == ["health"]:
+            self._send_json(200, {"status": "ok", "workers": self.service.workers,
+                                  "max_pending": self.service.queue.max_pending,
+                                  "jobs": self.service.queue.stats()})
+            return
+        if len(parts) in (2, 3) and parts[0] == "jobs":
+            want_result = len(parts) == 3 and parts[2] == "result"
+            if len(parts) == 3 and not want_result:
+                self._send_json(404, {"error": "not found"})
+                return
+            job = self.service.queue.get(parts[1], with_result=want_result)
+            if job is None:
+                self._send_json(404, {"error": f"任务不存在: {parts[1]}"})
+            elif want_result and job["status"] != "done":
+                self._send_json(409, {"error": "任务尚未完成", "status": job["status"],
+                                      "detail": job["error"]})
+            else:
+                self._send_json(200, job)
+            return
+        self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path.rstrip("/") != "/jobs":
+            self._send_json(404, {"error": "not found"})
+            return
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        content_type = self.headers.get("Content-Type", "")
+        try:
+            if content_type.startswith("application/json"):
+                payload = json.loads(body or b"{}")
+                verify_type = payload.get("verify_type", "simple")
+                if verify_type not in VERIFY_TYPES:
+                    raise ValueError(f"不支持的验证模式: {verify_type}")
+                job_id = self.service.submit_path(
+                    payload.get("doc_path", ""), verify_type)
+            else:
+                verify_type = query.get("verify_type", "simple")
+                if verify_type not in VERIFY_TYPES:
+                    raise ValueError(f"不支持的验证模式: {verify_type}")
+                if not body:
+                    raise ValueError("请求体为空，请上传 PDF 文档")
+                job_id = self.service.submit_file(
+                    body, query.get("filename", "document.pdf"), verify_type)
+        except QueueFullError as e:
+            self.send_response(429)
+            self.send_header("Retry-After", "5")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            print(f"[背压] {e}")
+            return
+        except PermissionError as e:
+            self._send_json(403, {"error": str(e)})
+            return
+        except (ValueError, FileNotFoundError) as e:
+            self._send_json(400, {"error": str(e)})
+            return
+        self._send_json(202, {"job_id": job_id, "status": "queued"})
+
+
+def make_http_server(service, host=SERVICE_HOST, port=SERVICE_PORT):
+    handler = type("ServiceHandler", (_ServiceHandler,), {"service": service})
+    httpd = ThreadingHTTPServer((host, port), handler)
+    httpd.daemon_threads = True
+    return httpd
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='论文引用验证服务')
+    parser.add_argument('--host', type=str, default=SERVICE_HOST)
+    parser.add_argument('--port', type=int, default=SERVICE_PORT)
+    parser.add_argument('--work_dir', type=str, default=SERVICE_WORK_DIR,
+                        help='服务工作目录，存放任务队列、上传文档与结果')
+    parser.add_argument('--pdf_store_dir', type=str, default=PDF_STORE_DIR,
+                        help='参考文献PDF共享存储目录')
+    parser.add_argument('--doc_root', type=str, default=SERVICE_DOC_ROOT,
+                        help='允许按路径提交的服务端目录，为空时只接受上传')
+    parser.add_argument('--workers', type=int, default=SERVICE_WORKERS,
+                        help='并发执行验证任务的 worker 数量')
+    parser.add_argument('--max_pending', type=int, default=SERVICE_MAX_PENDING,
+                        help='排队任务上限，超过后拒绝提交')
+    parser.add_argument('--fake', action='store_true',
+                        help='使用本地替身后端（GROBID / arXiv / 大模型）')
+    parser.add_argument('--fixture_dir', type=str, default=None,
+                        help='替身后端使用的预置 TEI 与 PDF 目录')
+    args = parser.parse_args()
+
+    grobid_url, llm_platform, arxiv_client, fake_grobid = GROBID_URL, LLM_PLATFORM, None, None
+    if args.fake:
+        from service.fake_backends import FakeArxivClient, FakeGrobidServer
+        fake_grobid = FakeGrobidServer(fixture_dir=args.fixture_dir).start()
+        grobid_url, llm_platform = fake_grobid.url, "fake"
+        arxiv_client = FakeArxivClient(fixture_dir=args.fixture_dir)
+        print(f"✅ 已启动替身 GROBID 服务: {grobid_url}")
+
+    service = VerificationService(work_dir=args.work_dir, workers=args.workers, max_pending=args.max_pending,
+                                  grobid_url=grobid_url, llm_platform=llm_platform,
+                                  arxiv_client=arxiv_client, pdf_store_dir=args.pdf_store_dir,
+                                  doc_root=args.doc_root).start()
+    httpd = make_http_server(service, args.host, args.port)
+    print(f"✅ 验证服务已启动: http://{args.host}:{args.port}")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        service.stop()
+        if fake_grobid:
+            fake_grobid.stop()
@@ -0,0 +1,91 @@
+"""
+GROBID 客户端池测试：在本机启动多个替身 GROBID 服务（service/fake_backends.FakeGrobidServer）
+    python -m pytest tests/test_grobid_pool.py
+"""
+import threading
+
+import pytest
+
+from clients.grobid_pool import GrobidPool
+from service.fake_backends import FakeGrobidServer
+
+
+@pytest.fixture
+def pdf_file(tmp_path):
+    path = tmp_path / "paper.pdf"
+    path.write_bytes(b"%PDF-1.4 test")
+    return str(path)
+
+
+@pytest.fixture
+def servers():
+    started = []
+
+    def start(**kwargs):
+        server = FakeGrobidServer(**kwargs).start()
+        started.append(server)
+        return server
+
+    yield start
+    for server in started:
+        server.stop()
+
+
+def test_busy_node_backs_off_and_request_fails_over(servers, pdf_file):
+    """节点返回 503 时退避该节点，请求改发其他节点"""
+    busy = servers(max_concurrency=0)
+    idle = servers()
+    pool = GrobidPool([busy.url, idle.url], sleep_time=30, timeout=5)
+
+    # 两个节点都空闲时先选列表中的第一个（繁忙节点）
+    _, status, tei = pool.process_pdf("processHeaderDocument", pdf_file)
+    assert status == 200 and "<TEI" in tei
+    assert busy.rejected == 1 and idle.served == 1
+
+    # 退避期内不再分配给繁忙节点
+    for _ in range(3):
+        assert pool.process_pdf("processHeaderDocument", pdf_file)[1] == 200
+    assert busy.rejected == 1 and idle.served == 4
+    stats = {s["url"]: s for s in pool.stats()}
+    assert stats[busy.url]["busy"] == 1 and stats[busy.url]["healthy"]
+    assert all(s["outstanding"] == 0 for s in stats.values())
+
+
+def test_in_flight_requests_capped_per_node(servers, pdf_file):
+    """每个节点的在途请求不超过 max_concurrency，多余的请求在池中等待"""
+    nodes = [servers(delay=0.2), servers(delay=0.2)]
+    pool = GrobidPool([n.url for n in nodes], max_concurrency=2, timeout=10)
+
+    statuses = []
+    threads = [threading.Thread(target=lambda: statuses.append(
+        pool.process_pdf("processFulltextDocument", pdf_file)[1])) for _ in range(10)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert statuses == [200] * 10
+    assert all(n.peak_active <= 2 for n in nodes)
+    assert all(n.rejected == 0 for n in nodes)
+    assert sum(n.served for n in nodes) == 10
+
+
+def test_node_failing_health_check_is_removed(servers, pdf_file):
+    """健康检查失败的节点被摘除，请求只发往可用节点；全部节点不可用时立即失败"""
+    down = servers()
+    up = servers()
+    down.stop()
+    pool = GrobidPool([down.url, up.url], probe_timeout=1, recheck_backoff=30, timeout=5)
+
+    assert pool.check_health() == 1
+    stats = {s["url"]: s for s in pool.stats()}
+    assert not stats[down.url]["healthy"] and stats[up.url]["healthy"]
+    for _ in range(3):
+        assert pool.process_pdf("processHeaderDocument", pdf_file)[1] == 200
+    assert up.served == 3
+    assert {s["url"]: s for s in pool.stats()}[down.url]["requests"] == 0
+
+    up.stop()
+    assert pool.check_health() == 0
+    with pytest.raises(RuntimeError):
+        pool.acquire()
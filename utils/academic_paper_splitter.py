@@ -1,34 +1,89 @@
 from xml.etree import ElementTree as ET
-import nltk
 import re
+from functools import lru_cache
+
 from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
-# 初始化NLTK资源
-nltk.download('punkt', quiet=True)
+from parsers.tei_stream import iter_body_units
+
+TEI_NS = '{http://www.tei-c.org/ns/1.0}'
+XML_ID = '{http://www.w3.org/XML/1998/namespace}id'
+
+# 无 punkt 模型时的近似句子切分
+_SENTENCE_RE = re.compile(r'(?<=[.!?。！？])\s+')
+# 需要单独成块的内容
+_STANDALONE_RE = re.compile(r'FORMULA \[|FIGURE \[|TABLE \[|\bFig\.')
+
+
+def _regex_sentences(text):
+    return [s for s in _SENTENCE_RE.split(text) if s]
+
+
+@lru_cache(maxsize=1)
+def _sentence_splitter():
+    """首次使用时加载一次句子切分器：优先 NLTK punkt（缺失时尝试下载），不可用时退回正则切分"""
+    import nltk
+    for attempt in range(2):
+        try:
+            nltk.sent_tokenize("Warm up.")
+            return nltk.sent_tokenize
+        except LookupError:
+            if attempt == 0:
+                for resource in ('punkt_tab', 'punkt'):
+                    nltk.download(resource, quiet=True)
+    print("[警告] 未找到 NLTK punkt 模型，使用正则切分句子")
+    return _regex_sentences
+
+
+def split_sentences(text):
+    """切分句子"""
+    return _sentence_splitter()(text)
 
 
 class AcademicPaperSplitter:
-    def __init__(self, xml_content, max_chunk_size=1024, chunk_overlap=200):
+    """
+    TEI 论文分割器：单次遍历正文，逐段切分句子并按章节累积为不超过 max_chunk_size 字符的检索块，
+    每个检索块携带其所在的章节层级；公式、图表标题单独成块。
+    """
+
+    def __init__(self, xml_content=None, max_chunk_size=1024, chunk_overlap=200, tei_path=None):
+        """
+        :param xml_content: TEI XML 字符串
+        :param tei_path: TEI 文件路径，传入时以 iterparse 流式解析，不在内存中构建整棵树
+        """
         self.ns = {'tei': 'http://www.tei-c.org/ns/1.0'}
-        self.root = ET.fromstring(xml_content)
+        self.tei_path = tei_path
+        # 流式解析时 root 为 teiHeader，在读到正文前由解析过程填入
+        self.root = ET.fromstring(xml_content) if tei_path is None else None
         self.max_chunk_size = max_chunk_size
         self.chunk_overlap = chunk_overlap
         self.section_hierarchy = []
-        self.current_figure = None
-        self.current_table = None
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=self.max_chunk_size,
             chunk_overlap=self.chunk_overlap,
             separators=["\n\n", "\n", " ", ""]
         )
 
+    @classmethod
+    def from_file(cls, tei_path, **kwargs):
+        """由TEI文件创建流式分割器"""
+        return cls(tei_path=tei_path, **kwargs)
+
     def extract_metadata(self):
         """提取文档级元数据"""
-        title = self.root.find('.//tei:title[@level="a"]', self.ns).text
-        authors = [author.text for author in self.root.findall(
-            './/tei:author', self.ns)]
-        doi = self.root.find('.//tei:idno[@type="arXiv"]', self.ns).text
+        if self.root is None:
+            return {'title': None, 'authors': '', 'doi': None, 'source': 'TEI_XML'}
+        # 只在 teiHeader 中查找，避免取到参考文献列表中的作者与 arXiv 编号
+        header = self.root.find('.//tei:teiHeader', self.ns)
+        if header is None:
+            header = self.root
+        title_node = header.find('.//tei:title[@level="a"]', self.ns)
+        title = title_node.text if title_node is not None else None
+        authors = [author.text for author in header.findall(
+            './/tei:author', self.ns) if author.text]
+        doi_node = header.find('.//tei:idno[@type="arXiv"]', self.ns)
+        doi = doi_node.text if doi_node is not None else None
 
         return {
             'title': title,
@@ -37,72 +92,6 @@ class AcademicPaperSplitter:
             'source': 'TEI_XML'
         }
 
-    def process_element(self, element, current_text, chunks):
-        """递归处理XML元素"""
-        tag = element.tag.split('}')[-1] if '}' in element.tag else element.tag
-
-        # 处理章节标题
-        if tag == 'head':
-            section_title = ''.join(element.itertext()).strip()
-            section_level = self.determine_section_level(section_title)
-            self.section_hierarchy = self.section_hierarchy[:section_level]
-            self.section_hierarchy.append(section_title)
-
-        # 处理段落
-        elif tag == 'p':
-            paragraph = ''.join(element.itertext()).strip()
-            if paragraph:
-                current_text.append(paragraph)
-
-        # 处理公式
-        elif tag == 'formula':
-            formula_text = ''.join(element.itertext()).strip()
-            if formula_text:
-                formula_id = element.attrib.get(
-                    '{http://www.w3.org/XML/1998/namespace}id', '')
-                formula_chunk = f"FORMULA [{formula_id}]: {formula_text}"
-                current_text.append(formula_chunk)
-
-        # 处理图表
-        elif tag == 'figure':
-            fig_id = element.attrib.get(
-                '{http://www.w3.org/XML/1998/namespace}id', '')
-            label = element.find('.//tei:label', self.ns)
-            fig_desc = element.find('.//tei:figDesc', self.ns)
-
-            label_text = label.text if label is not None else f"Figure {fig_id}"
-            desc_text = fig_desc.text if fig_desc is not None else ''
-
-            self.current_figure = f"FIGURE [{label_text}]: {desc_text}"
-            # 递归处理图表内的文本
-            for child in element:
-                self.process_element(child, current_text, chunks)
-            self.current_figure = None
-
-        # 处理表格
-        elif tag == 'table':
-            # 简化表格处理
-            self.current_table = "TABLE PRESENT"
-            # 递归处理表格内的文本
-            for child in element:
-                self.process_element(child, current_text, chunks)
-            self.current_table = None
-
-        # 处理引用
-        elif tag == 'ref':
-            ref_type = element.attrib.get('type', '')
-            ref_target = element.attrib.get('target', '')
-
-            if ref_type == 'bibr':
-                citation = f"[CITATION: {ref_target}]"
-                current_text.append(citation)
-            elif ref_type == 'figure' and self.current_figure:
-                current_text.append(self.current_figure)
-
-        # 递归处理子元素
-        for child in element:
-            self.process_element(child, current_text, chunks)
-
     def determine_section_level(self, title):
         """确定章节层级"""
         # 基于标题前缀判断层级
@@ -114,79 +103,189 @@ class AcademicPaperSplitter:
             return 2
         return len(self.section_hierarchy)  # 保持当前层级
 
-    def semantic_chunking(self, text):
-        """基于语义的分块方法"""
-        # 先按句子分割
-        sentences = nltk.sent_tokenize(text)
-
-        chunks = []
-        current_chunk = []
-        current_length = 0
-
-        for sentence in sentences:
-            # 保留公式上下文
-            if re.search(r'FORMULA \[|\bFig\.', sentence):
-                if current_chunk:
-                    chunks.append(" ".join(current_chunk))
-                    current_chunk = []
-                    current_length = 0
-                chunks.append(sentence)
+    def _figure_text(self, element):
+        """图表只取标签与标题说明，不再递归子元素，避免重复"""
+        label = element.find('tei:label', self.ns)
+        fig_desc = element.find('tei:figDesc', self.ns)
+        head = element.find('tei:head', self.ns)
+        kind = "TABLE" if element.get('type') == 'table' else "FIGURE"
+
+        label_text = (label.text or '').strip() if label is not None else ''
+        if not label_text:
+            label_text = ''.join(head.itertext()).strip() if head is not None else element.get(XML_ID, '')
+        desc_text = ''.join(fig_desc.itertext()).strip() if fig_desc is not None else ''
+        return f"{kind} [{label_text}]: {desc_text}" if desc_text or label_text else ''
+
+    def _tree_units(self, body):
+        """
+        非递归遍历正文树，按文档顺序产出与 tei_stream.iter_body_units 相同的单元：
+        ("head", 文本) / ("p", 元素) / ("formula", 公式ID, 文本) / ("figure", 元素)
+        段落与图表不再向下遍历，避免重复
+        """
+        stack = [iter(body)]
+        while stack:
+            element = next(stack[-1], None)
+            if element is None:
+                stack.pop()
                 continue
-
-            # 添加到当前块
-            if current_length + len(sentence) <= self.max_chunk_size:
-                current_chunk.append(sentence)
-                current_length += len(sentence) + 1  # +1 for space
+            if not isinstance(element.tag, str):
+                continue
+            tag = element.tag[len(TEI_NS):] if element.tag.startswith(TEI_NS) else element.tag
+
+            if tag == 'head':
+                yield "head", ''.join(element.itertext()).strip()
+            elif tag in ('p', 'figure'):
+                yield tag, element
+            elif tag == 'formula':
+                yield "formula", element.get(XML_ID, ''), ''.join(element.itertext()).strip()
+            elif tag == 'listBibl':
+                # 参考文献列表不作为正文
+                continue
+            # 其余元素（如 div）继续向下遍历
             else:
-                if current_chunk:
-                    chunks.append(" ".join(current_chunk))
-                current_chunk = [sentence]
-                current_length = len(sentence)
+                stack.append(iter(element))
+
+    def _body_units(self):
+        """正文单元来源：TEI 文件流式解析，或已解析的树"""
+        if self.tei_path is not None:
+            header = {}
+            for unit in iter_body_units(self.tei_path, header):
+                if self.root is None:
+                    self.root = header.get("header")
+                yield unit
+            return
+        # 正文与附录（<back> 中的附录、致谢等）
+        for section in ('.//tei:body', './/tei:back'):
+            element = self.root.find(section, self.ns)
+            if element is not None:
+                yield from self._tree_units(element)
+
+    def iter_units(self):
+        """
+        按文档顺序产出 (章节层级, 文本, 是否单独成块)
+        章节标题更新层级，段落与公式产出文本，图表产出标签与标题说明
+        """
+        for unit in self._body_units():
+            kind = unit[0]
+            # 处理章节标题
+            if kind == 'head':
+                section_title = unit[1]
+                if section_title:
+                    section_level = self.determine_section_level(section_title)
+                    self.section_hierarchy = self.section_hierarchy[:section_level]
+                    self.section_hierarchy.append(section_title)
+
+            # 处理段落，引用标记附在段末
+            elif kind == 'p':
+                element = unit[1]
+                paragraph = ''.join(element.itertext()).strip()
+                citations = [f"[CITATION: {ref.get('target', '')}]"
+                             for ref in element.iterfind('.//tei:ref[@type="bibr"]', self.ns)]
+                if citations:
+                    paragraph = f"{paragraph} {' '.join(citations)}".strip()
+                if paragraph:
+                    yield tuple(self.section_hierarchy), paragraph, False
+
+            # 处理公式
+            elif kind == 'formula':
+                if unit[2]:
+                    yield tuple(self.section_hierarchy), f"FORMULA [{unit[1]}]: {unit[2]}", True
+
+            # 处理图表
+            elif kind == 'figure':
+                figure_text = self._figure_text(unit[1])
+                if figure_text:
+                    yield tuple(self.section_hierarchy), figure_text, True
+
+    def _finalize(self, chunk):
+        """对过大的块进行二次分割"""
+        if len(chunk) > self.max_chunk_size * 1.5:
+            return self.text_splitter.split_text(chunk)
+        return [chunk]
+
+    def iter_chunks(self):
+        """逐块产出 (章节层级, 文本)，检索块不跨章节"""
+        self.section_hierarchy = []
+        current, current_length, current_section = [], 0, ()
+        for section, text, standalone in self.iter_units():
+            if current and (standalone or section != current_section):
+                for chunk in self._finalize(" ".join(current)):
+                    yield current_section, chunk
+                current, current_length = [], 0
+            if standalone:
+                for chunk in self._finalize(text):
+                    yield section, chunk
+                continue
 
-        if current_chunk:
-            chunks.append(" ".join(current_chunk))
+            current_section = section
+            # 逐段切分句子，跨段落累积到块大小上限
+            for sentence in split_sentences(text):
+                if _STANDALONE_RE.search(sentence):
+                    if current:
+                        for chunk in self._finalize(" ".join(current)):
+                            yield section, chunk
+                        current, current_length = [], 0
+                    for chunk in self._finalize(sentence):
+                        yield section, chunk
+                    continue
+                if current and current_length + len(sentence) > self.max_chunk_size:
+                    for chunk in self._finalize(" ".join(current)):
+                        yield section, chunk
+                    current, current_length = [], 0
+                current.append(sentence)
+                current_length += len(sentence) + 1  # +1 for space
 
-        return chunks
+        if current:
+            for chunk in self._finalize(" ".join(current)):
+                yield current_section, chunk
+
+    def iter_documents(self):
+        """惰性产出 Document，metadata 中的章节为该块所在章节"""
+        metadata = None
+        for i, (section, chunk) in enumerate(self.iter_chunks()):
+            # 流式解析时 teiHeader 在正文之前读到
+            if metadata is None:
+                metadata = self.extract_metadata()
+            # 添加结构化元数据
+            chunk_metadata = metadata.copy()
+            chunk_metadata.update({
+                'chunk_index': i,
+                'section': " > ".join(section) if section else 'Abstract',
+                'section_level': len(section)
+            })
+            yield Document(page_content=chunk, metadata=chunk_metadata)
 
     def split_document(self):
         """主分割方法"""
-        metadata = self.extract_metadata()
-        body = self.root.find('.//tei:body', self.ns)
-
-        all_text = []
-        chunks = []
-
-        if body is not None:
-            self.process_element(body, all_text, chunks)
-
-        full_text = "\n\n".join(all_text)
-
-        # 语义分割
-        semantic_chunks = self.semantic_chunking(full_text)
-
-        # 对过大的块进行二次分割
-        final_chunks = []
-        for chunk in semantic_chunks:
-            if len(chunk) > self.max_chunk_size * 1.5:
-                sub_chunks = self.text_splitter.split_text(chunk)
-                final_chunks.extend(sub_chunks)
-            else:
-                final_chunks.append(chunk)
-
-        # 创建文档对象
-        documents = []
-        for i, chunk in enumerate(final_chunks):
-            # 添加结构化元数据
+        return list(self.iter_documents())
+
+    def split_records(self):
+        """
+        紧凑的分割结果（供进程池返回，utils/cpu_stage）：(文档元数据, 章节层级表, [(章节序号, 文本)])，
+        章节层级只保存一次，由 documents_from_records 还原为与 split_document 相同的 Document 列表
+        """
+        metadata, sections, chunks = None, {}, []
+        for section, chunk in self.iter_chunks():
+            if metadata is None:
+                metadata = self.extract_metadata()
+            chunks.append((sections.setdefault(section, len(sections)), chunk))
+        return metadata, list(sections), chunks
+
+    @staticmethod
+    def documents_from_records(records):
+        """由 split_records 的结果还原 Document 列表"""
+        metadata, sections, chunks = records
+        docs = []
+        for i, (section_idx, chunk) in enumerate(chunks):
+            section = sections[section_idx]
             chunk_metadata = metadata.copy()
             chunk_metadata.update({
                 'chunk_index': i,
-                'section': " > ".join(self.section_hierarchy) if self.section_hierarchy else 'Abstract',
-                'section_level': len(self.section_hierarchy)
+                'section': " > ".join(section) if section else 'Abstract',
+                'section_level': len(section)
             })
-            documents.append(
-                Document(page_content=chunk, metadata=chunk_metadata))
-
-        return documents
+            docs.append(Document(page_content=chunk, metadata=chunk_metadata))
+        return docs
 
 
 if __name__ == "__main__":
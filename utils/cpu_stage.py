@@ -0,0 +1,112 @@
+"""
+CPU 密集步骤的进程池执行阶段
+TEI 的 lxml 解析、AcademicPaperSplitter 的正文遍历、NLTK 句子切分与文本分块都是纯 CPU 计算，
+在会话线程中执行时受 GIL 限制，批量处理成百上千份 TEI 时只能用满一个核心。CpuStage 把这些步骤交给进程池：
+- 零拷贝交接：只传 TEI 文件路径（GROBID 响应已流式落盘到 TEI_CACHE_DIR），工作进程自行以 iterparse 读取，
+  TEI 内容不经过进程间管道
+- 紧凑结果：参考文献为字段元组，论文切分结果的章节层级只保存一次（AcademicPaperSplitter.split_records），
+  引用索引为句子文本与位置列表，由主进程还原为参考文献字典、Document 或引用索引
+- 调用方在会话线程中阻塞等待结果，网络 I/O 留在线程中，CPU 计算分散到各个进程
+workers 为 1 时在调用线程中直接执行，结果格式相同。
+
+    stage = CpuStage(workers=4)
+    references = stage.references(parser.process_pdf_to_file("references", doc_path))
+    stage.close()
+"""
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from config.settings import CPU_WORKERS
+from parsers.context_extractor import CitationContextExtractor
+from parsers.grobid_parser import GrobidParser
+from utils.academic_paper_splitter import AcademicPaperSplitter, split_sentences
+
+REFERENCE_FIELDS = ("ref_id", "authors", "title", "journal", "year", "doi")
+TASKS = ("references", "contexts", "chunks")
+TASK_NAMES = {"references": "参考文献解析", "contexts": "引用索引", "chunks": "论文切分"}
+
+
+def _references(tei_path):
+    return [tuple(ref[field] for field in REFERENCE_FIELDS) for ref in GrobidParser.iter_references(tei_path)]
+
+
+def _contexts(tei_path):
+    return CitationContextExtractor.build_index(tei_path=tei_path)
+
+
+def _chunks(tei_path):
+    return AcademicPaperSplitter.from_file(tei_path).split_records()
+
+
+_TASK_FUNCS = {"references": _references, "contexts": _contexts, "chunks": _chunks}
+
+
+def _run(task, tei_path):
+    """工作进程入口：返回 (耗时, 紧凑结果)"""
+    start = time.perf_counter()
+    result = _TASK_FUNCS[task](tei_path)
+    return time.perf_counter() - start, result
+
+
+def _init_worker():
+    # 句子切分器每个进程加载一次
+    split_sentences("Warm up.")
+
+
+def _mp_context():
+    """会话中已有 GROBID 客户端池、预取等线程，不直接 fork 当前进程；Linux/macOS 由 forkserver 预先导入本模块"""
+    if sys.platform == "win32":
+        return multiprocessing.get_context("spawn")
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload([__name__])
+    return context
+
+
+class CpuStage:
+    def __init__(self, workers=CPU_WORKERS):
+        """
+        :param workers: 进程数，0 为 CPU 核数，1 为在调用线程中执行
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = ProcessPoolExecutor(self.workers, mp_context=_mp_context(), initializer=_init_worker) \
+            if self.workers > 1 else None
+        self._lock = threading.Lock()
+        self.stats = {task: {"docs": 0, "seconds": 0.0} for task in TASKS}
+
+    def _call(self, task, tei_path):
+        if self.executor is None:
+            elapsed, result = _run(task, tei_path)
+        else:
+            elapsed, result = self.executor.submit(_run, task, tei_path).result()
+        with self._lock:
+            self.stats[task]["docs"] += 1
+            self.stats[task]["seconds"] += elapsed
+        return result
+
+    def references(self, tei_path):
+        """解析 TEI 文件中的参考文献列表（与 GrobidParser.parse_references 的结果相同）"""
+        return [dict(zip(REFERENCE_FIELDS, row)) for row in self._call("references", tei_path)]
+
+    def contexts(self, tei_path):
+        """建立句子级引用索引（带句子切分的TEI），结果可交给 CitationContextExtractor.install"""
+        return self._call("contexts", tei_path)
+
+    def chunks(self, tei_path):
+        """用 AcademicPaperSplitter 切分 TEI 全文，返回 Document 列表（可作为 EvidenceRetriever.paper_index 的 split）"""
+        return AcademicPaperSplitter.documents_from_records(self._call("chunks", tei_path))
+
+    def summary(self):
+        with self._lock:
+            stats = {task: dict(s) for task, s in self.stats.items()}
+        parts = [f"{TASK_NAMES[task]} {s['docs']} 篇 {s['seconds']:.1f}s" for task, s in stats.items() if s["docs"]]
+        mode = f"{self.workers} 个进程" if self.workers > 1 else "调用线程内执行"
+        return f"CPU 阶段（{mode}）：" + ("，".join(parts) if parts else "尚无任务")
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
@@ -0,0 +1,177 @@
+import os
+import re
+import shutil
+import threading
+from collections import OrderedDict
+
+from config.settings import EVIDENCE_INDEX_DIR, EVIDENCE_MAX_TOKENS, EVIDENCE_MODE, EVIDENCE_TOP_K
+from utils.academic_paper_splitter import AcademicPaperSplitter
+from utils.arxiv_id import arxiv_key, key_filename
+from utils.index_factory import META_FILE, CorpusIndex
+from utils.tokens import count_tokens, truncate_tokens
+
+
+def embedding_dimension(embeddings):
+    """嵌入向量维度：优先读取模型属性，取不到时嵌入一条探测文本"""
+    for attr in ("size", "dimensions", "dim"):
+        value = getattr(embeddings, attr, None)
+        if isinstance(value, int) and value > 0:
+            return value
+    return len(embeddings.embed_query("dimension"))
+
+
+def index_namespace(embeddings):
+    """
+    嵌入模型的索引命名空间（嵌入模型类型-模型名-维度）：不同嵌入模型建立的向量索引互不兼容，持久化时按此区分目录
+    """
+    namespace = getattr(embeddings, "index_namespace", None)
+    if namespace is None:
+        model = next((name for name in (getattr(embeddings, attr, None) for attr in ("model_name", "model"))
+                      if isinstance(name, str) and name), "")
+        namespace = "-".join(filter(None, (type(embeddings).__name__, model)))
+    return re.sub(r"[^\w.\-]+", "_", f"{namespace}-{embedding_dimension(embeddings)}")
+
+
+class EvidenceRetriever:
+    """
+    被引文献全文证据检索
+    将被引文献的TEI全文用 AcademicPaperSplitter 切分并建立向量索引（每篇文献只建一次，按 arXiv ID 缓存，
+    不同施引论文共享），对每段引用上下文检索最相似的 top-k 段落，在固定 token 预算内作为证据交给大模型。
+    索引由 utils/index_factory 按段落数选择类型，持久化后以内存映射方式加载，同一节点的 worker 进程共享页缓存。
+    """
+
+    def __init__(self, parser, embeddings, index_dir=None, k=3, max_tokens=768, cache_size=32):
+        """
+        :param parser: GrobidParser 实例
+        :param embeddings: 嵌入模型
+        :param index_dir: 索引持久化根目录（按 index_namespace 分子目录），为 None 时只做内存缓存
+        :param k: 每段上下文检索的段落数
+        :param max_tokens: 证据的 token 预算
+        """
+        self.parser = parser
+        self.embeddings = embeddings
+        self.index_dir = index_dir
+        self.k = k
+        self.max_tokens = max_tokens
+        self.cache_size = cache_size
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+        self._build_locks = {}
+        self._namespace = None
+        self.stats = {"indexed": 0, "loaded": 0, "cache_hits": 0, "queries": 0, "evidence_tokens": 0}
+
+    def _index_path(self, paper_id):
+        # 命名空间在首次持久化时确定（可能需要一次嵌入调用探测维度）
+        if self._namespace is None:
+            self._namespace = index_namespace(self.embeddings)
+        return os.path.join(self.index_dir, self._namespace, key_filename(arxiv_key(paper_id) or paper_id))
+
+    def _build(self, paper_id, pdf_path, split=None):
+        """解析全文并建立向量索引（CorpusIndex），全文为空时返回 None"""
+        if self.index_dir:
+            path = self._index_path(paper_id)
+            if os.path.exists(os.path.join(path, META_FILE)):
+                self._count("loaded")
+                return CorpusIndex.load(path, self.embeddings, mmap=True)
+            if os.path.isdir(path):
+                # 旧版 langchain FAISS 格式的索引，重新构建
+                shutil.rmtree(path, ignore_errors=True)
+
+        # 全文TEI落盘后流式切分，长篇文献不会在内存中保留多份完整TEI
+        tei_path = self.parser.grobid_extract_tei_file(doc_path=pdf_path)
+        if not tei_path:
+            return None
+        docs = split(tei_path) if split is not None else AcademicPaperSplitter.from_file(tei_path).split_document()
+        if not docs:
+            return None
+        corpus = CorpusIndex.build(docs, self.embeddings)
+        self._count("indexed")
+        if self.index_dir:
+            # 先写临时目录再替换，避免并发进程读到写了一半的索引
+            path = self._index_path(paper_id)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            corpus.save(tmp_path)
+            try:
+                os.replace(tmp_path, path)
+            except OSError:
+                # 其他进程已写入同一索引：删除本进程的临时目录，使用先写入的索引
+                shutil.rmtree(tmp_path, ignore_errors=True)
+                if not os.path.exists(os.path.join(path, META_FILE)):
+                    return corpus
+            # 以内存映射方式加载，与其他 worker 进程共享同一份页缓存
+            return CorpusIndex.load(path, self.embeddings, mmap=True)
+        return corpus
+
+    def _count(self, name):
+        """paper_index 由会话线程池并发调用，统计在锁内更新"""
+        with self._lock:
+            self.stats[name] += 1
+
+    def paper_index(self, paper_id, pdf_path, split=None):
+        """
+        获取被引文献的向量索引（带缓存）
+        :param split: 可选，TEI 文件路径 → Document 列表的切分函数（如 CpuStage.chunks，在进程池中切分），默认在当前线程切分
+        """
+        # 按 arXiv 规范键缓存，不同论文中同一文献的不同写法（版本号、URL 等）共用一个索引
+        paper_id = arxiv_key(paper_id) or paper_id
+        with self._lock:
+            if paper_id in self._indexes:
+                self._indexes.move_to_end(paper_id)
+                self.stats["cache_hits"] += 1
+                return self._indexes[paper_id]
+            build_lock = self._build_locks.setdefault(paper_id, threading.Lock())
+
+        # 同一文献只由一个线程构建
+        with build_lock:
+            with self._lock:
+                if paper_id in self._indexes:
+                    return self._indexes[paper_id]
+            corpus = self._build(paper_id, pdf_path, split)
+            with self._lock:
+                # 构建失败（GROBID 暂时不可用等）不缓存，下次检索重新尝试
+                if corpus is not None:
+                    self._indexes[paper_id] = corpus
+                    while len(self._indexes) > self.cache_size:
+                        self._indexes.popitem(last=False)
+                self._build_locks.pop(paper_id, None)
+        return corpus
+
+    def pack(self, passages):
+        """按相似度顺序在 token 预算内装入段落，首段超出预算时截断"""
+        evidence, used = [], 0
+        for text in passages:
+            cost = count_tokens(text)
+            if used + cost > self.max_tokens:
+                if not evidence:
+                    evidence.append(truncate_tokens(text, self.max_tokens))
+                    used = self.max_tokens
+                break
+            evidence.append(text)
+            used += cost
+        return evidence, used
+
+    def retrieve(self, paper_id, pdf_path, context):
+        """
+        检索与引用上下文最相关的被引文献段落
+        :param paper_id: 被引文献 arXiv ID
+        :param pdf_path: 被引文献 PDF 路径
+        :param context: 施引论文中的引用上下文
+        :return: 证据段落列表（总 token 数不超过预算）
+        """
+        corpus = self.paper_index(paper_id, pdf_path)
+        if corpus is None:
+            return []
+        hits = corpus.search([context], k=self.k)[0]
+        evidence, used = self.pack([chunk["text"] for chunk, _ in hits])
+        with self._lock:
+            self.stats["queries"] += 1
+            self.stats["evidence_tokens"] += used
+        return evidence
+
+
+def create_evidence_retriever(parser, embeddings):
+    """按配置创建证据检索器，EVIDENCE_MODE=abstract 时返回 None（仅用摘要验证）"""
+    if EVIDENCE_MODE != "fulltext":
+        return None
+    return EvidenceRetriever(parser, embeddings, index_dir=EVIDENCE_INDEX_DIR,
+                             k=EVIDENCE_TOP_K, max_tokens=EVIDENCE_MAX_TOKENS)
@@ -0,0 +1,315 @@
+import math
+import re
+from collections import Counter, defaultdict
+
+import numpy as np
+from langchain_core.documents import Document
+
+from parsers.tei_stream import bibr_targets, iter_body_units
+
+# [3] / [1, 4] / [2-5] / [2–5]
+NUMERIC_MARKER_RE = re.compile(r'\[(\d+(?:\s*[-–,;]\s*\d+)*)\]')
+# Smith et al., 2020 / Smith and Doe (2019) / Smith & Doe 2019a / Smith (2020) / Smith, 2020 / (Smith 2020; Doe 2019)
+# 单个姓氏须带括号或逗号分隔的年份，或位于括号引用内，避免“In 2020”之类的普通短语被当作引用标记
+AUTHOR_YEAR_RE = re.compile(
+    r"(\(|;\s*)?\b([A-Z][A-Za-z'\-]+)"
+    r"(?:\s+et\s+al\.?,?\s*\(?|\s+(?:and|&)\s+[A-Z][A-Za-z'\-]+,?\s*\(?|\s*\(|,\s*|(?(1)\s+|(?!)))"
+    r"((?:19|20)\d{2})[a-z]?\b")
+# 句首常见词、月份与会议名不是作者姓氏
+AUTHOR_YEAR_STOPWORDS = {
+    "in", "since", "by", "from", "after", "before", "during", "until", "as", "the", "of", "on", "at", "for",
+    "between", "through", "to", "up", "around", "circa", "early", "late", "mid", "also", "and", "then",
+    "spring", "summer", "autumn", "fall", "winter", "january", "february", "march", "april", "may", "june", "july",
+    "august", "september", "october", "november", "december", "figure", "fig", "table", "section", "version",
+    "year", "cvpr", "iccv", "eccv", "neurips", "nips", "icml", "iclr", "acl", "emnlp", "naacl", "coling", "aaai",
+    "ijcai", "kdd", "sigir", "www", "arxiv"}
+WORD_RE = re.compile(r'[一-鿿]|\w+')
+
+
+def numeric_markers(text):
+    """解析正文中的数字引用标记，区间展开为单个编号"""
+    numbers = set()
+    for match in NUMERIC_MARKER_RE.finditer(text):
+        for part in re.split(r'\s*[,;]\s*', match.group(1)):
+            bounds = re.split(r'\s*[-–]\s*', part)
+            if len(bounds) == 2 and bounds[0].isdigit() and bounds[1].isdigit():
+                lo, hi = int(bounds[0]), int(bounds[1])
+                if 0 < hi - lo <= 50:
+                    numbers.update(range(lo, hi + 1))
+                    continue
+            numbers.update(int(b) for b in bounds if b.isdigit())
+    return numbers
+
+
+def author_year_markers(text):
+    """解析正文中的 作者-年份 引用标记，返回 {(姓氏小写, 年份)}"""
+    return {(m.group(2).lower(), m.group(3)) for m in AUTHOR_YEAR_RE.finditer(text)
+            if m.group(2).lower() not in AUTHOR_YEAR_STOPWORDS}
+
+
+def chunks_from_tei(source):
+    """
+    将TEI正文与附录按段落切分为检索块，保留每段中引用的TEI目标（#bN）；以 iterparse 流式读取，不在内存中保留完整TEI
+    :param source: TEI 文件路径或二进制文件对象
+    :return: Document 列表，metadata 含 chunk_id / section / ref_targets
+    """
+    docs = []
+    section = ''
+    for unit in iter_body_units(source):
+        if unit[0] == "head":
+            section = unit[1]
+        elif unit[0] == "p":
+            text = ''.join(unit[1].itertext()).strip()
+            if not text:
+                continue
+            docs.append(Document(page_content=text, metadata={
+                "chunk_id": len(docs), "section": section, "ref_targets": bibr_targets(unit[1])}))
+    return docs
+
+
+class CitationMarkerIndex:
+    """引用标记倒排索引：TEI 目标 / 数字编号 / 作者-年份 → 检索块ID"""
+
+    def __init__(self, docs):
+        self.postings = defaultdict(list)
+        for doc in docs:
+            chunk_id = doc.metadata["chunk_id"]
+            keys = {("tei", t) for t in doc.metadata.get("ref_targets", [])}
+            keys |= {("num", n) for n in numeric_markers(doc.page_content)}
+            keys |= {("ay",) + m for m in author_year_markers(doc.page_content)}
+            for key in keys:
+                self.postings[key].append(chunk_id)
+
+    @staticmethod
+    def reference_keys(ref_entry):
+        """由参考文献条目生成可能出现在正文中的引用标记"""
+        keys = []
+        ref_id = ref_entry.get("ref_id") or ""
+        if ref_id:
+            keys.append(("tei", ref_id))
+            digits = re.search(r'\d+', ref_id)
+            if digits:
+                # GROBID 的 b0 对应正文中的 [1]
+                keys.append(("num", int(digits.group()) + 1))
+        authors = ref_entry.get("authors") or []
+        year = re.search(r'(?:19|20)\d{2}', str(ref_entry.get("year") or ""))
+        if authors and year:
+            surname = str(authors[0]).split()[-1].lower() if str(authors[0]).split() else ""
+            if surname:
+                keys.append(("ay", surname, year.group()))
+        return keys
+
+    def lookup(self, ref_entry):
+        """返回命中的检索块ID（按正文顺序），TEI 目标命中时不再使用数字编号，避免编号体系不一致导致误命中"""
+        keys = self.reference_keys(ref_entry)
+        tei_hits = [c for k in keys if k[0] == "tei" for c in self.postings.get(k, [])]
+        if tei_hits:
+            return sorted(set(tei_hits))
+        hits = set()
+        for key in keys:
+            hits.update(self.postings.get(key, []))
+        return sorted(hits)
+
+
+class BM25Index:
+    """轻量 BM25 关键词检索"""
+
+    def __init__(self, docs, k1=1.5, b=0.75):
+        self.k1, self.b = k1, b
+        self.doc_ids = [doc.metadata["chunk_id"] for doc in docs]
+        self.term_freqs = [Counter(self.tokenize(doc.page_content)) for doc in docs]
+        self.doc_lens = [sum(tf.values()) for tf in self.term_freqs]
+        self.avg_len = (sum(self.doc_lens) / len(self.doc_lens)) if self.doc_lens else 0.0
+        df = Counter(term for tf in self.term_freqs for term in tf)
+        n = len(docs)
+        self.idf = {t: math.log(1 + (n - f + 0.5) / (f + 0.5)) for t, f in df.items()}
+
+    @staticmethod
+    def tokenize(text):
+        return [w.lower() for w in WORD_RE.findall(text)]
+
+    def search(self, query, k=10):
+        """返回 [(chunk_id, score)]，按分数降序"""
+        terms = [t for t in self.tokenize(query) if t in self.idf]
+        scores = []
+        for i, tf in enumerate(self.term_freqs):
+            score = 0.0
+            norm = self.k1 * (1 - self.b + self.b * self.doc_lens[i] / (self.avg_len or 1))
+            for t in terms:
+                f = tf.get(t)
+                if f:
+                    score += self.idf[t] * f * (self.k1 + 1) / (f + norm)
+            if score > 0:
+                scores.append((self.doc_ids[i], score))
+        scores.sort(key=lambda x: -x[1])
+        return scores[:k]
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """RRF 融合多路排序结果，返回按融合分数降序的ID列表"""
+    fused = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            fused[doc_id] += 1.0 / (k + rank + 1)
+    return [doc_id for doc_id, _ in sorted(fused.items(), key=lambda x: (-x[1], x[0]))]
+
+
+# embed_query 与 embed_documents([text])[0] 相同的嵌入模型，可直接用 embed_documents 批量嵌入查询
+SYMMETRIC_EMBEDDINGS = {"OpenAIEmbeddings", "QianfanEmbeddingsEndpoint", "DeterministicFakeEmbedding",
+                        "FakeEmbeddings", "LocalOnnxEmbeddings"}
+
+
+def embed_query_texts(embedding, queries):
+    """
+    批量嵌入查询文本，结果与逐条 embed_query 一致
+    （DashScope 等区分查询与文档的模型不能用 embed_documents 代替，否则检索到的近邻不同）
+    """
+    queries = list(queries)
+    name = type(embedding).__name__
+    if name in SYMMETRIC_EMBEDDINGS:
+        return embedding.embed_documents(queries)
+    if name == "DashScopeEmbeddings":
+        # 与 embed_query 相同的 text_type="query"，一次请求（按服务端上限分批）嵌入全部查询
+        from langchain_community.embeddings.dashscope import embed_with_retry
+        return [item["embedding"] for item in embed_with_retry(
+            embedding, input=queries, text_type="query", model=embedding.model)]
+    if hasattr(embedding, "embed_query"):
+        return [embedding.embed_query(q) for q in queries]
+    return [embedding(q) for q in queries]
+
+
+def embed_queries(vector_db, queries):
+    """一次批量嵌入全部查询，返回 float32 矩阵（按向量库配置做 L2 归一化）"""
+    vectors = embed_query_texts(vector_db.embedding_function, queries)
+    matrix = np.asarray(vectors, dtype=np.float32)
+    if getattr(vector_db, "_normalize_L2", False):
+        import faiss
+        faiss.normalize_L2(matrix)
+    return matrix
+
+
+def batch_similarity_search(vector_db, queries, k=5):
+    """
+    批量相似度检索：一次嵌入请求 + 一次 index.search(Q, k)
+    :param vector_db: langchain FAISS 向量库
+    :param queries: 查询列表
+    :return: 与 queries 对齐的 [[(Document, 距离)]]
+    """
+    if not queries:
+        return []
+    matrix = embed_queries(vector_db, queries)
+    distances, indices = vector_db.index.search(matrix, k)
+    results = []
+    for row_dist, row_idx in zip(distances, indices):
+        hits = []
+        for dist, idx in zip(row_dist, row_idx):
+            if idx == -1:
+                continue
+            doc = vector_db.docstore.search(vector_db.index_to_docstore_id[idx])
+            hits.append((doc, float(dist)))
+        results.append(hits)
+    return results
+
+
+# 自适应截断的基准距离下限（L2 平方距离）：最近片段与查询几乎重合（距离为 0，如上下文原样出现在正文中）时，
+# 阈值不至于收缩为 0 而只保留最近的片段
+ADAPTIVE_CUT_MIN_DISTANCE = 0.05
+
+
+def adaptive_cut(hits, ratio, min_k=1, min_distance=ADAPTIVE_CUT_MIN_DISTANCE):
+    """
+    自适应截断：hits 为按距离升序的 [(Document, 距离)]，距离超过 max(最近片段距离, min_distance) × ratio 的片段丢弃
+    :param ratio: 距离倍数阈值，0 时不截断
+    :param min_k: 至少保留的片段数
+    :param min_distance: 基准距离下限，避免最近距离为 0 时阈值失效
+    :return: 保留的 Document 列表
+    """
+    if not ratio or not hits:
+        return [doc for doc, _ in hits]
+    cutoff = max(hits[0][1], min_distance) * ratio
+    return [doc for i, (doc, dist) in enumerate(hits) if i < min_k or dist <= cutoff]
+
+
+class HybridCitationRetriever:
+    """
+    混合检索：先查引用标记倒排索引（精确命中，无需嵌入调用），
+    无命中时退回 BM25 + FAISS 的 RRF 融合检索
+    """
+
+    def __init__(self, docs, vector_db, k=5, fetch_k=20, score_ratio=0):
+        """
+        :param score_ratio: 兜底检索的自适应截断倍数（见 adaptive_cut），BM25 得分低于最高分 / score_ratio 的片段同样丢弃，
+                            0 为固定返回 k 个融合结果
+        """
+        self.docs = {doc.metadata["chunk_id"]: doc for doc in docs}
+        self.vector_db = vector_db
+        self.k = k
+        self.fetch_k = fetch_k
+        self.score_ratio = score_ratio
+        self.marker_index = CitationMarkerIndex(docs)
+        self.bm25 = BM25Index(docs)
+        # score_dropped：兜底检索中因得分低于阈值而少返回的片段数（相对固定返回 k 个）
+        self.stats = {"marker_hits": 0, "fallbacks": 0, "score_dropped": 0}
+
+    def fallback_query(self, ref_entry):
+        return f"{ref_entry.get('title') or ''} {' '.join(ref_entry.get('authors') or [])}"
+
+    def fuse(self, bm25_hits, vector_hits):
+        """
+        融合 BM25 的 [(chunk_id, 得分)] 与向量检索的 [(Document, 距离)]；
+        启用 score_ratio 时两路先各自按相对阈值截断，融合结果可能少于 k 个
+        """
+        full = min(self.k, len({c for c, _ in bm25_hits} |
+                               {d.metadata["chunk_id"] for d, _ in vector_hits if "chunk_id" in d.metadata}))
+        if self.score_ratio and bm25_hits:
+            cutoff = bm25_hits[0][1] / self.score_ratio
+            bm25_hits = [(c, score) for i, (c, score) in enumerate(bm25_hits) if i == 0 or score >= cutoff]
+        bm25_ids = [c for c, _ in bm25_hits]
+        vector_ids = [d.metadata["chunk_id"] for d in adaptive_cut(vector_hits, self.score_ratio)
+                      if "chunk_id" in d.metadata]
+        fused = reciprocal_rank_fusion([bm25_ids, vector_ids])[:self.k]
+        self.stats["score_dropped"] += full - len(fused)
+        return fused
+
+    def retrieve(self, ref_entry, vector_query=None):
+        """
+        检索引用该参考文献的正文片段
+        :param ref_entry: 参考文献条目
+        :param vector_query: 向量检索使用的查询，默认使用标题与作者
+        :return: Document 列表
+        """
+        hits = self.marker_index.lookup(ref_entry)
+        if hits:
+            self.stats["marker_hits"] += 1
+            return [self.docs[c] for c in hits]
+
+        self.stats["fallbacks"] += 1
+        query = self.fallback_query(ref_entry)
+        bm25_hits = self.bm25.search(query, self.fetch_k)
+        vector_hits = self.vector_db.similarity_search_with_score(
+            vector_query or query, k=self.fetch_k)
+        return [self.docs[c] for c in self.fuse(bm25_hits, vector_hits)]
+
+    def retrieve_many(self, ref_entries, vector_queries=None):
+        """
+        批量检索：标记命中的直接返回，其余参考文献的向量查询合并为一次批量检索
+        :return: 与 ref_entries 对齐的 Document 列表
+        """
+        vector_queries = vector_queries or [None] * len(ref_entries)
+        results = [None] * len(ref_entries)
+        fallback = []
+        for i, ref_entry in enumerate(ref_entries):
+            hits = self.marker_index.lookup(ref_entry)
+            if hits:
+                self.stats["marker_hits"] += 1
+                results[i] = [self.docs[c] for c in hits]
+            else:
+                self.stats["fallbacks"] += 1
+                fallback.append(i)
+
+        queries = [vector_queries[i] or self.fallback_query(ref_entries[i]) for i in fallback]
+        vector_hits = batch_similarity_search(self.vector_db, queries, k=self.fetch_k)
+        for i, hits in zip(fallback, vector_hits):
+            bm25_hits = self.bm25.search(self.fallback_query(ref_entries[i]), self.fetch_k)
+            results[i] = [self.docs[c] for c in self.fuse(bm25_hits, hits)]
+        return results
@@ -0,0 +1,185 @@
+"""
+FAISS 索引工厂
+按语料规模选择索引类型：
+- flat:  精确检索，适合单篇论文或小语料
+- hnsw:  图索引，召回高、查询快，内存约为原始向量的 1.2~1.5 倍
+- ivfpq: 倒排 + 乘积量化，内存为原始向量的几十分之一，适合全部已下载文献组成的大语料
+大索引以内存映射方式加载，多个 worker 进程共享同一份页缓存。
+
+构建全部已下载文献的语料索引：
+    python -m utils.index_factory --download_dir ./pdf_store --index_dir ./corpus_index
+"""
+import argparse
+import json
+import math
+import os
+
+import faiss
+import numpy as np
+
+from config.settings import INDEX_FLAT_MAX, INDEX_HNSW_MAX
+from utils.hybrid_retriever import embed_query_texts
+
+INDEX_FILE = "index.faiss"
+CHUNKS_FILE = "chunks.jsonl"
+META_FILE = "meta.json"
+
+
+def choose_index_type(n_vectors, flat_max=INDEX_FLAT_MAX, hnsw_max=INDEX_HNSW_MAX):
+    """按向量数量选择索引类型"""
+    if n_vectors <= flat_max:
+        return "flat"
+    if n_vectors <= hnsw_max:
+        return "hnsw"
+    return "ivfpq"
+
+
+def _pq_subquantizers(dim):
+    """乘积量化的子空间数：取能整除维度、不超过 64 且每个子空间至少 8 维的最大值"""
+    for m in (64, 48, 32, 24, 16, 12, 8, 4, 2, 1):
+        if dim % m == 0 and dim // m >= 8:
+            return m
+    return 1
+
+
+def build_index(vectors, index_type=None, hnsw_m=32, ef_search=64, nprobe=16):
+    """
+    构建 FAISS 索引（L2 距离，与 langchain FAISS 默认一致）
+    :param vectors: (n, dim) float32 矩阵
+    :param index_type: flat / hnsw / ivfpq，默认按规模自动选择
+    :return: (索引, 索引类型)
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n, dim = vectors.shape
+    index_type = index_type or choose_index_type(n)
+
+    if index_type == "flat":
+        index = faiss.IndexFlatL2(dim)
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, hnsw_m)
+        index.hnsw.efConstruction = 2 * hnsw_m
+        index.hnsw.efSearch = ef_search
+    elif index_type == "ivfpq":
+        # 每个聚类中心至少需要约 39 个训练样本
+        nlist = max(1, min(int(4 * math.sqrt(n)), n // 39))
+        quantizer = faiss.IndexFlatL2(dim)
+        index = faiss.IndexIVFPQ(quantizer, dim, nlist, _pq_subquantizers(dim), 8 if n >= 256 * 39 else 4)
+        index.train(vectors)
+        index.nprobe = min(nprobe, nlist)
+    else:
+        raise ValueError(f"Unsupported index type: {index_type}")
+
+    index.add(vectors)
+    return index, index_type
+
+
+def load_index(path, mmap=True):
+    """
+    加载索引，mmap=True 时以只读内存映射方式加载，多个进程共享同一份物理内存
+    :return: (索引, 是否内存映射)
+    """
+    if mmap:
+        flag = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+        try:
+            return faiss.read_index(path, flag), True
+        except RuntimeError as e:
+            print(f"[警告] 索引不支持内存映射加载，改为读入内存: {e}")
+    return faiss.read_index(path), False
+
+
+class CorpusIndex:
+    """
+    语料级向量索引：索引文件 + 检索块元数据（JSONL，按向量序号对齐）
+    """
+
+    def __init__(self, index, chunks, index_type, embeddings=None, mmapped=False):
+        self.index = index
+        self.chunks = chunks
+        self.index_type = index_type
+        self.embeddings = embeddings
+        self.mmapped = mmapped
+
+    @classmethod
+    def build(cls, docs, embeddings, index_type=None, batch_size=64):
+        """
+        由 Document 列表构建索引
+        :param docs: langchain Document 列表
+        :param embeddings: 嵌入模型
+        """
+        texts = [doc.page_content for doc in docs]
+        vectors = []
+        for i in range(0, len(texts), batch_size):
+            vectors.extend(embeddings.embed_documents(texts[i:i + batch_size]))
+        index, index_type = build_index(np.asarray(vectors, dtype=np.float32), index_type)
+        chunks = [{"text": doc.page_content, "metadata": doc.metadata} for doc in docs]
+        return cls(index, chunks, index_type, embeddings)
+
+    def save(self, index_dir):
+        os.makedirs(index_dir, exist_ok=True)
+        faiss.write_index(self.index, os.path.join(index_dir, INDEX_FILE))
+        with open(os.path.join(index_dir, CHUNKS_FILE), "w", encoding="utf-8") as f:
+            for chunk in self.chunks:
+                f.write(json.dumps(chunk, ensure_ascii=False) + "\n")
+        with open(os.path.join(index_dir, META_FILE), "w", encoding="utf-8") as f:
+            json.dump({"index_type": self.index_type, "size": len(self.chunks),
+                       "dim": self.index.d}, f)
+
+    @classmethod
+    def load(cls, index_dir, embeddings=None, mmap=True):
+        index, mmapped = load_index(os.path.join(index_dir, INDEX_FILE), mmap=mmap)
+        with open(os.path.join(index_dir, CHUNKS_FILE), "r", encoding="utf-8") as f:
+            chunks = [json.loads(line) for line in f]
+        with open(os.path.join(index_dir, META_FILE), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        return cls(index, chunks, meta["index_type"], embeddings, mmapped)
+
+    def search_vectors(self, vectors, k=5):
+        """批量检索，返回与查询对齐的 [[(chunk, 距离)]]"""
+        distances, indices = self.index.search(np.ascontiguousarray(vectors, dtype=np.float32), k)
+        return [[(self.chunks[i], float(d)) for d, i in zip(row_d, row_i) if i != -1]
+                for row_d, row_i in zip(distances, indices)]
+
+    def search(self, queries, k=5):
+        """文本查询批量检索（一次嵌入请求）"""
+        if not queries:
+            return []
+        vectors = embed_query_texts(self.embeddings, queries)
+        return self.search_vectors(np.asarray(vectors, dtype=np.float32), k)
+
+
+def collect_corpus_docs(parser, download_dir):
+    """解析PDF共享存储（或普通下载目录）中的全部文献并切分为检索块"""
+    from utils.academic_paper_splitter import AcademicPaperSplitter
+    from utils.pdf_store import get_pdf_store
+
+    papers = [(os.path.splitext(name)[0], os.path.join(download_dir, name))
+              for name in sorted(os.listdir(download_dir)) if name.endswith(".pdf")]
+    if os.path.exists(os.path.join(download_dir, "catalog.json")):
+        papers += get_pdf_store(download_dir).papers()
+    docs = []
+    for paper_id, doc_path in papers:
+        tei_path = parser.grobid_extract_tei_file(doc_path=doc_path)
+        if not tei_path:
+            continue
+        for doc in AcademicPaperSplitter.from_file(tei_path).iter_documents():
+            doc.metadata["paper_id"] = paper_id
+            docs.append(doc)
+    return docs
+
+if __name__ == "__main__":
+    from config.settings import GROBID_URL
+    from parsers.grobid_parser import GrobidParser as gp
+    from verifier.llm_platform import create_llm_platform
+
+    arg_parser = argparse.ArgumentParser(description='构建已下载文献的语料索引')
+    arg_parser.add_argument('--download_dir', type=str, required=True, help='PDF共享存储目录或已下载文献目录')
+    arg_parser.add_argument('--index_dir', type=str, required=True, help='索引输出目录')
+    arg_parser.add_argument('--index_type', type=str, default=None, choices=['flat', 'hnsw', 'ivfpq'],
+                            help='索引类型，默认按语料规模自动选择')
+    args = arg_parser.parse_args()
+
+    _, embeddings = create_llm_platform()
+    corpus_docs = collect_corpus_docs(gp(grobid_url=GROBID_URL), args.download_dir)
+    corpus = CorpusIndex.build(corpus_docs, embeddings, args.index_type)
+    corpus.save(args.index_dir)
+    print(f"✅ 已构建 {corpus.index_type} 索引，共 {len(corpus.chunks)} 个检索块 → {args.index_dir}")
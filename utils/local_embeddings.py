@@ -0,0 +1,115 @@
+"""
+本地 CPU 嵌入模型（ONNX Runtime）
+在本机运行小型句向量模型（如 all-MiniLM-L6-v2、bge-small-zh-v1.5 导出的 ONNX），建库与检索无需访问远程嵌入服务：
+- 按长度排序后分批推理，减少补齐；ONNX Runtime 算子内多线程（intra-op）
+- 可选 int8 动态量化：首次加载时由 fp32 模型生成 model_int8.onnx 并缓存在模型目录
+- 均值池化 + L2 归一化，FAISS 的内积/欧氏距离检索结果与余弦相似度一致
+
+模型目录需包含 model.onnx 与 tokenizer.json，可用以下命令导出：
+    optimum-cli export onnx --model sentence-transformers/all-MiniLM-L6-v2 ./models/all-MiniLM-L6-v2-onnx
+
+手动量化：
+    python -m utils.local_embeddings --model_dir ./models/all-MiniLM-L6-v2-onnx --quantize
+"""
+import argparse
+import os
+import threading
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from config.settings import (LOCAL_EMBEDDING_BATCH, LOCAL_EMBEDDING_INT8, LOCAL_EMBEDDING_MAX_LENGTH,
+                             LOCAL_EMBEDDING_MODEL, LOCAL_EMBEDDING_THREADS)
+
+FP32_MODEL = "model.onnx"
+INT8_MODEL = "model_int8.onnx"
+
+
+def quantize_model(model_dir):
+    """将 model.onnx 动态量化为 int8（权重 int8，激活运行时量化），返回量化模型路径"""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    src = os.path.join(model_dir, FP32_MODEL)
+    dst = os.path.join(model_dir, INT8_MODEL)
+    tmp = f"{dst}.{os.getpid()}.tmp"
+    quantize_dynamic(src, tmp, weight_type=QuantType.QInt8)
+    os.replace(tmp, dst)
+    return dst
+
+
+class LocalOnnxEmbeddings(Embeddings):
+    def __init__(self, model_dir=LOCAL_EMBEDDING_MODEL, int8=LOCAL_EMBEDDING_INT8, threads=LOCAL_EMBEDDING_THREADS,
+                 batch_size=LOCAL_EMBEDDING_BATCH, max_length=LOCAL_EMBEDDING_MAX_LENGTH):
+        """
+        :param model_dir: ONNX 模型目录（model.onnx + tokenizer.json）
+        :param int8: 是否使用 int8 量化模型（不存在时自动生成）
+        :param threads: ONNX Runtime 算子内线程数，0 为使用全部核心
+        :param batch_size: 每批推理的文本数
+        :param max_length: 单段文本的最大 token 数，超出截断
+        """
+        try:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise ImportError("本地嵌入模型需要安装 onnxruntime 与 tokenizers：pip install onnxruntime tokenizers") from e
+        if not os.path.isfile(os.path.join(model_dir, FP32_MODEL)):
+            raise FileNotFoundError(f"找不到本地嵌入模型: {os.path.join(model_dir, FP32_MODEL)}（导出方法见 utils/local_embeddings.py）")
+
+        model_path = os.path.join(model_dir, FP32_MODEL)
+        if int8:
+            model_path = os.path.join(model_dir, INT8_MODEL)
+            if not os.path.isfile(model_path):
+                print(f"[警告] 未找到 int8 模型，正在量化: {model_dir}")
+                model_path = quantize_model(model_dir)
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding()
+        # tokenizers 的 padding/truncation 配置不是线程安全的，编码时加锁（推理本身可并发）
+        self._tokenizer_lock = threading.Lock()
+        self.batch_size = batch_size
+        self.model_path = model_path
+        # 索引命名空间：不同嵌入模型建立的向量索引互不兼容，持久化时按此区分目录
+        self.index_namespace = f"local-{os.path.basename(os.path.normpath(model_dir))}"
+
+    def _embed_batch(self, texts):
+        with self._tokenizer_lock:
+            encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+        hidden = self.session.run(None, feeds)[0]
+        # 均值池化（忽略补齐位置）后 L2 归一化
+        mask = attention_mask[..., None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+    def embed_documents(self, texts):
+        if not texts:
+            return []
+        # 按长度排序后分批，同一批内补齐长度相近
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors = [None] * len(texts)
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            for i, vector in zip(batch, self._embed_batch([texts[i] for i in batch])):
+                vectors[i] = vector.tolist()
+        return vectors
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='本地 ONNX 嵌入模型工具')
+    parser.add_argument('--model_dir', type=str, default=LOCAL_EMBEDDING_MODEL, help='ONNX 模型目录')
+    parser.add_argument('--quantize', action='store_true', help='生成 int8 量化模型')
+    args = parser.parse_args()
+    if args.quantize:
+        print(f"[成功] 已生成 int8 模型: {quantize_model(args.model_dir)}")
@@ -0,0 +1,287 @@
+"""
+按内容寻址的 PDF 共享存储
+    <root>/blobs/ab/<sha256>.pdf   文件内容（同一内容只存一份）
+    <root>/catalog.json            标识 → 内容哈希 的映射，以及每份内容的大小、最近访问时间与租约（计数、取得时间）
+    <root>/locks/                  目录锁与按标识的下载锁（filelock，跨进程）
+不同任务、不同进程按 arXiv 规范键解析 PDF，已存在时直接复用；同一标识同时只会有一个进程在下载。
+使用中的文件以租约（按 主机:进程 计数，记录取得时间）保护，超出磁盘配额时按最近访问时间淘汰没有租约的内容；
+本机已退出进程的租约回收时清除，其他主机的租约超过有效期后清除。
+
+运行：
+    python -m utils.pdf_store --stats
+    python -m utils.pdf_store --gc --quota_mb 1024
+"""
+import hashlib
+import json
+import os
+import shutil
+import socket
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from filelock import FileLock
+
+from config.settings import PDF_STORE_DIR, PDF_STORE_LEASE_TTL_HOURS, PDF_STORE_QUOTA_MB
+from utils.arxiv_id import key_filename
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class PdfStore:
+    def __init__(self, root=PDF_STORE_DIR, quota_mb=PDF_STORE_QUOTA_MB, lock_timeout=120,
+                 lease_ttl_hours=PDF_STORE_LEASE_TTL_HOURS):
+        """
+        :param root: 存储目录，可由多个进程共享
+        :param quota_mb: 磁盘配额（MB），入库后超出配额时自动回收；0 为不限
+        :param lock_timeout: 等待目录锁/下载锁的超时（秒）
+        :param lease_ttl_hours: 租约有效期（小时），超过后回收时清除；0 为不过期
+        """
+        self.root = root
+        self.quota_bytes = int(quota_mb * 2 ** 20)
+        self.lease_ttl = lease_ttl_hours * 3600
+        self.lock_timeout = lock_timeout
+        for sub in ("blobs", "locks", "tmp"):
+            os.makedirs(os.path.join(root, sub), exist_ok=True)
+        self._catalog_path = os.path.join(root, "catalog.json")
+        self._lock = FileLock(os.path.join(root, "locks", "catalog.lock"), timeout=lock_timeout)
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+
+    def blob_path(self, digest):
+        return os.path.join(self.root, "blobs", digest[:2], f"{digest}.pdf")
+
+    def _load(self):
+        try:
+            with open(self._catalog_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"ids": {}, "blobs": {}}
+
+    def _save(self, catalog):
+        tmp_path = f"{self._catalog_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(catalog, f, ensure_ascii=False)
+        os.replace(tmp_path, self._catalog_path)
+
+    @contextmanager
+    def _catalog(self):
+        """持有目录锁读改写目录"""
+        with self._lock:
+            catalog = self._load()
+            yield catalog
+            self._save(catalog)
+
+    def _resolve(self, catalog, key):
+        """目录中标识对应的内容哈希；文件已丢失时清除记录"""
+        digest = catalog["ids"].get(key)
+        if digest is None:
+            return None
+        if digest not in catalog["blobs"] or not os.path.exists(self.blob_path(digest)):
+            catalog["ids"].pop(key, None)
+            catalog["blobs"].pop(digest, None)
+            return None
+        catalog["blobs"][digest]["last_access"] = time.time()
+        return digest
+
+    def _acquire(self, entry):
+        """为本进程增加一个租约并刷新取得时间"""
+        leases = entry.setdefault("leases", {})
+        held = leases.get(self.owner)
+        count = held["count"] if isinstance(held, dict) else held or 0
+        leases[self.owner] = {"count": count + 1, "time": time.time()}
+
+    def lookup(self, key, lease=False):
+        """
+        :param lease: 是否同时取得租约（使用完毕后调用 release）
+        :return: 标识对应的文件路径，不存在时返回 None
+        """
+        with self._catalog() as catalog:
+            digest = self._resolve(catalog, key)
+            if digest is None:
+                return None
+            if lease:
+                self._acquire(catalog["blobs"][digest])
+        return self.blob_path(digest)
+
+    def put(self, key, src_path, lease=False):
+        """
+        将文件入库（移动 src_path）并建立 标识 → 内容 映射，内容已存在时只增加映射
+        :return: 库内文件路径
+        """
+        h = hashlib.sha256()
+        with open(src_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        digest = h.hexdigest()
+        blob = self.blob_path(digest)
+        size = os.path.getsize(src_path)
+        with self._catalog() as catalog:
+            if os.path.exists(blob):
+                os.remove(src_path)
+            else:
+                os.makedirs(os.path.dirname(blob), exist_ok=True)
+                # 临时目录与存储在同一文件系统时为原子重命名
+                shutil.move(src_path, blob)
+            entry = catalog["blobs"].setdefault(digest, {"size": size, "leases": {}})
+            entry["last_access"] = time.time()
+            if lease:
+                self._acquire(entry)
+            catalog["ids"][key] = digest
+            total = sum(b["size"] for b in catalog["blobs"].values())
+        if self.quota_bytes and total > self.quota_bytes:
+            # 刚入库的文件不回收：不持有租约的调用方（预取、批量准备）随后才会打开它
+            self.gc(keep=(digest,))
+        return blob
+
+    def fetch(self, key, download, lease=False):
+        """
+        取得标识对应的PDF，不存在时调用 download(临时文件路径) 下载后入库；同一标识跨进程只下载一次
+        :param download: 下载函数，成功时返回真值
+        :return: 库内文件路径
+        """
+        path = self.lookup(key, lease=lease)
+        if path:
+            return path
+        with FileLock(os.path.join(self.root, "locks", f"{key_filename(key)}.lock"), timeout=self.lock_timeout):
+            # 等待期间其他进程可能已完成下载
+            path = self.lookup(key, lease=lease)
+            if path:
+                return path
+            tmp_path = os.path.join(self.root, "tmp", f"{uuid.uuid4().hex}.pdf")
+            try:
+                if not download(tmp_path) or not os.path.exists(tmp_path):
+                    raise RuntimeError(f"下载失败: {key}")
+                return self.put(key, tmp_path, lease=lease)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+    def release(self, key):
+        """释放本进程对标识对应内容的一个租约"""
+        with self._catalog() as catalog:
+            digest = catalog["ids"].get(key)
+            entry = catalog["blobs"].get(digest) if digest else None
+            if not entry:
+                return
+            leases = entry.setdefault("leases", {})
+            held = leases.get(self.owner)
+            count = held["count"] if isinstance(held, dict) else held or 0
+            if count <= 1:
+                leases.pop(self.owner, None)
+            else:
+                leases[self.owner] = dict(held, count=count - 1) if isinstance(held, dict) else count - 1
+
+    @contextmanager
+    def lease(self, key, download=None):
+        """在上下文内持有租约，期间文件不会被回收"""
+        path = self.fetch(key, download, lease=True) if download else self.lookup(key, lease=True)
+        if path is None:
+            raise KeyError(key)
+        try:
+            yield path
+        finally:
+            self.release(key)
+
+    def _prune_leases(self, entry):
+        """清除本机已退出进程遗留的租约，以及超过有效期的租约（其他主机上的进程无法检查存活）"""
+        host = socket.gethostname()
+        now = time.time()
+        leases = entry.setdefault("leases", {})
+        for owner, held in list(leases.items()):
+            owner_host, _, pid = owner.rpartition(":")
+            # 旧格式的租约（只有计数）没有取得时间，按已过期处理
+            acquired = held.get("time", 0) if isinstance(held, dict) else 0
+            if owner_host == host and pid.isdigit() and not _pid_alive(int(pid)):
+                leases.pop(owner)
+            elif self.lease_ttl and now - acquired > self.lease_ttl:
+                leases.pop(owner)
+        return leases
+
+    def gc(self, quota_bytes=None, keep=()):
+        """
+        按最近访问时间回收没有租约的内容，直到总大小不超过配额
+        :param keep: 本次不回收的内容哈希（如刚入库的文件）
+        :return: (回收的文件数, 回收的字节数)
+        """
+        quota = self.quota_bytes if quota_bytes is None else quota_bytes
+        removed, freed = 0, 0
+        with self._catalog() as catalog:
+            blobs = catalog["blobs"]
+            total = sum(b["size"] for b in blobs.values())
+            for digest, entry in sorted(blobs.items(), key=lambda item: item[1].get("last_access", 0)):
+                if total <= quota:
+                    break
+                if self._prune_leases(entry) or digest in keep:
+                    continue
+                try:
+                    os.remove(self.blob_path(digest))
+                except FileNotFoundError:
+                    pass
+                del blobs[digest]
+                total -= entry["size"]
+                removed += 1
+                freed += entry["size"]
+            catalog["ids"] = {key: digest for key, digest in catalog["ids"].items() if digest in blobs}
+        if removed:
+            print(f"[信息] PDF 存储回收 {removed} 个文件，释放 {freed / 2 ** 20:.1f}MB")
+        return removed, freed
+
+    def stats(self):
+        with self._lock:
+            catalog = self._load()
+        blobs = catalog["blobs"].values()
+        return {"ids": len(catalog["ids"]), "blobs": len(catalog["blobs"]),
+                "bytes": sum(b["size"] for b in blobs),
+                "leased": sum(1 for b in blobs if b.get("leases")), "quota_bytes": self.quota_bytes}
+
+    def papers(self):
+        """
+        库内全部文献，内容相同的多个标识只取第一个
+        :return: [(标识, 文件路径)]
+        """
+        with self._lock:
+            catalog = self._load()
+        seen, papers = set(), []
+        for key, digest in sorted(catalog["ids"].items()):
+            if digest not in seen and digest in catalog["blobs"]:
+                seen.add(digest)
+                papers.append((key, self.blob_path(digest)))
+        return papers
+
+
+_STORES = {}
+_STORES_LOCK = threading.Lock()
+
+
+def get_pdf_store(root=None):
+    """按目录共享 PdfStore 实例，root 为空时使用配置 PDF_STORE_DIR"""
+    root = os.path.abspath(root or PDF_STORE_DIR)
+    with _STORES_LOCK:
+        if root not in _STORES:
+            _STORES[root] = PdfStore(root)
+        return _STORES[root]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    arg_parser = argparse.ArgumentParser(description='PDF 共享存储维护')
+    arg_parser.add_argument('--root', type=str, default=PDF_STORE_DIR)
+    arg_parser.add_argument('--gc', action='store_true', help='按配额回收')
+    arg_parser.add_argument('--quota_mb', type=float, default=PDF_STORE_QUOTA_MB)
+    arg_parser.add_argument('--stats', action='store_true')
+    args = arg_parser.parse_args()
+
+    store = PdfStore(args.root, quota_mb=args.quota_mb)
+    if args.gc:
+        store.gc()
+    print(store.stats())
@@ -0,0 +1,38 @@
+import re
+from functools import lru_cache
+
+# 无 tiktoken 时的近似切分：每个中日韩字符、每个单词、每个标点各计一个 token
+_APPROX_TOKEN_RE = re.compile(r'[぀-ヿ㐀-鿿豈-﫿]|\w+|[^\w\s]')
+
+
+@lru_cache(maxsize=1)
+def _encoder():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+
+def count_tokens(text):
+    """估算文本 token 数（优先使用 tiktoken，不可用时按字词近似）"""
+    if not text:
+        return 0
+    encoder = _encoder()
+    if encoder is not None:
+        return len(encoder.encode(text, disallowed_special=()))
+    return len(_APPROX_TOKEN_RE.findall(text))
+
+
+def truncate_tokens(text, max_tokens):
+    """截断文本到不超过 max_tokens 个 token"""
+    if max_tokens <= 0:
+        return ""
+    encoder = _encoder()
+    if encoder is not None:
+        ids = encoder.encode(text, disallowed_special=())
+        return text if len(ids) <= max_tokens else encoder.decode(ids[:max_tokens])
+    matches = list(_APPROX_TOKEN_RE.finditer(text))
+    if len(matches) <= max_tokens:
+        return text
+    return text[:matches[max_tokens - 1].end()]
@@ -0,0 +1,354 @@
+"""
+判定仓库：跨运行的引用判定列式存储（Parquet，按运行日期 hive 分区）
+    <root>/run_date=2026-10-19/part-<run_id>-<序号>.parquet
+验证器每次运行把逐条判定（运行、施引论文、被引文献、引用上下文、判定、模型、耗时）缓存在内存中，
+运行结束时写成一个 Parquet 文件（先写隐藏临时文件再原子改名，读取方不会看到写了一半的文件）；
+多个进程/任务各自写独立文件，无需加锁。
+查询只读取用到的列并按运行日期裁剪分区，读取的列按文件缓存在内存中（常驻服务中重复查询不再读盘），
+聚合由 Arrow 计算内核完成，百万行量级为毫秒级；长期运行产生大量小文件时可按分区合并（compact，建议在没有写入时执行）。
+目录为标准的 hive 分区 Parquet 数据集，也可直接用 pyarrow.dataset / pandas / DuckDB 读取。
+
+运行：
+    python -m utils.verdict_warehouse --top 不相关
+    python -m utils.verdict_warehouse --counts model --since 2026-10-01
+    python -m utils.verdict_warehouse --latency model,tier
+    python -m utils.verdict_warehouse --compact
+"""
+import argparse
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from config.settings import VERDICT_WAREHOUSE_DIR
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+PARTITION = "run_date"
+# 不缓存的列（文本较长，只在明细查询中读取）
+UNCACHED = {"context"}
+NUM_ROWS = "__num_rows__"
+
+
+def _rename(table, **names):
+    return table.rename_columns([names.get(name, name) for name in table.column_names])
+
+
+def _sorted_rows(table, keys):
+    # 字典编码列不支持 sort_by，分组结果行数很少，直接在 Python 中排序
+    return sorted(table.to_pylist(), key=lambda row: tuple(str(row[k]) for k in keys))
+
+
+def _schema():
+    label = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ("run_id", pa.string()),
+        ("created_at", pa.timestamp("ms")),
+        ("doc_id", pa.string()),
+        ("doc_digest", pa.string()),
+        ("method", label),
+        ("ref_key", pa.string()),
+        ("ref_title", pa.string()),
+        ("context_idx", pa.int32()),
+        ("context", pa.string()),
+        ("verdict", label),
+        ("model", label),
+        ("tier", label),
+        ("llm_ms", pa.float32()),
+        ("evidence_ms", pa.float32()),
+        ("evidence_count", pa.int16()),
+    ])
+
+
+def new_run_id():
+    return uuid.uuid4().hex[:12]
+
+
+class VerdictLog:
+    """单次运行的判定缓冲，flush() 时写入仓库（线程安全）"""
+
+    def __init__(self, warehouse, run_id, doc_id, doc_digest, method):
+        self.warehouse = warehouse
+        self.run_id = run_id
+        self.run_date = datetime.now().strftime("%Y-%m-%d")
+        self.doc = {"run_id": run_id, "doc_id": doc_id, "doc_digest": doc_digest, "method": method}
+        self.rows = []
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def add(self, ref_key, ref_title, context_idx, context, verdict, model, tier="", llm_seconds=0.0,
+            evidence_seconds=0.0, evidence_count=0):
+        """
+        记录一条判定
+        :param verdict: 相关/不相关/不确定（verifier.prompts.parse_verdict）
+        :param tier: 模型级联中采纳判定的层级（fast/heavy），未启用级联时为空
+        """
+        row = dict(self.doc, created_at=datetime.now(), ref_key=ref_key, ref_title=ref_title,
+                   context_idx=context_idx, context=context, verdict=verdict, model=model, tier=tier,
+                   llm_ms=llm_seconds * 1000, evidence_ms=evidence_seconds * 1000, evidence_count=evidence_count)
+        with self._lock:
+            self.rows.append(row)
+
+    def flush(self):
+        """将缓冲的判定写成一个 Parquet 文件，返回写入的行数"""
+        with self._lock:
+            rows, self.rows = self.rows, []
+            self._seq += 1
+            seq = self._seq
+        if not rows:
+            return 0
+        try:
+            self.warehouse.write(rows, self.run_date, f"part-{self.run_id}-{seq:04d}.parquet")
+        except Exception as e:
+            print(f"[警告] 判定写入仓库失败: {e}")
+            return 0
+        return len(rows)
+
+
+class VerdictWarehouse:
+    def __init__(self, root=VERDICT_WAREHOUSE_DIR):
+        if pa is None:
+            raise ImportError("判定仓库需要安装 pyarrow：pip install pyarrow")
+        self.root = root
+        self.schema = _schema()
+        # (文件路径, 修改时间) → {列名: 列数据}
+        self._cache = {}
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def open_run(self, doc_id, doc_digest, method, run_id=None):
+        return VerdictLog(self, run_id or new_run_id(), doc_id, doc_digest, method)
+
+    def write(self, rows, run_date, name):
+        partition = os.path.join(self.root, f"{PARTITION}={run_date}")
+        os.makedirs(partition, exist_ok=True)
+        table = pa.Table.from_pylist(rows, schema=self.schema)
+        # 以 . 开头的临时文件不会被数据集扫描到
+        tmp = os.path.join(partition, f".{name}.{os.getpid()}.tmp")
+        pq.write_table(table, tmp, compression="zstd")
+        os.replace(tmp, os.path.join(partition, name))
+
+    # ---------- 查询 ----------
+
+    def files(self, since=None, until=None):
+        """按运行日期范围（YYYY-MM-DD，含端点）列出分区内的 Parquet 文件，返回 [(路径, 运行日期)]"""
+        files = []
+        for entry in sorted(os.listdir(self.root)):
+            if not entry.startswith(f"{PARTITION}="):
+                continue
+            run_date = entry.split("=", 1)[1]
+            if (since and run_date < since) or (until and run_date > until):
+                continue
+            partition = os.path.join(self.root, entry)
+            files += [(os.path.join(partition, f), run_date) for f in sorted(os.listdir(partition))
+                      if f.endswith(".parquet") and not f.startswith(".")]
+        return files
+
+    def _read(self, path, columns):
+        """读取单个文件的指定列，除引用上下文外的列缓存在内存中（按文件修改时间失效）"""
+        key = (path, os.stat(path).st_mtime_ns)
+        with self._lock:
+            cached = self._cache.setdefault(key, {})
+            missing = [c for c in columns if c not in cached]
+        if missing:
+            table = pq.read_table(path, columns=missing, schema=self.schema)
+            with self._lock:
+                for column in missing:
+                    if column not in UNCACHED:
+                        cached[column] = table[column]
+            loaded = {column: table[column] for column in missing}
+        else:
+            loaded = {}
+        return pa.table({column: loaded[column] if column in loaded else cached[column] for column in columns})
+
+    def scan(self, columns, since=None, until=None, **where):
+        """
+        读取指定列
+        :param since/until: 运行日期范围（YYYY-MM-DD，含端点），按分区裁剪
+        :param where: 等值过滤，如 model="qwen-plus"
+        """
+        where = {k: v for k, v in where.items() if v is not None}
+        needed = list(dict.fromkeys([c for c in columns if c != PARTITION] + list(where)))
+        files = self.files(since, until)
+        with self._lock:
+            # 已被合并或删除的文件不再保留缓存
+            live = {path for path, _ in files}
+            for key in [key for key in self._cache if key[0] not in live]:
+                del self._cache[key]
+        tables = []
+        for path, run_date in files:
+            try:
+                table = self._read(path, needed)
+            except FileNotFoundError:
+                # 查询期间被合并掉的文件，其数据已在合并后的文件中
+                continue
+            if PARTITION in columns:
+                table = table.append_column(PARTITION, pa.array([run_date] * table.num_rows, pa.string()))
+            tables.append(table)
+        if not tables:
+            schema = self.schema.append(pa.field(PARTITION, pa.string()))
+            return pa.table({c: pa.array([], schema.field(c).type) for c in columns})
+        table = pa.concat_tables(tables)
+        mask = None
+        for column, value in where.items():
+            condition = pc.equal(table[column], value)
+            mask = condition if mask is None else pc.and_(mask, condition)
+        if mask is not None:
+            table = table.filter(mask)
+        return table.select(list(columns))
+
+    def count(self, since=None, until=None, **where):
+        if where:
+            return self.scan(list(where), since, until, **where).num_rows
+        # 无过滤时只读取 Parquet 元数据（同样按文件缓存）
+        total = 0
+        for path, _ in self.files(since, until):
+            key = (path, os.stat(path).st_mtime_ns)
+            with self._lock:
+                num_rows = self._cache.get(key, {}).get(NUM_ROWS)
+            if num_rows is None:
+                num_rows = pq.ParquetFile(path).metadata.num_rows
+                with self._lock:
+                    self._cache.setdefault(key, {})[NUM_ROWS] = num_rows
+            total += num_rows
+        return total
+
+    def verdict_counts(self, by=("model",), since=None, until=None, **where):
+        """按 by 分组统计各判定的条数"""
+        keys = list(dict.fromkeys(list(by) + ["verdict"]))
+        table = self.scan(keys, since, until, **where)
+        result = _rename(table.group_by(keys).aggregate([([], "count_all")]), count_all="count")
+        return _sorted_rows(result.select(keys + ["count"]), keys)
+
+    def top_references(self, verdict="不相关", limit=20, min_total=1, since=None, until=None, **where):
+        """
+        被判定为 verdict 次数最多的被引文献
+        :return: [{"ref_key", "ref_title", "hits", "total", "ratio"}]
+        """
+        table = self.scan(["ref_key", "verdict"], since, until, **where)
+        table = pa.table({"ref_key": table["ref_key"], "hit": pc.equal(table["verdict"], verdict)})
+        result = _rename(table.group_by("ref_key").aggregate([("hit", "sum"), ([], "count_all")]),
+                         hit_sum="hits", count_all="total")
+        result = result.filter(pc.and_(pc.greater(result["hits"], 0), pc.greater_equal(result["total"], min_total)))
+        result = result.append_column("ratio", pc.divide(result["hits"].cast(pa.float64()), result["total"]))
+        rows = result.sort_by([("hits", "descending"), ("ratio", "descending")]).slice(0, limit).to_pylist()
+        # 标题只为排行中的文献查找
+        titles = self.titles([row["ref_key"] for row in rows], since, until)
+        return [{"ref_key": row["ref_key"], "ref_title": titles.get(row["ref_key"]), "hits": row["hits"],
+                 "total": row["total"], "ratio": row["ratio"]} for row in rows]
+
+    def titles(self, ref_keys, since=None, until=None):
+        """被引文献的标题（同一文献取任一次记录）"""
+        if not ref_keys:
+            return {}
+        table = self.scan(["ref_key", "ref_title"], since, until)
+        titles = {}
+        for ref_key in ref_keys:
+            # 只查找首次出现的位置，排行靠前的文献出现频繁，通常很快命中
+            position = pc.index(table["ref_key"], ref_key).as_py()
+            titles[ref_key] = table["ref_title"][position].as_py() if position >= 0 else None
+        return titles
+
+    def latency(self, by=("model",), since=None, until=None, **where):
+        """按 by 分组统计大模型调用与证据检索耗时（毫秒）"""
+        keys = list(by)
+        table = self.scan(keys + ["llm_ms", "evidence_ms"], since, until, **where)
+        quantiles = pc.TDigestOptions(q=[0.5, 0.95])
+        result = table.group_by(keys).aggregate([
+            ([], "count_all"), ("llm_ms", "mean"), ("llm_ms", "tdigest", quantiles), ("evidence_ms", "mean")])
+        rows = []
+        for row in _sorted_rows(result, keys):
+            p50, p95 = row.pop("llm_ms_tdigest")
+            rows.append(dict(row, llm_ms_p50=p50, llm_ms_p95=p95))
+        return rows
+
+    def runs(self, limit=20, since=None, until=None):
+        """最近的运行及其判定条数"""
+        table = self.scan(["run_id", "doc_id", "created_at"], since, until)
+        result = table.group_by(["run_id", "doc_id"]).aggregate([([], "count_all"), ("created_at", "min")])
+        return result.sort_by([("created_at_min", "descending")]).slice(0, limit).to_pylist()
+
+    def compact(self, run_date=None):
+        """
+        将分区内的小文件合并为一个（减少查询时打开的文件数）
+        合并文件写入后才删除原文件，期间并发的查询可能重复计数，建议在没有写入时执行
+        :return: 合并的分区数
+        """
+        merged = 0
+        for entry in sorted(os.listdir(self.root)):
+            if not entry.startswith(f"{PARTITION}=") or (run_date and entry != f"{PARTITION}={run_date}"):
+                continue
+            partition = os.path.join(self.root, entry)
+            files = sorted(f for f in os.listdir(partition) if f.endswith(".parquet") and not f.startswith("."))
+            if len(files) <= 1:
+                continue
+            table = pa.concat_tables(pq.read_table(os.path.join(partition, f), schema=self.schema) for f in files)
+            name = f"compact-{int(time.time())}-{new_run_id()}.parquet"
+            tmp = os.path.join(partition, f".{name}.tmp")
+            pq.write_table(table, tmp, compression="zstd", row_group_size=256 * 1024)
+            os.replace(tmp, os.path.join(partition, name))
+            for f in files:
+                os.remove(os.path.join(partition, f))
+            merged += 1
+            print(f"[成功] 已合并 {entry}: {len(files)} 个文件，{table.num_rows} 行")
+        return merged
+
+
+_WAREHOUSES = {}
+_WAREHOUSES_LOCK = threading.Lock()
+
+
+def get_verdict_warehouse(root=VERDICT_WAREHOUSE_DIR):
+    """按目录共享判定仓库；未配置目录或未安装 pyarrow 时返回 None（不记录）"""
+    if not root:
+        return None
+    with _WAREHOUSES_LOCK:
+        if root not in _WAREHOUSES:
+            try:
+                _WAREHOUSES[root] = VerdictWarehouse(root)
+            except ImportError as e:
+                print(f"[警告] {e}，判定不会写入仓库")
+                _WAREHOUSES[root] = None
+        return _WAREHOUSES[root]
+
+
+def _print_rows(rows):
+    if not rows:
+        print("（无数据）")
+    for row in rows:
+        print("  " + "  ".join(f"{k}={round(v, 3) if isinstance(v, float) else v}" for k, v in row.items()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='判定仓库查询与维护')
+    parser.add_argument('--root', type=str, default=VERDICT_WAREHOUSE_DIR or "./verdict_warehouse")
+    parser.add_argument('--since', type=str, default=None, help='起始运行日期 YYYY-MM-DD')
+    parser.add_argument('--until', type=str, default=None, help='截止运行日期 YYYY-MM-DD')
+    parser.add_argument('--top', type=str, default=None, help='被判定为该结果次数最多的被引文献，如 不相关')
+    parser.add_argument('--limit', type=int, default=20)
+    parser.add_argument('--counts', type=str, default=None, help='按列分组统计判定，逗号分隔，如 model,tier')
+    parser.add_argument('--latency', type=str, default=None, help='按列分组统计耗时，逗号分隔')
+    parser.add_argument('--runs', action='store_true', help='最近的运行')
+    parser.add_argument('--compact', action='store_true', help='合并各分区的小文件')
+    args = parser.parse_args()
+
+    warehouse = VerdictWarehouse(args.root)
+    if args.compact:
+        print(f"[成功] 共合并 {warehouse.compact()} 个分区")
+    start = time.perf_counter()
+    if args.top:
+        _print_rows(warehouse.top_references(args.top, args.limit, since=args.since, until=args.until))
+    if args.counts:
+        _print_rows(warehouse.verdict_counts(args.counts.split(","), since=args.since, until=args.until))
+    if args.latency:
+        _print_rows(warehouse.latency(args.latency.split(","), since=args.since, until=args.until))
+    if args.runs:
+        _print_rows(warehouse.runs(args.limit, since=args.since, until=args.until))
+    print(f"共 {warehouse.count(since=args.since, until=args.until)} 条判定，查询耗时 "
+          f"{(time.perf_counter() - start) * 1000:.1f}ms")
@@ -0,0 +1,288 @@
+"""
+批量调度：多篇论文一起验证时，按跨论文的引用关系安排工作，使热门被引文献只准备一次
+1. 打开全部论文并提取参考文献（会话线程池并行），建立 被引文献（arXiv 规范键）→ [(论文, 参考文献条目)] 的引用关系图
+2. 被引文献按被引论文数从多到少排序，每 wave_size 篇为一波：先准备该波的被引文献（解析下载链接并下载入库、
+   GROBID 解析摘要、建立全文证据索引，各只做一次），再验证各论文中引用这些文献的条目，此时 PDF、摘要TEI与证据索引都在缓存中
+3. 每波的大小不超过解析器TEI缓存与证据索引缓存容量的一半，被依赖的验证完成前不会被逐出
+4. 结束时输出去重统计：arXiv 引用条数、不同被引文献数、被多篇论文引用的文献及节省的准备次数
+5. CPU 密集步骤（施引论文的参考文献解析与句子级引用索引、被引文献全文切分）交给进程池（utils/cpu_stage），
+   会话线程只负责 GROBID 请求与下载，TEI 以落盘文件路径交给工作进程
+
+各论文的输出文件、运行日志与判定仓库记录与逐篇验证相同（条目按波次写入输出文件），返回结果按参考文献原始顺序排列。
+
+运行：
+    python -m verifier.batch --doc_dir ./papers --output_dir ./output --verify_type simple
+    python main.py --doc_path a.pdf b.pdf c.pdf --output_dir ./output --verify_type simple
+"""
+import argparse
+import glob
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from config.settings import BATCH_WAVE_SIZE, CPU_WORKERS, CheckType, PDF_STORE_DIR
+from utils.arxiv_id import arxiv_key
+from utils.cpu_stage import CpuStage
+from verifier.session import get_session
+
+
+def cited_key(ref):
+    """参考文献对应的被引文献键（arXiv 规范键），非 arXiv 文献或缺少标识时返回 None"""
+    if not ref.get("doi") or not (ref.get("journal") and ref.get("journal").lower() == "arxiv"):
+        return None
+    return arxiv_key(ref["doi"]) or ref["doi"]
+
+
+class ReferenceGraph:
+    """跨论文的引用关系图：被引文献 → 引用它的 (论文序号, 参考文献条目)（同一论文重复引用时保留每一条）"""
+
+    def __init__(self):
+        self.citations = OrderedDict()
+        self.refs_total = 0
+
+    def add(self, doc_idx, references):
+        for ref in references:
+            self.refs_total += 1
+            key = cited_key(ref)
+            if key is not None:
+                self.citations.setdefault(key, []).append((doc_idx, ref))
+
+    def citing_docs(self, key):
+        return {doc_idx for doc_idx, _ in self.citations[key]}
+
+    def order(self):
+        """被引论文数从多到少（相同时按首次出现顺序）"""
+        return sorted(self.citations, key=lambda key: -len(self.citing_docs(key)))
+
+    def stats(self):
+        in_degree = {key: len(self.citing_docs(key)) for key in self.citations}
+        shared = [key for key, n in in_degree.items() if n > 1]
+        return {
+            "refs": self.refs_total,
+            # 按（论文, 被引文献）去重后的引用数，即逐篇独立处理时需要准备被引文献的次数
+            "citations": sum(in_degree.values()),
+            "unique": len(in_degree),
+            "shared": len(shared),
+            "shared_citations": sum(in_degree[key] for key in shared),
+            "top": sorted(shared, key=lambda key: -in_degree[key])[:5],
+            "in_degree": in_degree,
+        }
+
+
+class BatchScheduler:
+    def __init__(self, session, doc_paths, output_dir, verify_type=CheckType.CHECK_TYPE_SIMPLE.value, resume=True,
+                 retrieval_mode=None, wave_size=BATCH_WAVE_SIZE, cpu_workers=CPU_WORKERS):
+        """
+        :param session: VerifierSession，全部论文共享其客户端、缓存与证据索引
+        :param doc_paths: 论文PDF路径列表
+        :param wave_size: 每波准备的被引文献数，0 为按缓存容量自动确定
+        :param cpu_workers: CPU 阶段的进程数，0 为 CPU 核数，1 为在会话线程中执行
+        """
+        self.session = session
+        self.verify_type = verify_type
+        # 被引文献由调度器统一准备，不再按论文推测式预取
+        self.systems = [session.open(path, output_dir, verify_type, resume=resume, retrieval_mode=retrieval_mode,
+                                     prefetch=False) for path in doc_paths]
+        self.wave_size = wave_size or self._cache_capacity()
+        self.references = None
+        self.graph = None
+        self.waves = []
+        self._lock = threading.Lock()
+        self.stats = {"prepared": 0, "failed": 0, "downloaded": 0, "seconds": 0.0}
+        self.cpu_workers = cpu_workers
+        self._stage = None
+
+    @property
+    def stage(self):
+        """CPU 阶段（首次使用时启动进程池，close 后再次使用时重新启动）"""
+        with self._lock:
+            if self._stage is None:
+                self._stage = CpuStage(self.cpu_workers)
+            return self._stage
+
+    def close(self):
+        """关闭 CPU 阶段的进程池"""
+        if self._stage is not None:
+            self._stage.close()
+
+    def _cache_capacity(self):
+        sizes = [self.session.parser.cache_size]
+        if self.session.evidence_retriever is not None:
+            sizes.append(self.session.evidence_retriever.cache_size)
+        # 解析器缓存同时存放施引论文的TEI，只用一半容量
+        return max(1, min(sizes) // 2)
+
+    def _map(self, fn, items):
+        """有会话线程池时并行执行，否则顺序执行"""
+        if self.session.executor is None:
+            return [fn(item) for item in items]
+        return list(self.session.executor.map(fn, items))
+
+    def extract_references(self, system):
+        """
+        提取施引论文的参考文献：GROBID 结果落盘后交给 CPU 阶段解析；
+        本地提取（REFERENCE_EXTRACTOR=local）或失败时按原方式在当前线程提取
+        """
+        if system.references is None and self.session.parser.reference_extractor == "grobid":
+            try:
+                tei_path = self.session.parser.process_pdf_to_file("references", system.doc_path)
+                system.references = self.stage.references(tei_path)
+            except Exception as e:
+                print(f"[警告] 进程池解析参考文献失败，改为直接提取: {e}")
+        return system.extract_references()
+
+    def prepare_contexts(self, system):
+        """普通模式：在 CPU 阶段建立施引论文的句子级引用索引，验证时直接命中缓存"""
+        extractor = getattr(system, "context_extractor", None)
+        if extractor is None:
+            return
+        tei_path = self.session.parser.grobid_extract_tei_file(doc_path=system.doc_path, segment_sentences=True)
+        if tei_path:
+            extractor.install(system.doc_path, self.stage.contexts(tei_path))
+
+    def plan(self):
+        """提取全部论文的参考文献，建立引用关系图并划分波次"""
+        self.references = self._map(self.extract_references, self.systems)
+        self.graph = ReferenceGraph()
+        for doc_idx, references in enumerate(self.references):
+            self.graph.add(doc_idx, references)
+        order = self.graph.order()
+        self.waves = [order[i:i + self.wave_size] for i in range(0, len(order), self.wave_size)]
+        return self.graph
+
+    def prepare(self, key):
+        """准备被引文献：下载入库、解析摘要、建立证据索引（失败时由各论文的验证循环按原方式重试并报错）"""
+        session = self.session
+        try:
+            stored = session.pdf_store.lookup(key, lease=False)
+            ref_path = stored or session.arxiv_client.fetch_pdf(key, session.pdf_store, lease=False)
+            session.parser.extract_abstract(ref_path)
+            if session.evidence_retriever is not None:
+                session.evidence_retriever.paper_index(key, ref_path, split=self.stage.chunks)
+            with self._lock:
+                self.stats["prepared"] += 1
+                self.stats["downloaded"] += stored is None
+        except Exception as e:
+            with self._lock:
+                self.stats["failed"] += 1
+            print(f"[警告] 准备被引文献 {key} 失败，将在验证时重试: {e}")
+
+    def _verify(self, system, references, callback=None):
+        if self.verify_type == CheckType.CHECK_TYPE_SIMPLE.value:
+            return system.verify_citation(references, callback)
+        return system.verify_citation_by_chain(references, callback)
+
+    def run(self, callback=None):
+        """
+        按波次准备被引文献并验证
+        :return: 每篇论文的验证结果列表（与逐篇 verify_citation / verify_citation_by_chain 的格式相同）
+        """
+        if self.graph is None:
+            self.plan()
+        start = time.perf_counter()
+        for system in self.systems:
+            system.begin_run()
+        try:
+            if self.verify_type == CheckType.CHECK_TYPE_SIMPLE.value:
+                self._map(self.prepare_contexts, self.systems)
+            # 不需要准备被引文献的条目（非 arXiv、缺少标识）先交给各论文，只输出跳过信息
+            for system, references in zip(self.systems, self.references):
+                others = [ref for ref in references if cited_key(ref) is None]
+                if others:
+                    self._verify(system, others, callback)
+            for n, wave in enumerate(self.waves):
+                self._map(self.prepare, wave)
+                by_doc = {}
+                for key in wave:
+                    for doc_idx, ref in self.graph.citations[key]:
+                        by_doc.setdefault(doc_idx, []).append(ref)
+                for doc_idx in sorted(by_doc):
+                    self._verify(self.systems[doc_idx], by_doc[doc_idx], callback)
+                    # 本波的文献已验证完，释放租约，存储可按配额回收
+                    self.systems[doc_idx].release_pdfs()
+                if callback:
+                    callback(f"[批量] 第 {n + 1}/{len(self.waves)} 波完成：{len(wave)} 篇被引文献，{len(by_doc)} 篇论文\n")
+        finally:
+            for system in self.systems:
+                system.finish_run()
+            self.close()
+            self.stats["seconds"] += time.perf_counter() - start
+        return [self.ordered_results(doc_idx) for doc_idx in range(len(self.systems))]
+
+    def ordered_results(self, doc_idx):
+        """按参考文献原始顺序整理该论文的结果（链路模式与逐篇验证一致，重复引用只计一次）"""
+        system = self.systems[doc_idx]
+        results, seen = [], set()
+        for ref in self.references[doc_idx]:
+            ref_key = ref.get("doi")
+            if ref_key not in system.processed_refs:
+                continue
+            if ref_key in seen and self.verify_type != CheckType.CHECK_TYPE_SIMPLE.value:
+                continue
+            seen.add(ref_key)
+            results.extend(system.processed_refs[ref_key])
+        return results
+
+    def summary(self):
+        """引用关系图的去重统计与准备情况"""
+        if self.graph is None:
+            return "批量调度：尚未规划"
+        s = self.graph.stats()
+        saved = s["citations"] - s["unique"]
+        lines = [f"批量调度：{len(self.systems)} 篇论文，{s['refs']} 条参考文献，其中 arXiv 引用 {s['citations']} 条"
+                 f"（按论文去重），涉及 {s['unique']} 篇不同的被引文献"]
+        if s["citations"]:
+            lines.append(f"  被多篇论文引用的文献 {s['shared']} 篇，覆盖 {s['shared_citations']} 条引用；"
+                         f"下载/摘要解析/证据索引各准备 {s['unique']} 次（逐篇独立处理需 {s['citations']} 次），"
+                         f"节省 {saved} 次（{saved / s['citations']:.1%}）")
+        if s["top"]:
+            lines.append("  被引最多: " + "，".join(f"{key}（{s['in_degree'][key]} 篇）" for key in s["top"]))
+        lines.append(f"  共 {len(self.waves)} 波（每波最多 {self.wave_size} 篇），准备成功 {self.stats['prepared']} 篇"
+                     f"（新下载 {self.stats['downloaded']} 篇），失败 {self.stats['failed']} 篇，耗时 {self.stats['seconds']:.1f}s")
+        if self._stage is not None:
+            lines.append(f"  {self._stage.summary()}")
+        retriever = self.session.evidence_retriever
+        if retriever is not None:
+            r = retriever.stats
+            lines.append(f"  证据索引：新建 {r['indexed']} 个，从磁盘加载 {r['loaded']} 个，缓存命中 {r['cache_hits']} 次")
+        return "\n".join(lines)
+
+
+def run_batch(doc_paths, output_dir, verify_type=CheckType.CHECK_TYPE_SIMPLE.value, download_dir=PDF_STORE_DIR,
+              resume=True, retrieval_mode=None, wave_size=BATCH_WAVE_SIZE, cpu_workers=CPU_WORKERS, callback=None):
+    """经由进程内共享的 VerifierSession 批量验证多篇论文，返回 (调度器, 每篇论文的结果)"""
+    scheduler = BatchScheduler(get_session(pdf_store_dir=download_dir), doc_paths, output_dir, verify_type,
+                               resume=resume, retrieval_mode=retrieval_mode, wave_size=wave_size,
+                               cpu_workers=cpu_workers)
+    scheduler.plan()
+    results = scheduler.run(callback)
+    return scheduler, results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='论文引用验证批量调度')
+    parser.add_argument('--doc_dir', type=str, default=None, help='论文目录（其中全部 PDF）')
+    parser.add_argument('--doc_path', type=str, nargs='*', default=[], help='论文路径，可多个')
+    parser.add_argument('--verify_type', type=str, default='simple', help='验证模式：chain/simple')
+    parser.add_argument('--download_dir', type=str, default=PDF_STORE_DIR, help='参考文献PDF共享存储目录')
+    parser.add_argument('--output_dir', type=str, default='./output', help='结果输出目录')
+    parser.add_argument('--wave_size', type=int, default=BATCH_WAVE_SIZE, help='每波准备的被引文献数，0 为自动')
+    parser.add_argument('--cpu_workers', type=int, default=CPU_WORKERS, help='CPU 阶段的进程数，0 为 CPU 核数，1 为不启用进程池')
+    parser.add_argument('--fresh', action='store_true', help='忽略运行日志，从头开始验证')
+    parser.add_argument('--plan', action='store_true', help='只规划并输出去重统计，不验证')
+    args = parser.parse_args()
+
+    paths = list(args.doc_path)
+    if args.doc_dir:
+        paths += sorted(glob.glob(os.path.join(args.doc_dir, "*.pdf")))
+    if not paths:
+        parser.error("请通过 --doc_dir 或 --doc_path 指定论文")
+    batch = BatchScheduler(get_session(pdf_store_dir=args.download_dir), paths, args.output_dir, args.verify_type,
+                           resume=not args.fresh, wave_size=args.wave_size, cpu_workers=args.cpu_workers)
+    batch.plan()
+    if not args.plan:
+        batch_results = batch.run()
+        print(f"✅ 批量验证完成，共 {sum(len(r) for r in batch_results)} 条结果")
+    batch.close()
+    print(batch.summary())
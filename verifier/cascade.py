@@ -0,0 +1,170 @@
+"""
+模型级联：快速模型先判，不确定时再交给复核模型
+1. 快速模型（LLM_FAST_MODEL）输出判定与置信度
+2. 判定为“不确定”、未给出置信度或置信度低于 CASCADE_THRESHOLD 时，升级到复核模型（LLM_MODEL，通常为推理模型）
+3. 按模型层级统计调用次数、耗时、token 数与成本；可选写入判定日志，并按 CASCADE_SHADOW_RATE 抽样对直接采纳的判定做影子复核
+
+离线一致率报告（用于调整阈值）：
+    python -m verifier.cascade --log cascade_log.jsonl
+    python -m verifier.cascade --log cascade_log.jsonl --thresholds 0.5,0.7,0.9
+"""
+import argparse
+import json
+import random
+import threading
+import time
+
+from config.settings import (CASCADE_LOG, CASCADE_SHADOW_RATE, CASCADE_THRESHOLD, LLM_FAST_MODEL,
+                             LLM_FAST_PRICE_PER_1K, LLM_PRICE_PER_1K)
+from utils.tokens import count_tokens
+from verifier.llm_platform import model_label
+from verifier.prompts import CitationChains, build_citation_prompt, citation_inputs, parse_confidence, parse_verdict
+
+TIERS = ("fast", "heavy")
+TIER_NAMES = {"fast": "快速模型", "heavy": "复核模型"}
+
+
+def should_escalate(verdict, confidence, threshold=CASCADE_THRESHOLD):
+    """快速模型判定为“不确定”、未给出置信度或置信度低于阈值时升级复核"""
+    return verdict == "不确定" or confidence is None or confidence < threshold
+
+
+class CascadeVerifier:
+    def __init__(self, fast_llm, heavy_llm, threshold=CASCADE_THRESHOLD, fast_price=LLM_FAST_PRICE_PER_1K,
+                 heavy_price=LLM_PRICE_PER_1K, log_path=CASCADE_LOG, shadow_rate=CASCADE_SHADOW_RATE):
+        """
+        :param threshold: 快速模型判定直接采纳的最低置信度
+        :param fast_price/heavy_price: 各层级每千 token 单价
+        :param log_path: 判定日志（JSONL），为空时不记录
+        :param shadow_rate: 直接采纳的判定中同时交给复核模型的抽样比例（仅用于一致率统计，不改变结果）
+        """
+        self.chains = {"fast": CitationChains(fast_llm), "heavy": CitationChains(heavy_llm)}
+        self.prices = {"fast": fast_price, "heavy": heavy_price}
+        self.models = {"fast": model_label(fast_llm), "heavy": model_label(heavy_llm)}
+        self.threshold = threshold
+        self.log_path = log_path
+        self.shadow_rate = shadow_rate
+        self._rng = random.Random()
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = {tier: {"calls": 0, "seconds": 0.0, "tokens": 0, "cost": 0.0} for tier in TIERS}
+            self.stats.update({"verdicts": 0, "escalated": 0, "shadowed": 0})
+
+    def _invoke(self, tier, inputs, meter=None):
+        with_confidence = tier == "fast"
+        start = time.perf_counter()
+        output_text = self.chains[tier].invoke(inputs, with_confidence=with_confidence, meter=meter)
+        elapsed = time.perf_counter() - start
+        prompt = build_citation_prompt("evidence" in inputs, with_confidence).format(**inputs)
+        tokens = count_tokens(prompt) + count_tokens(output_text)
+        with self._lock:
+            stats = self.stats[tier]
+            stats["calls"] += 1
+            stats["seconds"] += elapsed
+            stats["tokens"] += tokens
+            stats["cost"] += tokens / 1000 * self.prices[tier]
+        return output_text, elapsed
+
+    def verify(self, context, title, authors, abstract, evidence=None, meter=None, info=None):
+        """
+        验证单个引用，返回采纳的模型输出（与 verify_citation_with_llm 一致，第一行为判定）
+        :param meter: 可选，PromptCacheMeter
+        :param info: 可选，dict，写入采纳判定的层级（tier）与模型名称（model）
+        """
+        inputs = citation_inputs(context, title, authors, abstract, evidence)
+        fast_text, fast_seconds = self._invoke("fast", inputs, meter)
+        verdict, confidence = parse_verdict(fast_text), parse_confidence(fast_text)
+        escalated = should_escalate(verdict, confidence, self.threshold)
+        shadowed = not escalated and self.shadow_rate > 0 and self._rng.random() < self.shadow_rate
+        heavy_text, heavy_seconds = None, None
+        if escalated or shadowed:
+            heavy_text, heavy_seconds = self._invoke("heavy", inputs, meter)
+        with self._lock:
+            self.stats["verdicts"] += 1
+            self.stats["escalated"] += escalated
+            self.stats["shadowed"] += shadowed
+        if self.log_path:
+            self._log({
+                "title": title,
+                "fast_verdict": verdict,
+                "confidence": confidence,
+                "escalated": escalated,
+                "heavy_verdict": parse_verdict(heavy_text) if heavy_text is not None else None,
+                "fast_seconds": round(fast_seconds, 4),
+                "heavy_seconds": round(heavy_seconds, 4) if heavy_seconds is not None else None,
+            })
+        if info is not None:
+            tier = "heavy" if escalated else "fast"
+            info.update(tier=tier, model=self.models[tier])
+        return heavy_text if escalated else fast_text
+
+    def _log(self, record):
+        with self._lock:
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def summary(self):
+        """各层级调用次数、耗时、token 与成本统计"""
+        with self._lock:
+            stats = json.loads(json.dumps(self.stats))
+        total = stats["verdicts"]
+        if not total:
+            return "模型级联：尚无判定"
+        lines = [f"模型级联：共 {total} 次判定，快速模型直接采纳 {total - stats['escalated']} 次，"
+                 f"升级复核 {stats['escalated']} 次（{stats['escalated'] / total:.1%}），影子复核 {stats['shadowed']} 次"]
+        for tier in TIERS:
+            s = stats[tier]
+            if s["calls"]:
+                lines.append(f"  {TIER_NAMES[tier]}: {s['calls']} 次，平均 {s['seconds'] / s['calls'] * 1000:.0f}ms，"
+                             f"{s['tokens']} tokens，成本 {s['cost']:.4f}")
+        heavy = stats["heavy"]
+        if heavy["calls"]:
+            # 全部交给复核模型时的估算（按复核模型的单次平均值）
+            lines.append(f"  全部复核估算: 耗时 {heavy['seconds'] / heavy['calls'] * total:.1f}s，"
+                         f"成本 {heavy['cost'] / heavy['calls'] * total:.4f}；级联实际: 耗时 "
+                         f"{stats['fast']['seconds'] + heavy['seconds']:.1f}s，成本 {stats['fast']['cost'] + heavy['cost']:.4f}")
+        return "\n".join(lines)
+
+
+def create_cascade(platform, heavy_llm, fast_model=LLM_FAST_MODEL):
+    """配置了快速模型时创建级联，否则返回 None（全部交给 heavy_llm）"""
+    if not fast_model:
+        return None
+    from verifier.llm_platform import create_llm
+    return CascadeVerifier(create_llm(platform, model=fast_model), heavy_llm)
+
+
+def agreement_report(log_path, thresholds):
+    """
+    按判定日志估计不同阈值下的升级比例与两级模型一致率
+    一致率只统计有复核结果（升级或影子复核）且在该阈值下会被直接采纳的判定
+    """
+    with open(log_path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    if not records:
+        print("[警告] 判定日志为空")
+        return
+    labeled = [r for r in records if r.get("heavy_verdict")]
+    print(f"判定 {len(records)} 条，其中有复核结果 {len(labeled)} 条")
+    if labeled:
+        agree = sum(r["fast_verdict"] == r["heavy_verdict"] for r in labeled)
+        print(f"有复核结果的判定中两级一致 {agree}/{len(labeled)}（{agree / len(labeled):.1%}）")
+    print(f"{'阈值':>6} {'升级比例':>8} {'采纳样本':>8} {'一致率':>8}")
+    for threshold in thresholds:
+        escalated = sum(should_escalate(r["fast_verdict"], r["confidence"], threshold) for r in records)
+        accepted = [r for r in labeled if not should_escalate(r["fast_verdict"], r["confidence"], threshold)]
+        rate = f"{sum(r['fast_verdict'] == r['heavy_verdict'] for r in accepted) / len(accepted):.1%}" \
+            if accepted else "-"
+        print(f"{threshold:>6.2f} {escalated / len(records):>8.1%} {len(accepted):>8} {rate:>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='模型级联一致率报告')
+    parser.add_argument('--log', type=str, default=CASCADE_LOG or "cascade_log.jsonl", help='判定日志路径')
+    parser.add_argument('--thresholds', type=str, default="0.5,0.6,0.7,0.8,0.9,0.95",
+                        help='待评估的阈值，逗号分隔')
+    args = parser.parse_args()
+    agreement_report(args.log, [float(t) for t in args.thresholds.split(",")])
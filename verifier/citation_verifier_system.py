@@ -1,80 +1,106 @@
 import hashlib
 import os
 import json
+import threading
+import time
 
+from parsers.context_extractor import CitationContextExtractor
 from parsers.grobid_parser import GrobidParser as gp
-from clients.arxiv_client import ArxivClient
-from config.settings import MODEL_CONFIGS, GROBID_URL, LLM_PLATFORM
-
-from langchain_community.llms.tongyi import Tongyi
-from langchain_community.embeddings import DashScopeEmbeddings
-from langchain_core.prompts import PromptTemplate
+from config.settings import CONTEXT_MAX_TOKENS, CONTEXT_MODE, CONTEXT_WINDOW
+from utils.arxiv_id import arxiv_key, canonical_arxiv_id
+from utils.pdf_store import get_pdf_store
+from verifier.prefetch import ReferencePrefetcher
+from verifier.prompt_cache import PromptCacheMeter
+from verifier.prompts import parse_verdict
+from verifier.run_journal import RunJournal
+from verifier.session import VerifierSession
 
 
 class CitationVerificationSystem:
-    def __init__(self, download_dir, doc_path, output_dir):
+    def __init__(self, download_dir, doc_path, output_dir,
+                 parser=None, arxiv_client=None, llm=None, embeddings=None, resume=True, session=None):
+        """
+        :param parser/arxiv_client/llm/embeddings: 可选，传入已初始化的共享客户端（如常驻服务中预热的实例），
+                                                   未传入时按配置新建
+        :param resume: 是否从运行日志续跑，同一文档已完成的阶段将被跳过
+        :param session: 可选，VerifierSession，传入时共享其全部客户端、缓存与证据索引（忽略上面的客户端参数）
+        """
         if not os.path.isfile(doc_path):
             raise FileNotFoundError(f"找不到文件: {doc_path}")
 
         self.doc_path = doc_path
         self.doc_id = os.path.splitext(os.path.basename(doc_path))[0]  # 唯一文档ID
-        self.parser = gp(grobid_url=GROBID_URL)
-        self.arxiv_client = ArxivClient()
-        self.download_dir = download_dir
-        os.makedirs(self.download_dir, exist_ok=True)
+        self.session = session or VerifierSession(pdf_store_dir=download_dir, parser=parser,
+                                                  arxiv_client=arxiv_client, llm=llm, embeddings=embeddings)
+        self.parser = self.session.parser
+        self.arxiv_client = self.session.arxiv_client
+        self.llm = self.session.llm
+        self.embeddings = self.session.embeddings
+        # 句子级引用上下文提取，CONTEXT_MODE=paragraph 时退回整段提取
+        self.context_extractor = CitationContextExtractor(
+            self.parser, window=CONTEXT_WINDOW, max_tokens=CONTEXT_MAX_TOKENS) if CONTEXT_MODE == "sentence" else None
+        # 被引文献PDF共享存储，download_dir 为存储目录（按内容寻址，多个任务共用）
+        self.pdf_store = get_pdf_store(download_dir) if download_dir else self.session.pdf_store
+        self.download_dir = self.pdf_store.root
+        # 本次验证持有租约的文献，结束后释放
+        self.leased = []
 
         # 向量数据库路径
         self.vector_db_dir = f"faiss_index_{self.doc_id}"
         self.hash_file = f"faiss_hashes_{self.doc_id}.txt"
 
-        self.embeddings = DashScopeEmbeddings(
-            model=MODEL_CONFIGS['dashscope']['embedding_model'],
-            dashscope_api_key=MODEL_CONFIGS['dashscope']['api_key'])
-
         os.makedirs(output_dir, exist_ok=True)
         self.output_path = os.path.join(
             output_dir, f"output_{self.doc_id}.txt")
-        # 清空或创建输出文件
-        with open(self.output_path, "w", encoding="utf-8") as f:
-            f.write(f"引用验证报告 - {self.doc_id}\n\n")
-        self.init_llm_platform()
+        # 运行日志，记录每条参考文献各阶段的结果
+        self.journal = RunJournal(
+            os.path.join(output_dir, f"journal_{self.doc_id}.jsonl"),
+            gp.file_digest(self.doc_path), resume=resume)
+        self._output_ready = False
+        # 被引文献全文证据检索（会话内共享），EVIDENCE_MODE=abstract 时为 None
+        self.evidence_retriever = self.session.evidence_retriever
 
         # 缓存已处理的文献
         self.processed_refs = {}
-
-    def init_llm_platform(self):
-        # 初始化 LLM
-        if LLM_PLATFORM == "openai":
-            from langchain_community.embeddings import OpenAIEmbeddings
-            import langchain_community.llms.openai as openai
-            self.embeddings = OpenAIEmbeddings(
-                model=MODEL_CONFIGS['dashscope']['embedding_model'],
-                api_key=MODEL_CONFIGS['dashscope']['api_key'])
-            self.llm = openai.OpenAI(
-                model=MODEL_CONFIGS['openai']['model'],
-                api_key=MODEL_CONFIGS['openai']['api_key'])
-        elif LLM_PLATFORM == "tongyi":
-            from langchain_community.embeddings import DashScopeEmbeddings
-            import langchain_community.llms.tongyi as tongyi
-            # 初始化嵌入模型
-            self.embeddings = DashScopeEmbeddings(
-                model=MODEL_CONFIGS['dashscope']['embedding_model'],
-                dashscope_api_key=MODEL_CONFIGS['dashscope']['api_key'])
-            self.llm = tongyi.Tongyi(
-                model=MODEL_CONFIGS['dashscope']['model'],
-                api_key=MODEL_CONFIGS['dashscope']['api_key'])
-        elif LLM_PLATFORM == "qianfan":
-            from langchain_community.embeddings.baidu_qianfan_endpoint import QianfanEmbeddingsEndpoint
-            import langchain_community.llms.baidu_qianfan_endpoint as qianfan
-            # 初始化嵌入模型
-            self.embeddings = QianfanEmbeddingsEndpoint(
-                model=MODEL_CONFIGS['dashscope']['embedding_model'],
-                api_key=MODEL_CONFIGS['dashscope']['api_key'])
-            self.llm = qianfan.QianfanLLMEndpoint(
-                model=MODEL_CONFIGS['qianfan']['model'],
-                api_key=MODEL_CONFIGS['qianfan']['api_key'])
+        self.references = None
+        self._references_lock = threading.Lock()
+        # 推测式预取（start_prefetch 后启用）
+        self.prefetcher = None
+        # 本次运行的提示词前缀缓存统计
+        self.prompt_cache = PromptCacheMeter()
+        # 本次运行写入判定仓库的缓冲（verify 开始时创建，结束时写入）
+        self.verdict_log = None
+        self._run_open = False
+
+    def init_output(self):
+        """首次写入前初始化输出文件：续跑时保留已有输出，否则清空或创建"""
+        if self._output_ready:
+            return
+        if not self.journal.resumed or not os.path.exists(self.output_path):
+            with open(self.output_path, "w", encoding="utf-8") as f:
+                f.write(f"引用验证报告 - {self.doc_id}\n\n")
+        self._output_ready = True
+
+    def extract_references(self):
+        """提取本文档的参考文献（首次调用时解析，之后复用；启用预取时随即提交被引文献的预取）"""
+        with self._references_lock:
+            if self.references is None:
+                self.references = self.parser.extract_references(self.doc_path)
+                if self.prefetcher is not None:
+                    self.prefetcher.submit(self.references)
+        return self.references
+
+    def prepare_fulltext(self):
+        """解析全文并建立引用上下文索引（TEI 落盘缓存），供预取在后台提前完成"""
+        if self.context_extractor is not None:
+            self.context_extractor.prepare(self.doc_path)
         else:
-            raise ValueError(f"Unsupported LLM platform: {LLM_PLATFORM}")
+            self.parser.grobid_extract_tei_file(doc_path=self.doc_path)
+
+    def start_prefetch(self, executor):
+        """在后台并行提取参考文献与解析全文，并预取被引文献（executor 通常为 VerifierSession.executor）"""
+        self.prefetcher = ReferencePrefetcher(self, executor).start()
+        return self.prefetcher
 
     def get_doc_hash(self, document):
         """结合内容和元数据生成唯一哈希"""
@@ -98,33 +124,45 @@ class CitationVerificationSystem:
         with open(self.hash_file, 'a', encoding='utf-8') as f:
             for h in new_hashes:
                 f.write(h + "\n")
-    def download_if_needed(self, arxiv_doi, callback=None):
-        """按需下载文献"""
+    def download_if_needed(self, arxiv_doi, callback=None, lease=True):
+        """
+        按需下载文献：从共享存储解析PDF（不存在时下载入库）并持有租约，直到 release_pdfs
+        :param lease: 为 False 时只确保文献入库、不持有租约（预取使用）
+        """
         try:
-            pdf_path = os.path.join(self.download_dir, f"{arxiv_doi}.pdf")
-            if os.path.exists(pdf_path):
+            arxiv_doi = arxiv_key(arxiv_doi) or arxiv_doi
+            pdf_path = self.pdf_store.lookup(arxiv_doi, lease=lease)
+            if pdf_path:
+                if lease:
+                    self.leased.append(arxiv_doi)
                 if callback:
                     callback(f"已存在: {arxiv_doi} → {pdf_path.replace(os.sep, '/')}\n")
+                if self.journal.get(arxiv_doi, "downloaded") is None:
+                    self.journal.record(arxiv_doi, "downloaded", {"path": pdf_path})
                 return pdf_path
 
-            doi = arxiv_doi.split(":")[-1]
-            s_result = self.arxiv_client.search_papers(doi)
-
-            if not s_result:
-                raise ValueError(f"未找到论文: {arxiv_doi}")
-
-            success = self.arxiv_client.download_pdf(
-                s_result[0]["pdf_link"], pdf_path)
-
-            if success:
-                msg = f"成功下载: {arxiv_doi} → {pdf_path.replace(os.sep, '/')}\n"
-                if callback:
-                    callback(msg)
-                else:
-                    print(msg)
-                return pdf_path
+            def download(save_path):
+                resolved = self.journal.get(arxiv_doi, "resolved")
+                if resolved is None:
+                    s_result = self.arxiv_client.search_papers(canonical_arxiv_id(arxiv_doi) or arxiv_doi)
+
+                    if not s_result:
+                        raise ValueError(f"未找到论文: {arxiv_doi}")
+                    resolved = {"pdf_link": s_result[0]["pdf_link"]}
+                    self.journal.record(arxiv_doi, "resolved", resolved)
+                return self.arxiv_client.download_pdf(resolved["pdf_link"], save_path)
+
+            # 同一文献跨进程只下载一次，其他进程等待后直接复用
+            pdf_path = self.pdf_store.fetch(arxiv_doi, download, lease=lease)
+            if lease:
+                self.leased.append(arxiv_doi)
+            self.journal.record(arxiv_doi, "downloaded", {"path": pdf_path})
+            msg = f"成功下载: {arxiv_doi} → {pdf_path.replace(os.sep, '/')}\n"
+            if callback:
+                callback(msg)
             else:
-                raise RuntimeError(f"下载失败: {arxiv_doi}")
+                print(msg)
+            return pdf_path
 
         except Exception as e:
             error_msg = f"处理文献 {arxiv_doi} 失败: {str(e)}\n"
@@ -134,12 +172,71 @@ class CitationVerificationSystem:
                 print(error_msg)
             raise RuntimeError(error_msg)
 
-
+    def extract_contexts(self, ref):
+        """提取论文中引用该参考文献的上下文"""
+        if self.prefetcher is not None:
+            self.prefetcher.wait_fulltext()
+        if self.context_extractor is not None:
+            return self.context_extractor.extract(self.doc_path, ref.get('ref_id'))
+        return self.parser.extract_refer_text(self.doc_path, ref.get('ref_id'))
+
+    def report_context_savings(self, callback=None):
+        """输出本次运行句子级上下文提取节省的 token 数"""
+        if self.context_extractor is None:
+            return
+        self.init_output()
+        msg = f"📉 {self.context_extractor.summary()}\n"
+        if callback:
+            callback(msg)
+        else:
+            print(msg)
+        with open(self.output_path, "a", encoding="utf-8") as f:
+            f.write(msg)
+
+    @property
+    def context_mode(self):
+        """引用上下文的提取方式，运行日志中的上下文记录只在提取方式不变时复用"""
+        if self.context_extractor is None:
+            return "paragraph"
+        return f"sentence:{self.context_extractor.window}:{self.context_extractor.max_tokens}"
+
+    def begin_run(self):
+        """
+        开始一次运行（初始化输出文件与判定仓库缓冲），返回是否由本次调用开始；
+        已开始时直接返回 False，批量调度（verifier/batch）先 begin_run，再分多次验证，最后 finish_run
+        """
+        if self._run_open:
+            return False
+        self.init_output()
+        self.verdict_log = self.session.open_verdict_log(self.doc_id, self.journal.doc_digest, "grobid_extraction")
+        self._run_open = True
+        return True
+
+    def finish_run(self):
+        """结束运行：释放PDF租约、将判定写入仓库并关闭运行日志"""
+        self.release_pdfs()
+        self.flush_verdicts()
+        self.journal.close()
+        self.verdict_log = None
+        self._run_open = False
 
     def verify_citation(self, references, callback=None):
         """
         使用grobid进行tei解析，并提取参考文献（基于精确位置）。
         """
+        started = self.begin_run()
+        try:
+            return self._verify_citation(references, callback)
+        finally:
+            if started:
+                self.finish_run()
+
+    def release_pdfs(self):
+        """释放本次验证持有的PDF租约，之后存储可按配额回收这些文件"""
+        while self.leased:
+            self.pdf_store.release(self.leased.pop())
+
+    def _verify_citation(self, references, callback=None):
         results = []
 
         for ref in references:
@@ -162,25 +259,45 @@ class CitationVerificationSystem:
                     callback(f"[缓存] 已处理文献: {ref.get('title')}\n")
                 continue
 
+            # 运行日志中已完成的文献直接复用结果
+            if self.journal.is_done(ref_key):
+                self.processed_refs[ref_key] = self.journal.verdicts(ref_key)
+                results.extend(self.processed_refs[ref_key])
+                if callback:
+                    callback(f"[续跑] 已完成文献: {ref.get('title')}\n")
+                continue
+
             try:
-                ref_path = self.download_if_needed(ref["doi"])
-                refer_abstract = self.parser.extract_abstract(ref_path) or ""
+                if self.prefetcher is not None:
+                    self.prefetcher.wait(ref_key)
+                parsed = self.journal.get(ref_key, "parsed")
+                ref_path = None
+                # 需要读取PDF时从共享存储解析（续跑时日志中的路径可能已被回收）
+                if parsed is None or self.evidence_retriever is not None:
+                    ref_path = self.download_if_needed(ref["doi"])
+                if parsed is None:
+                    parsed = {"abstract": self.parser.extract_abstract(ref_path) or "", "path": ref_path}
+                    self.journal.record(ref_key, "parsed", parsed)
+                refer_abstract = parsed["abstract"]
             except Exception as e:
                 error_msg = f"❌ 处理文献 {ref.get('title', '未知')} 时出错: {str(e)}\n"
                 if callback:
                     callback(error_msg)
                 with open(self.output_path, "a", encoding="utf-8") as f:
                     f.write(error_msg)
+                self.journal.record(ref_key, "error", {"error": str(e)})
                 continue
 
             # 找到论文中引用参考文献的段落
-            try:
-                ext_list = self.parser.extract_refer_text(
-                    self.doc_path, ref.get('ref_id'))
-            except Exception as e:
-                if callback:
-                    callback(f"提取引用文本失败: {str(e)}\n")
-                ext_list = []
+            ext_list = self.journal.contexts(ref_key, self.context_mode)
+            if ext_list is None:
+                try:
+                    ext_list = self.extract_contexts(ref)
+                    self.journal.record(ref_key, "contexts", {"contexts": ext_list, "mode": self.context_mode})
+                except Exception as e:
+                    if callback:
+                        callback(f"提取引用文本失败: {str(e)}\n")
+                    ext_list = []
 
             if not ext_list:
                 msg = f"❗️未找到直接引用: {ref.get('title')}\n"
@@ -188,17 +305,31 @@ class CitationVerificationSystem:
                     callback(msg)
                 with open(self.output_path, "a", encoding="utf-8") as f:
                     f.write(msg + "\n")
+                self.journal.record(ref_key, "done")
                 continue
 
             ref_results = []
+            finished = {entry["context_idx"]: entry for entry in self.journal.verdicts(ref_key)}
             for idx, context in enumerate(ext_list):
-                # 验证引用
+                # 只复用针对同一段落的判定（提取方式变化后段落序号对应的内容不同）
+                if idx + 1 in finished and finished[idx + 1]["context"] == context:
+                    ref_results.append(finished[idx + 1])
+                    continue
+                # 验证引用（附被引文献正文证据）
+                start = time.perf_counter()
+                evidence = self.retrieve_evidence(ref_key, ref_path, context, callback)
+                evidence_seconds = time.perf_counter() - start
+                info = {}
+                start = time.perf_counter()
                 result = self.verify_single_citation(
                     context,
                     ref['title'],
                     ref['authors'],
-                    refer_abstract
+                    refer_abstract,
+                    evidence,
+                    info
                 )
+                llm_seconds = time.perf_counter() - start
 
                 # 解析结果
                 output_text = result.strip()
@@ -211,6 +342,7 @@ class CitationVerificationSystem:
                     "ref_authors": ref['authors'],
                     "context_idx": idx + 1,
                     "context": context,
+                    "evidence": evidence,
                     "verification_result": output_text,
                     "is_related": is_related
                 }
@@ -222,35 +354,49 @@ class CitationVerificationSystem:
                     callback(output_msg)
                 with open(self.output_path, "a", encoding="utf-8") as f:
                     f.write(f"【精确位置】{ref['title']}段落{idx+1}:\n\n{context}\nresult:\n {output_text}\n\n")
+                self.journal.record(ref_key, "verdict", result_entry)
+                self.record_verdict(ref_key, result_entry, info, llm_seconds, evidence_seconds)
 
             # 缓存结果
+            self.journal.record(ref_key, "done")
             self.processed_refs[ref_key] = ref_results
             results.extend(ref_results)
 
         return results
 
-    def verify_single_citation(self, context, title, authors, abstract):
+    def retrieve_evidence(self, ref_key, ref_path, context, callback=None):
+        """检索被引文献正文中与引用上下文最相关的段落，未启用或失败时返回空列表（退回仅摘要验证）"""
+        if self.evidence_retriever is None or not ref_path:
+            return []
+        try:
+            return self.evidence_retriever.retrieve(ref_key, ref_path, context)
+        except Exception as e:
+            if callback:
+                callback(f"检索正文证据失败: {str(e)}\n")
+            return []
+
+    def verify_single_citation(self, context, title, authors, abstract, evidence=None, info=None):
         """验证单个引用（共享逻辑）"""
-        prompt_template = PromptTemplate(
-            input_variables=["context", "title", "authors", "abstract"],
-            template="""请判断下面论文正文中的引用内容，从论文内容、相关性等方面判断是否真正参考了后面给出的文献。
-论文正文引用片段：
-\"\"\"{context}\"\"\"
-
-参考文献条目：
-标题：{title}
-作者：{authors}
-摘要：{abstract}
-
-请输出“相关/不相关/不确定”，并给出简短理由。"""
-        )
-
-        # 使用新的 RunnableSequence 方法
-        citation_verifier = prompt_template | self.llm
-
-        return citation_verifier.invoke({
-            "context": context,
-            "title": title,
-            "authors": authors,
-            "abstract": abstract
-        })
\ No newline at end of file
+        return self.session.verify_single_citation(context, title, authors, abstract, evidence,
+                                                   meter=self.prompt_cache, info=info)
+
+    def record_verdict(self, ref_key, entry, info, llm_seconds, evidence_seconds):
+        """将一条判定追加到判定仓库的缓冲（未启用时忽略）"""
+        if self.verdict_log is None:
+            return
+        self.verdict_log.add(ref_key, entry["ref_title"], entry["context_idx"], entry["context"],
+                             parse_verdict(entry["verification_result"]), info.get("model", ""), info.get("tier", ""),
+                             llm_seconds, evidence_seconds, len(entry["evidence"]))
+
+    def flush_verdicts(self):
+        """将本次运行的判定写入判定仓库"""
+        if self.verdict_log is not None:
+            self.verdict_log.flush()
+
+    def report_prompt_cache(self, callback=None):
+        """输出本次运行提示词前缀的复用与服务商缓存命中情况"""
+        msg = f"🗂️ {self.prompt_cache.summary()}\n"
+        if callback:
+            callback(msg)
+        else:
+            print(msg)
@@ -2,31 +2,57 @@ import hashlib
 import os
 import json
 import shutil
+import threading
+import time
 
 import utils
-from clients.arxiv_client import ArxivClient
-from config.settings import MODEL_CONFIGS, GROBID_URL, LLM_PLATFORM
+from config.settings import (CONTEXT_SCORE_RATIO, CONTEXT_TOP_K, EARLY_STOP_RELATED, EARLY_STOP_UNRELATED,
+                             RETRIEVAL_MODE)
+from verifier.early_stop import EarlyStopMeter, SequentialVerdictPolicy
+from verifier.prefetch import ReferencePrefetcher
+from verifier.prompt_cache import PromptCacheMeter
+from verifier.prompts import parse_verdict
+from verifier.run_journal import DOC_KEY, RunJournal
+from verifier.session import VerifierSession
 from parsers.grobid_parser import GrobidParser as gp
+from utils.arxiv_id import arxiv_key, canonical_arxiv_id
+from utils.hybrid_retriever import HybridCitationRetriever, adaptive_cut, batch_similarity_search, chunks_from_tei
+from utils.pdf_store import get_pdf_store
 
 from langchain_community.vectorstores import FAISS
 from langchain_community.docstore.document import Document
-from langchain_core.prompts import PromptTemplate
-from langchain_community.document_loaders.generic import GenericLoader
-from langchain_community.document_loaders.parsers import GrobidParser as langchain_grobid_parser
 
 import utils.refer_parser
 
+# 向量库目录名，位于本文档的输出目录（output_dir/<文档ID>）下，混合检索模式加 _hybrid 后缀
+VECTOR_DB_DIRS = {"vector": "faiss_index", "hybrid": "faiss_index_hybrid"}
+
 
 class CitationVerificationLangchainVer:
-    def __init__(self, download_dir, doc_path, output_dir):
+    def __init__(self, download_dir, doc_path, output_dir,
+                 parser=None, arxiv_client=None, llm=None, embeddings=None, resume=True, retrieval_mode=None,
+                 session=None):
+        """
+        :param parser/arxiv_client/llm/embeddings: 可选，传入已初始化的共享客户端（如常驻服务中预热的实例），
+                                                   未传入时按配置新建
+        :param resume: 是否从运行日志续跑，同一文档已完成的阶段（含向量库构建）将被跳过
+        :param retrieval_mode: 引用上下文检索方式，hybrid（引用标记倒排索引 + BM25/FAISS 兜底）或 vector（仅向量检索），
+                               默认读取配置 RETRIEVAL_MODE
+        :param session: 可选，VerifierSession，传入时共享其全部客户端、缓存与证据索引（忽略上面的客户端参数）
+        """
         if not os.path.isfile(doc_path):
             raise FileNotFoundError(f"路径填写错误{doc_path}")
 
         # 初始化配置
         self.doc_path = doc_path
         self.doc_id = os.path.splitext(os.path.basename(self.doc_path))[0]
+        self.retrieval_mode = retrieval_mode or RETRIEVAL_MODE
+        if self.retrieval_mode not in ("hybrid", "vector"):
+            raise ValueError(f"Unsupported retrieval mode: {self.retrieval_mode}")
         self.output_dir = os.path.join(output_dir, self.doc_id)
-        shutil.rmtree(self.output_dir, ignore_errors=True)
+        if not resume:
+            shutil.rmtree(self.output_dir, ignore_errors=True)
+        os.makedirs(self.output_dir, exist_ok=True)
         # 设置output_path
         self.result_path = os.path.join(
             self.output_dir, f"result_{self.doc_id}.txt")
@@ -34,64 +60,84 @@ class CitationVerificationLangchainVer:
             self.output_dir, f"repeat_{self.doc_id}.txt")
         self.error_path = os.path.join(
             self.output_dir, f"error_{self.doc_id}.txt")
-        # 初始化解析器
-        self.parser = gp(grobid_url=GROBID_URL)
-        self.langchain_grobid_parser = langchain_grobid_parser(
-            segment_sentences=False, grobid_server=f"{GROBID_URL}/api/processFulltextDocument")
-        self.loader = GenericLoader.from_filesystem(
-            self.doc_path,
-            glob="*",
-            suffixes=[".pdf"],
-            parser=langchain_grobid_parser(segment_sentences=False),
-        )
-        # 初始化arxiv客户端
-        self.arxiv_client = ArxivClient()
-        self.download_dir = download_dir
-        os.makedirs(self.download_dir, exist_ok=True)
-
-        self.init_llm_platform()
-
-        # 初始化向量数据库列表
-        self.init_vector_db()
-        self.retriever = self.vector_db.as_retriever(search_kwargs={"k": 5})
+        # 运行日志，记录向量库构建及每条参考文献各阶段的结果
+        self.journal = RunJournal(
+            os.path.join(self.output_dir, f"journal_{self.doc_id}.jsonl"),
+            gp.file_digest(self.doc_path), resume=resume)
+        # 共享客户端（GROBID 客户端池、arXiv、大模型/嵌入模型）
+        self.session = session or VerifierSession(pdf_store_dir=download_dir, parser=parser,
+                                                  arxiv_client=arxiv_client, llm=llm, embeddings=embeddings)
+        self.parser = self.session.parser
+        self.arxiv_client = self.session.arxiv_client
+        self.llm = self.session.llm
+        self.embeddings = self.session.embeddings
+        # 被引文献PDF共享存储，download_dir 为存储目录（按内容寻址，多个任务共用）
+        self.pdf_store = get_pdf_store(download_dir) if download_dir else self.session.pdf_store
+        self.download_dir = self.pdf_store.root
+        # 本次验证持有租约的文献，结束后释放
+        self.leased = []
+        # 被引文献全文证据检索（会话内共享），EVIDENCE_MODE=abstract 时为 None
+        self.evidence_retriever = self.session.evidence_retriever
+
+        # 向量库与检索器在首次检索时构建（init_index）；每条参考文献最多取 top_k 段，得分低于自适应阈值的段落不取
+        self.top_k = CONTEXT_TOP_K
+        self.score_ratio = CONTEXT_SCORE_RATIO
+        self.vector_db = None
+        self.retriever = None
+        self.hybrid_retriever = None
+        self._index_lock = threading.Lock()
 
-        os.makedirs(self.output_dir, exist_ok=True)
         # 初始化处理过的引用列表
         self.processed_refs = {}
-
-    def init_llm_platform(self):
-        # 初始化 LLM
-        if LLM_PLATFORM == "openai":
-            from langchain_community.embeddings import OpenAIEmbeddings
-            import langchain_community.llms.openai as openai
-            self.embeddings = OpenAIEmbeddings(
-                model=MODEL_CONFIGS['dashscope']['embedding_model'],
-                api_key=MODEL_CONFIGS['dashscope']['api_key'])
-            self.llm = openai.OpenAI(
-                model=MODEL_CONFIGS['openai']['model'],
-                api_key=MODEL_CONFIGS['openai']['api_key'])
-        elif LLM_PLATFORM == "tongyi":
-            from langchain_community.embeddings import DashScopeEmbeddings
-            import langchain_community.llms.tongyi as tongyi
-            # 初始化嵌入模型
-            self.embeddings = DashScopeEmbeddings(
-                model=MODEL_CONFIGS['dashscope']['embedding_model'],
-                dashscope_api_key=MODEL_CONFIGS['dashscope']['api_key'])
-            self.llm = tongyi.Tongyi(
-                model=MODEL_CONFIGS['dashscope']['model'],
-                api_key=MODEL_CONFIGS['dashscope']['api_key'])
-        elif LLM_PLATFORM == "qianfan":
-            from langchain_community.embeddings.baidu_qianfan_endpoint import QianfanEmbeddingsEndpoint
-            import langchain_community.llms.baidu_qianfan_endpoint as qianfan
-            # 初始化嵌入模型
-            self.embeddings = QianfanEmbeddingsEndpoint(
-                model=MODEL_CONFIGS['dashscope']['embedding_model'],
-                api_key=MODEL_CONFIGS['dashscope']['api_key'])
-            self.llm = qianfan.QianfanLLMEndpoint(
-                model=MODEL_CONFIGS['qianfan']['model'],
-                api_key=MODEL_CONFIGS['qianfan']['api_key'])
-        else:
-            raise ValueError(f"Unsupported LLM platform: {LLM_PLATFORM}")
+        self.references = None
+        self._references_lock = threading.Lock()
+        # 推测式预取（start_prefetch 后启用）
+        self.prefetcher = None
+        # 本次运行的提示词前缀缓存统计
+        self.prompt_cache = PromptCacheMeter()
+        # 逐段提前终止的判定次数阈值（见 verifier/early_stop），及本次运行节省的大模型调用
+        self.early_stop_related = EARLY_STOP_RELATED
+        self.early_stop_unrelated = EARLY_STOP_UNRELATED
+        self.early_stop = EarlyStopMeter()
+        # 本次运行写入判定仓库的缓冲（verify 开始时创建，结束时写入）
+        self.verdict_log = None
+        self._run_open = False
+
+    def init_index(self):
+        """
+        首次检索前清理上次的输出文件（非续跑时），并构建或加载本文档的向量库与检索器
+        （预取在后台提前调用时，验证线程在此等待其完成，不会重复构建）
+        """
+        with self._index_lock:
+            if self.retriever is not None:
+                return
+            if not self.journal.resumed:
+                for path in (self.result_path, self.repeat_path, self.error_path):
+                    if os.path.exists(path):
+                        os.remove(path)
+            self.init_vector_db()
+            if self.retrieval_mode == "hybrid":
+                docs = [self.vector_db.docstore.search(self.vector_db.index_to_docstore_id[i])
+                        for i in range(len(self.vector_db.index_to_docstore_id))]
+                self.hybrid_retriever = HybridCitationRetriever(docs, self.vector_db, k=self.top_k,
+                                                                score_ratio=self.score_ratio)
+            self.retriever = self.vector_db.as_retriever(search_kwargs={"k": self.top_k})
+
+    prepare_fulltext = init_index
+
+    def extract_references(self):
+        """提取本文档的参考文献（首次调用时解析，之后复用；启用预取时随即提交被引文献的预取）"""
+        with self._references_lock:
+            if self.references is None:
+                self.references = self.parser.extract_references(self.doc_path)
+                if self.prefetcher is not None:
+                    self.prefetcher.submit(self.references)
+        return self.references
+
+    def start_prefetch(self, executor):
+        """在后台并行提取参考文献与构建向量库，并预取被引文献（executor 通常为 VerifierSession.executor）"""
+        self.prefetcher = ReferencePrefetcher(self, executor).start()
+        return self.prefetcher
 
     def get_doc_hash(self, document):
         """结合内容和元数据生成唯一哈希"""
@@ -118,56 +164,159 @@ class CitationVerificationLangchainVer:
 
     def init_vector_db(self):
         """初始化向量数据库，并返回向量库列表"""
-        doc = self.loader.load()
-        # 向量数据库路径
-        vector_db_dir_tmp = f"faiss_index_{self.doc_id}"
+        # 续跑时直接加载上次构建的向量库
+        index = self.journal.get(DOC_KEY, "index")
+        if index and index.get("mode", "vector") == self.retrieval_mode and os.path.exists(index["path"]):
+            self.vector_db = FAISS.load_local(
+                index["path"], self.embeddings, allow_dangerous_deserialization=True)
+            print(f"Loaded vector database for {self.doc_id}")
+            return
+
+        if self.retrieval_mode == "hybrid":
+            # 按TEI段落切分（落盘TEI流式读取），保留每段引用的参考文献目标供引用标记索引使用
+            tei_path = self.parser.grobid_extract_tei_file(doc_path=self.doc_path)
+            if not tei_path:
+                raise RuntimeError(f"Grobid 解析全文失败: {self.doc_path}")
+            doc = chunks_from_tei(tei_path)
+            vector_db_dir_tmp = os.path.join(self.output_dir, VECTOR_DB_DIRS["hybrid"])
+        else:
+            xml_content = self.parser.process_pdf_cached("vector_chunks", self.doc_path)
+            # 仅用 langchain GrobidParser 的 process_xml 将TEI组块；TEI 经由 self.parser 的 GROBID 客户端池获取
+            langchain_grobid_parser = self.session.langchain_grobid_parser
+            doc = list(langchain_grobid_parser.process_xml(
+                self.doc_path, xml_content, langchain_grobid_parser.segment_sentences))
+            # 向量数据库路径（写在输出目录下，不落在当前工作目录）
+            vector_db_dir_tmp = os.path.join(self.output_dir, VECTOR_DB_DIRS["vector"])
         # 如果vector_db存在，则强制删除已存在的db，创建新的db
         if os.path.exists(vector_db_dir_tmp):
             shutil.rmtree(vector_db_dir_tmp)
         # 创建新的向量数据库
         self.vector_db = FAISS.from_documents(doc, self.embeddings)
         self.vector_db.save_local(vector_db_dir_tmp)
+        self.journal.record(DOC_KEY, "index", {"path": vector_db_dir_tmp, "mode": self.retrieval_mode})
         # 输出创建向量数据库的进度
         print(f"Created vector database for {self.doc_id}")
 
-    def download_if_needed(self, arxiv_doi):
-        """按需下载文献"""
+    def download_if_needed(self, arxiv_doi, lease=True):
+        """
+        按需下载文献：从共享存储解析PDF（不存在时下载入库）并持有租约，直到 release_pdfs
+        :param lease: 为 False 时只确保文献入库、不持有租约（预取使用）
+        """
         try:
-            pdf_path = os.path.join(self.download_dir, f"{arxiv_doi}.pdf")
-            if os.path.exists(pdf_path):
+            arxiv_doi = arxiv_key(arxiv_doi) or arxiv_doi
+            pdf_path = self.pdf_store.lookup(arxiv_doi, lease=lease)
+            if pdf_path:
+                if lease:
+                    self.leased.append(arxiv_doi)
+                if self.journal.get(arxiv_doi, "downloaded") is None:
+                    self.journal.record(arxiv_doi, "downloaded", {"path": pdf_path})
                 return pdf_path
 
-            doi = arxiv_doi.split(":")[-1]
-            s_result = self.arxiv_client.search_papers(doi)
-
-            if not s_result:
-                raise ValueError(f"未找到论文: {arxiv_doi}")
-
-            success = self.arxiv_client.download_pdf(
-                s_result[0]["pdf_link"], pdf_path)
-
-            if success:
-                print(f"成功下载: {arxiv_doi} → {pdf_path}")
-                return pdf_path
-            else:
-                raise RuntimeError(f"下载失败: {arxiv_doi}")
+            def download(save_path):
+                resolved = self.journal.get(arxiv_doi, "resolved")
+                if resolved is None:
+                    s_result = self.arxiv_client.search_papers(canonical_arxiv_id(arxiv_doi) or arxiv_doi)
+
+                    if not s_result:
+                        raise ValueError(f"未找到论文: {arxiv_doi}")
+                    resolved = {"pdf_link": s_result[0]["pdf_link"]}
+                    self.journal.record(arxiv_doi, "resolved", resolved)
+                return self.arxiv_client.download_pdf(resolved["pdf_link"], save_path)
+
+            # 同一文献跨进程只下载一次，其他进程等待后直接复用
+            pdf_path = self.pdf_store.fetch(arxiv_doi, download, lease=lease)
+            if lease:
+                self.leased.append(arxiv_doi)
+            self.journal.record(arxiv_doi, "downloaded", {"path": pdf_path})
+            print(f"成功下载: {arxiv_doi} → {pdf_path}")
+            return pdf_path
 
         except Exception as e:
             raise RuntimeError(f"处理文献 {arxiv_doi} 失败: {str(e)}")
 
-    def extract_refer_text_by_faiss(self, ref_entry):
-        """
-        使用faiss（retriever）进行检索，获取最相关正文片段
-        """
-        query = f"""查询正文及附录中关于引用参考文献[{utils.refer_parser.increment_id(ref_entry['ref_id'])}]的所有段落，参考文献详细信息如下：
+    @staticmethod
+    def build_faiss_query(ref_entry):
+        """构造向量检索的查询语句"""
+        return f"""查询正文及附录中关于引用参考文献[{utils.refer_parser.increment_id(ref_entry['ref_id'])}]的所有段落，参考文献详细信息如下：
         title: {ref_entry['title']}
         authors: {ref_entry['authors']}
         doi: {ref_entry['doi']}
         """
-        docs = self.retriever.get_relevant_documents(
-            query=query, metadata={'title': ref_entry['title']})
-        refer_text = [doc.page_content for doc in docs]
-        return refer_text
+
+    def extract_refer_text_by_faiss(self, ref_entry):
+        """
+        使用faiss进行检索，获取最相关正文片段（按距离自适应截断，见 adaptive_cut）
+        hybrid 模式下优先通过引用标记精确定位，无命中时才进行 BM25 + 向量检索
+        """
+        self.init_index()
+        query = self.build_faiss_query(ref_entry)
+        if self.hybrid_retriever is not None:
+            dropped = self.hybrid_retriever.stats["score_dropped"]
+            docs = self.hybrid_retriever.retrieve(ref_entry, vector_query=query)
+            self.early_stop.observe_dropped(self.hybrid_retriever.stats["score_dropped"] - dropped)
+            return [doc.page_content for doc in docs]
+        hits = self.vector_db.similarity_search_with_score(query, k=self.top_k)
+        docs = adaptive_cut(hits, self.score_ratio)
+        self.early_stop.observe_dropped(len(hits) - len(docs))
+        return [doc.page_content for doc in docs]
+
+    def extract_refer_texts_bulk(self, ref_entries):
+        """
+        批量检索多条参考文献的引用片段：所有查询一次批量嵌入，再执行一次矩阵检索 index.search(Q, k)
+        :return: 与 ref_entries 对齐的片段列表
+        """
+        self.init_index()
+        queries = [self.build_faiss_query(ref_entry) for ref_entry in ref_entries]
+        if self.hybrid_retriever is not None:
+            dropped = self.hybrid_retriever.stats["score_dropped"]
+            docs_list = self.hybrid_retriever.retrieve_many(ref_entries, vector_queries=queries)
+            self.early_stop.observe_dropped(self.hybrid_retriever.stats["score_dropped"] - dropped)
+        else:
+            hits_list = batch_similarity_search(self.vector_db, queries, k=self.top_k)
+            docs_list = [adaptive_cut(hits, self.score_ratio) for hits in hits_list]
+            self.early_stop.observe_dropped(sum(len(h) - len(d) for h, d in zip(hits_list, docs_list)))
+        return [[doc.page_content for doc in docs] for docs in docs_list]
+
+    def prefetch_refer_texts(self, references):
+        """为本次需要检索的参考文献批量预取引用片段，返回 doi → 片段列表"""
+        pending, seen = [], set()
+        for ref in references:
+            ref_key = ref.get("doi")
+            if not ref_key or ref_key in seen or ref_key in self.processed_refs:
+                continue
+            seen.add(ref_key)
+            if not (ref.get("journal") and ref.get("journal").lower() == "arxiv"):
+                continue
+            if self.journal.is_done(ref_key) or self.journal.contexts(ref_key, self.context_mode) is not None:
+                continue
+            pending.append(ref)
+        if not pending:
+            return {}
+        return dict(zip([ref["doi"] for ref in pending], self.extract_refer_texts_bulk(pending)))
+
+    @property
+    def context_mode(self):
+        """引用片段的检索方式，运行日志中的片段记录只在检索方式与参数不变时复用"""
+        return f"{self.retrieval_mode}:{self.top_k}:{self.score_ratio}"
+
+    def begin_run(self):
+        """
+        开始一次运行（创建判定仓库缓冲），返回是否由本次调用开始；
+        已开始时直接返回 False，批量调度（verifier/batch）先 begin_run，再分多次验证，最后 finish_run
+        """
+        if self._run_open:
+            return False
+        self.verdict_log = self.session.open_verdict_log(self.doc_id, self.journal.doc_digest, "vector_retrieval")
+        self._run_open = True
+        return True
+
+    def finish_run(self):
+        """结束运行：释放PDF租约、将判定写入仓库并关闭运行日志"""
+        self.release_pdfs()
+        self.flush_verdicts()
+        self.journal.close()
+        self.verdict_log = None
+        self._run_open = False
 
     def verify_citation_by_chain(self, references, callback=None):
         """
@@ -175,7 +324,23 @@ class CitationVerificationLangchainVer:
         :param references: list of reference dicts
         :param callback: 可选回调函数，用于实时显示结果
         """
+        self.init_index()
+        started = self.begin_run()
+        try:
+            return self._verify_citation_by_chain(references, callback)
+        finally:
+            if started:
+                self.finish_run()
+
+    def release_pdfs(self):
+        """释放本次验证持有的PDF租约，之后存储可按配额回收这些文件"""
+        while self.leased:
+            self.pdf_store.release(self.leased.pop())
+
+    def _verify_citation_by_chain(self, references, callback=None):
         results = []
+        # 一次批量检索所有参考文献的引用片段，避免逐条嵌入与检索
+        prefetched = self.prefetch_refer_texts(references)
 
         for ref in references:
             if not ref.get("doi"):
@@ -187,7 +352,6 @@ class CitationVerificationLangchainVer:
             # 避免重复处理同一文献，并将重复的参考文献写入repeat.txt中
             ref_key = ref["doi"]
             if ref_key in self.processed_refs:
-                self.append_hash_set([self.get_doc_hash(ref_path)])
                 with open(self.repeat_path, "a", encoding="utf-8") as f:
                     f.write(
                         f"查找到重复参考文献: {ref.get('title')} (DOI: {ref_key})\n")
@@ -202,20 +366,42 @@ class CitationVerificationLangchainVer:
                     callback(f"[跳过] 非arXiv文献: {ref.get('title')}\n")
                 continue
 
+            # 运行日志中已完成的文献直接复用结果
+            if self.journal.is_done(ref_key):
+                self.processed_refs[ref_key] = self.journal.verdicts(ref_key)
+                results.extend(self.processed_refs[ref_key])
+                if callback:
+                    callback(f"[续跑] 已完成文献: {ref.get('title')}\n")
+                continue
+
             try:
-                ref_path = self.download_if_needed(ref["doi"])
-                refer_abstract = self.parser.extract_abstract(
-                    ref_path) or ""
+                if self.prefetcher is not None:
+                    self.prefetcher.wait(ref_key)
+                parsed = self.journal.get(ref_key, "parsed")
+                ref_path = None
+                # 需要读取PDF时从共享存储解析（续跑时日志中的路径可能已被回收）
+                if parsed is None or self.evidence_retriever is not None:
+                    ref_path = self.download_if_needed(ref["doi"])
+                if parsed is None:
+                    parsed = {"abstract": self.parser.extract_abstract(ref_path) or "", "path": ref_path}
+                    self.journal.record(ref_key, "parsed", parsed)
+                refer_abstract = parsed["abstract"]
             except Exception as e:
                 error_msg = f"❌ 处理文献 {ref.get('title', '未知')} 时出错: {str(e)}\n"
                 if callback:
                     callback(error_msg)
                 with open(self.error_path, "a", encoding="utf-8") as f:
                     f.write(error_msg)
+                self.journal.record(ref_key, "error", {"error": str(e)})
                 continue
 
             # 检索相关段落
-            refer_texts = self.extract_refer_text_by_faiss(ref)
+            refer_texts = self.journal.contexts(ref_key, self.context_mode)
+            if refer_texts is None:
+                refer_texts = prefetched.get(ref_key)
+                if refer_texts is None:
+                    refer_texts = self.extract_refer_text_by_faiss(ref)
+                self.journal.record(ref_key, "contexts", {"contexts": refer_texts, "mode": self.context_mode})
 
             if not refer_texts:
                 msg = f"❗️未找到引用: {ref['title']}\n"
@@ -223,17 +409,39 @@ class CitationVerificationLangchainVer:
                     callback(msg)
                 with open(self.error_path, "a", encoding="utf-8") as f:
                     f.write(msg + "\n")
+                self.journal.record(ref_key, "done")
                 continue
 
             ref_results = []
+            finished = {entry["context_idx"]: entry for entry in self.journal.verdicts(ref_key)}
+            # 段落按检索相关度排列，判定确定后剩余段落不再调用大模型
+            policy = SequentialVerdictPolicy(self.early_stop_related, self.early_stop_unrelated)
+            self.early_stop.observe_contexts(len(refer_texts))
             for idx, context in enumerate(refer_texts):
-                # 验证引用
+                if policy.settled:
+                    self.skip_settled(ref, policy.settled, idx, len(refer_texts), callback)
+                    break
+                # 只复用针对同一段落的判定（检索方式变化后段落序号对应的内容不同）
+                if idx + 1 in finished and finished[idx + 1]["context"] == context:
+                    ref_results.append(finished[idx + 1])
+                    policy.observe(parse_verdict(finished[idx + 1]["verification_result"]))
+                    continue
+                # 验证引用（附被引文献正文证据）
+                start = time.perf_counter()
+                evidence = self.retrieve_evidence(ref_key, ref_path, context, callback)
+                evidence_seconds = time.perf_counter() - start
+                info = {}
+                start = time.perf_counter()
                 result = self.verify_single_citation(
                     context,
                     ref['title'],
                     ref['authors'],
-                    refer_abstract
+                    refer_abstract,
+                    evidence,
+                    info
                 )
+                llm_seconds = time.perf_counter() - start
+                self.early_stop.observe_call()
 
                 # 解析结果
                 output_text = result.strip()
@@ -246,6 +454,7 @@ class CitationVerificationLangchainVer:
                     "ref_authors": ref['authors'],
                     "context_idx": idx + 1,
                     "context": context,
+                    "evidence": evidence,
                     "verification_result": output_text,
                     "is_related": is_related
                 }
@@ -259,32 +468,65 @@ class CitationVerificationLangchainVer:
                 with open(self.result_path, "a", encoding="utf-8") as f:
                     f.write(
                         f"【向量检索】{ref['title']}段落{idx+1}\n{context}: {output_text}\n {seg} \n")
+                self.journal.record(ref_key, "verdict", result_entry)
+                self.record_verdict(ref_key, result_entry, info, llm_seconds, evidence_seconds)
+                policy.observe(parse_verdict(output_text))
 
+            self.journal.record(ref_key, "done")
+            self.processed_refs[ref_key] = ref_results
             results.extend(ref_results)
         return results
 
-    def verify_single_citation(self, context, title, authors, abstract):
+    def skip_settled(self, ref, verdict, idx, total, callback=None):
+        """判定已确定：记录跳过的段落 idx+1..total（不调用大模型）"""
+        self.early_stop.observe_settled(verdict, total - idx)
+        msg = f"【{ref['title']}】判定已确定为“{verdict}”，跳过段落{idx + 1}-{total}\n"
+        if callback:
+            callback(msg)
+        with open(self.result_path, "a", encoding="utf-8") as f:
+            f.write(f"【提前终止】{msg}")
+
+    def retrieve_evidence(self, ref_key, ref_path, context, callback=None):
+        """检索被引文献正文中与引用上下文最相关的段落，未启用或失败时返回空列表（退回仅摘要验证）"""
+        if self.evidence_retriever is None or not ref_path:
+            return []
+        try:
+            return self.evidence_retriever.retrieve(ref_key, ref_path, context)
+        except Exception as e:
+            if callback:
+                callback(f"检索正文证据失败: {str(e)}\n")
+            return []
+
+    def verify_single_citation(self, context, title, authors, abstract, evidence=None, info=None):
         """验证单个引用（共享逻辑）"""
-        prompt_template = PromptTemplate(
-            input_variables=["context", "title", "authors", "abstract"],
-            template="""请判断下面论文正文中的引用内容，从论文内容、相关性等方面判断是否真正参考了后面给出的文献。
-论文正文引用片段：
-\"\"\"{context}\"\"\"
-
-参考文献条目：
-标题：{title}
-作者：{authors}
-摘要：{abstract}
-
-请输出“相关/不相关/不确定”，并给出简短理由。"""
-        )
-
-        # 使用新的 RunnableSequence 方法
-        citation_verifier = prompt_template | self.llm
-
-        return citation_verifier.invoke({
-            "context": context,
-            "title": title,
-            "authors": authors,
-            "abstract": abstract
-        })
\ No newline at end of file
+        return self.session.verify_single_citation(context, title, authors, abstract, evidence,
+                                                   meter=self.prompt_cache, info=info)
+
+    def record_verdict(self, ref_key, entry, info, llm_seconds, evidence_seconds):
+        """将一条判定追加到判定仓库的缓冲（未启用时忽略）"""
+        if self.verdict_log is None:
+            return
+        self.verdict_log.add(ref_key, entry["ref_title"], entry["context_idx"], entry["context"],
+                             parse_verdict(entry["verification_result"]), info.get("model", ""), info.get("tier", ""),
+                             llm_seconds, evidence_seconds, len(entry["evidence"]))
+
+    def flush_verdicts(self):
+        """将本次运行的判定写入判定仓库"""
+        if self.verdict_log is not None:
+            self.verdict_log.flush()
+
+    def report_prompt_cache(self, callback=None):
+        """输出本次运行提示词前缀的复用与服务商缓存命中情况"""
+        msg = f"🗂️ {self.prompt_cache.summary()}\n"
+        if callback:
+            callback(msg)
+        else:
+            print(msg)
+
+    def report_early_stop(self, callback=None):
+        """输出本次运行自适应检索与提前终止避免的大模型调用"""
+        msg = f"✂️ {self.early_stop.summary()}\n"
+        if callback:
+            callback(msg)
+        else:
+            print(msg)
@@ -0,0 +1,82 @@
+"""
+链路模式的自适应检索与逐段提前终止统计
+同一参考文献的引用上下文按检索相关度依次验证：
+- 出现 EARLY_STOP_RELATED 次“相关”后，该文献已确认被正确引用，剩余段落不再调用大模型
+- 连续 EARLY_STOP_UNRELATED 次“不相关”后（剩余段落相关度更低，通常不会改变结论），剩余段落不再调用大模型
+“不确定”不计入“相关”次数，并中断连续“不相关”的计数。续跑时日志中已有的判定按原顺序重放，提前终止的位置与首次运行一致。
+"""
+import threading
+
+from config.settings import EARLY_STOP_RELATED, EARLY_STOP_UNRELATED
+
+
+class SequentialVerdictPolicy:
+    """单条参考文献的逐段判定策略，observe 每段的判定，settled 非空后停止验证"""
+
+    def __init__(self, related=EARLY_STOP_RELATED, unrelated=EARLY_STOP_UNRELATED):
+        """
+        :param related: 确定为“相关”所需的“相关”判定次数，0 为不按“相关”终止
+        :param unrelated: 确定为“不相关”所需的连续“不相关”判定次数，0 为不按“不相关”终止
+        """
+        self.related_needed = related
+        self.unrelated_needed = unrelated
+        self.related = 0
+        self.unrelated_run = 0
+        self.settled = None
+
+    def observe(self, verdict):
+        """记录一段的判定（相关/不相关/不确定），返回是否已确定"""
+        if verdict == "相关":
+            self.related += 1
+            self.unrelated_run = 0
+        elif verdict == "不相关":
+            self.unrelated_run += 1
+        else:
+            self.unrelated_run = 0
+        if self.related_needed and self.related >= self.related_needed:
+            self.settled = "相关"
+        elif self.unrelated_needed and self.unrelated_run >= self.unrelated_needed:
+            self.settled = "不相关"
+        return self.settled is not None
+
+
+class EarlyStopMeter:
+    """单次验证运行的大模型调用节省统计（相对不截断检索结果、逐段全部验证）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stats = {"refs": 0, "contexts": 0, "score_dropped": 0, "llm_calls": 0, "skipped": 0,
+                      "settled": {"相关": 0, "不相关": 0}}
+
+    def observe_dropped(self, dropped):
+        """记录检索时因得分低于阈值而少取的段落数"""
+        with self._lock:
+            self.stats["score_dropped"] += dropped
+
+    def observe_contexts(self, contexts):
+        """记录一条待验证参考文献的引用上下文段数"""
+        with self._lock:
+            self.stats["refs"] += 1
+            self.stats["contexts"] += contexts
+
+    def observe_call(self):
+        with self._lock:
+            self.stats["llm_calls"] += 1
+
+    def observe_settled(self, verdict, skipped):
+        """记录判定已确定的参考文献及因此跳过的段落数"""
+        with self._lock:
+            self.stats["settled"][verdict] += 1
+            self.stats["skipped"] += skipped
+
+    def summary(self):
+        with self._lock:
+            s = {**self.stats, "settled": dict(self.stats["settled"])}
+        avoided = s["score_dropped"] + s["skipped"]
+        baseline = s["llm_calls"] + avoided
+        if not baseline:
+            return "自适应检索与提前终止：尚无验证"
+        return (f"自适应检索与提前终止：{s['refs']} 条参考文献，检索到 {s['contexts']} 段引用上下文"
+                f"（按得分阈值少取 {s['score_dropped']} 段），大模型调用 {s['llm_calls']} 次；"
+                f"判定提前确定 {sum(s['settled'].values())} 条（相关 {s['settled']['相关']} / 不相关 {s['settled']['不相关']}），"
+                f"跳过 {s['skipped']} 段；共避免 {avoided} 次调用（占不截断、逐段全部验证的 {avoided / baseline:.1%}）")
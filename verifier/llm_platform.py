@@ -0,0 +1,86 @@
+from config.settings import EMBEDDING_BACKEND, MODEL_CONFIGS, LLM_PLATFORM
+
+
+def create_llm(platform=LLM_PLATFORM, model=None):
+    """
+    按平台配置创建大模型
+    :param platform: LLM 平台名称，默认读取配置 LLM_PLATFORM
+    :param model: 可选，模型名称，默认读取平台配置（用于创建级联中的快速模型）
+    """
+    if platform == "openai":
+        import langchain_community.llms.openai as openai
+        return openai.OpenAI(
+            model=model or MODEL_CONFIGS['openai']['model'],
+            api_key=MODEL_CONFIGS['openai']['api_key'])
+    if platform == "tongyi":
+        import langchain_community.llms.tongyi as tongyi
+        return tongyi.Tongyi(
+            model=model or MODEL_CONFIGS['dashscope']['model'],
+            api_key=MODEL_CONFIGS['dashscope']['api_key'])
+    if platform == "qianfan":
+        import langchain_community.llms.baidu_qianfan_endpoint as qianfan
+        return qianfan.QianfanLLMEndpoint(
+            model=model or MODEL_CONFIGS['qianfan']['model'],
+            api_key=MODEL_CONFIGS['qianfan']['api_key'])
+    if platform == "local":
+        # 本机 llama-server 运行的量化模型（GGUF），完全离线
+        if model:
+            raise ValueError("LLM_PLATFORM=local 暂不支持级联快速模型（LLM_FAST_MODEL）")
+        from clients.llama_server import create_local_llm
+        return create_local_llm()
+    if platform == "fake":
+        # 本地替身后端：不访问任何远程服务，用于离线调试与服务联调
+        from langchain_community.llms.fake import FakeListLLM
+        if model:
+            return FakeListLLM(responses=["不确定\n置信度：0.0\n理由：本地替身快速模型，未进行真实判断。"])
+        return FakeListLLM(responses=["不确定\n理由：本地替身模型，未进行真实判断。"])
+    raise ValueError(f"Unsupported LLM platform: {platform}")
+
+
+def create_embeddings(platform=LLM_PLATFORM, backend=EMBEDDING_BACKEND):
+    """
+    按平台配置创建嵌入模型
+    :param backend: 嵌入模型后端，local 时使用本机 ONNX 句向量模型（与 LLM 平台无关），默认读取配置 EMBEDDING_BACKEND；
+                    LLM_PLATFORM=local 时总是使用本机嵌入模型
+    """
+    if backend == "local" or platform == "local":
+        from utils.local_embeddings import LocalOnnxEmbeddings
+        return LocalOnnxEmbeddings()
+    if platform == "openai":
+        from langchain_community.embeddings import OpenAIEmbeddings
+        return OpenAIEmbeddings(
+            model=MODEL_CONFIGS['dashscope']['embedding_model'],
+            api_key=MODEL_CONFIGS['dashscope']['api_key'])
+    if platform == "tongyi":
+        from langchain_community.embeddings import DashScopeEmbeddings
+        return DashScopeEmbeddings(
+            model=MODEL_CONFIGS['dashscope']['embedding_model'],
+            dashscope_api_key=MODEL_CONFIGS['dashscope']['api_key'])
+    if platform == "qianfan":
+        from langchain_community.embeddings.baidu_qianfan_endpoint import QianfanEmbeddingsEndpoint
+        return QianfanEmbeddingsEndpoint(
+            model=MODEL_CONFIGS['dashscope']['embedding_model'],
+            api_key=MODEL_CONFIGS['dashscope']['api_key'])
+    if platform == "fake":
+        from langchain_community.embeddings import DeterministicFakeEmbedding
+        return DeterministicFakeEmbedding(size=256)
+    raise ValueError(f"Unsupported LLM platform: {platform}")
+
+
+def create_llm_platform(platform=LLM_PLATFORM):
+    """
+    按平台配置创建大模型与嵌入模型
+    :param platform: LLM 平台名称，默认读取配置 LLM_PLATFORM
+    :return: (llm, embeddings)
+    """
+    embeddings = create_embeddings(platform)
+    return create_llm(platform), embeddings
+
+
+def model_label(llm):
+    """大模型的名称（用于判定仓库等统计），取不到时退回模型类型"""
+    for attr in ("model_name", "model"):
+        name = getattr(llm, attr, None)
+        if isinstance(name, str) and name:
+            return name
+    return getattr(llm, "_llm_type", type(llm).__name__)
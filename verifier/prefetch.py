@@ -0,0 +1,83 @@
+"""
+推测式预取：主文档解析与被引文献准备重叠执行
+1. 参考文献提取（processReferences）与全文解析/向量库构建（processFulltextDocument）同时发出
+2. 参考文献列表一就绪，即在后台为全部 arXiv 文献解析下载链接、下载PDF到共享存储并提取摘要（写入运行日志 parsed 阶段）
+3. 验证循环按顺序处理参考文献时先等待该文献的预取完成，之后的阶段直接复用日志中的结果
+
+预取不持有PDF租约，验证循环取用时照常经 download_if_needed 取得租约；预取失败的文献由验证循环同步重试并按原方式报错。
+"""
+import threading
+import time
+from concurrent.futures import wait
+
+
+class ReferencePrefetcher:
+    def __init__(self, system, executor):
+        """
+        :param system: CitationVerificationSystem 或 CitationVerificationLangchainVer
+        :param executor: 共享线程池（VerifierSession.executor）
+        """
+        self.system = system
+        self.executor = executor
+        self.fulltext = None
+        self._futures = {}
+        self._lock = threading.Lock()
+        self.stats = {"submitted": 0, "warmed": 0, "failed": 0, "waited": 0.0}
+
+    def start(self):
+        """并行发出参考文献提取与全文解析；参考文献就绪后由 system.extract_references 回调 submit"""
+        self.fulltext = self.executor.submit(self.system.prepare_fulltext)
+        self.executor.submit(self.system.extract_references)
+        return self
+
+    def submit(self, references):
+        """为需要验证的 arXiv 文献提交预取任务（已提交或已完成的跳过）"""
+        with self._lock:
+            for ref in references:
+                ref_key = ref.get("doi")
+                if not ref_key or ref_key in self._futures:
+                    continue
+                if not (ref.get("journal") and ref.get("journal").lower() == "arxiv"):
+                    continue
+                if self.system.journal.is_done(ref_key):
+                    continue
+                self._futures[ref_key] = self.executor.submit(self._warm, ref)
+                self.stats["submitted"] += 1
+
+    def _warm(self, ref):
+        ref_key = ref["doi"]
+        journal = self.system.journal
+        if journal.get(ref_key, "parsed") is not None:
+            return
+        try:
+            ref_path = self.system.download_if_needed(ref_key, lease=False)
+            parsed = {"abstract": self.system.parser.extract_abstract(ref_path) or "", "path": ref_path}
+            journal.record(ref_key, "parsed", parsed)
+            self._count("warmed")
+        except Exception as e:
+            self._count("failed")
+            print(f"[警告] 预取文献 {ref_key} 失败，将在验证时重试: {e}")
+
+    def wait(self, ref_key):
+        """等待该文献的预取完成（未提交预取时立即返回）"""
+        with self._lock:
+            future = self._futures.get(ref_key)
+        if future is not None and not future.done():
+            start = time.perf_counter()
+            future.result()
+            self._count("waited", time.perf_counter() - start)
+
+    def _count(self, name, value=1):
+        with self._lock:
+            self.stats[name] += value
+
+    def wait_fulltext(self):
+        """等待全文解析完成（失败时不抛出，由调用方同步重试并报错）"""
+        if self.fulltext is not None:
+            wait([self.fulltext])
+
+    def cancel(self):
+        """取消尚未开始的预取任务"""
+        with self._lock:
+            for future in self._futures.values():
+                future.cancel()
@@ -0,0 +1,86 @@
+"""
+提示词前缀缓存统计
+- 本地估算：按模型与参考文献记录提示词前缀（指令与参考文献条目），同一前缀再次出现时计为可复用的前缀 token
+- 服务商返回：从模型回调中读取输入 token 与缓存命中 token（OpenAI/DashScope 的 prompt_tokens_details.cached_tokens、
+  Anthropic 的 cache_read_input_tokens、对话模型的 usage_metadata.input_token_details.cache_read），服务商未返回时不计入
+"""
+import threading
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from utils.tokens import count_tokens
+from verifier.prompts import citation_prefix_template
+
+
+def _usage_tokens(usage):
+    """从服务商返回的 usage 中取出 (输入 token, 缓存命中 token)"""
+    if not isinstance(usage, dict):
+        return None, None
+    prompt = usage.get("prompt_tokens", usage.get("input_tokens"))
+    details = usage.get("prompt_tokens_details") or usage.get("input_token_details") or {}
+    cached = details.get("cached_tokens", details.get("cache_read")) if isinstance(details, dict) else None
+    if cached is None:
+        cached = usage.get("cache_read_input_tokens")
+    return prompt, cached
+
+
+class PromptCacheMeter(BaseCallbackHandler):
+    """单次验证运行的提示词缓存统计，作为回调传给 CitationChains.invoke"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._prefixes = {}
+        self.stats = {"calls": 0, "prefix_tokens": 0, "reusable_tokens": 0,
+                      "reported_calls": 0, "prompt_tokens": 0, "cached_tokens": 0}
+
+    def observe_prefix(self, chains, variant, inputs):
+        """记录本次调用的提示词前缀；同一模型、同一文献的前缀再次出现时计为可复用"""
+        key = (id(chains), variant, inputs["title"], str(inputs["authors"]), inputs["abstract"])
+        with self._lock:
+            tokens = self._prefixes.get(key)
+        reused = tokens is not None
+        if not reused:
+            tokens = count_tokens(citation_prefix_template(*variant).format(
+                title=inputs["title"], authors=inputs["authors"], abstract=inputs["abstract"]))
+        with self._lock:
+            self._prefixes[key] = tokens
+            self.stats["calls"] += 1
+            self.stats["prefix_tokens"] += tokens
+            if reused:
+                self.stats["reusable_tokens"] += tokens
+
+    def on_llm_end(self, response, **kwargs):
+        prompt, cached = _usage_tokens((response.llm_output or {}).get("token_usage")
+                                       or (response.llm_output or {}).get("usage"))
+        if prompt is None:
+            for generations in response.generations:
+                for generation in generations:
+                    message = getattr(generation, "message", None)
+                    usage = getattr(message, "usage_metadata", None) or \
+                        (generation.generation_info or {}).get("token_usage") or \
+                        (generation.generation_info or {}).get("usage")
+                    prompt, cached = _usage_tokens(usage)
+                    if prompt is not None:
+                        break
+                if prompt is not None:
+                    break
+        if prompt is None:
+            return
+        with self._lock:
+            self.stats["reported_calls"] += 1
+            self.stats["prompt_tokens"] += prompt
+            self.stats["cached_tokens"] += cached or 0
+
+    def summary(self):
+        with self._lock:
+            s = dict(self.stats)
+        if not s["calls"]:
+            return "提示词缓存：本次运行没有模型调用"
+        msg = (f"提示词缓存：{s['calls']} 次调用，同一文献的前缀可复用 {s['reusable_tokens']}/{s['prefix_tokens']} tokens"
+               f"（{s['reusable_tokens'] / max(s['prefix_tokens'], 1):.1%}）")
+        if s["reported_calls"]:
+            msg += (f"；服务商返回缓存命中 {s['cached_tokens']}/{s['prompt_tokens']} 输入 tokens"
+                    f"（{s['cached_tokens'] / max(s['prompt_tokens'], 1):.1%}，{s['reported_calls']} 次调用有用量信息）")
+        else:
+            msg += "；服务商未返回缓存用量"
+        return msg
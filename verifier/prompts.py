@@ -0,0 +1,149 @@
+import re
+from functools import lru_cache
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.prompts import ChatPromptTemplate, PromptTemplate
+
+from config.settings import PROMPT_CACHE_HINTS
+
+# 提示词按“静态指令 → 参考文献条目 → 证据段落 → 引用片段”排列：同一文献的多段上下文共享相同的前缀（指令与文献条目），
+# 服务商的提示词前缀缓存可以命中，随上下文变化的部分放在最后
+CITATION_INSTRUCTION = """请判断论文正文中的引用片段是否真正参考了下面给出的文献，从论文内容、相关性等方面判断。
+请输出“相关/不相关/不确定”，并给出简短理由。"""
+
+CITATION_EVIDENCE_INSTRUCTION = """请判断论文正文中的引用片段是否真正参考了下面给出的文献，从论文内容、相关性等方面判断。
+请结合摘要与参考文献正文段落，输出“相关/不相关/不确定”，并给出简短理由。"""
+
+# 级联中的快速模型需同时给出置信度，用于决定是否交给复核模型
+CONFIDENCE_INSTRUCTION = """
+输出格式：第一行只写“相关/不相关/不确定”，第二行写“置信度：”加 0 到 1 之间的小数，之后给出简短理由。"""
+
+REFERENCE_BLOCK = """
+
+参考文献条目：
+标题：{title}
+作者：{authors}
+摘要：{abstract}"""
+
+EVIDENCE_BLOCK = """参考文献正文中与引用片段最相关的段落：
+\"\"\"{evidence}\"\"\"
+
+"""
+
+CONTEXT_BLOCK = """论文正文引用片段：
+\"\"\"{context}\"\"\""""
+
+CITATION_VERIFY_TEMPLATE = CITATION_INSTRUCTION + REFERENCE_BLOCK + "\n\n" + CONTEXT_BLOCK
+
+CITATION_EVIDENCE_TEMPLATE = CITATION_EVIDENCE_INSTRUCTION + REFERENCE_BLOCK + "\n\n" + EVIDENCE_BLOCK + CONTEXT_BLOCK
+
+_CONFIDENCE_RE = re.compile(r'置信度\s*[:：]\s*([0-9]*\.?[0-9]+)')
+
+
+def citation_prefix_template(with_evidence=False, with_confidence=False):
+    """同一文献的所有上下文共享的提示词前缀（指令与参考文献条目）"""
+    instruction = CITATION_EVIDENCE_INSTRUCTION if with_evidence else CITATION_INSTRUCTION
+    if with_confidence:
+        instruction += CONFIDENCE_INSTRUCTION
+    return instruction + REFERENCE_BLOCK
+
+
+def citation_suffix_template(with_evidence=False):
+    """随引用上下文变化的提示词后缀（证据段落与引用片段）"""
+    return (EVIDENCE_BLOCK if with_evidence else "") + CONTEXT_BLOCK
+
+
+@lru_cache(maxsize=None)
+def build_citation_prompt(with_evidence=False, with_confidence=False):
+    """构造引用验证的提示词模板（按参数缓存，进程内只构造一次）"""
+    return PromptTemplate.from_template(
+        citation_prefix_template(with_evidence, with_confidence) + "\n\n" + citation_suffix_template(with_evidence))
+
+
+@lru_cache(maxsize=None)
+def build_citation_chat_prompt(with_evidence=False, with_confidence=False, cache_hints=False):
+    """
+    构造对话模型使用的提示词模板：前缀作为 system 消息，引用片段作为 user 消息
+    :param cache_hints: 是否在前缀上标注 cache_control（支持显式缓存的服务商据此缓存前缀）
+    """
+    prefix = citation_prefix_template(with_evidence, with_confidence)
+    if cache_hints:
+        prefix = [{"type": "text", "text": prefix, "cache_control": {"type": "ephemeral"}}]
+    return ChatPromptTemplate.from_messages([("system", prefix), ("human", citation_suffix_template(with_evidence))])
+
+
+class CitationChains:
+    """
+    预先编译的引用验证链（提示词模板 | 大模型），会话内构造一次、多线程共用
+    文本补全模型使用单段提示词，对话模型使用 system（前缀）+ user（引用片段）两条消息
+    """
+
+    def __init__(self, llm, cache_hints=PROMPT_CACHE_HINTS):
+        self.llm = llm
+        chat = isinstance(llm, BaseChatModel)
+        if cache_hints and not chat:
+            # 目前可配置的平台（tongyi / openai / qianfan / local）均为文本补全模型，单段提示词无法标注 cache_control
+            print(f"[警告] PROMPT_CACHE_HINTS 只对对话模型生效，当前大模型 {type(llm).__name__} 为文本补全模型，不发送缓存提示")
+        self.chains = {}
+        for with_evidence in (False, True):
+            for with_confidence in (False, True):
+                prompt = build_citation_chat_prompt(with_evidence, with_confidence, cache_hints) if chat \
+                    else build_citation_prompt(with_evidence, with_confidence)
+                self.chains[(with_evidence, with_confidence)] = prompt | llm
+
+    def invoke(self, inputs, with_confidence=False, meter=None):
+        """
+        :param inputs: citation_inputs 构造的输入
+        :param meter: 可选，PromptCacheMeter，统计前缀复用与服务商返回的缓存命中 token
+        :return: 模型输出文本
+        """
+        with_evidence = "evidence" in inputs
+        config = None
+        if meter is not None:
+            meter.observe_prefix(self, (with_evidence, with_confidence), inputs)
+            config = {"callbacks": [meter]}
+        output = self.chains[(with_evidence, with_confidence)].invoke(inputs, config=config)
+        return getattr(output, "content", output)
+
+
+def citation_inputs(context, title, authors, abstract, evidence=None):
+    """构造提示词模板的输入"""
+    inputs = {
+        "context": context,
+        "title": title,
+        "authors": authors,
+        "abstract": abstract
+    }
+    if evidence:
+        inputs["evidence"] = "\n\n".join(evidence)
+    return inputs
+
+
+def verify_citation_with_llm(llm, context, title, authors, abstract, evidence=None):
+    """
+    使用给定大模型验证单个引用
+    :param evidence: 可选，被引文献正文中检索到的证据段落列表
+    """
+    inputs = citation_inputs(context, title, authors, abstract, evidence)
+    # 使用新的 RunnableSequence 方法
+    citation_verifier = build_citation_prompt(with_evidence=bool(evidence)) | llm
+
+    return citation_verifier.invoke(inputs)
+
+
+def parse_verdict(output_text):
+    """从模型输出的第一行解析判定：相关/不相关/不确定（无法识别时视为不确定）"""
+    lines = output_text.strip().split("\n")
+    first = lines[0] if lines else ""
+    for verdict in ("不相关", "不确定", "相关"):
+        if verdict in first:
+            return verdict
+    return "不确定"
+
+
+def parse_confidence(output_text):
+    """解析模型输出中的置信度（0~1），未给出时返回 None"""
+    match = _CONFIDENCE_RE.search(output_text)
+    if not match:
+        return None
+    return min(max(float(match.group(1)), 0.0), 1.0)
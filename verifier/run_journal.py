@@ -0,0 +1,109 @@
+import json
+import os
+import threading
+import time
+
+# 每条参考文献依次经历的阶段
+STAGES = ("resolved", "downloaded", "parsed", "contexts", "verdict", "done", "error")
+# 文档级记录使用的键（如向量库构建）
+DOC_KEY = "__doc__"
+
+
+class RunJournal:
+    """
+    验证运行日志（断点续跑）
+    以追加写 JSONL 的方式记录每条参考文献各阶段的结果，每次写入只追加一行并 flush，开销与单次 print 相当；
+    重启时回放日志恢复内存索引，已完成的阶段直接跳过。
+    日志首行记录文档内容哈希，文档内容变化时自动丢弃旧日志重新开始。
+    运行结束时 close() 关闭追加句柄，之后再写入（如后台预取）时重新打开。
+    """
+
+    def __init__(self, path, doc_digest, resume=True):
+        self.path = path
+        self.doc_digest = doc_digest
+        self._lock = threading.Lock()
+        # ref_key -> {stage: data}，verdict 阶段为 {context_idx: entry}
+        self._state = {}
+        self.resumed = False
+
+        if resume and os.path.exists(path):
+            self.resumed = self._replay()
+        if not self.resumed:
+            self._state = {}
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(json.dumps({"stage": "run", "doc_digest": doc_digest,
+                                    "started_at": time.time()}) + "\n")
+        self._fh = open(path, "a", encoding="utf-8")
+        # 中断时可能留下不完整的末行，补一个换行避免与后续记录粘连
+        if self.resumed and not self._ends_with_newline():
+            self._fh.write("\n")
+
+    def _ends_with_newline(self):
+        with open(self.path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() == 0:
+                return True
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def _replay(self):
+        """回放日志，返回日志是否可用于续跑"""
+        with open(self.path, "r", encoding="utf-8") as f:
+            header = f.readline()
+            try:
+                if json.loads(header).get("doc_digest") != self.doc_digest:
+                    return False
+            except json.JSONDecodeError:
+                return False
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # 进程中断时最后一行可能不完整，忽略即可
+                    continue
+                self._apply(record)
+        return True
+
+    def _apply(self, record):
+        stages = self._state.setdefault(record["ref"], {})
+        if record["stage"] == "verdict":
+            stages.setdefault("verdict", {})[record["data"]["context_idx"]] = record["data"]
+        else:
+            stages[record["stage"]] = record["data"]
+
+    def record(self, ref_key, stage, data=None):
+        """追加一条阶段记录"""
+        if stage not in STAGES and ref_key != DOC_KEY:
+            raise ValueError(f"未知阶段: {stage}")
+        record = {"ref": ref_key, "stage": stage, "data": data or {}}
+        with self._lock:
+            self._apply(record)
+            if self._fh is None:
+                self._fh = open(self.path, "a", encoding="utf-8")
+            self._fh.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._fh.flush()
+
+    def get(self, ref_key, stage):
+        """返回某阶段记录的数据，未完成时返回 None"""
+        return self._state.get(ref_key, {}).get(stage)
+
+    def contexts(self, ref_key, mode):
+        """返回以 mode 提取的引用上下文；未记录或提取方式已变化时返回 None"""
+        data = self.get(ref_key, "contexts")
+        if data is None or data.get("mode") != mode:
+            return None
+        return data["contexts"]
+
+    def verdicts(self, ref_key):
+        """按上下文序号返回已完成的验证结果"""
+        verdicts = self._state.get(ref_key, {}).get("verdict", {})
+        return [verdicts[idx] for idx in sorted(verdicts)]
+
+    def is_done(self, ref_key):
+        return "done" in self._state.get(ref_key, {})
+
+    def close(self):
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
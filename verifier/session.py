@@ -0,0 +1,125 @@
+"""
+验证会话：进程级共享资源与按文档的轻量句柄分离
+VerifierSession 每个进程创建一次，持有 GROBID 解析器（客户端池与TEI缓存）、arXiv 客户端、大模型/嵌入模型、
+PDF 共享存储与被引文献证据索引；open() 返回的验证器只记录文档路径与运行日志，
+参考文献提取、输出文件初始化、全文解析与向量库构建都推迟到首次使用时执行。
+
+    session = get_session()
+    system = session.open("paper.pdf", "./output", verify_type="simple")
+    system.verify_citation(system.extract_references())
+"""
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+from clients.arxiv_client import ArxivClient
+from config.settings import (CheckType, GROBID_URL, LLM_PLATFORM, PDF_STORE_DIR, PREFETCH_WORKERS,
+                             VERDICT_WAREHOUSE_DIR)
+from parsers.grobid_parser import GrobidParser as gp
+from utils.evidence_retriever import create_evidence_retriever
+from utils.pdf_store import get_pdf_store
+from utils.verdict_warehouse import get_verdict_warehouse
+from verifier.cascade import create_cascade
+from verifier.llm_platform import create_llm_platform, model_label
+from verifier.prompts import CitationChains, citation_inputs
+
+
+class VerifierSession:
+    def __init__(self, grobid_url=GROBID_URL, llm_platform=LLM_PLATFORM, pdf_store_dir=PDF_STORE_DIR,
+                 parser=None, arxiv_client=None, llm=None, embeddings=None, prefetch_workers=PREFETCH_WORKERS,
+                 warehouse_dir=VERDICT_WAREHOUSE_DIR):
+        """
+        :param parser/arxiv_client/llm/embeddings: 可选，传入已初始化的客户端，未传入时按配置新建
+        :param prefetch_workers: 推测式预取（verifier/prefetch）的线程数，会话内所有文档共用；0 为关闭
+        :param warehouse_dir: 判定仓库目录（utils/verdict_warehouse），为空时不记录
+        """
+        self.parser = parser or gp(grobid_url=grobid_url)
+        self.arxiv_client = arxiv_client or ArxivClient()
+        if llm is None or embeddings is None:
+            llm, embeddings = create_llm_platform(llm_platform)
+        self.llm = llm
+        self.model_name = model_label(llm)
+        self.embeddings = embeddings
+        # 预先编译的引用验证链（提示词模板 | 大模型），会话内所有文档共用
+        self.chains = CitationChains(self.llm)
+        # 模型级联（配置 LLM_FAST_MODEL 时启用，self.llm 作为复核模型）
+        self.cascade = create_cascade(llm_platform, self.llm)
+        self.pdf_store = get_pdf_store(pdf_store_dir)
+        # 被引文献证据索引按 arXiv ID 缓存，会话内所有文档共享；EVIDENCE_MODE=abstract 时为 None
+        self.evidence_retriever = create_evidence_retriever(self.parser, self.embeddings)
+        # 跨运行的判定仓库，未配置目录或未安装 pyarrow 时为 None
+        self.warehouse = get_verdict_warehouse(warehouse_dir)
+        self.executor = ThreadPoolExecutor(prefetch_workers, thread_name_prefix="prefetch") \
+            if prefetch_workers > 0 else None
+        self._langchain_grobid_parser = None
+        self._lock = threading.Lock()
+        # 本会话打开的文档句柄，close() 时关闭其运行日志
+        self._systems = weakref.WeakSet()
+
+    @property
+    def langchain_grobid_parser(self):
+        """链路模式 vector 检索用于TEI组块的 langchain GrobidParser（构造时会探测 GROBID 服务，首次使用时创建）"""
+        with self._lock:
+            if self._langchain_grobid_parser is None:
+                from langchain_community.document_loaders.parsers import GrobidParser
+                self._langchain_grobid_parser = GrobidParser(
+                    segment_sentences=False, grobid_server=f"{self.parser.grobid_url}/api/processFulltextDocument")
+            return self._langchain_grobid_parser
+
+    def verify_single_citation(self, context, title, authors, abstract, evidence=None, meter=None, info=None):
+        """
+        验证单个引用：启用级联时先由快速模型判定，否则直接交给 self.llm
+        :param meter: 可选，PromptCacheMeter，统计本次运行的提示词缓存
+        :param info: 可选，dict，写入给出判定的模型名称（model）与级联层级（tier）
+        """
+        if self.cascade is not None:
+            return self.cascade.verify(context, title, authors, abstract, evidence, meter=meter, info=info)
+        if info is not None:
+            info.update(model=self.model_name, tier="")
+        return self.chains.invoke(citation_inputs(context, title, authors, abstract, evidence), meter=meter)
+
+    def open_verdict_log(self, doc_id, doc_digest, method, run_id=None):
+        """为一次运行创建判定缓冲（VerdictLog），未启用判定仓库时返回 None"""
+        if self.warehouse is None:
+            return None
+        return self.warehouse.open_run(doc_id, doc_digest, method, run_id)
+
+    def open(self, doc_path, output_dir, verify_type=CheckType.CHECK_TYPE_SIMPLE.value, resume=True,
+             retrieval_mode=None, prefetch=True):
+        """
+        打开文档，返回共享本会话资源的验证器（构造本身不解析文档）
+        :param verify_type: simple（CitationVerificationSystem）或 chain（CitationVerificationLangchainVer）
+        :param prefetch: 是否立即在后台开始解析文档并预取被引文献（会话未启用预取线程时忽略）
+        """
+        if verify_type == CheckType.CHECK_TYPE_SIMPLE.value:
+            from verifier.citation_verifier_system import CitationVerificationSystem
+            system = CitationVerificationSystem(self.pdf_store.root, doc_path, output_dir, resume=resume, session=self)
+        else:
+            from verifier.citation_verify_langchain_ver import CitationVerificationLangchainVer
+            system = CitationVerificationLangchainVer(self.pdf_store.root, doc_path, output_dir, resume=resume,
+                                                      retrieval_mode=retrieval_mode, session=self)
+        if prefetch and self.executor is not None:
+            system.start_prefetch(self.executor)
+        self._systems.add(system)
+        return system
+
+    def close(self):
+        """结束会话：等待预取线程结束，并关闭已打开文档的运行日志"""
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        for system in list(self._systems):
+            system.journal.close()
+
+
+_SESSIONS = {}
+_SESSIONS_LOCK = threading.Lock()
+
+
+def get_session(grobid_url=GROBID_URL, llm_platform=LLM_PLATFORM, pdf_store_dir=PDF_STORE_DIR):
+    """按配置共享 VerifierSession 实例（同一进程内只初始化一次）"""
+    key = (grobid_url, llm_platform, pdf_store_dir)
+    with _SESSIONS_LOCK:
+        if key not in _SESSIONS:
+            _SESSIONS[key] = VerifierSession(grobid_url, llm_platform, pdf_store_dir)
+        return _SESSIONS[key]
@@ -0,0 +1,411 @@
+"""
+分片执行：将一篇论文的引用验证拆分到多个进程/节点
+1. plan:  论文只解析一次，提取参考文献及其引用上下文，序列化为工作单元（每条参考文献一个单元），按 shard_size 打包为分片写入队列目录
+2. work:  worker 从 pending/ 原子领取分片（rename 到 running/），逐单元验证，结果写入 results/<unit_id>.json
+3. merge: 按参考文献顺序与上下文序号确定性地合并为一份报告
+
+队列目录放在共享文件系统上即可供远程 worker 使用。工作单元的ID由内容哈希得到，已有最终结果的单元会被跳过，
+因此任意分片都可以单独重试（retry 将 failed/ 中的分片移回 pending/）。下载、解析等出错的单元结果只用于报告，
+不算最终结果，所在分片进入 failed/，重试时重新执行。
+
+运行：
+    python -m verifier.sharding run   --doc_path paper.pdf --verify_type simple --spool_dir ./spool --download_dir ./pdf_store --processes 4
+    python -m verifier.sharding plan  --doc_path paper.pdf --verify_type simple --spool_dir ./spool --download_dir ./pdf_store
+    python -m verifier.sharding work  --spool_dir ./spool --download_dir ./pdf_store --processes 4
+    python -m verifier.sharding retry --spool_dir ./spool
+    python -m verifier.sharding merge --spool_dir ./spool
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import socket
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+from config.settings import CheckType, PDF_STORE_DIR
+from parsers.grobid_parser import GrobidParser as gp
+from utils.arxiv_id import arxiv_key
+from verifier.prompts import parse_verdict
+from verifier.session import VerifierSession, get_session
+
+QUEUE_DIRS = ("pending", "running", "failed", "done", "results")
+# 最终结果的单元状态，重试时跳过；error（下载、GROBID 等可能是暂时性的失败）重新执行
+FINAL_STATUSES = ("ok", "no_context")
+
+
+def _write_json_atomic(path, payload):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _unit_id(doc_digest, ref, contexts):
+    """工作单元ID：由论文内容、参考文献条目与引用上下文共同决定，相同输入总是得到相同ID"""
+    h = hashlib.sha1(doc_digest.encode())
+    h.update(json.dumps([ref, contexts], ensure_ascii=False,
+             sort_keys=True).encode("utf-8"))
+    return h.hexdigest()[:20]
+
+
+class ShardSpool:
+    """基于目录的分片队列，目录内的状态迁移均通过原子 rename 完成"""
+
+    def __init__(self, spool_dir):
+        self.spool_dir = spool_dir
+        for d in QUEUE_DIRS:
+            os.makedirs(os.path.join(spool_dir, d), exist_ok=True)
+        self.manifest_path = os.path.join(spool_dir, "manifest.json")
+
+    def path(self, state, name):
+        return os.path.join(self.spool_dir, state, name)
+
+    def list(self, state):
+        return sorted(f for f in os.listdir(os.path.join(self.spool_dir, state)) if f.endswith(".json"))
+
+    def claim(self):
+        """领取一个待处理分片，返回 (分片名, 分片内容)，队列为空时返回 (None, None)"""
+        for name in self.list("pending"):
+            try:
+                os.replace(self.path("pending", name),
+                           self.path("running", name))
+            except FileNotFoundError:
+                # 已被其他 worker 领取
+                continue
+            return name, _read_json(self.path("running", name))
+        return None, None
+
+    def finish(self, name, ok, error=None):
+        target = "done" if ok else "failed"
+        if error:
+            shard = _read_json(self.path("running", name))
+            shard["error"] = error
+            _write_json_atomic(self.path("running", name), shard)
+        os.replace(self.path("running", name), self.path(target, name))
+
+    def retry_failed(self):
+        """将失败分片移回待处理队列"""
+        names = self.list("failed")
+        for name in names:
+            os.replace(self.path("failed", name), self.path("pending", name))
+        return len(names)
+
+    def requeue_stale(self, timeout):
+        """将超时未完成（worker 异常退出）的分片移回待处理队列"""
+        now = time.time()
+        count = 0
+        for name in self.list("running"):
+            path = self.path("running", name)
+            try:
+                if now - os.path.getmtime(path) > timeout:
+                    os.replace(path, self.path("pending", name))
+                    count += 1
+            except FileNotFoundError:
+                continue
+        return count
+
+    def has_result(self, unit_id):
+        """单元是否已有最终结果（出错的结果不算）"""
+        payload = self.load_result(unit_id)
+        return payload is not None and payload["status"] in FINAL_STATUSES
+
+    def save_result(self, unit_id, payload):
+        _write_json_atomic(self.path("results", f"{unit_id}.json"), payload)
+
+    def load_result(self, unit_id):
+        path = self.path("results", f"{unit_id}.json")
+        return _read_json(path) if os.path.exists(path) else None
+
+
+def plan_shards(system, references, verify_type, spool_dir, shard_size=10):
+    """
+    解析论文并生成分片
+    :param system: 已初始化的验证系统（CitationVerificationSystem 或 CitationVerificationLangchainVer）
+    :param references: extract_references 的结果
+    :param verify_type: simple / chain
+    :param spool_dir: 队列目录
+    :param shard_size: 每个分片包含的参考文献数
+    :return: manifest 字典
+    """
+    spool = ShardSpool(spool_dir)
+    doc_digest = gp.file_digest(system.doc_path)
+    method = "grobid_extraction" if verify_type == CheckType.CHECK_TYPE_SIMPLE.value else "vector_retrieval"
+
+    eligible, skipped = [], []
+    for ref_index, ref in enumerate(references):
+        if not ref.get("doi") or not (ref.get("journal") and ref.get("journal").lower() == "arxiv"):
+            skipped.append({"ref_index": ref_index, "title": ref.get("title"),
+                            "reason": "非arXiv文献或缺少DOI"})
+            continue
+        eligible.append((ref_index, ref))
+
+    # 重复引用同一文献时复用首次出现的工作单元
+    first_by_doi = {}
+    for ref_index, ref in eligible:
+        first_by_doi.setdefault(ref["doi"], (ref_index, ref))
+    unique = list(first_by_doi.values())
+    if method == "grobid_extraction":
+        contexts_list = [system.extract_contexts(ref) for _, ref in unique]
+    else:
+        # 向量检索模式一次批量检索全部参考文献
+        contexts_list = system.extract_refer_texts_bulk([ref for _, ref in unique])
+
+    units, unit_by_doi = [], {}
+    for (ref_index, ref), contexts in zip(unique, contexts_list):
+        unit_id = _unit_id(doc_digest, ref, contexts)
+        unit_by_doi[ref["doi"]] = unit_id
+        units.append({"unit_id": unit_id, "ref_index": ref_index, "method": method,
+                      "ref": ref, "contexts": contexts})
+    # 报告顺序与串行运行一致：普通模式重复引用时重复输出首次的结果，链路模式只输出一次
+    order = [unit_by_doi[ref["doi"]] for _, ref in eligible]
+    if method == "vector_retrieval":
+        order = list(dict.fromkeys(order))
+
+    shards = []
+    for i in range(0, len(units), shard_size):
+        batch = units[i:i + shard_size]
+        shard_id = hashlib.sha1(
+            "".join(u["unit_id"] for u in batch).encode()).hexdigest()[:16]
+        name = f"{i // shard_size:05d}_{shard_id}.json"
+        shards.append(name)
+        # 已完成的分片不再重复入队
+        if not any(os.path.exists(spool.path(state, name)) for state in QUEUE_DIRS[:4]):
+            _write_json_atomic(spool.path("pending", name), {
+                "shard": name, "units": batch})
+
+    manifest = {"doc_id": system.doc_id, "doc_digest": doc_digest, "verify_type": verify_type,
+                "order": order, "skipped": skipped, "shards": shards}
+    _write_json_atomic(spool.manifest_path, manifest)
+    print(f"[成功] 共生成 {len(units)} 个工作单元，{len(shards)} 个分片 → {spool_dir}")
+    return manifest
+
+
+class ShardWorker:
+    """分片执行器：每个进程初始化一次客户端，循环领取分片直到队列为空"""
+
+    def __init__(self, spool_dir, download_dir, parser=None, arxiv_client=None, llm=None, embeddings=None):
+        self.spool = ShardSpool(spool_dir)
+        self.session = session = VerifierSession(pdf_store_dir=download_dir, parser=parser,
+                                                 arxiv_client=arxiv_client, llm=llm, embeddings=embeddings)
+        # 被引文献PDF共享存储，同一节点上的 worker 进程共用，同一文献只下载一次
+        self.pdf_store = session.pdf_store
+        self.parser = session.parser
+        self.arxiv_client = session.arxiv_client
+        self.llm = session.llm
+        self.evidence_retriever = session.evidence_retriever
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.verdict_log = None
+
+    def open_verdict_log(self, method):
+        """按队列的 manifest 创建判定仓库缓冲；同一队列的各 worker 共用一个运行ID"""
+        if self.verdict_log is None and os.path.exists(self.spool.manifest_path):
+            manifest = _read_json(self.spool.manifest_path)
+            run_id = hashlib.sha1(f"{os.path.abspath(self.spool.spool_dir)}:{manifest['doc_digest']}".encode()
+                                  ).hexdigest()[:12]
+            self.verdict_log = self.session.open_verdict_log(manifest["doc_id"], manifest["doc_digest"], method, run_id)
+        return self.verdict_log
+
+    def run_unit(self, unit):
+        """执行单个工作单元，返回可序列化的结果"""
+        ref = unit["ref"]
+        try:
+            ref_path = self.arxiv_client.fetch_pdf(ref["doi"], self.pdf_store, lease=True)
+        except Exception as e:
+            return {"unit_id": unit["unit_id"], "status": "error",
+                    "error": f"❌ 处理文献 {ref.get('title', '未知')} 时出错: {str(e)}", "entries": []}
+        # 验证期间持有租约，避免文件被存储回收
+        try:
+            return self._verify_unit(unit, ref_path)
+        finally:
+            self.pdf_store.release(arxiv_key(ref["doi"]) or ref["doi"])
+
+    def _verify_unit(self, unit, ref_path):
+        ref = unit["ref"]
+        try:
+            refer_abstract = self.parser.extract_abstract(ref_path) or ""
+        except Exception as e:
+            return {"unit_id": unit["unit_id"], "status": "error",
+                    "error": f"❌ 处理文献 {ref.get('title', '未知')} 时出错: {str(e)}", "entries": []}
+
+        if not unit["contexts"]:
+            return {"unit_id": unit["unit_id"], "status": "no_context",
+                    "error": f"❗️未找到引用: {ref.get('title')}", "entries": []}
+
+        entries = []
+        verdict_log = self.open_verdict_log(unit["method"])
+        for idx, context in enumerate(unit["contexts"]):
+            evidence = []
+            start = time.perf_counter()
+            if self.evidence_retriever is not None:
+                try:
+                    evidence = self.evidence_retriever.retrieve(ref["doi"], ref_path, context)
+                except Exception as e:
+                    print(f"[警告] 检索正文证据失败: {e}")
+            evidence_seconds = time.perf_counter() - start
+            info = {}
+            start = time.perf_counter()
+            output_text = self.session.verify_single_citation(
+                context, ref['title'], ref['authors'], refer_abstract, evidence, info=info).strip()
+            if verdict_log is not None:
+                verdict_log.add(ref["doi"], ref['title'], idx + 1, context, parse_verdict(output_text),
+                                info.get("model", ""), info.get("tier", ""), time.perf_counter() - start,
+                                evidence_seconds, len(evidence))
+            entries.append({
+                "method": unit["method"],
+                "ref_title": ref['title'],
+                "ref_authors": ref['authors'],
+                "context_idx": idx + 1,
+                "context": context,
+                "evidence": evidence,
+                "verification_result": output_text,
+                "is_related": "相关" in output_text.split("\n")[0]
+            })
+        return {"unit_id": unit["unit_id"], "status": "ok", "worker": self.worker_id, "entries": entries}
+
+    def run(self):
+        """循环领取并执行分片，返回处理的分片数"""
+        processed = 0
+        while True:
+            name, shard = self.spool.claim()
+            if name is None:
+                return processed
+            try:
+                failed = 0
+                for unit in shard["units"]:
+                    if self.spool.has_result(unit["unit_id"]):
+                        continue
+                    result = self.run_unit(unit)
+                    self.spool.save_result(unit["unit_id"], result)
+                    failed += result["status"] not in FINAL_STATUSES
+                if failed:
+                    # 出错的单元结果仍写入 results/ 供合并报告，分片进入 failed/，retry 后只重新执行这些单元
+                    self.spool.finish(name, ok=False, error=f"{failed} 个工作单元出错")
+                    print(f"[错误] {self.worker_id} 分片 {name} 中 {failed} 个工作单元出错")
+                else:
+                    self.spool.finish(name, ok=True)
+                    print(f"[成功] {self.worker_id} 完成分片 {name}")
+            except Exception as e:
+                traceback.print_exc()
+                self.spool.finish(name, ok=False, error=str(e))
+                print(f"[错误] {self.worker_id} 分片 {name} 失败: {e}")
+            # 每个分片结束后写入一次判定仓库（失败分片中已完成的单元同样保留）
+            if self.verdict_log is not None:
+                self.verdict_log.flush()
+            processed += 1
+
+
+def _worker_process_main(spool_dir, download_dir):
+    return ShardWorker(spool_dir, download_dir).run()
+
+
+def _mp_context():
+    """调用方进程中已有 GROBID 客户端池、预取等线程，fork 时可能带走被持有的锁；Linux/macOS 改由 forkserver 创建 worker"""
+    if sys.platform == "win32":
+        return multiprocessing.get_context("spawn")
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload(["verifier.sharding"])
+    return context
+
+
+def run_local_workers(spool_dir, download_dir, processes=4):
+    """在本机启动多个 worker 进程消费队列"""
+    if processes <= 1:
+        return _worker_process_main(spool_dir, download_dir)
+    with ProcessPoolExecutor(max_workers=processes, mp_context=_mp_context()) as pool:
+        futures = [pool.submit(_worker_process_main, spool_dir, download_dir)
+                   for _ in range(processes)]
+        return sum(f.result() for f in futures)
+
+
+def merge_results(spool_dir, output_path=None):
+    """
+    按参考文献原始顺序合并各单元结果
+    :return: 与串行 verify_citation 相同格式的结果列表
+    """
+    spool = ShardSpool(spool_dir)
+    manifest = _read_json(spool.manifest_path)
+    results, missing, errors = [], [], []
+    for unit_id in manifest["order"]:
+        payload = spool.load_result(unit_id)
+        if payload is None:
+            missing.append(unit_id)
+            continue
+        if payload["status"] != "ok":
+            errors.append(payload["error"])
+        results.extend(payload["entries"])
+
+    if missing:
+        print(f"❗️有 {len(set(missing))} 个工作单元尚无结果，报告不完整")
+    if output_path:
+        with open(output_path, "w", encoding="utf-8") as f:
+            f.write(f"引用验证报告 - {manifest['doc_id']}\n\n")
+            for entry in results:
+                f.write(f"【{entry['ref_title']}】段落{entry['context_idx']}:\n\n"
+                        f"{entry['context']}\nresult:\n {entry['verification_result']}\n\n")
+            for error in errors:
+                f.write(error + "\n")
+    return results
+
+
+def run_sharded(system, references, verify_type, spool_dir, download_dir, processes=4, shard_size=10, output_path=None):
+    """plan + 本地多进程执行 + merge"""
+    plan_shards(system, references, verify_type, spool_dir, shard_size)
+    # 本地模式下没有其他 worker，上次中断遗留在 running/ 的分片直接重新入队
+    ShardSpool(spool_dir).requeue_stale(timeout=0)
+    run_local_workers(spool_dir, download_dir, processes)
+    return merge_results(spool_dir, output_path)
+
+
+def build_system(verify_type, doc_path, download_dir, output_dir, resume=True, prefetch=True):
+    """经由进程内共享的 VerifierSession 打开文档"""
+    return get_session(pdf_store_dir=download_dir).open(doc_path, output_dir, verify_type, resume=resume,
+                                                        prefetch=prefetch)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='论文引用验证分片执行')
+    parser.add_argument('command', choices=['run', 'plan', 'work', 'retry', 'merge'])
+    parser.add_argument('--spool_dir', type=str, required=True, help='分片队列目录（远程 worker 需共享该目录）')
+    parser.add_argument('--doc_path', type=str, help='文档路径（plan/run）')
+    parser.add_argument('--verify_type', type=str, default='simple', help='验证模式：chain/simple')
+    parser.add_argument('--download_dir', type=str, default=PDF_STORE_DIR, help='参考文献PDF共享存储目录')
+    parser.add_argument('--output_dir', type=str, default='./output', help='结果输出目录')
+    parser.add_argument('--processes', type=int, default=4, help='本机 worker 进程数')
+    parser.add_argument('--shard_size', type=int, default=10, help='每个分片的参考文献数')
+    parser.add_argument('--stale_timeout', type=float, default=None,
+                        help='work 前将超过该秒数仍处于 running 的分片重新入队')
+    args = parser.parse_args()
+
+    report_path = os.path.join(args.output_dir, "sharded_report.txt")
+    if args.command in ("run", "plan"):
+        # run 由本机 worker 进程下载并验证被引文献，不在本进程预取
+        system = build_system(args.verify_type, args.doc_path, args.download_dir, args.output_dir,
+                              prefetch=args.command == "plan")
+        references = system.extract_references()
+        report_path = os.path.join(args.output_dir, f"sharded_{system.doc_id}.txt")
+        if args.command == "plan":
+            plan_shards(system, references, args.verify_type, args.spool_dir, args.shard_size)
+        else:
+            results = run_sharded(system, references, args.verify_type, args.spool_dir, args.download_dir,
+                                  args.processes, args.shard_size, report_path)
+            print(f"✅ 合并完成，共 {len(results)} 条结果 → {report_path}")
+    elif args.command == "work":
+        if args.stale_timeout is not None:
+            ShardSpool(args.spool_dir).requeue_stale(args.stale_timeout)
+        n = run_local_workers(args.spool_dir, args.download_dir, args.processes)
+        print(f"✅ 本机共处理 {n} 个分片")
+    elif args.command == "retry":
+        n = ShardSpool(args.spool_dir).retry_failed()
+        print(f"✅ 已将 {n} 个失败分片重新入队")
+    else:
+        os.makedirs(args.output_dir, exist_ok=True)
+        results = merge_results(args.spool_dir, report_path)
+        print(f"✅ 合并完成，共 {len(results)} 条结果 → {report_path}")